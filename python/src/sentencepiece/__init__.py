@@ -58,6 +58,18 @@ class _SwigNonDynamicMeta(type):
     __setattr__ = _swig_setattr_nondynamic_class_variable(type.__setattr__)
 
 
+
+def SetWorkerPoolSize(size):
+    return _sentencepiece.SetWorkerPoolSize(size)
+
+def GetWorkerPoolSize():
+    return _sentencepiece.GetWorkerPoolSize()
+
+def _ShutdownWorkerPool():
+    return _sentencepiece._ShutdownWorkerPool()
+
+def _ResetWorkerPoolAfterFork():
+    return _sentencepiece._ResetWorkerPoolAfterFork()
 class ImmutableSentencePieceText_ImmutableSentencePiece(object):
     thisown = property(lambda x: x.this.own(), lambda x, v: x.this.own(v), doc="The membership flag")
     __repr__ = _swig_repr
@@ -270,6 +282,27 @@ class SentencePieceProcessor(object):
     def LoadVocabulary(self, filename, threshold):
         return _sentencepiece.SentencePieceProcessor_LoadVocabulary(self, filename, threshold)
 
+    def SetEncodeCacheCapacity(self, capacity):
+        return _sentencepiece.SentencePieceProcessor_SetEncodeCacheCapacity(self, capacity)
+
+    def GetEncodeCacheCapacity(self):
+        return _sentencepiece.SentencePieceProcessor_GetEncodeCacheCapacity(self)
+
+    def GetEncodeCacheHits(self):
+        return _sentencepiece.SentencePieceProcessor_GetEncodeCacheHits(self)
+
+    def GetEncodeCacheMisses(self):
+        return _sentencepiece.SentencePieceProcessor_GetEncodeCacheMisses(self)
+
+    def ClearEncodeCache(self):
+        return _sentencepiece.SentencePieceProcessor_ClearEncodeCache(self)
+
+    def SetWordCacheCapacity(self, capacity):
+        return _sentencepiece.SentencePieceProcessor_SetWordCacheCapacity(self, capacity)
+
+    def GetWordCacheCapacity(self):
+        return _sentencepiece.SentencePieceProcessor_GetWordCacheCapacity(self)
+
     def CalculateEntropy(self, *args):
         return _sentencepiece.SentencePieceProcessor_CalculateEntropy(self, *args)
 
@@ -312,6 +345,12 @@ class SentencePieceProcessor(object):
     def serialized_model_proto(self):
         return _sentencepiece.SentencePieceProcessor_serialized_model_proto(self)
 
+    def serialized_precompiled_model(self):
+        return _sentencepiece.SentencePieceProcessor_serialized_precompiled_model(self)
+
+    def SavePrecompiled(self, filename):
+        return _sentencepiece.SentencePieceProcessor_SavePrecompiled(self, filename)
+
     def LoadFromFile(self, arg):
         return _sentencepiece.SentencePieceProcessor_LoadFromFile(self, arg)
 
@@ -339,6 +378,12 @@ class SentencePieceProcessor(object):
     def _EncodeAsImmutableProtoBatch(self, ins, num_threads, enable_sampling, nbest_size, alpha, add_bos, add_eos, reverse, emit_unk_piece):
         return _sentencepiece.SentencePieceProcessor__EncodeAsImmutableProtoBatch(self, ins, num_threads, enable_sampling, nbest_size, alpha, add_bos, add_eos, reverse, emit_unk_piece)
 
+    def _EncodeAsIdsBatchAsBuffer(self, ins, num_threads, enable_sampling, nbest_size, alpha, add_bos, add_eos, reverse, emit_unk_piece, max_length):
+        return _sentencepiece.SentencePieceProcessor__EncodeAsIdsBatchAsBuffer(self, ins, num_threads, enable_sampling, nbest_size, alpha, add_bos, add_eos, reverse, emit_unk_piece, max_length)
+
+    def _EncodeAsIdsBatchAsPadded(self, ins, num_threads, enable_sampling, nbest_size, alpha, add_bos, add_eos, reverse, emit_unk_piece, max_length, pad_length):
+        return _sentencepiece.SentencePieceProcessor__EncodeAsIdsBatchAsPadded(self, ins, num_threads, enable_sampling, nbest_size, alpha, add_bos, add_eos, reverse, emit_unk_piece, max_length, pad_length)
+
     def _DecodeIds(self, ids):
         return _sentencepiece.SentencePieceProcessor__DecodeIds(self, ids)
 
@@ -348,6 +393,15 @@ class SentencePieceProcessor(object):
     def _DecodePieces(self, pieces):
         return _sentencepiece.SentencePieceProcessor__DecodePieces(self, pieces)
 
+    def _NewDecodeStream(self):
+        return _sentencepiece.SentencePieceProcessor__NewDecodeStream(self)
+
+    def _SetParallelEncode(self, num_threads, chunk_size):
+        return _sentencepiece.SentencePieceProcessor__SetParallelEncode(self, num_threads, chunk_size)
+
+    def _EncodeAppended(self, text, state):
+        return _sentencepiece.SentencePieceProcessor__EncodeAppended(self, text, state)
+
     def _DecodeIdsAsSerializedProto(self, ids):
         return _sentencepiece.SentencePieceProcessor__DecodeIdsAsSerializedProto(self, ids)
 
@@ -405,12 +459,39 @@ class SentencePieceProcessor(object):
     def _SampleEncodeAndScoreAsImmutableProto(self, text, num_samples, alpha, wor, include_best, add_bos, add_eos, reverse, emit_unk_piece):
         return _sentencepiece.SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProto(self, text, num_samples, alpha, wor, include_best, add_bos, add_eos, reverse, emit_unk_piece)
 
+    def _NBestEncodeAsIdsBatch(self, ins, num_threads, nbest_size, add_bos, add_eos, reverse, emit_unk_piece):
+        return _sentencepiece.SentencePieceProcessor__NBestEncodeAsIdsBatch(self, ins, num_threads, nbest_size, add_bos, add_eos, reverse, emit_unk_piece)
+
+    def _NBestEncodeAsPiecesBatch(self, ins, num_threads, nbest_size, add_bos, add_eos, reverse, emit_unk_piece):
+        return _sentencepiece.SentencePieceProcessor__NBestEncodeAsPiecesBatch(self, ins, num_threads, nbest_size, add_bos, add_eos, reverse, emit_unk_piece)
+
+    def _NBestEncodeAsSerializedProtoBatch(self, ins, num_threads, nbest_size, add_bos, add_eos, reverse, emit_unk_piece):
+        return _sentencepiece.SentencePieceProcessor__NBestEncodeAsSerializedProtoBatch(self, ins, num_threads, nbest_size, add_bos, add_eos, reverse, emit_unk_piece)
+
+    def _NBestEncodeAsImmutableProtoBatch(self, ins, num_threads, nbest_size, add_bos, add_eos, reverse, emit_unk_piece):
+        return _sentencepiece.SentencePieceProcessor__NBestEncodeAsImmutableProtoBatch(self, ins, num_threads, nbest_size, add_bos, add_eos, reverse, emit_unk_piece)
+
+    def _SampleEncodeAndScoreAsIdsBatch(self, ins, num_threads, num_samples, alpha, wor, include_best, add_bos, add_eos, reverse, emit_unk_piece):
+        return _sentencepiece.SentencePieceProcessor__SampleEncodeAndScoreAsIdsBatch(self, ins, num_threads, num_samples, alpha, wor, include_best, add_bos, add_eos, reverse, emit_unk_piece)
+
+    def _SampleEncodeAndScoreAsPiecesBatch(self, ins, num_threads, num_samples, alpha, wor, include_best, add_bos, add_eos, reverse, emit_unk_piece):
+        return _sentencepiece.SentencePieceProcessor__SampleEncodeAndScoreAsPiecesBatch(self, ins, num_threads, num_samples, alpha, wor, include_best, add_bos, add_eos, reverse, emit_unk_piece)
+
+    def _SampleEncodeAndScoreAsSerializedProtoBatch(self, ins, num_threads, num_samples, alpha, wor, include_best, add_bos, add_eos, reverse, emit_unk_piece):
+        return _sentencepiece.SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProtoBatch(self, ins, num_threads, num_samples, alpha, wor, include_best, add_bos, add_eos, reverse, emit_unk_piece)
+
+    def _SampleEncodeAndScoreAsImmutableProtoBatch(self, ins, num_threads, num_samples, alpha, wor, include_best, add_bos, add_eos, reverse, emit_unk_piece):
+        return _sentencepiece.SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProtoBatch(self, ins, num_threads, num_samples, alpha, wor, include_best, add_bos, add_eos, reverse, emit_unk_piece)
+
     def _Normalize(self, text):
         return _sentencepiece.SentencePieceProcessor__Normalize(self, text)
 
     def _NormalizeWithOffsets(self, text):
         return _sentencepiece.SentencePieceProcessor__NormalizeWithOffsets(self, text)
 
+    def _NormalizeBatch(self, ins, num_threads, with_offsets, flat_offsets):
+        return _sentencepiece.SentencePieceProcessor__NormalizeBatch(self, ins, num_threads, with_offsets, flat_offsets)
+
     def _CalculateEntropy(self, text, alpha):
         return _sentencepiece.SentencePieceProcessor__CalculateEntropy(self, text, alpha)
 
@@ -431,7 +512,10 @@ class SentencePieceProcessor(object):
              enable_sampling=False,
              nbest_size=-1,
              alpha=0.1,
-             num_threads=-1):
+             num_threads=-1,
+             encode_cache_capacity=0,
+             word_cache_capacity=0,
+             parallel_encode_chunk_size=0):
       """Initialzie sentencepieceProcessor.
 
       Args:
@@ -452,6 +536,14 @@ class SentencePieceProcessor(object):
         alpha: Soothing parameter for unigram sampling, and dropout probability of
                merge operations for BPE-dropout.
         num_threads: number of threads in batch processing (Default = -1, auto-detected)
+        encode_cache_capacity: number of distinct inputs whose encoding results
+          are cached. Sampling is never cached. (Default = 0, no cache)
+        word_cache_capacity: number of distinct words whose pieces are memoized
+          by BPE models. (Default = 0, no cache)
+        parallel_encode_chunk_size: a single input longer than this many bytes
+          is split into chunks at word boundaries, which are encoded with
+          `num_threads` threads. Only used by the models whose results do not
+          change, e.g., BPE. (Default = 0, disabled)
       """
 
       _sentencepiece_processor_init_native(self)
@@ -464,8 +556,12 @@ class SentencePieceProcessor(object):
       self._nbest_size = nbest_size
       self._alpha = alpha
       self._num_threads = num_threads
+      self.SetEncodeCacheCapacity(encode_cache_capacity)
+      self._SetParallelEncode(num_threads, parallel_encode_chunk_size)
       if model_file or model_proto:
         self.Load(model_file=model_file, model_proto=model_proto)
+        if word_cache_capacity:
+          self.SetWordCacheCapacity(word_cache_capacity)
 
 
     def Encode(self,
@@ -478,12 +574,23 @@ class SentencePieceProcessor(object):
                enable_sampling=None,
                nbest_size=None,
                alpha=None,
-               num_threads=None):
+               num_threads=None,
+               max_length=None,
+               padding=None,
+               truncation=None):
       """Encode text input to segmented ids or tokens.
 
         Args:
-        input: input string. accepsts list of string.
-        out_type: output type. int or str.
+        input: input string. accepsts list of string, or a tuple (data, offsets)
+               of a contiguous UTF-8 buffer and an int32/int64 offsets array of
+               size n + 1 (e.g. Arrow string column buffers), which encodes
+               data[offsets[i]:offsets[i+1]] without creating Python strings.
+        out_type: output type. int, str, 'serialized_proto', 'immutable_proto',
+                  'buffer' or 'numpy'. 'buffer' returns a pair of memoryviews
+                  (ids, offsets) holding int32 ids of all inputs concatenated and
+                  int64 offsets such that ids[offsets[i]:offsets[i+1]] are the ids
+                  of the i-th input. 'numpy' returns the same pair as numpy arrays.
+                  For a single string input, only the ids are returned.
         add_bos: Add <s> to the result (Default = false)
         add_eos: Add </s> to the result (Default = false) <s>/</s> is added after
                  reversing (if enabled).
@@ -498,6 +605,15 @@ class SentencePieceProcessor(object):
         alpha: Soothing parameter for unigram sampling, and merge probability for
                BPE-dropout (probablity 'p' in BPE-dropout paper).
         num_threads: the number of threads used in the batch processing (Default = -1).
+        max_length: maximum sequence length used by `padding` and `truncation`.
+        padding: 'longest' or 'max_length'. Returns a pair of 2-D int32 arrays
+                 (ids, attention_mask) where each sequence is right-padded with
+                 pad_id() (0 if the model has no <pad>) to the longest sequence or
+                 to max_length. The arrays are nested lists for out_type=int,
+                 memoryviews for 'buffer' and numpy arrays for 'numpy'.
+                 (Default = None, no padding)
+        truncation: Truncates each sequence to max_length. The tail of the text is
+                    removed while <s> and </s> are kept. (Default = false)
       """
 
       if out_type is None:
@@ -531,7 +647,47 @@ class SentencePieceProcessor(object):
       if num_threads is None or type(num_threads) is not int:
         raise RuntimeError('num_threads must be int')
 
-      if type(input) is list:
+      if padding is True:
+        padding = 'longest'
+      if padding not in [None, False, 'longest', 'max_length']:
+        raise RuntimeError('unknown padding={}'.format(padding))
+      if (padding == 'max_length' or truncation) and max_length is None:
+        raise RuntimeError(
+            'When padding="max_length" or truncation is True, We must specify "max_length".')
+      if max_length is not None and (type(max_length) is not int or max_length <= 0):
+        raise RuntimeError('max_length must be positive int')
+
+      truncate_length = max_length if truncation else 0
+      is_batch = _is_batch(input)
+      batch = input if is_batch else [input]
+
+      if padding:
+        if out_type is not int and out_type != 'buffer' and out_type != 'numpy':
+          raise RuntimeError('padding is only supported with out_type=int, "buffer" or "numpy"')
+        ids, mask, length = self._EncodeAsIdsBatchAsPadded(
+            batch, num_threads, enable_sampling, nbest_size, alpha,
+            add_bos, add_eos, reverse, emit_unk_piece, truncate_length,
+            max_length if padding == 'max_length' else 0)
+        shape = [_batch_size(input), length] if is_batch else [length]
+        return _padded_ids(ids, shape, out_type), _padded_ids(mask, shape, out_type)
+
+      if out_type == 'buffer' or out_type == 'numpy' or (truncation and out_type is int):
+        ids, offsets = _ragged_ids(
+            self._EncodeAsIdsBatchAsBuffer(
+                batch, num_threads, enable_sampling, nbest_size, alpha,
+                add_bos, add_eos, reverse, emit_unk_piece, truncate_length),
+            out_type)
+        if out_type is int:
+          ids = [ids[offsets[i]:offsets[i + 1]].tolist() for i in range(len(offsets) - 1)]
+          return ids if is_batch else ids[0]
+        if is_batch:
+          return ids, offsets
+        return ids
+
+      if truncation:
+        raise RuntimeError('truncation is only supported with out_type=int, "buffer" or "numpy"')
+
+      if is_batch:
         if out_type is int:
           return self._EncodeAsIdsBatch(input, num_threads, enable_sampling, nbest_size,
                                         alpha, add_bos, add_eos, reverse, emit_unk_piece)
@@ -605,7 +761,8 @@ class SentencePieceProcessor(object):
                     add_eos=None,
                     reverse=None,
                     emit_unk_piece=None,
-                    nbest_size=None):
+                    nbest_size=None,
+                    num_threads=None):
       """NBestEncode text input to segmented ids or tokens.
 
         Args:
@@ -616,6 +773,7 @@ class SentencePieceProcessor(object):
         reverse: Reverses the tokenized sequence (Default = false)
         emit_unk_piece: Emits the unk literal string (Default = false)
         nbest_size: nbest size
+        num_threads: the number of threads used in the batch processing (Default = -1).
       """
 
       if out_type is None:
@@ -631,9 +789,31 @@ class SentencePieceProcessor(object):
       if nbest_size is None:
         nbest_size = self._nbest_size
 
+      if num_threads is None:
+        num_threads = self._num_threads
+
       if nbest_size <= 0:
         nbest_size=1
 
+      if num_threads is None or type(num_threads) is not int:
+        raise RuntimeError('num_threads must be int')
+
+      if _is_batch(input):
+        if out_type is int:
+          return self._NBestEncodeAsIdsBatch(input, num_threads, nbest_size,
+                                             add_bos, add_eos, reverse, emit_unk_piece)
+        if out_type is str:
+          return self._NBestEncodeAsPiecesBatch(input, num_threads, nbest_size,
+                                                add_bos, add_eos, reverse, emit_unk_piece)
+        if out_type == 'serialized_proto' or out_type == 'proto':
+          return self._NBestEncodeAsSerializedProtoBatch(input, num_threads, nbest_size,
+                                                         add_bos, add_eos, reverse, emit_unk_piece)
+        if out_type == 'immutable_proto':
+          return self._NBestEncodeAsImmutableProtoBatch(input, num_threads, nbest_size,
+                                                        add_bos, add_eos, reverse, emit_unk_piece)
+
+        raise RuntimeError('unknown out_type')
+
       def _encode(text):
         if out_type is int:
           return self._NBestEncodeAsIds(text, nbest_size,
@@ -650,9 +830,6 @@ class SentencePieceProcessor(object):
 
         raise RuntimeError('unknown out_type')
 
-      if type(input) is list:
-        return [_encode(n) for n in input]
-
       return _encode(input)
 
 
@@ -686,7 +863,8 @@ class SentencePieceProcessor(object):
                              num_samples=None,
                              alpha=None,
                              wor=None,
-                             include_best=None):
+                             include_best=None,
+                             num_threads=None):
       """SampleEncodeAndScore text input to segmented ids or tokens.
 
         Args:
@@ -700,6 +878,7 @@ class SentencePieceProcessor(object):
         alpha: inverse temperature for sampling
         wor: whether to sample without replacement (Default = false)
         include_best: whether to include the best tokenization, requires wor=True (Default = false)
+        num_threads: the number of threads used in the batch processing (Default = -1).
       """
 
       if out_type is None:
@@ -720,6 +899,8 @@ class SentencePieceProcessor(object):
         wor = False
       if include_best is None:
         include_best = False
+      if num_threads is None:
+        num_threads = self._num_threads
 
       if num_samples <= 0:
         raise RuntimeError('num_examples must be positive')
@@ -727,6 +908,29 @@ class SentencePieceProcessor(object):
       if include_best and not wor:
         raise RuntimeError('When include_best is True, We must specify "wor = True".')
 
+      if num_threads is None or type(num_threads) is not int:
+        raise RuntimeError('num_threads must be int')
+
+      if _is_batch(input):
+        if out_type is int:
+          return self._SampleEncodeAndScoreAsIdsBatch(
+              input, num_threads, num_samples, alpha, wor, include_best,
+              add_bos, add_eos, reverse, emit_unk_piece)
+        if out_type is str:
+          return self._SampleEncodeAndScoreAsPiecesBatch(
+              input, num_threads, num_samples, alpha, wor, include_best,
+              add_bos, add_eos, reverse, emit_unk_piece)
+        if out_type == 'serialized_proto' or out_type == 'proto':
+          return self._SampleEncodeAndScoreAsSerializedProtoBatch(
+              input, num_threads, num_samples, alpha, wor, include_best,
+              add_bos, add_eos, reverse, emit_unk_piece)
+        if out_type == 'immutable_proto':
+          return self._SampleEncodeAndScoreAsImmutableProtoBatch(
+              input, num_threads, num_samples, alpha, wor, include_best,
+              add_bos, add_eos, reverse, emit_unk_piece)
+
+        raise RuntimeError('unknown output type')
+
 
       def _encode(text):
         if out_type is int:
@@ -747,9 +951,6 @@ class SentencePieceProcessor(object):
         raise RuntimeError('unknown output type')
 
 
-      if type(input) is list:
-        return [_encode(n) for n in input]
-
       return _encode(input)
 
 
@@ -892,9 +1093,55 @@ class SentencePieceProcessor(object):
       return self.Decode(input=input, out_type=out_type, **kwargs)
 
 
+    def NewDecodeStream(self):
+      """Returns a DecodeStream, which decodes ids incrementally.
+
+      Useful to detokenize the outputs of a language model token by token.
+      DecodeStream.Put(ids) returns only the text finalized by `ids`.
+      """
+      stream = self._NewDecodeStream()
+      stream._processor = self
+      return stream
+
+
+    def EncodeAppended(self, text, state):
+      """Appends `text` to `state` and returns the ids of the whole input.
+
+      The result is the same as Encode(state.input()) with the current encode
+      options, but only the end of the input is segmented again. Useful to
+      encode a growing conversation turn by turn.
+      """
+      return self._EncodeAppended(text, state)
+
+
+    async def EncodeAsync(self, input, **kwargs):
+      """Asynchronous version of Encode.
+
+      Encoding runs on an executor thread with the GIL released, so the event
+      loop is not blocked. Single-string requests issued in the same event loop
+      iteration with the same options are merged into one batch Encode call.
+      """
+      padded = kwargs.get('padding') or kwargs.get('truncation')
+      if (_is_batch(input) or padded or
+          kwargs.get('out_type') == 'buffer' or kwargs.get('out_type') == 'numpy'):
+        return await _run_in_executor(self.Encode, input, kwargs)
+      return await _AsyncBatcher.get().submit(self.Encode, type(input), input, kwargs)
+
+
+    async def DecodeAsync(self, input, **kwargs):
+      """Asynchronous version of Decode.
+
+      Concurrent requests for single id or piece sequences issued in the same
+      event loop iteration are merged into one batch Decode call.
+      """
+      if type(input) is not list or not input or type(input[0]) is list:
+        return await _run_in_executor(self.Decode, input, kwargs)
+      return await _AsyncBatcher.get().submit(self.Decode, type(input[0]), input, kwargs)
+
+
     def CalculateEntropy(self, input, alpha, num_threads=None):
       """Calculate sentence entropy"""
-      if type(input) is list:
+      if _is_batch(input):
         if num_threads is None:
           num_threads = self._num_threads
         if num_threads is None or type(num_threads) is not int:
@@ -904,15 +1151,25 @@ class SentencePieceProcessor(object):
       return self._CalculateEntropy(input, alpha)
 
 
-    def Normalize(self, input, with_offsets=None):
-      def _normalize(text):
-        if with_offsets:
-          return self._NormalizeWithOffsets(text)
-        return self._Normalize(text)
+    def Normalize(self, input, with_offsets=None, num_threads=None, out_type=None):
+      """Normalizes the input with the normalizer of the model.
 
-      if type(input) is list:
-        return [_normalize(x) for x in input]
-      return _normalize(input)
+      Args:
+        input: input string. accepts list of string, or a (data, offsets) tuple
+               as in Encode.
+        with_offsets: also returns the offsets mapping each character of the
+                      normalized string to the input.
+        num_threads: the number of threads used in the batch processing
+                     (Default = num_threads of the constructor).
+        out_type: None, 'buffer' or 'numpy'. With `with_offsets`, 'buffer'
+                  returns the offsets of a batch as a pair of int64 memoryviews
+                  (offsets, splits) such that offsets[splits[i]:splits[i+1]] are
+                  the offsets of the i-th input, i.e., a batch returns
+                  (normalized, offsets, splits). 'numpy' returns numpy arrays.
+      """
+      if num_threads is None:
+        num_threads = self._num_threads
+      return _normalize(self, input, with_offsets, num_threads, out_type)
 
     def OverrideNormalizerSpec(self, **kwargs):
       new_kwargs = {}
@@ -930,6 +1187,15 @@ class SentencePieceProcessor(object):
 
 
     def __getstate__(self):
+      """Returns the precompiled model if it carries the index of the model.
+
+      Older releases cannot load the precompiled model, so the model proto is
+      returned otherwise. index_size is the uint64 at offset 24 of
+      PrecompiledModelHeader.
+      """
+      state = self.serialized_precompiled_model()
+      if len(state) >= 32 and struct.unpack_from('=Q', state, 24)[0] > 0:
+        return state
       return self.serialized_model_proto()
 
 
@@ -963,6 +1229,67 @@ class SentencePieceProcessor(object):
 
 # Register SentencePieceProcessor in _sentencepiece:
 _sentencepiece.SentencePieceProcessor_swigregister(SentencePieceProcessor)
+class DecodeStream(object):
+    thisown = property(lambda x: x.this.own(), lambda x, v: x.this.own(v), doc="The membership flag")
+
+    def __init__(self, *args, **kwargs):
+        raise AttributeError("No constructor defined")
+    __repr__ = _swig_repr
+    __swig_destroy__ = _sentencepiece.delete_DecodeStream
+
+    def Reset(self):
+        return _sentencepiece.DecodeStream_Reset(self)
+
+    def _Put(self, ids):
+        return _sentencepiece.DecodeStream__Put(self, ids)
+
+    def _Finish(self):
+        return _sentencepiece.DecodeStream__Finish(self)
+
+    def Put(self, input):
+      """Appends an id or a list of ids and returns the newly finalized text.
+
+      Bytes of an incomplete UTF-8 character are kept until the following
+      ids complete it.
+      """
+      if type(input) is not list:
+        input = [input]
+      return self._Put(input)
+
+    def Finish(self):
+      """Returns the remaining text and resets the stream."""
+      return self._Finish()
+
+
+# Register DecodeStream in _sentencepiece:
+_sentencepiece.DecodeStream_swigregister(DecodeStream)
+class IncrementalEncodeState(object):
+    thisown = property(lambda x: x.this.own(), lambda x, v: x.this.own(v), doc="The membership flag")
+    __repr__ = _swig_repr
+
+    def __init__(self):
+        _sentencepiece.IncrementalEncodeState_swiginit(self, _sentencepiece.new_IncrementalEncodeState())
+    __swig_destroy__ = _sentencepiece.delete_IncrementalEncodeState
+
+    def input(self):
+        return _sentencepiece.IncrementalEncodeState_input(self)
+
+    def normalized(self):
+        return _sentencepiece.IncrementalEncodeState_normalized(self)
+
+    def Clear(self):
+        return _sentencepiece.IncrementalEncodeState_Clear(self)
+
+    def _ids(self):
+        return _sentencepiece.IncrementalEncodeState__ids(self)
+
+    def ids(self):
+      """Returns the ids of the whole input."""
+      return self._ids()
+
+
+# Register IncrementalEncodeState in _sentencepiece:
+_sentencepiece.IncrementalEncodeState_swigregister(IncrementalEncodeState)
 
 def SetRandomGeneratorSeed(seed):
     return _sentencepiece.SetRandomGeneratorSeed(seed)
@@ -1078,6 +1405,9 @@ class SentencePieceNormalizer(object):
     def _NormalizeWithOffsets(self, text):
         return _sentencepiece.SentencePieceNormalizer__NormalizeWithOffsets(self, text)
 
+    def _NormalizeBatch(self, ins, num_threads, with_offsets, flat_offsets):
+        return _sentencepiece.SentencePieceNormalizer__NormalizeBatch(self, ins, num_threads, with_offsets, flat_offsets)
+
     def _SetProtoField(self, name, value):
         return _sentencepiece.SentencePieceNormalizer__SetProtoField(self, name, value)
 
@@ -1119,15 +1449,12 @@ class SentencePieceNormalizer(object):
         self._SetProtoField('escape_whitespaces', escape_whitespaces)
         self._SetProtoField('remove_extra_whitespaces', remove_extra_whitespaces)
 
-    def Normalize(self, input, with_offsets=None):
-      def _normalize(text):
-        if with_offsets:
-          return self._NormalizeWithOffsets(text)
-        return self._Normalize(text)
+    def Normalize(self, input, with_offsets=None, num_threads=-1, out_type=None):
+      """Normalizes the input.
 
-      if type(input) is list:
-        return [_normalize(x) for x in input]
-      return _normalize(input)
+      Accepts the same arguments as SentencePieceProcessor.Normalize.
+      """
+      return _normalize(self, input, with_offsets, num_threads, out_type)
 
 
     def __getstate__(self):
@@ -1150,6 +1477,11 @@ import re
 import csv
 import sys
 import os
+import struct
+import asyncio
+import atexit
+import functools
+import weakref
 import importlib.resources
 from io import StringIO
 from io import BytesIO
@@ -1168,6 +1500,163 @@ def _add_snake_case(classname):
     setattr(classname, k, v)
 
 
+def _run_in_executor(func, input, kwargs):
+  loop = asyncio.get_running_loop()
+  return loop.run_in_executor(None, functools.partial(func, input, **kwargs))
+
+
+class _AsyncBatcher(object):
+  """Merges requests issued in one event loop iteration into a batch call."""
+
+  _batchers = weakref.WeakKeyDictionary()
+
+  @classmethod
+  def get(cls):
+    loop = asyncio.get_running_loop()
+    batcher = cls._batchers.get(loop)
+    if batcher is None:
+      batcher = cls._batchers[loop] = cls(loop)
+    return batcher
+
+  def __init__(self, loop):
+    self._loop = loop
+    self._pending = {}
+
+  def submit(self, func, input_type, input, kwargs):
+    """Returns a future for func(input, **kwargs), batched by func([...])."""
+    try:
+      key = (func, input_type, tuple(sorted(kwargs.items())))
+      requests = self._pending.get(key)
+    except TypeError:  # unhashable option values.
+      return _run_in_executor(func, input, kwargs)
+    if requests is None:
+      requests = self._pending[key] = []
+      self._loop.call_soon(self._flush, key)
+    future = self._loop.create_future()
+    requests.append((input, future))
+    return future
+
+  def _flush(self, key):
+    func, _, kwargs = key
+    requests = self._pending.pop(key)
+    inputs = [input for input, _ in requests]
+    batch = _run_in_executor(func, inputs, dict(kwargs))
+
+    def _done(batch):
+      if (not batch.cancelled() and batch.exception() is not None and
+          len(requests) > 1):
+# Reruns the requests one by one so that only the invalid ones fail.
+        for input, future in requests:
+          if not future.done():
+            _chain(_run_in_executor(func, input, dict(kwargs)), future)
+        return
+      for n, (_, future) in enumerate(requests):
+        if future.done():
+          continue
+        if batch.cancelled():
+          future.cancel()
+        elif batch.exception() is not None:
+          future.set_exception(batch.exception())
+        else:
+          future.set_result(batch.result()[n])
+
+    batch.add_done_callback(_done)
+
+
+def _chain(source, future):
+  """Copies the result of the future `source` to `future` when it is done."""
+
+  def _done(source):
+    if future.done():
+      return
+    if source.cancelled():
+      future.cancel()
+    elif source.exception() is not None:
+      future.set_exception(source.exception())
+    else:
+      future.set_result(source.result())
+
+  source.add_done_callback(_done)
+
+
+def _is_batch(input):
+  """Returns true if input is a list of strings or a (data, offsets) tuple.
+
+  Other tuples, e.g., a tuple of strings, raise TypeError. `data` must be a
+  bytes-like object and `offsets` an integer array.
+  """
+  if type(input) is list:
+    return True
+  if type(input) is not tuple:
+    return False
+  if len(input) == 2 and not isinstance(input[0], str):
+    try:
+      memoryview(input[0])
+      format = memoryview(input[1]).format.lstrip('@=')
+    except TypeError:
+      format = None
+    if format in ('i', 'I', 'l', 'L', 'q', 'Q'):
+      return True
+  raise TypeError('expected list of str or (data, offsets), got tuple')
+
+
+def _batch_size(input):
+  if type(input) is tuple:
+    return len(memoryview(input[1])) - 1
+  return len(input)
+
+
+def _ragged_ids(buffers, out_type):
+  """Wraps the (ids, offsets) bytearrays returned by _EncodeAsIdsBatchAsBuffer."""
+  ids = memoryview(buffers[0]).cast('i')
+  offsets = memoryview(buffers[1]).cast('q')
+  if out_type == 'numpy':
+    import numpy as np
+    return np.frombuffer(ids, dtype=np.int32), np.frombuffer(offsets, dtype=np.int64)
+  return ids, offsets
+
+
+def _padded_ids(buffer, shape, out_type):
+  """Wraps an int32 bytearray returned by _EncodeAsIdsBatchAsPadded as `shape`."""
+  if out_type == 'numpy':
+    import numpy as np
+    return np.frombuffer(buffer, dtype=np.int32).reshape(shape)
+  view = memoryview(buffer).cast('i')
+  if out_type is int:
+    if len(shape) == 1:
+      return view.tolist()
+    return [view[i * shape[1]:(i + 1) * shape[1]].tolist() for i in range(shape[0])]
+# memoryview cannot represent an empty multi-dimensional array.
+  if 0 in shape:
+    return view
+  return memoryview(buffer).cast('i', shape)
+
+
+def _normalize(normalizer, input, with_offsets, num_threads, out_type):
+  """Implements Normalize of SentencePieceProcessor and SentencePieceNormalizer."""
+  if num_threads is None or type(num_threads) is not int:
+    raise RuntimeError('num_threads must be int')
+  if out_type not in [None, 'buffer', 'numpy']:
+    raise RuntimeError('unknown out_type={}'.format(out_type))
+  if not _is_batch(input):
+    if with_offsets:
+      return normalizer._NormalizeWithOffsets(input)
+    return normalizer._Normalize(input)
+
+  flat_offsets = bool(with_offsets) and out_type is not None
+  batch = normalizer._NormalizeBatch(input, num_threads, bool(with_offsets),
+                                     flat_offsets)
+  if not flat_offsets:
+    return batch
+  normalized, offsets, splits = batch
+  offsets = memoryview(offsets).cast('q')
+  splits = memoryview(splits).cast('q')
+  if out_type == 'numpy':
+    import numpy as np
+    return normalized, np.frombuffer(offsets, dtype=np.int64), np.frombuffer(splits, dtype=np.int64)
+  return normalized, offsets, splits
+
+
 def _batchnize(classname, name):
   """Enables batch request for the method classname.name."""
   func = getattr(classname, name, None)
@@ -1202,8 +1691,16 @@ for m in [
 _add_snake_case(SentencePieceProcessor)
 _add_snake_case(SentencePieceTrainer)
 _add_snake_case(SentencePieceNormalizer)
+_add_snake_case(DecodeStream)
+_add_snake_case(IncrementalEncodeState)
 set_random_generator_seed = SetRandomGeneratorSeed
 set_min_log_level = SetMinLogLevel
+set_worker_pool_size = SetWorkerPoolSize
+get_worker_pool_size = GetWorkerPoolSize
+
+atexit.register(_ShutdownWorkerPool)
+if hasattr(os, 'register_at_fork'):
+  os.register_at_fork(after_in_child=_ResetWorkerPoolAfterFork)
 
 from ._version import __version__
 
@@ -9,6 +9,12 @@
 #include <functional>
 #include <limits>
 #include <cmath>
+#include <condition_variable>
+#include <cstring>
+#include <deque>
+#include <memory>
+#include <mutex>
+#include <shared_mutex>
 #include <thread>
 #include <vector>
 #include <sentencepiece_processor.h>
@@ -19,6 +25,32 @@ PyObject* kUnicodeInput = reinterpret_cast<PyObject* >(0x1);
 PyObject* kByteInput = reinterpret_cast<PyObject* >(0x2);
 
 using BytesArray = std::vector<sentencepiece::util::bytes>;
+using ScoredIdsArray = std::vector<std::pair<std::vector<int>, float>>;
+using ScoredPiecesArray = std::vector<std::pair<std::vector<std::string>, float>>;
+
+// Batch of ids returned to Python as flat int32 ids and int64 offsets
+// (CSR layout) instead of a list of lists.
+struct RaggedIds {
+  std::vector<std::vector<int>> ids;
+};
+
+// Batch of ids returned to Python as a 2-D int32 array of
+// ids.size() x length, padded with pad_id, and its attention mask.
+struct PaddedIds {
+  std::vector<std::vector<int>> ids;
+  size_t length = 0;
+  int pad_id = 0;
+};
+
+// Normalized strings of a batch. When `with_offsets`, `offsets[i]` is the
+// alignment of `normalized[i]` to the i-th input, returned to Python either as
+// lists or, when `flat_offsets`, as flat int64 offsets and splits (CSR layout).
+struct NormalizedBatch {
+  std::vector<std::string> normalized;
+  std::vector<std::vector<size_t>> offsets;
+  bool with_offsets = false;
+  bool flat_offsets = false;
+};
 
 inline void ReleaseResultObject(PyObject *obj) {
   if (obj != nullptr && obj != kUnicodeInput && obj != kByteInput) {
@@ -67,6 +99,35 @@ PyObject* MakePyOutputBytes(const sentencepiece::util::bytes& output) {
   return PyBytes_FromStringAndSize(output.data(), output.size());
 }
 
+// Converts the nested results of the n-best and sampling batch requests.
+inline PyObject *MakePyObject(int value, PyObject *input_type) {
+  return PyInt_FromLong(static_cast<long>(value));
+}
+
+inline PyObject *MakePyObject(const std::string &value, PyObject *input_type) {
+  return MakePyOutputString(value, input_type);
+}
+
+template <typename T>
+PyObject *MakePyObject(const std::pair<T, float> &value, PyObject *input_type);
+
+template <typename T>
+PyObject *MakePyObject(const std::vector<T> &values, PyObject *input_type) {
+  PyObject *list = PyList_New(values.size());
+  for (size_t i = 0; i < values.size(); ++i) {
+    PyList_SET_ITEM(list, i, MakePyObject(values[i], input_type));
+  }
+  return list;
+}
+
+template <typename T>
+PyObject *MakePyObject(const std::pair<T, float> &value, PyObject *input_type) {
+  PyObject *tuple = PyTuple_New(2);
+  PyTuple_SET_ITEM(tuple, 0, MakePyObject(value.first, input_type));
+  PyTuple_SET_ITEM(tuple, 1, PyFloat_FromDouble(static_cast<double>(value.second)));
+  return tuple;
+}
+
 int ToSwigError(sentencepiece::util::StatusCode code) {
   switch (code) {
     case sentencepiece::util::StatusCode::kNotFound:
@@ -81,6 +142,110 @@ int ToSwigError(sentencepiece::util::StatusCode code) {
   return SWIG_RuntimeError;
 }
 
+// Releases the GIL while in scope. No Python object may be accessed, and
+// the inputs must be kept alive by the caller (see PyObjectRefs).
+class ScopedGILRelease {
+ public:
+  ScopedGILRelease() : state_(PyEval_SaveThread()) {}
+  ScopedGILRelease(const ScopedGILRelease &) = delete;
+  ScopedGILRelease &operator=(const ScopedGILRelease &) = delete;
+  ~ScopedGILRelease() { PyEval_RestoreThread(state_); }
+
+ private:
+  PyThreadState *state_ = nullptr;
+};
+
+// Owns references to Python objects until the wrapper returns. Input lists
+// are snapshotted into tuples, so that the string views taken from their
+// items stay valid even if another thread modifies the list while the GIL
+// is released.
+class PyObjectRefs {
+ public:
+  PyObjectRefs() = default;
+  PyObjectRefs(const PyObjectRefs &) = delete;
+  PyObjectRefs &operator=(const PyObjectRefs &) = delete;
+
+  ~PyObjectRefs() {
+    for (PyObject *obj : refs_) Py_DECREF(obj);
+  }
+
+  // Takes the ownership of a new reference `obj`.
+  PyObject *Add(PyObject *obj) {
+    if (obj != nullptr) refs_.push_back(obj);
+    return obj;
+  }
+
+ private:
+  std::vector<PyObject *> refs_;
+};
+
+// Owns a Py_buffer acquired from an object supporting the buffer protocol.
+class PyBufferHolder {
+ public:
+  PyBufferHolder() = default;
+  PyBufferHolder(const PyBufferHolder &) = delete;
+  PyBufferHolder &operator=(const PyBufferHolder &) = delete;
+
+  ~PyBufferHolder() {
+    if (view_.obj != nullptr) PyBuffer_Release(&view_);
+  }
+
+  bool Acquire(PyObject *obj, int flags) {
+    if (PyObject_GetBuffer(obj, &view_, flags) != 0) {
+      view_.obj = nullptr;
+      return false;
+    }
+    return true;
+  }
+
+  const Py_buffer &view() const { return view_; }
+
+ private:
+  Py_buffer view_ = {};
+};
+
+template <typename T>
+bool SplitByOffsets(const Py_buffer &data, const T *offsets, size_t size,
+                    std::vector<absl::string_view> *out) {
+  if (size == 0) {
+    PyErr_SetString(PyExc_ValueError, "offsets must not be empty");
+    return false;
+  }
+  const char *base = static_cast<const char *>(data.buf);
+  out->resize(size - 1);
+  for (size_t i = 0; i + 1 < size; ++i) {
+    const int64_t begin = static_cast<int64_t>(offsets[i]);
+    const int64_t end = static_cast<int64_t>(offsets[i + 1]);
+    if (begin < 0 || begin > end || end > static_cast<int64_t>(data.len)) {
+      PyErr_SetString(PyExc_ValueError, "offsets are out of range");
+      return false;
+    }
+    (*out)[i] = absl::string_view(base + begin, end - begin);
+  }
+  return true;
+}
+
+// Splits a contiguous UTF-8 buffer `data` into the strings delimited by
+// `offsets`, an int32 or int64 array of size n + 1 (Arrow string layout).
+// The returned string views point into `data`.
+bool SplitByOffsets(const Py_buffer &data, const Py_buffer &offsets,
+                    std::vector<absl::string_view> *out) {
+  const char *format = offsets.format == nullptr ? "B" : offsets.format;
+  if (*format == '@' || *format == '=') ++format;
+  const bool is_int = format[0] != '\0' && format[1] == '\0' &&
+                      std::strchr("iIlLqQ", format[0]) != nullptr;
+  if (!is_int || offsets.ndim > 1 ||
+      (offsets.itemsize != 4 && offsets.itemsize != 8)) {
+    PyErr_SetString(PyExc_TypeError, "offsets must be an int32 or int64 array");
+    return false;
+  }
+  const size_t size = offsets.len / offsets.itemsize;
+  if (offsets.itemsize == 4) {
+    return SplitByOffsets(data, static_cast<const int32_t *>(offsets.buf), size, out);
+  }
+  return SplitByOffsets(data, static_cast<const int64_t *>(offsets.buf), size, out);
+}
+
 class PySentenceIterator : public sentencepiece::SentenceIterator {
   public:
   PySentenceIterator(PyObject *iter) : iter_(iter) {
@@ -182,6 +347,44 @@ inline void RewriteIds(const sentencepiece::SentencePieceProcessor &sp,
   }
 }
 
+inline void RewriteIds(const sentencepiece::SentencePieceProcessor &sp,
+                       sentencepiece::ImmutableNBestSentencePieceText *proto,
+                       bool add_bos, bool add_eos, bool reverse, bool emit_unk_piece) {
+  if (add_bos || add_eos || reverse || emit_unk_piece) {
+    throw sentencepiece::util::Status(
+        sentencepiece::util::StatusCode::kUnimplemented,
+        "add_bos, add_eos, reverse, and emit_unk_piece is not supported in proto API");
+  }
+}
+
+template <typename T>
+inline void RewriteIds(const sentencepiece::SentencePieceProcessor &sp,
+                       std::vector<std::vector<T>> *nbests,
+                       bool add_bos, bool add_eos, bool reverse, bool emit_unk_piece) {
+  for (auto &nbest : *nbests) {
+    RewriteIds(sp, &nbest, add_bos, add_eos, reverse, emit_unk_piece);
+  }
+}
+
+template <typename T>
+inline void RewriteIds(const sentencepiece::SentencePieceProcessor &sp,
+                       std::vector<std::pair<std::vector<T>, float>> *samples,
+                       bool add_bos, bool add_eos, bool reverse, bool emit_unk_piece) {
+  for (auto &sample : *samples) {
+    RewriteIds(sp, &sample.first, add_bos, add_eos, reverse, emit_unk_piece);
+  }
+}
+
+// Throws if OutType does not support the options. Called before a batch is
+// handed to the worker threads, which must not throw.
+template <typename OutType>
+inline void CheckRewriteOptions(const sentencepiece::SentencePieceProcessor &sp,
+                                bool add_bos, bool add_eos, bool reverse,
+                                bool emit_unk_piece) {
+  OutType out;
+  RewriteIds(sp, &out, add_bos, add_eos, reverse, emit_unk_piece);
+}
+
 inline void CheckIds(const std::vector<int> &ids, int num_pieces) {
   for (int id : ids) {
     if (id < 0 || id >= num_pieces) {
@@ -211,31 +414,144 @@ inline void ConvertToUnicodeSpans(sentencepiece::ImmutableNBestSentencePieceText
   proto->ConvertToUnicodeSpans();
 }
 
-class ThreadPool {
+// Long-lived worker pool shared by all batch requests. Threads are created
+// once and reused across calls, instead of being spawned per request.
+class WorkerPool {
  public:
-  explicit ThreadPool(size_t request_size) :
-    request_size_(request_size) {}
+  static WorkerPool *GetInstance() {
+    std::lock_guard<std::mutex> lock(instance_mutex_);
+    if (instance_ == nullptr) instance_ = new WorkerPool;
+    return instance_;
+  }
+
+  // Called in the child process after fork(). Worker threads do not survive
+  // fork() and the locks may have been held by them, so the old pool is
+  // leaked and a new one is created on the next request.
+  static void ResetAfterFork() {
+    new (&instance_mutex_) std::mutex;
+    instance_ = nullptr;
+  }
+
+  // Sets the number of worker threads. A negative size uses the number of
+  // hardware threads. Size 0 stops all workers; requests are then processed
+  // on the calling thread.
+  void Resize(int size) {
+    if (size < 0) size = std::thread::hardware_concurrency();
+    std::lock_guard<std::mutex> resize_lock(resize_mutex_);
+    StopWorkers();
+    std::lock_guard<std::mutex> lock(mutex_);
+    StartWorkers(size);
+  }
+
+  int size() const {
+    std::lock_guard<std::mutex> lock(mutex_);
+    return size_ < 0 ? std::thread::hardware_concurrency() : size_;
+  }
+
+  // Calls `func(i)` for i in [0, size) using at most `num_threads` threads,
+  // the calling thread included. Returns when all calls have finished.
+  void ParallelFor(size_t size, int num_threads,
+                   const std::function<void(size_t)> &func) {
+    if (num_threads <= 1 || size <= 1) {
+      for (size_t i = 0; i < size; ++i) func(i);
+      return;
+    }
 
-  virtual ~ThreadPool() {
-    for (auto &task : tasks_) {
-      task.join();
+    auto task = std::make_shared<Task>(size, func);
+    {
+      std::lock_guard<std::mutex> lock(mutex_);
+      if (size_ < 0) StartWorkers(std::thread::hardware_concurrency());
+      const int num_helpers = std::min<int>(num_threads - 1, workers_.size());
+      for (int n = 0; n < num_helpers; ++n) queue_.push_back(task);
     }
+    cond_.notify_all();
+
+    task->Run();
+
+    // Helpers that pick up `task` after this point find no items left, so
+    // waiting for the completion of all items is sufficient.
+    std::unique_lock<std::mutex> lock(task->mutex);
+    task->done_cond.wait(lock, [&]() { return task->done == size; });
   }
 
-  void Schedule(std::function<void()> closure) {
-    static constexpr size_t kMinThreadSize = 2;
-    if (request_size_ < kMinThreadSize) {
-      closure();
-    } else {
-      tasks_.emplace_back(closure);
+ private:
+  struct Task {
+    Task(size_t size, const std::function<void(size_t)> &func)
+        : size(size), func(func) {}
+
+    void Run() {
+      size_t i = 0;
+      size_t n = 0;
+      while ((i = std::atomic_fetch_add(&index, 1)) < size) {
+        func(i);
+        ++n;
+      }
+      if (n == 0) return;
+      std::lock_guard<std::mutex> lock(mutex);
+      done += n;
+      if (done == size) done_cond.notify_all();
     }
+
+    const size_t size;
+    const std::function<void(size_t)> &func;
+    std::atomic<size_t> index = 0;
+    std::mutex mutex;
+    std::condition_variable done_cond;
+    size_t done = 0;
+  };
+
+  WorkerPool() = default;
+
+  // `mutex_` must be held.
+  void StartWorkers(int size) {
+    stop_ = false;
+    for (int n = 0; n < size; ++n) {
+      workers_.emplace_back([this]() { WorkerLoop(); });
+    }
+    size_ = size;
   }
 
- private:
-  size_t request_size_ = 0;
-  std::vector<std::thread> tasks_;
+  void StopWorkers() {
+    std::vector<std::thread> workers;
+    {
+      std::lock_guard<std::mutex> lock(mutex_);
+      stop_ = true;
+      size_ = 0;
+      workers.swap(workers_);
+    }
+    cond_.notify_all();
+    for (auto &worker : workers) worker.join();
+  }
+
+  void WorkerLoop() {
+    while (true) {
+      std::shared_ptr<Task> task;
+      {
+        std::unique_lock<std::mutex> lock(mutex_);
+        cond_.wait(lock, [this]() { return stop_ || !queue_.empty(); });
+        if (queue_.empty()) return;
+        task = std::move(queue_.front());
+        queue_.pop_front();
+      }
+      task->Run();
+    }
+  }
+
+  static WorkerPool *instance_;
+  static std::mutex instance_mutex_;
+
+  mutable std::mutex mutex_;
+  std::mutex resize_mutex_;
+  std::condition_variable cond_;
+  std::deque<std::shared_ptr<Task>> queue_;
+  std::vector<std::thread> workers_;
+  bool stop_ = false;
+  int size_ = -1;  // -1: not started yet.
 };
 
+WorkerPool *WorkerPool::instance_ = nullptr;
+std::mutex WorkerPool::instance_mutex_;
+
 template <typename T>
 inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
   if (*num_threads < 0) {
@@ -246,52 +562,138 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
                                      static_cast<int>(ins.size()), 256}));
 }
 
+inline void ParallelFor(size_t size, int num_threads,
+                        const std::function<void(size_t)> &func) {
+  WorkerPool::GetInstance()->ParallelFor(size, num_threads, func);
+}
+
 #define DEFINE_ENCODE_BATCH_FUNC_IMPL(FuncName, InType, OutType)        \
+  CheckRewriteOptions<OutType>(*self, add_bos, add_eos, reverse,        \
+                               emit_unk_piece);                         \
   std::vector<OutType> outs(ins.size());                                \
   InitNumThreads(ins, &num_threads);                                    \
-  {                                                                     \
-    ThreadPool pool(ins.size());                                        \
-    std::atomic<size_t> index = 0;                                      \
-    for (int n = 0;  n < num_threads; ++n) {                            \
-      pool.Schedule([&]() {                                             \
-          size_t i = 0;                                                 \
-          while ((i = std::atomic_fetch_add(&index, 1)) < outs.size()) { \
-            auto out = enable_sampling ?                                \
-                       self->Sample##FuncName(ins[i],                   \
-                                              nbest_size, alpha) :      \
-                       self->FuncName(ins[i]);                          \
-            RewriteIds(*self, &out, add_bos, add_eos, reverse,          \
-                       emit_unk_piece);                                 \
-            ConvertToUnicodeSpans(&out);                                \
-            outs[i] = std::move(out);                                   \
-          }                                                             \
-        });                                                             \
-    }                                                                   \
-  }                                                                     \
+  ParallelFor(outs.size(), num_threads, [&](size_t i) {                 \
+      auto out = enable_sampling ?                                      \
+                 self->Sample##FuncName(ins[i], nbest_size, alpha) :    \
+                 self->FuncName(ins[i]);                                \
+      RewriteIds(*self, &out, add_bos, add_eos, reverse,                \
+                 emit_unk_piece);                                       \
+      ConvertToUnicodeSpans(&out);                                      \
+      outs[i] = std::move(out);                                         \
+    });                                                                 \
+  return outs;
+
+// Same as DEFINE_ENCODE_BATCH_FUNC_IMPL for the n-best and sampling
+// requests, which return multiple results per input. The arguments after
+// the input are passed as `...`.
+#define DEFINE_NBEST_ENCODE_BATCH_FUNC_IMPL(FuncName, OutType, ...)     \
+  CheckRewriteOptions<OutType>(*self, add_bos, add_eos, reverse,        \
+                               emit_unk_piece);                         \
+  std::vector<OutType> outs(ins.size());                                \
+  InitNumThreads(ins, &num_threads);                                    \
+  ParallelFor(outs.size(), num_threads, [&](size_t i) {                 \
+      auto out = self->FuncName(ins[i], __VA_ARGS__);                   \
+      RewriteIds(*self, &out, add_bos, add_eos, reverse,                \
+                 emit_unk_piece);                                       \
+      ConvertToUnicodeSpans(&out);                                      \
+      outs[i] = std::move(out);                                         \
+    });                                                                 \
   return outs;
 
 #define DEFINE_DECODE_BATCH_FUNC_IMPL(FuncName, InType, OutType)        \
   std::vector<OutType> outs(ins.size());                                \
   InitNumThreads(ins, &num_threads);                                    \
-  {                                                                     \
-    std::atomic<size_t> index = 0;                                      \
-    ThreadPool pool(ins.size());                                        \
-    for (int n = 0;  n < num_threads; ++n) {                            \
-      pool.Schedule([&]() {                                             \
-          size_t i = 0;                                                 \
-          while ((i = std::atomic_fetch_add(&index, 1)) < outs.size()) { \
-            auto out = self->FuncName(ins[i]);                          \
-            ConvertToUnicodeSpans(&out);                                \
-            outs[i] = std::move(out);                                   \
-          }                                                             \
-        });                                                             \
-    }                                                                   \
-  }                                                                     \
+  ParallelFor(outs.size(), num_threads, [&](size_t i) {                 \
+      auto out = self->FuncName(ins[i]);                                \
+      ConvertToUnicodeSpans(&out);                                      \
+      outs[i] = std::move(out);                                         \
+    });                                                                 \
+  return outs;
+
+// Encodes `ins` to ids in parallel. When `max_length` is positive, each
+// sequence is truncated to `max_length` ids. Truncation removes the tail of
+// the text, <s> and </s> are always kept.
+inline std::vector<std::vector<int>> EncodeAsIdsBatch(
+    const sentencepiece::SentencePieceProcessor &sp,
+    const std::vector<absl::string_view> &ins, int num_threads,
+    bool enable_sampling, int nbest_size, float alpha,
+    bool add_bos, bool add_eos, bool reverse, bool emit_unk_piece,
+    int max_length) {
+  std::vector<std::vector<int>> outs(ins.size());
+  const int num_specials = static_cast<int>(add_bos) + static_cast<int>(add_eos);
+  const size_t text_length = max_length > 0 ?
+                             std::max(0, max_length - num_specials) : 0;
+  InitNumThreads(ins, &num_threads);
+  ParallelFor(outs.size(), num_threads, [&](size_t i) {
+      auto &ids = outs[i];
+      ids = enable_sampling ?
+            sp.SampleEncodeAsIds(ins[i], nbest_size, alpha) :
+            sp.EncodeAsIds(ins[i]);
+      if (max_length > 0 && ids.size() > text_length) {
+        ids.resize(text_length);
+      }
+      RewriteIds(sp, &ids, add_bos, add_eos, reverse, emit_unk_piece);
+      if (max_length > 0 && ids.size() > static_cast<size_t>(max_length)) {
+        ids.resize(max_length);
+      }
+    });
   return outs;
+}
+
+// Normalizes `ins` in parallel with `normalizer`, either a
+// SentencePieceProcessor or a SentencePieceNormalizer. The offsets are
+// converted to Unicode character offsets if `unicode_input`.
+template <typename T>
+NormalizedBatch NormalizeBatch(const T &normalizer,
+                               const std::vector<absl::string_view> &ins,
+                               int num_threads, bool with_offsets,
+                               bool flat_offsets, bool unicode_input) {
+  NormalizedBatch batch;
+  batch.normalized.resize(ins.size());
+  if (with_offsets) batch.offsets.resize(ins.size());
+  batch.with_offsets = with_offsets;
+  batch.flat_offsets = flat_offsets;
+  InitNumThreads(ins, &num_threads);
+  std::vector<sentencepiece::util::Status> status(ins.size());
+  ParallelFor(ins.size(), num_threads, [&](size_t i) {
+      status[i] = with_offsets ?
+                  normalizer.Normalize(ins[i], &batch.normalized[i],
+                                       &batch.offsets[i]) :
+                  normalizer.Normalize(ins[i], &batch.normalized[i]);
+      if (with_offsets && unicode_input) {
+        sentencepiece::ConvertToUnicodeAlignment(ins[i], batch.normalized[i],
+                                                 &batch.offsets[i]);
+      }
+    });
+  for (const auto &s : status) {
+    if (!s.ok()) throw s;
+  }
+  return batch;
+}
 
 }  // namespace
 %}
 
+%inline %{
+// Sets the number of threads in the worker pool shared by all batch requests.
+// A negative size uses the number of hardware threads (default).
+void SetWorkerPoolSize(int size) {
+  WorkerPool::GetInstance()->Resize(size);
+}
+
+int GetWorkerPoolSize() {
+  return WorkerPool::GetInstance()->size();
+}
+
+void _ShutdownWorkerPool() {
+  WorkerPool::GetInstance()->Resize(0);
+}
+
+void _ResetWorkerPoolAfterFork() {
+  WorkerPool::ResetAfterFork();
+}
+%}
+
 %init %{
 #ifdef Py_GIL_DISABLED
   PyUnstable_Module_SetGIL(m, Py_MOD_GIL_NOT_USED);
@@ -308,6 +710,117 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
   }
 }
 
+// Releases the GIL while the native part of Method runs. Inputs are
+// converted before, and outputs after the GIL is re-acquired. The instance
+// is locked shared in the meantime, so that the methods updating it (see
+// %exclusive) wait until the call finishes.
+%define %release_gil_of(Class, Method)
+%exception Class::Method {
+  try {
+    {
+      ScopedGILRelease release_gil;
+      std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+      $action
+    }
+    ReleaseResultObject(resultobj);
+  }
+  catch (const sentencepiece::util::Status &status) {
+    SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+  }
+}
+%enddef
+
+%define %release_gil(Method)
+%release_gil_of(sentencepiece::SentencePieceProcessor, Method)
+%enddef
+
+%release_gil(_EncodeAsIds)
+%release_gil(_EncodeAsPieces)
+%release_gil(_EncodeAsSerializedProto)
+%release_gil(_EncodeAsImmutableProto)
+%release_gil(_EncodeAsIdsBatch)
+%release_gil(_EncodeAsPiecesBatch)
+%release_gil(_EncodeAsSerializedProtoBatch)
+%release_gil(_EncodeAsImmutableProtoBatch)
+%release_gil(_EncodeAsIdsBatchAsBuffer)
+%release_gil(_EncodeAsIdsBatchAsPadded)
+%release_gil(_DecodeIds)
+%release_gil(_DecodeIdsAsBytes)
+%release_gil(_DecodePieces)
+%release_gil(_DecodeIdsAsSerializedProto)
+%release_gil(_DecodePiecesAsSerializedProto)
+%release_gil(_DecodeIdsAsImmutableProto)
+%release_gil(_DecodePiecesAsImmutableProto)
+%release_gil(_DecodeIdsBatch)
+%release_gil(_DecodeIdsAsBytesBatch)
+%release_gil(_DecodeIdsAsSerializedProtoBatch)
+%release_gil(_DecodeIdsAsImmutableProtoBatch)
+%release_gil(_DecodePiecesBatch)
+%release_gil(_DecodePiecesAsSerializedProtoBatch)
+%release_gil(_DecodePiecesAsImmutableProtoBatch)
+%release_gil(_NBestEncodeAsIds)
+%release_gil(_NBestEncodeAsPieces)
+%release_gil(_NBestEncodeAsSerializedProto)
+%release_gil(_NBestEncodeAsImmutableProto)
+%release_gil(_SampleEncodeAndScoreAsIds)
+%release_gil(_SampleEncodeAndScoreAsPieces)
+%release_gil(_SampleEncodeAndScoreAsSerializedProto)
+%release_gil(_SampleEncodeAndScoreAsImmutableProto)
+%release_gil(_NBestEncodeAsIdsBatch)
+%release_gil(_NBestEncodeAsPiecesBatch)
+%release_gil(_NBestEncodeAsSerializedProtoBatch)
+%release_gil(_NBestEncodeAsImmutableProtoBatch)
+%release_gil(_SampleEncodeAndScoreAsIdsBatch)
+%release_gil(_SampleEncodeAndScoreAsPiecesBatch)
+%release_gil(_SampleEncodeAndScoreAsSerializedProtoBatch)
+%release_gil(_SampleEncodeAndScoreAsImmutableProtoBatch)
+%release_gil(_Normalize)
+%release_gil(_NormalizeWithOffsets)
+%release_gil(_NormalizeBatch)
+%release_gil_of(sentencepiece::SentencePieceNormalizer, _NormalizeBatch)
+%release_gil(_CalculateEntropy)
+%release_gil(_CalculateEntropyBatch)
+
+// Locks the instance exclusively while Method updates it. The GIL is
+// released while waiting for the calls of %release_gil to finish.
+%define %exclusive_of(Class, Method)
+%exception Class::Method {
+  try {
+    std::unique_lock<std::shared_mutex> lock(*arg1->mutex(), std::defer_lock);
+    {
+      ScopedGILRelease release_gil;
+      lock.lock();
+    }
+    $action
+    ReleaseResultObject(resultobj);
+  }
+  catch (const sentencepiece::util::Status &status) {
+    SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+  }
+}
+%enddef
+
+%define %exclusive(Method)
+%exclusive_of(sentencepiece::SentencePieceProcessor, Method)
+%enddef
+
+%exclusive(LoadFromFile)
+%exclusive(LoadFromSerializedProto)
+%exclusive(SetEncodeExtraOptions)
+%exclusive(SetDecodeExtraOptions)
+%exclusive(SetVocabulary)
+%exclusive(ResetVocabulary)
+%exclusive(LoadVocabulary)
+%exclusive(SetEncodeCacheCapacity)
+%exclusive(SetWordCacheCapacity)
+%exclusive(_SetParallelEncode)
+%exclusive(_OverrideNormalizerSpec)
+%exclusive_of(sentencepiece::SentencePieceNormalizer, LoadFromFile)
+%exclusive_of(sentencepiece::SentencePieceNormalizer, LoadFromSerializedProto)
+%exclusive_of(sentencepiece::SentencePieceNormalizer, LoadFromRuleTSV)
+%exclusive_of(sentencepiece::SentencePieceNormalizer, LoadFromRuleName)
+%exclusive_of(sentencepiece::SentencePieceNormalizer, _SetProtoField)
+
 %apply unsigned int { uint32_t }
 
 %ignore sentencepiece::util::Status;
@@ -365,6 +878,7 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
 %ignore sentencepiece::SentencePieceProcessor::LoadOrDie;
 %ignore sentencepiece::SentencePieceProcessor::SetModel;
 %ignore sentencepiece::SentencePieceProcessor::SetNormalizer;
+%ignore sentencepiece::SentencePieceProcessor::mutex;
 %ignore sentencepiece::pretokenizer::PretokenizerForTrainingInterface;
 %ignore sentencepiece::SentenceIterator;
 %ignore sentencepiece::ConvertToUnicodeSpans;
@@ -383,6 +897,16 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
 %ignore sentencepiece::SentencePieceNormalizer::Load;
 %ignore sentencepiece::SentencePieceNormalizer::Normalize;
 %ignore sentencepiece::SentencePieceNormalizer::mutable_normalizer_spec;
+%ignore sentencepiece::SentencePieceNormalizer::mutex;
+
+%ignore sentencepiece::SentencePieceProcessor::NewDecodeStream;
+%ignore sentencepiece::DecodeStream::DecodeStream;
+%ignore sentencepiece::DecodeStream::Put;
+%ignore sentencepiece::DecodeStream::Finish;
+%newobject sentencepiece::SentencePieceProcessor::_NewDecodeStream;
+%ignore sentencepiece::SentencePieceProcessor::EncodeAppended;
+%ignore sentencepiece::SentencePieceProcessor::SetParallelEncode;
+%ignore sentencepiece::IncrementalEncodeState::ids;
 
 %ignore sentencepiece::io::LoadModelProto;
 %ignore sentencepiece::io::SaveModelProto;
@@ -485,6 +1009,35 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
                                   sentencepiece::ImmutableSentencePieceText);
   }
 
+  RaggedIds _EncodeAsIdsBatchAsBuffer(
+      const std::vector<absl::string_view> &ins, int num_threads,
+      bool enable_sampling, int nbest_size, float alpha,
+      bool add_bos, bool add_eos, bool reverse,
+      bool emit_unk_piece, int max_length) const {
+    RaggedIds result;
+    result.ids = EncodeAsIdsBatch(*$self, ins, num_threads, enable_sampling,
+                                  nbest_size, alpha, add_bos, add_eos, reverse,
+                                  emit_unk_piece, max_length);
+    return result;
+  }
+
+  PaddedIds _EncodeAsIdsBatchAsPadded(
+      const std::vector<absl::string_view> &ins, int num_threads,
+      bool enable_sampling, int nbest_size, float alpha,
+      bool add_bos, bool add_eos, bool reverse,
+      bool emit_unk_piece, int max_length, int pad_length) const {
+    PaddedIds result;
+    result.ids = EncodeAsIdsBatch(*$self, ins, num_threads, enable_sampling,
+                                  nbest_size, alpha, add_bos, add_eos, reverse,
+                                  emit_unk_piece, max_length);
+    result.length = pad_length > 0 ? pad_length : 0;
+    for (const auto &ids : result.ids) {
+      result.length = std::max(result.length, ids.size());
+    }
+    result.pad_id = std::max(0, $self->pad_id());
+    return result;
+  }
+
   /////////////////////////////////////////////////////////////////////////////
   // DecodeAs* (Single request)
   std::string _DecodeIds(const std::vector<int> &ids) const {
@@ -501,6 +1054,30 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
     return $self->DecodePieces(pieces);
   }
 
+  sentencepiece::DecodeStream *_NewDecodeStream() const {
+    return new sentencepiece::DecodeStream(*$self);
+  }
+
+  sentencepiece::util::Status _SetParallelEncode(int num_threads,
+                                                size_t chunk_size) {
+    if (num_threads < 0) num_threads = std::thread::hardware_concurrency();
+    if (num_threads <= 1 || chunk_size == 0) {
+      return $self->SetParallelEncode(nullptr, 0);
+    }
+    return $self->SetParallelEncode(
+        [num_threads](size_t size, const std::function<void(size_t)> &func) {
+          ParallelFor(size, num_threads, func);
+        },
+        chunk_size);
+  }
+
+  std::vector<int> _EncodeAppended(absl::string_view text,
+                                   sentencepiece::IncrementalEncodeState *state) const {
+    const auto _status = $self->EncodeAppended(text, state);
+    if (!_status.ok()) throw _status;
+    return state->ids();
+  }
+
   sentencepiece::util::bytes _DecodeIdsAsSerializedProto(
       const std::vector<int> &ids) const {
     CheckIds(ids, $self->GetPieceSize());
@@ -681,6 +1258,87 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
     return proto;
   }
 
+  /////////////////////////////////////////////////////////////////////////////
+  // NBestEncodeAs* (Batch request)
+  std::vector<std::vector<std::vector<int>>> _NBestEncodeAsIdsBatch(
+      const std::vector<absl::string_view> &ins, int num_threads,
+      int nbest_size, bool add_bos, bool add_eos, bool reverse,
+      bool emit_unk_piece) const {
+    DEFINE_NBEST_ENCODE_BATCH_FUNC_IMPL(NBestEncodeAsIds,
+                                        std::vector<std::vector<int>>,
+                                        nbest_size);
+  }
+
+  std::vector<std::vector<std::vector<std::string>>> _NBestEncodeAsPiecesBatch(
+      const std::vector<absl::string_view> &ins, int num_threads,
+      int nbest_size, bool add_bos, bool add_eos, bool reverse,
+      bool emit_unk_piece) const {
+    DEFINE_NBEST_ENCODE_BATCH_FUNC_IMPL(NBestEncodeAsPieces,
+                                        std::vector<std::vector<std::string>>,
+                                        nbest_size);
+  }
+
+  BytesArray _NBestEncodeAsSerializedProtoBatch(
+      const std::vector<absl::string_view> &ins, int num_threads,
+      int nbest_size, bool add_bos, bool add_eos, bool reverse,
+      bool emit_unk_piece) const {
+    DEFINE_NBEST_ENCODE_BATCH_FUNC_IMPL(NBestEncodeAsSerializedProto,
+                                        sentencepiece::util::bytes,
+                                        nbest_size);
+  }
+
+  std::vector<sentencepiece::ImmutableNBestSentencePieceText>
+      _NBestEncodeAsImmutableProtoBatch(
+      const std::vector<absl::string_view> &ins, int num_threads,
+      int nbest_size, bool add_bos, bool add_eos, bool reverse,
+      bool emit_unk_piece) const {
+    DEFINE_NBEST_ENCODE_BATCH_FUNC_IMPL(
+        NBestEncodeAsImmutableProto,
+        sentencepiece::ImmutableNBestSentencePieceText, nbest_size);
+  }
+
+  /////////////////////////////////////////////////////////////////////////////
+  // SampleEncodeAndScoreAs* (Batch request)
+  std::vector<std::vector<std::pair<std::vector<int>, float>>>
+      _SampleEncodeAndScoreAsIdsBatch(
+      const std::vector<absl::string_view> &ins, int num_threads,
+      int num_samples, float alpha, bool wor, bool include_best,
+      bool add_bos, bool add_eos, bool reverse, bool emit_unk_piece) const {
+    DEFINE_NBEST_ENCODE_BATCH_FUNC_IMPL(
+        SampleEncodeAndScoreAsIds, ScoredIdsArray,
+        num_samples, alpha, wor, include_best);
+  }
+
+  std::vector<std::vector<std::pair<std::vector<std::string>, float>>>
+      _SampleEncodeAndScoreAsPiecesBatch(
+      const std::vector<absl::string_view> &ins, int num_threads,
+      int num_samples, float alpha, bool wor, bool include_best,
+      bool add_bos, bool add_eos, bool reverse, bool emit_unk_piece) const {
+    DEFINE_NBEST_ENCODE_BATCH_FUNC_IMPL(
+        SampleEncodeAndScoreAsPieces, ScoredPiecesArray,
+        num_samples, alpha, wor, include_best);
+  }
+
+  BytesArray _SampleEncodeAndScoreAsSerializedProtoBatch(
+      const std::vector<absl::string_view> &ins, int num_threads,
+      int num_samples, float alpha, bool wor, bool include_best,
+      bool add_bos, bool add_eos, bool reverse, bool emit_unk_piece) const {
+    DEFINE_NBEST_ENCODE_BATCH_FUNC_IMPL(
+        SampleEncodeAndScoreAsSerializedProto, sentencepiece::util::bytes,
+        num_samples, alpha, wor, include_best);
+  }
+
+  std::vector<sentencepiece::ImmutableNBestSentencePieceText>
+      _SampleEncodeAndScoreAsImmutableProtoBatch(
+      const std::vector<absl::string_view> &ins, int num_threads,
+      int num_samples, float alpha, bool wor, bool include_best,
+      bool add_bos, bool add_eos, bool reverse, bool emit_unk_piece) const {
+    DEFINE_NBEST_ENCODE_BATCH_FUNC_IMPL(
+        SampleEncodeAndScoreAsImmutableProto,
+        sentencepiece::ImmutableNBestSentencePieceText,
+        num_samples, alpha, wor, include_best);
+  }
+
   // Normalize
   std::string _Normalize(absl::string_view text) {
     return $self->Normalize(text);
@@ -692,6 +1350,13 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
     return result;
   }
 
+  NormalizedBatch _NormalizeBatch(const std::vector<absl::string_view> &ins,
+                                  int num_threads, bool with_offsets,
+                                  bool flat_offsets, bool unicode_input) const {
+    return NormalizeBatch(*$self, ins, num_threads, with_offsets, flat_offsets,
+                          unicode_input);
+  }
+
   // Calculate Entropy
   float _CalculateEntropy(absl::string_view text, float alpha)  {
     return $self->CalculateEntropy(text, alpha);
@@ -701,18 +1366,9 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
                                             float alpha, int num_threads)  {
     std::vector<float> outs(ins.size());
     InitNumThreads(ins, &num_threads);
-    {
-      ThreadPool pool(ins.size());
-      std::atomic<size_t> index = 0;
-      for (int n = 0;  n < num_threads; ++n) {
-        pool.Schedule([&]() {
-           size_t i = 0;
-           while ((i = std::atomic_fetch_add(&index, 1)) < outs.size()) {
-             outs[i] = self->CalculateEntropy(ins[i], alpha);
-           }
-         });
-      }
-    }
+    ParallelFor(outs.size(), num_threads, [&](size_t i) {
+        outs[i] = self->CalculateEntropy(ins[i], alpha);
+      });
     return outs;
   }
 
@@ -741,7 +1397,10 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
            enable_sampling=False,
            nbest_size=-1,
            alpha=0.1,
-           num_threads=-1):
+           num_threads=-1,
+           encode_cache_capacity=0,
+           word_cache_capacity=0,
+           parallel_encode_chunk_size=0):
     """Initialzie sentencepieceProcessor.
 
     Args:
@@ -762,6 +1421,14 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
       alpha: Soothing parameter for unigram sampling, and dropout probability of
              merge operations for BPE-dropout.
       num_threads: number of threads in batch processing (Default = -1, auto-detected)
+      encode_cache_capacity: number of distinct inputs whose encoding results
+        are cached. Sampling is never cached. (Default = 0, no cache)
+      word_cache_capacity: number of distinct words whose pieces are memoized
+        by BPE models. (Default = 0, no cache)
+      parallel_encode_chunk_size: a single input longer than this many bytes
+        is split into chunks at word boundaries, which are encoded with
+        `num_threads` threads. Only used by the models whose results do not
+        change, e.g., BPE. (Default = 0, disabled)
     """
 
     _sentencepiece_processor_init_native(self)
@@ -774,8 +1441,12 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
     self._nbest_size = nbest_size
     self._alpha = alpha
     self._num_threads = num_threads
+    self.SetEncodeCacheCapacity(encode_cache_capacity)
+    self._SetParallelEncode(num_threads, parallel_encode_chunk_size)
     if model_file or model_proto:
       self.Load(model_file=model_file, model_proto=model_proto)
+      if word_cache_capacity:
+        self.SetWordCacheCapacity(word_cache_capacity)
 
 
   def Encode(self,
@@ -788,12 +1459,23 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
              enable_sampling=None,
              nbest_size=None,
              alpha=None,
-             num_threads=None):
+             num_threads=None,
+             max_length=None,
+             padding=None,
+             truncation=None):
     """Encode text input to segmented ids or tokens.
 
       Args:
-      input: input string. accepsts list of string.
-      out_type: output type. int or str.
+      input: input string. accepsts list of string, or a tuple (data, offsets)
+             of a contiguous UTF-8 buffer and an int32/int64 offsets array of
+             size n + 1 (e.g. Arrow string column buffers), which encodes
+             data[offsets[i]:offsets[i+1]] without creating Python strings.
+      out_type: output type. int, str, 'serialized_proto', 'immutable_proto',
+                'buffer' or 'numpy'. 'buffer' returns a pair of memoryviews
+                (ids, offsets) holding int32 ids of all inputs concatenated and
+                int64 offsets such that ids[offsets[i]:offsets[i+1]] are the ids
+                of the i-th input. 'numpy' returns the same pair as numpy arrays.
+                For a single string input, only the ids are returned.
       add_bos: Add <s> to the result (Default = false)
       add_eos: Add </s> to the result (Default = false) <s>/</s> is added after
                reversing (if enabled).
@@ -808,6 +1490,15 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
       alpha: Soothing parameter for unigram sampling, and merge probability for
              BPE-dropout (probablity 'p' in BPE-dropout paper).
       num_threads: the number of threads used in the batch processing (Default = -1).
+      max_length: maximum sequence length used by `padding` and `truncation`.
+      padding: 'longest' or 'max_length'. Returns a pair of 2-D int32 arrays
+               (ids, attention_mask) where each sequence is right-padded with
+               pad_id() (0 if the model has no <pad>) to the longest sequence or
+               to max_length. The arrays are nested lists for out_type=int,
+               memoryviews for 'buffer' and numpy arrays for 'numpy'.
+               (Default = None, no padding)
+      truncation: Truncates each sequence to max_length. The tail of the text is
+                  removed while <s> and </s> are kept. (Default = false)
     """
 
     if out_type is None:
@@ -841,7 +1532,47 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
     if num_threads is None or type(num_threads) is not int:
       raise RuntimeError('num_threads must be int')
 
-    if type(input) is list:
+    if padding is True:
+      padding = 'longest'
+    if padding not in [None, False, 'longest', 'max_length']:
+      raise RuntimeError('unknown padding={}'.format(padding))
+    if (padding == 'max_length' or truncation) and max_length is None:
+      raise RuntimeError(
+          'When padding="max_length" or truncation is True, We must specify "max_length".')
+    if max_length is not None and (type(max_length) is not int or max_length <= 0):
+      raise RuntimeError('max_length must be positive int')
+
+    truncate_length = max_length if truncation else 0
+    is_batch = _is_batch(input)
+    batch = input if is_batch else [input]
+
+    if padding:
+      if out_type is not int and out_type != 'buffer' and out_type != 'numpy':
+        raise RuntimeError('padding is only supported with out_type=int, "buffer" or "numpy"')
+      ids, mask, length = self._EncodeAsIdsBatchAsPadded(
+          batch, num_threads, enable_sampling, nbest_size, alpha,
+          add_bos, add_eos, reverse, emit_unk_piece, truncate_length,
+          max_length if padding == 'max_length' else 0)
+      shape = [_batch_size(input), length] if is_batch else [length]
+      return _padded_ids(ids, shape, out_type), _padded_ids(mask, shape, out_type)
+
+    if out_type == 'buffer' or out_type == 'numpy' or (truncation and out_type is int):
+      ids, offsets = _ragged_ids(
+          self._EncodeAsIdsBatchAsBuffer(
+              batch, num_threads, enable_sampling, nbest_size, alpha,
+              add_bos, add_eos, reverse, emit_unk_piece, truncate_length),
+          out_type)
+      if out_type is int:
+        ids = [ids[offsets[i]:offsets[i + 1]].tolist() for i in range(len(offsets) - 1)]
+        return ids if is_batch else ids[0]
+      if is_batch:
+        return ids, offsets
+      return ids
+
+    if truncation:
+      raise RuntimeError('truncation is only supported with out_type=int, "buffer" or "numpy"')
+
+    if is_batch:
       if out_type is int:
         return self._EncodeAsIdsBatch(input, num_threads, enable_sampling, nbest_size,
                                       alpha, add_bos, add_eos, reverse, emit_unk_piece)
@@ -915,7 +1646,8 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
                   add_eos=None,
                   reverse=None,
                   emit_unk_piece=None,
-                  nbest_size=None):
+                  nbest_size=None,
+                  num_threads=None):
     """NBestEncode text input to segmented ids or tokens.
 
       Args:
@@ -926,6 +1658,7 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
       reverse: Reverses the tokenized sequence (Default = false)
       emit_unk_piece: Emits the unk literal string (Default = false)
       nbest_size: nbest size
+      num_threads: the number of threads used in the batch processing (Default = -1).
     """
 
     if out_type is None:
@@ -941,9 +1674,31 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
     if nbest_size is None:
       nbest_size = self._nbest_size
 
+    if num_threads is None:
+      num_threads = self._num_threads
+
     if nbest_size <= 0:
       nbest_size=1
 
+    if num_threads is None or type(num_threads) is not int:
+      raise RuntimeError('num_threads must be int')
+
+    if _is_batch(input):
+      if out_type is int:
+        return self._NBestEncodeAsIdsBatch(input, num_threads, nbest_size,
+                                           add_bos, add_eos, reverse, emit_unk_piece)
+      if out_type is str:
+        return self._NBestEncodeAsPiecesBatch(input, num_threads, nbest_size,
+                                              add_bos, add_eos, reverse, emit_unk_piece)
+      if out_type == 'serialized_proto' or out_type == 'proto':
+        return self._NBestEncodeAsSerializedProtoBatch(input, num_threads, nbest_size,
+                                                       add_bos, add_eos, reverse, emit_unk_piece)
+      if out_type == 'immutable_proto':
+        return self._NBestEncodeAsImmutableProtoBatch(input, num_threads, nbest_size,
+                                                      add_bos, add_eos, reverse, emit_unk_piece)
+
+      raise RuntimeError('unknown out_type')
+
     def _encode(text):
       if out_type is int:
         return self._NBestEncodeAsIds(text, nbest_size,
@@ -960,9 +1715,6 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
 
       raise RuntimeError('unknown out_type')
 
-    if type(input) is list:
-      return [_encode(n) for n in input]
-
     return _encode(input)
 
 
@@ -996,7 +1748,8 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
                            num_samples=None,
                            alpha=None,
                            wor=None,
-                           include_best=None):
+                           include_best=None,
+                           num_threads=None):
     """SampleEncodeAndScore text input to segmented ids or tokens.
 
       Args:
@@ -1010,6 +1763,7 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
       alpha: inverse temperature for sampling
       wor: whether to sample without replacement (Default = false)
       include_best: whether to include the best tokenization, requires wor=True (Default = false)
+      num_threads: the number of threads used in the batch processing (Default = -1).
     """
 
     if out_type is None:
@@ -1030,6 +1784,8 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
       wor = False
     if include_best is None:
       include_best = False
+    if num_threads is None:
+      num_threads = self._num_threads
 
     if num_samples <= 0:
       raise RuntimeError('num_examples must be positive')
@@ -1037,6 +1793,29 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
     if include_best and not wor:
       raise RuntimeError('When include_best is True, We must specify "wor = True".')
 
+    if num_threads is None or type(num_threads) is not int:
+      raise RuntimeError('num_threads must be int')
+
+    if _is_batch(input):
+      if out_type is int:
+        return self._SampleEncodeAndScoreAsIdsBatch(
+            input, num_threads, num_samples, alpha, wor, include_best,
+            add_bos, add_eos, reverse, emit_unk_piece)
+      if out_type is str:
+        return self._SampleEncodeAndScoreAsPiecesBatch(
+            input, num_threads, num_samples, alpha, wor, include_best,
+            add_bos, add_eos, reverse, emit_unk_piece)
+      if out_type == 'serialized_proto' or out_type == 'proto':
+        return self._SampleEncodeAndScoreAsSerializedProtoBatch(
+            input, num_threads, num_samples, alpha, wor, include_best,
+            add_bos, add_eos, reverse, emit_unk_piece)
+      if out_type == 'immutable_proto':
+        return self._SampleEncodeAndScoreAsImmutableProtoBatch(
+            input, num_threads, num_samples, alpha, wor, include_best,
+            add_bos, add_eos, reverse, emit_unk_piece)
+
+      raise RuntimeError('unknown output type')
+
 
     def _encode(text):
       if out_type is int:
@@ -1057,9 +1836,6 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
       raise RuntimeError('unknown output type')
 
 
-    if type(input) is list:
-      return [_encode(n) for n in input]
-
     return _encode(input)
 
 
@@ -1202,9 +1978,55 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
     return self.Decode(input=input, out_type=out_type, **kwargs)
 
 
+  def NewDecodeStream(self):
+    """Returns a DecodeStream, which decodes ids incrementally.
+
+    Useful to detokenize the outputs of a language model token by token.
+    DecodeStream.Put(ids) returns only the text finalized by `ids`.
+    """
+    stream = self._NewDecodeStream()
+    stream._processor = self
+    return stream
+
+
+  def EncodeAppended(self, text, state):
+    """Appends `text` to `state` and returns the ids of the whole input.
+
+    The result is the same as Encode(state.input()) with the current encode
+    options, but only the end of the input is segmented again. Useful to
+    encode a growing conversation turn by turn.
+    """
+    return self._EncodeAppended(text, state)
+
+
+  async def EncodeAsync(self, input, **kwargs):
+    """Asynchronous version of Encode.
+
+    Encoding runs on an executor thread with the GIL released, so the event
+    loop is not blocked. Single-string requests issued in the same event loop
+    iteration with the same options are merged into one batch Encode call.
+    """
+    padded = kwargs.get('padding') or kwargs.get('truncation')
+    if (_is_batch(input) or padded or
+        kwargs.get('out_type') == 'buffer' or kwargs.get('out_type') == 'numpy'):
+      return await _run_in_executor(self.Encode, input, kwargs)
+    return await _AsyncBatcher.get().submit(self.Encode, type(input), input, kwargs)
+
+
+  async def DecodeAsync(self, input, **kwargs):
+    """Asynchronous version of Decode.
+
+    Concurrent requests for single id or piece sequences issued in the same
+    event loop iteration are merged into one batch Decode call.
+    """
+    if type(input) is not list or not input or type(input[0]) is list:
+      return await _run_in_executor(self.Decode, input, kwargs)
+    return await _AsyncBatcher.get().submit(self.Decode, type(input[0]), input, kwargs)
+
+
   def CalculateEntropy(self, input, alpha, num_threads=None):
     """Calculate sentence entropy"""
-    if type(input) is list:
+    if _is_batch(input):
       if num_threads is None:
         num_threads = self._num_threads
       if num_threads is None or type(num_threads) is not int:
@@ -1214,15 +2036,25 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
     return self._CalculateEntropy(input, alpha)
 
 
-  def Normalize(self, input, with_offsets=None):
-    def _normalize(text):
-      if with_offsets:
-        return self._NormalizeWithOffsets(text)
-      return self._Normalize(text)
+  def Normalize(self, input, with_offsets=None, num_threads=None, out_type=None):
+    """Normalizes the input with the normalizer of the model.
 
-    if type(input) is list:
-      return [_normalize(x) for x in input]
-    return _normalize(input)
+    Args:
+      input: input string. accepts list of string, or a (data, offsets) tuple
+             as in Encode.
+      with_offsets: also returns the offsets mapping each character of the
+                    normalized string to the input.
+      num_threads: the number of threads used in the batch processing
+                   (Default = num_threads of the constructor).
+      out_type: None, 'buffer' or 'numpy'. With `with_offsets`, 'buffer'
+                returns the offsets of a batch as a pair of int64 memoryviews
+                (offsets, splits) such that offsets[splits[i]:splits[i+1]] are
+                the offsets of the i-th input, i.e., a batch returns
+                (normalized, offsets, splits). 'numpy' returns numpy arrays.
+    """
+    if num_threads is None:
+      num_threads = self._num_threads
+    return _normalize(self, input, with_offsets, num_threads, out_type)
 
   def OverrideNormalizerSpec(self, **kwargs):
     new_kwargs = {}
@@ -1240,6 +2072,15 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
 
 
   def __getstate__(self):
+    """Returns the precompiled model if it carries the index of the model.
+
+    Older releases cannot load the precompiled model, so the model proto is
+    returned otherwise. index_size is the uint64 at offset 24 of
+    PrecompiledModelHeader.
+    """
+    state = self.serialized_precompiled_model()
+    if len(state) >= 32 and struct.unpack_from('=Q', state, 24)[0] > 0:
+      return state
     return self.serialized_model_proto()
 
 
@@ -1379,6 +2220,13 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
     return result;
   }
 
+  NormalizedBatch _NormalizeBatch(const std::vector<absl::string_view> &ins,
+                                  int num_threads, bool with_offsets,
+                                  bool flat_offsets, bool unicode_input) const {
+    return NormalizeBatch(*$self, ins, num_threads, with_offsets, flat_offsets,
+                          unicode_input);
+  }
+
   void _SetProtoField(absl::string_view name, bool value) {
     sentencepiece::SentencePieceTrainer::SetProtoField(
         name,
@@ -1425,15 +2273,12 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
       self._SetProtoField('escape_whitespaces', escape_whitespaces)
       self._SetProtoField('remove_extra_whitespaces', remove_extra_whitespaces)
 
-  def Normalize(self, input, with_offsets=None):
-    def _normalize(text):
-      if with_offsets:
-        return self._NormalizeWithOffsets(text)
-      return self._Normalize(text)
+  def Normalize(self, input, with_offsets=None, num_threads=-1, out_type=None):
+    """Normalizes the input.
 
-    if type(input) is list:
-      return [_normalize(x) for x in input]
-    return _normalize(input)
+    Accepts the same arguments as SentencePieceProcessor.Normalize.
+    """
+    return _normalize(self, input, with_offsets, num_threads, out_type)
 
 
   def __getstate__(self):
@@ -1592,6 +2437,50 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
   %}
 }
 
+%extend sentencepiece::DecodeStream {
+  std::string _Put(const std::vector<int> &ids) {
+    std::string text;
+    const auto _status = $self->Put(ids, &text);
+    if (!_status.ok()) throw _status;
+    return text;
+  }
+
+  std::string _Finish() {
+    std::string text;
+    const auto _status = $self->Finish(&text);
+    if (!_status.ok()) throw _status;
+    return text;
+  }
+
+  %pythoncode %{
+    def Put(self, input):
+      """Appends an id or a list of ids and returns the newly finalized text.
+
+      Bytes of an incomplete UTF-8 character are kept until the following
+      ids complete it.
+      """
+      if type(input) is not list:
+        input = [input]
+      return self._Put(input)
+
+    def Finish(self):
+      """Returns the remaining text and resets the stream."""
+      return self._Finish()
+  %}
+}
+
+%extend sentencepiece::IncrementalEncodeState {
+  std::vector<int> _ids() const {
+    return $self->ids();
+  }
+
+  %pythoncode %{
+    def ids(self):
+      """Returns the ids of the whole input."""
+      return self._ids()
+  %}
+}
+
 %typemap(out) std::vector<int> {
   $result = PyList_New($1.size());
   for (size_t i = 0; i < $1.size(); ++i) {
@@ -1617,6 +2506,57 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
   }
 }
 
+%typemap(out) RaggedIds {
+  size_t total = 0;
+  for (const auto &ids : $1.ids) total += ids.size();
+  PyObject *ids_obj = PyByteArray_FromStringAndSize(nullptr, total * sizeof(int32_t));
+  PyObject *offsets_obj = PyByteArray_FromStringAndSize(
+      nullptr, ($1.ids.size() + 1) * sizeof(int64_t));
+  if (ids_obj == nullptr || offsets_obj == nullptr) {
+    Py_XDECREF(ids_obj);
+    Py_XDECREF(offsets_obj);
+    SWIG_fail;
+  }
+  int32_t *ids_data = reinterpret_cast<int32_t *>(PyByteArray_AS_STRING(ids_obj));
+  int64_t *offsets_data = reinterpret_cast<int64_t *>(PyByteArray_AS_STRING(offsets_obj));
+  int64_t offset = 0;
+  offsets_data[0] = 0;
+  for (size_t i = 0; i < $1.ids.size(); ++i) {
+    std::copy($1.ids[i].begin(), $1.ids[i].end(), ids_data + offset);
+    offset += $1.ids[i].size();
+    offsets_data[i + 1] = offset;
+  }
+  $result = PyTuple_Pack(2, ids_obj, offsets_obj);
+  Py_DECREF(ids_obj);
+  Py_DECREF(offsets_obj);
+}
+
+%typemap(out) PaddedIds {
+  const size_t size = $1.ids.size() * $1.length;
+  PyObject *ids_obj = PyByteArray_FromStringAndSize(nullptr, size * sizeof(int32_t));
+  PyObject *mask_obj = PyByteArray_FromStringAndSize(nullptr, size * sizeof(int32_t));
+  if (ids_obj == nullptr || mask_obj == nullptr) {
+    Py_XDECREF(ids_obj);
+    Py_XDECREF(mask_obj);
+    SWIG_fail;
+  }
+  int32_t *ids_data = reinterpret_cast<int32_t *>(PyByteArray_AS_STRING(ids_obj));
+  int32_t *mask_data = reinterpret_cast<int32_t *>(PyByteArray_AS_STRING(mask_obj));
+  for (const auto &ids : $1.ids) {
+    std::copy(ids.begin(), ids.end(), ids_data);
+    std::fill(ids_data + ids.size(), ids_data + $1.length, $1.pad_id);
+    std::fill(mask_data, mask_data + ids.size(), 1);
+    std::fill(mask_data + ids.size(), mask_data + $1.length, 0);
+    ids_data += $1.length;
+    mask_data += $1.length;
+  }
+  PyObject *length_obj = PyInt_FromLong(static_cast<long>($1.length));
+  $result = PyTuple_Pack(3, ids_obj, mask_obj, length_obj);
+  Py_DECREF(ids_obj);
+  Py_DECREF(mask_obj);
+  Py_DECREF(length_obj);
+}
+
 %typemap(out) std::vector<std::string> {
   PyObject *input_type = resultobj;
   $result = PyList_New($1.size());
@@ -1691,13 +2631,17 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
   $1 = ustring.str();
 }
 
-%typemap(in) const std::vector<absl::string_view>& {
+%typemap(in) const std::vector<absl::string_view>& (PyBufferHolder data_buffer,
+                                                     PyBufferHolder offsets_buffer,
+                                                     PyObjectRefs refs) {
   std::vector<absl::string_view> *out = nullptr;
   if (PyList_Check($input)) {
-    const size_t size = PyList_Size($input);
+    PyObject *items = refs.Add(PyList_AsTuple($input));
+    if (items == nullptr) SWIG_fail;
+    const size_t size = PyTuple_GET_SIZE(items);
     out = new std::vector<absl::string_view>(size);
     for (size_t i = 0; i < size; ++i) {
-      const PyInputString ustring(PyList_GetItem($input, i));
+      const PyInputString ustring(PyTuple_GET_ITEM(items, i));
       if (ustring.IsAvalable()) {
         (*out)[i] = ustring.str();
       } else {
@@ -1706,6 +2650,18 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
       }
       resultobj = ustring.input_type();
     }
+  } else if (PyTuple_Check($input) && PyTuple_Size($input) == 2) {
+    // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+    // kept alive until the call returns, so no copy of the strings is made.
+    out = new std::vector<absl::string_view>;
+    $1 = out;
+    if (!data_buffer.Acquire(PyTuple_GET_ITEM($input, 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer.Acquire(PyTuple_GET_ITEM($input, 1),
+                                PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer.view(), offsets_buffer.view(), out)) {
+      SWIG_fail;
+    }
+    resultobj = kUnicodeInput;
   } else {
     PyErr_SetString(PyExc_TypeError, "not a list");
     SWIG_fail;
@@ -1734,7 +2690,7 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
   $1 = out;
 }
 
-%typemap(in) const std::vector<std::vector<absl::string_view>>& {
+%typemap(in) const std::vector<std::vector<absl::string_view>>& (PyObjectRefs refs) {
   std::vector<std::vector<absl::string_view>> *out = nullptr;
   if (PyList_Check($input)) {
     const size_t size = PyList_Size($input);
@@ -1742,10 +2698,12 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
     for (size_t i = 0; i < size; ++i) {
       PyObject *o = PyList_GetItem($input, i);
       if (PyList_Check(o)) {
-        const size_t size2 = PyList_Size(o);
+        PyObject *items = refs.Add(PyList_AsTuple(o));
+        if (items == nullptr) SWIG_fail;
+        const size_t size2 = PyTuple_GET_SIZE(items);
         (*out)[i].resize(size2);
         for (size_t j = 0; j < size2; ++j) {
-          const PyInputString ustring(PyList_GetItem(o, j));
+          const PyInputString ustring(PyTuple_GET_ITEM(items, j));
           if (ustring.IsAvalable()) {
             (*out)[i][j] = ustring.str();
           } else {
@@ -1853,6 +2811,90 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
   }
 }
 
+// Not a Python argument. Tells whether the string arguments were unicode,
+// which is known after all the arguments are converted.
+%typemap(in, numinputs=0) bool unicode_input "";
+%typemap(check) bool unicode_input {
+  $1 = PyInputString::IsUnicode(resultobj);
+}
+
+%typemap(out) NormalizedBatch {
+  PyObject *input_type = resultobj;
+  PyObject *normalized = PyList_New($1.normalized.size());
+  for (size_t i = 0; i < $1.normalized.size(); ++i) {
+    PyList_SET_ITEM(normalized, i, MakePyOutputString($1.normalized[i], input_type));
+  }
+  if (!$1.with_offsets) {
+    $result = normalized;
+  } else if (!$1.flat_offsets) {
+    $result = PyList_New($1.normalized.size());
+    for (size_t i = 0; i < $1.normalized.size(); ++i) {
+      PyObject *text = PyList_GET_ITEM(normalized, i);
+      PyObject *obj = PyList_New($1.offsets[i].size());
+      for (size_t j = 0; j < $1.offsets[i].size(); ++j) {
+        PyList_SET_ITEM(obj, j, PyInt_FromLong(static_cast<long>($1.offsets[i][j])));
+      }
+      PyObject *pair = PyTuple_New(2);
+      Py_INCREF(text);
+      PyTuple_SET_ITEM(pair, 0, text);
+      PyTuple_SET_ITEM(pair, 1, obj);
+      PyList_SET_ITEM($result, i, pair);
+    }
+    Py_DECREF(normalized);
+  } else {
+    size_t total = 0;
+    for (const auto &offsets : $1.offsets) total += offsets.size();
+    PyObject *offsets_obj = PyByteArray_FromStringAndSize(nullptr, total * sizeof(int64_t));
+    PyObject *splits_obj = PyByteArray_FromStringAndSize(
+        nullptr, ($1.offsets.size() + 1) * sizeof(int64_t));
+    if (offsets_obj == nullptr || splits_obj == nullptr) {
+      Py_DECREF(normalized);
+      Py_XDECREF(offsets_obj);
+      Py_XDECREF(splits_obj);
+      SWIG_fail;
+    }
+    int64_t *offsets_data = reinterpret_cast<int64_t *>(PyByteArray_AS_STRING(offsets_obj));
+    int64_t *splits_data = reinterpret_cast<int64_t *>(PyByteArray_AS_STRING(splits_obj));
+    int64_t split = 0;
+    splits_data[0] = 0;
+    for (size_t i = 0; i < $1.offsets.size(); ++i) {
+      std::copy($1.offsets[i].begin(), $1.offsets[i].end(), offsets_data + split);
+      split += $1.offsets[i].size();
+      splits_data[i + 1] = split;
+    }
+    $result = PyTuple_Pack(3, normalized, offsets_obj, splits_obj);
+    Py_DECREF(normalized);
+    Py_DECREF(offsets_obj);
+    Py_DECREF(splits_obj);
+  }
+}
+
+%typemap(out) std::vector<std::vector<std::vector<int>>> {
+  $result = MakePyObject($1, nullptr);
+}
+
+%typemap(out) std::vector<std::vector<std::vector<std::string>>> {
+  PyObject *input_type = resultobj;
+  $result = MakePyObject($1, input_type);
+}
+
+%typemap(out) std::vector<std::vector<std::pair<std::vector<int>, float>>> {
+  $result = MakePyObject($1, nullptr);
+}
+
+%typemap(out) std::vector<std::vector<std::pair<std::vector<std::string>, float>>> {
+  PyObject *input_type = resultobj;
+  $result = MakePyObject($1, input_type);
+}
+
+%typemap(out) std::vector<sentencepiece::ImmutableNBestSentencePieceText> {
+  $result = PyList_New($1.size());
+  for (size_t i = 0; i < $1.size(); ++i) {
+    PyObject *obj = SWIG_NewPointerObj(new sentencepiece::ImmutableNBestSentencePieceText($1.at(i)), SWIGTYPE_p_sentencepiece__ImmutableNBestSentencePieceText, SWIG_POINTER_OWN | 0);
+    PyList_SET_ITEM($result, i, obj);
+  }
+}
+
 // Types for normalized string and offset
 %typemap(out) std::pair<std::string, std::vector<size_t>> {
   PyObject *input_type = resultobj;
@@ -1863,7 +2905,9 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
   for (size_t i = 0; i < $1.second.size(); ++i) {
     PyList_SET_ITEM(obj, i, PyInt_FromLong(static_cast<long>($1.second[i])));
   }
-  $result = PyTuple_Pack(2, MakePyOutputString($1.first, input_type), obj);
+  $result = PyTuple_New(2);
+  PyTuple_SET_ITEM($result, 0, MakePyOutputString($1.first, input_type));
+  PyTuple_SET_ITEM($result, 1, obj);
 }
 
 %typemap(in) sentencepiece::SentenceIterator * {
@@ -1934,6 +2978,11 @@ import re
 import csv
 import sys
 import os
+import struct
+import asyncio
+import atexit
+import functools
+import weakref
 import importlib.resources
 from io import StringIO
 from io import BytesIO
@@ -1952,6 +3001,163 @@ def _add_snake_case(classname):
     setattr(classname, k, v)
 
 
+def _run_in_executor(func, input, kwargs):
+  loop = asyncio.get_running_loop()
+  return loop.run_in_executor(None, functools.partial(func, input, **kwargs))
+
+
+class _AsyncBatcher(object):
+  """Merges requests issued in one event loop iteration into a batch call."""
+
+  _batchers = weakref.WeakKeyDictionary()
+
+  @classmethod
+  def get(cls):
+    loop = asyncio.get_running_loop()
+    batcher = cls._batchers.get(loop)
+    if batcher is None:
+      batcher = cls._batchers[loop] = cls(loop)
+    return batcher
+
+  def __init__(self, loop):
+    self._loop = loop
+    self._pending = {}
+
+  def submit(self, func, input_type, input, kwargs):
+    """Returns a future for func(input, **kwargs), batched by func([...])."""
+    try:
+      key = (func, input_type, tuple(sorted(kwargs.items())))
+      requests = self._pending.get(key)
+    except TypeError:  # unhashable option values.
+      return _run_in_executor(func, input, kwargs)
+    if requests is None:
+      requests = self._pending[key] = []
+      self._loop.call_soon(self._flush, key)
+    future = self._loop.create_future()
+    requests.append((input, future))
+    return future
+
+  def _flush(self, key):
+    func, _, kwargs = key
+    requests = self._pending.pop(key)
+    inputs = [input for input, _ in requests]
+    batch = _run_in_executor(func, inputs, dict(kwargs))
+
+    def _done(batch):
+      if (not batch.cancelled() and batch.exception() is not None and
+          len(requests) > 1):
+        # Reruns the requests one by one so that only the invalid ones fail.
+        for input, future in requests:
+          if not future.done():
+            _chain(_run_in_executor(func, input, dict(kwargs)), future)
+        return
+      for n, (_, future) in enumerate(requests):
+        if future.done():
+          continue
+        if batch.cancelled():
+          future.cancel()
+        elif batch.exception() is not None:
+          future.set_exception(batch.exception())
+        else:
+          future.set_result(batch.result()[n])
+
+    batch.add_done_callback(_done)
+
+
+def _chain(source, future):
+  """Copies the result of the future `source` to `future` when it is done."""
+
+  def _done(source):
+    if future.done():
+      return
+    if source.cancelled():
+      future.cancel()
+    elif source.exception() is not None:
+      future.set_exception(source.exception())
+    else:
+      future.set_result(source.result())
+
+  source.add_done_callback(_done)
+
+
+def _is_batch(input):
+  """Returns true if input is a list of strings or a (data, offsets) tuple.
+
+  Other tuples, e.g., a tuple of strings, raise TypeError. `data` must be a
+  bytes-like object and `offsets` an integer array.
+  """
+  if type(input) is list:
+    return True
+  if type(input) is not tuple:
+    return False
+  if len(input) == 2 and not isinstance(input[0], str):
+    try:
+      memoryview(input[0])
+      format = memoryview(input[1]).format.lstrip('@=')
+    except TypeError:
+      format = None
+    if format in ('i', 'I', 'l', 'L', 'q', 'Q'):
+      return True
+  raise TypeError('expected list of str or (data, offsets), got tuple')
+
+
+def _batch_size(input):
+  if type(input) is tuple:
+    return len(memoryview(input[1])) - 1
+  return len(input)
+
+
+def _ragged_ids(buffers, out_type):
+  """Wraps the (ids, offsets) bytearrays returned by _EncodeAsIdsBatchAsBuffer."""
+  ids = memoryview(buffers[0]).cast('i')
+  offsets = memoryview(buffers[1]).cast('q')
+  if out_type == 'numpy':
+    import numpy as np
+    return np.frombuffer(ids, dtype=np.int32), np.frombuffer(offsets, dtype=np.int64)
+  return ids, offsets
+
+
+def _padded_ids(buffer, shape, out_type):
+  """Wraps an int32 bytearray returned by _EncodeAsIdsBatchAsPadded as `shape`."""
+  if out_type == 'numpy':
+    import numpy as np
+    return np.frombuffer(buffer, dtype=np.int32).reshape(shape)
+  view = memoryview(buffer).cast('i')
+  if out_type is int:
+    if len(shape) == 1:
+      return view.tolist()
+    return [view[i * shape[1]:(i + 1) * shape[1]].tolist() for i in range(shape[0])]
+  # memoryview cannot represent an empty multi-dimensional array.
+  if 0 in shape:
+    return view
+  return memoryview(buffer).cast('i', shape)
+
+
+def _normalize(normalizer, input, with_offsets, num_threads, out_type):
+  """Implements Normalize of SentencePieceProcessor and SentencePieceNormalizer."""
+  if num_threads is None or type(num_threads) is not int:
+    raise RuntimeError('num_threads must be int')
+  if out_type not in [None, 'buffer', 'numpy']:
+    raise RuntimeError('unknown out_type={}'.format(out_type))
+  if not _is_batch(input):
+    if with_offsets:
+      return normalizer._NormalizeWithOffsets(input)
+    return normalizer._Normalize(input)
+
+  flat_offsets = bool(with_offsets) and out_type is not None
+  batch = normalizer._NormalizeBatch(input, num_threads, bool(with_offsets),
+                                     flat_offsets)
+  if not flat_offsets:
+    return batch
+  normalized, offsets, splits = batch
+  offsets = memoryview(offsets).cast('q')
+  splits = memoryview(splits).cast('q')
+  if out_type == 'numpy':
+    import numpy as np
+    return normalized, np.frombuffer(offsets, dtype=np.int64), np.frombuffer(splits, dtype=np.int64)
+  return normalized, offsets, splits
+
+
 def _batchnize(classname, name):
   """Enables batch request for the method classname.name."""
   func = getattr(classname, name, None)
@@ -1986,8 +3192,16 @@ for m in [
 _add_snake_case(SentencePieceProcessor)
 _add_snake_case(SentencePieceTrainer)
 _add_snake_case(SentencePieceNormalizer)
+_add_snake_case(DecodeStream)
+_add_snake_case(IncrementalEncodeState)
 set_random_generator_seed = SetRandomGeneratorSeed
 set_min_log_level = SetMinLogLevel
+set_worker_pool_size = SetWorkerPoolSize
+get_worker_pool_size = GetWorkerPoolSize
+
+atexit.register(_ShutdownWorkerPool)
+if hasattr(os, 'register_at_fork'):
+  os.register_at_fork(after_in_child=_ResetWorkerPoolAfterFork)
 
 from ._version import __version__
 
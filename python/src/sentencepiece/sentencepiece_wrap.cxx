@@ -3206,23 +3206,26 @@ SWIG_Python_NonDynamicSetAttr(PyObject *obj, PyObject *name, PyObject *value) {
 
 /* -------- TYPES TABLE (BEGIN) -------- */
 
-#define SWIGTYPE_p_char swig_types[0]
-#define SWIGTYPE_p_float swig_types[1]
-#define SWIGTYPE_p_sentencepiece__ImmutableNBestSentencePieceText swig_types[2]
-#define SWIGTYPE_p_sentencepiece__ImmutableSentencePieceText swig_types[3]
-#define SWIGTYPE_p_sentencepiece__ImmutableSentencePieceText_ImmutableSentencePiece swig_types[4]
-#define SWIGTYPE_p_sentencepiece__SentenceIterator swig_types[5]
-#define SWIGTYPE_p_sentencepiece__SentencePieceNormalizer swig_types[6]
-#define SWIGTYPE_p_sentencepiece__SentencePieceProcessor swig_types[7]
-#define SWIGTYPE_p_sentencepiece__SentencePieceTrainer swig_types[8]
-#define SWIGTYPE_p_std__string swig_types[9]
-#define SWIGTYPE_p_std__unordered_mapT_std__string_std__string_t swig_types[10]
-#define SWIGTYPE_p_std__vectorT_absl__string_view_t swig_types[11]
-#define SWIGTYPE_p_std__vectorT_int_t swig_types[12]
-#define SWIGTYPE_p_std__vectorT_std__vectorT_absl__string_view_t_t swig_types[13]
-#define SWIGTYPE_p_std__vectorT_std__vectorT_int_t_t swig_types[14]
-static swig_type_info *swig_types[16];
-static swig_module_info swig_module = {swig_types, 15, 0, 0, 0, 0};
+#define SWIGTYPE_p_ParallelForFunc swig_types[0]
+#define SWIGTYPE_p_char swig_types[1]
+#define SWIGTYPE_p_float swig_types[2]
+#define SWIGTYPE_p_sentencepiece__DecodeStream swig_types[3]
+#define SWIGTYPE_p_sentencepiece__ImmutableNBestSentencePieceText swig_types[4]
+#define SWIGTYPE_p_sentencepiece__ImmutableSentencePieceText swig_types[5]
+#define SWIGTYPE_p_sentencepiece__ImmutableSentencePieceText_ImmutableSentencePiece swig_types[6]
+#define SWIGTYPE_p_sentencepiece__IncrementalEncodeState swig_types[7]
+#define SWIGTYPE_p_sentencepiece__SentenceIterator swig_types[8]
+#define SWIGTYPE_p_sentencepiece__SentencePieceNormalizer swig_types[9]
+#define SWIGTYPE_p_sentencepiece__SentencePieceProcessor swig_types[10]
+#define SWIGTYPE_p_sentencepiece__SentencePieceTrainer swig_types[11]
+#define SWIGTYPE_p_std__string swig_types[12]
+#define SWIGTYPE_p_std__unordered_mapT_std__string_std__string_t swig_types[13]
+#define SWIGTYPE_p_std__vectorT_absl__string_view_t swig_types[14]
+#define SWIGTYPE_p_std__vectorT_int_t swig_types[15]
+#define SWIGTYPE_p_std__vectorT_std__vectorT_absl__string_view_t_t swig_types[16]
+#define SWIGTYPE_p_std__vectorT_std__vectorT_int_t_t swig_types[17]
+static swig_type_info *swig_types[19];
+static swig_module_info swig_module = {swig_types, 18, 0, 0, 0, 0};
 #define SWIG_TypeQuery(name) SWIG_TypeQueryModule(&swig_module, &swig_module, name)
 #define SWIG_MangledTypeQuery(name) SWIG_MangledTypeQueryModule(&swig_module, &swig_module, name)
 
@@ -3376,6 +3379,12 @@ namespace swig {
 #include <functional>
 #include <limits>
 #include <cmath>
+#include <condition_variable>
+#include <cstring>
+#include <deque>
+#include <memory>
+#include <mutex>
+#include <shared_mutex>
 #include <thread>
 #include <vector>
 #include <sentencepiece_processor.h>
@@ -3386,6 +3395,32 @@ PyObject* kUnicodeInput = reinterpret_cast<PyObject* >(0x1);
 PyObject* kByteInput = reinterpret_cast<PyObject* >(0x2);
 
 using BytesArray = std::vector<sentencepiece::util::bytes>;
+using ScoredIdsArray = std::vector<std::pair<std::vector<int>, float>>;
+using ScoredPiecesArray = std::vector<std::pair<std::vector<std::string>, float>>;
+
+// Batch of ids returned to Python as flat int32 ids and int64 offsets
+// (CSR layout) instead of a list of lists.
+struct RaggedIds {
+  std::vector<std::vector<int>> ids;
+};
+
+// Batch of ids returned to Python as a 2-D int32 array of
+// ids.size() x length, padded with pad_id, and its attention mask.
+struct PaddedIds {
+  std::vector<std::vector<int>> ids;
+  size_t length = 0;
+  int pad_id = 0;
+};
+
+// Normalized strings of a batch. When `with_offsets`, `offsets[i]` is the
+// alignment of `normalized[i]` to the i-th input, returned to Python either as
+// lists or, when `flat_offsets`, as flat int64 offsets and splits (CSR layout).
+struct NormalizedBatch {
+  std::vector<std::string> normalized;
+  std::vector<std::vector<size_t>> offsets;
+  bool with_offsets = false;
+  bool flat_offsets = false;
+};
 
 inline void ReleaseResultObject(PyObject *obj) {
   if (obj != nullptr && obj != kUnicodeInput && obj != kByteInput) {
@@ -3434,6 +3469,35 @@ PyObject* MakePyOutputBytes(const sentencepiece::util::bytes& output) {
   return PyBytes_FromStringAndSize(output.data(), output.size());
 }
 
+// Converts the nested results of the n-best and sampling batch requests.
+inline PyObject *MakePyObject(int value, PyObject *input_type) {
+  return PyInt_FromLong(static_cast<long>(value));
+}
+
+inline PyObject *MakePyObject(const std::string &value, PyObject *input_type) {
+  return MakePyOutputString(value, input_type);
+}
+
+template <typename T>
+PyObject *MakePyObject(const std::pair<T, float> &value, PyObject *input_type);
+
+template <typename T>
+PyObject *MakePyObject(const std::vector<T> &values, PyObject *input_type) {
+  PyObject *list = PyList_New(values.size());
+  for (size_t i = 0; i < values.size(); ++i) {
+    PyList_SET_ITEM(list, i, MakePyObject(values[i], input_type));
+  }
+  return list;
+}
+
+template <typename T>
+PyObject *MakePyObject(const std::pair<T, float> &value, PyObject *input_type) {
+  PyObject *tuple = PyTuple_New(2);
+  PyTuple_SET_ITEM(tuple, 0, MakePyObject(value.first, input_type));
+  PyTuple_SET_ITEM(tuple, 1, PyFloat_FromDouble(static_cast<double>(value.second)));
+  return tuple;
+}
+
 int ToSwigError(sentencepiece::util::StatusCode code) {
   switch (code) {
     case sentencepiece::util::StatusCode::kNotFound:
@@ -3448,6 +3512,110 @@ int ToSwigError(sentencepiece::util::StatusCode code) {
   return SWIG_RuntimeError;
 }
 
+// Releases the GIL while in scope. No Python object may be accessed, and
+// the inputs must be kept alive by the caller (see PyObjectRefs).
+class ScopedGILRelease {
+ public:
+  ScopedGILRelease() : state_(PyEval_SaveThread()) {}
+  ScopedGILRelease(const ScopedGILRelease &) = delete;
+  ScopedGILRelease &operator=(const ScopedGILRelease &) = delete;
+  ~ScopedGILRelease() { PyEval_RestoreThread(state_); }
+
+ private:
+  PyThreadState *state_ = nullptr;
+};
+
+// Owns references to Python objects until the wrapper returns. Input lists
+// are snapshotted into tuples, so that the string views taken from their
+// items stay valid even if another thread modifies the list while the GIL
+// is released.
+class PyObjectRefs {
+ public:
+  PyObjectRefs() = default;
+  PyObjectRefs(const PyObjectRefs &) = delete;
+  PyObjectRefs &operator=(const PyObjectRefs &) = delete;
+
+  ~PyObjectRefs() {
+    for (PyObject *obj : refs_) Py_DECREF(obj);
+  }
+
+  // Takes the ownership of a new reference `obj`.
+  PyObject *Add(PyObject *obj) {
+    if (obj != nullptr) refs_.push_back(obj);
+    return obj;
+  }
+
+ private:
+  std::vector<PyObject *> refs_;
+};
+
+// Owns a Py_buffer acquired from an object supporting the buffer protocol.
+class PyBufferHolder {
+ public:
+  PyBufferHolder() = default;
+  PyBufferHolder(const PyBufferHolder &) = delete;
+  PyBufferHolder &operator=(const PyBufferHolder &) = delete;
+
+  ~PyBufferHolder() {
+    if (view_.obj != nullptr) PyBuffer_Release(&view_);
+  }
+
+  bool Acquire(PyObject *obj, int flags) {
+    if (PyObject_GetBuffer(obj, &view_, flags) != 0) {
+      view_.obj = nullptr;
+      return false;
+    }
+    return true;
+  }
+
+  const Py_buffer &view() const { return view_; }
+
+ private:
+  Py_buffer view_ = {};
+};
+
+template <typename T>
+bool SplitByOffsets(const Py_buffer &data, const T *offsets, size_t size,
+                    std::vector<absl::string_view> *out) {
+  if (size == 0) {
+    PyErr_SetString(PyExc_ValueError, "offsets must not be empty");
+    return false;
+  }
+  const char *base = static_cast<const char *>(data.buf);
+  out->resize(size - 1);
+  for (size_t i = 0; i + 1 < size; ++i) {
+    const int64_t begin = static_cast<int64_t>(offsets[i]);
+    const int64_t end = static_cast<int64_t>(offsets[i + 1]);
+    if (begin < 0 || begin > end || end > static_cast<int64_t>(data.len)) {
+      PyErr_SetString(PyExc_ValueError, "offsets are out of range");
+      return false;
+    }
+    (*out)[i] = absl::string_view(base + begin, end - begin);
+  }
+  return true;
+}
+
+// Splits a contiguous UTF-8 buffer `data` into the strings delimited by
+// `offsets`, an int32 or int64 array of size n + 1 (Arrow string layout).
+// The returned string views point into `data`.
+bool SplitByOffsets(const Py_buffer &data, const Py_buffer &offsets,
+                    std::vector<absl::string_view> *out) {
+  const char *format = offsets.format == nullptr ? "B" : offsets.format;
+  if (*format == '@' || *format == '=') ++format;
+  const bool is_int = format[0] != '\0' && format[1] == '\0' &&
+                      std::strchr("iIlLqQ", format[0]) != nullptr;
+  if (!is_int || offsets.ndim > 1 ||
+      (offsets.itemsize != 4 && offsets.itemsize != 8)) {
+    PyErr_SetString(PyExc_TypeError, "offsets must be an int32 or int64 array");
+    return false;
+  }
+  const size_t size = offsets.len / offsets.itemsize;
+  if (offsets.itemsize == 4) {
+    return SplitByOffsets(data, static_cast<const int32_t *>(offsets.buf), size, out);
+  }
+  return SplitByOffsets(data, static_cast<const int64_t *>(offsets.buf), size, out);
+}
+
 class PySentenceIterator : public sentencepiece::SentenceIterator {
   public:
   PySentenceIterator(PyObject *iter) : iter_(iter) {
@@ -3549,6 +3717,44 @@ inline void RewriteIds(const sentencepiece::SentencePieceProcessor &sp,
   }
 }
 
+inline void RewriteIds(const sentencepiece::SentencePieceProcessor &sp,
+                       sentencepiece::ImmutableNBestSentencePieceText *proto,
+                       bool add_bos, bool add_eos, bool reverse, bool emit_unk_piece) {
+  if (add_bos || add_eos || reverse || emit_unk_piece) {
+    throw sentencepiece::util::Status(
+        sentencepiece::util::StatusCode::kUnimplemented,
+        "add_bos, add_eos, reverse, and emit_unk_piece is not supported in proto API");
+  }
+}
+
+template <typename T>
+inline void RewriteIds(const sentencepiece::SentencePieceProcessor &sp,
+                       std::vector<std::vector<T>> *nbests,
+                       bool add_bos, bool add_eos, bool reverse, bool emit_unk_piece) {
+  for (auto &nbest : *nbests) {
+    RewriteIds(sp, &nbest, add_bos, add_eos, reverse, emit_unk_piece);
+  }
+}
+
+template <typename T>
+inline void RewriteIds(const sentencepiece::SentencePieceProcessor &sp,
+                       std::vector<std::pair<std::vector<T>, float>> *samples,
+                       bool add_bos, bool add_eos, bool reverse, bool emit_unk_piece) {
+  for (auto &sample : *samples) {
+    RewriteIds(sp, &sample.first, add_bos, add_eos, reverse, emit_unk_piece);
+  }
+}
+
+// Throws if OutType does not support the options. Called before a batch is
+// handed to the worker threads, which must not throw.
+template <typename OutType>
+inline void CheckRewriteOptions(const sentencepiece::SentencePieceProcessor &sp,
+                                bool add_bos, bool add_eos, bool reverse,
+                                bool emit_unk_piece) {
+  OutType out;
+  RewriteIds(sp, &out, add_bos, add_eos, reverse, emit_unk_piece);
+}
+
 inline void CheckIds(const std::vector<int> &ids, int num_pieces) {
   for (int id : ids) {
     if (id < 0 || id >= num_pieces) {
@@ -3578,31 +3784,144 @@ inline void ConvertToUnicodeSpans(sentencepiece::ImmutableNBestSentencePieceText
   proto->ConvertToUnicodeSpans();
 }
 
-class ThreadPool {
+// Long-lived worker pool shared by all batch requests. Threads are created
+// once and reused across calls, instead of being spawned per request.
+class WorkerPool {
  public:
-  explicit ThreadPool(size_t request_size) :
-    request_size_(request_size) {}
+  static WorkerPool *GetInstance() {
+    std::lock_guard<std::mutex> lock(instance_mutex_);
+    if (instance_ == nullptr) instance_ = new WorkerPool;
+    return instance_;
+  }
 
-  virtual ~ThreadPool() {
-    for (auto &task : tasks_) {
-      task.join();
-    }
+  // Called in the child process after fork(). Worker threads do not survive
+  // fork() and the locks may have been held by them, so the old pool is
+  // leaked and a new one is created on the next request.
+  static void ResetAfterFork() {
+    new (&instance_mutex_) std::mutex;
+    instance_ = nullptr;
   }
 
-  void Schedule(std::function<void()> closure) {
-    static constexpr size_t kMinThreadSize = 2;
-    if (request_size_ < kMinThreadSize) {
-      closure();
-    } else {
-      tasks_.emplace_back(closure);
+  // Sets the number of worker threads. A negative size uses the number of
+  // hardware threads. Size 0 stops all workers; requests are then processed
+  // on the calling thread.
+  void Resize(int size) {
+    if (size < 0) size = std::thread::hardware_concurrency();
+    std::lock_guard<std::mutex> resize_lock(resize_mutex_);
+    StopWorkers();
+    std::lock_guard<std::mutex> lock(mutex_);
+    StartWorkers(size);
+  }
+
+  int size() const {
+    std::lock_guard<std::mutex> lock(mutex_);
+    return size_ < 0 ? std::thread::hardware_concurrency() : size_;
+  }
+
+  // Calls `func(i)` for i in [0, size) using at most `num_threads` threads,
+  // the calling thread included. Returns when all calls have finished.
+  void ParallelFor(size_t size, int num_threads,
+                   const std::function<void(size_t)> &func) {
+    if (num_threads <= 1 || size <= 1) {
+      for (size_t i = 0; i < size; ++i) func(i);
+      return;
+    }
+
+    auto task = std::make_shared<Task>(size, func);
+    {
+      std::lock_guard<std::mutex> lock(mutex_);
+      if (size_ < 0) StartWorkers(std::thread::hardware_concurrency());
+      const int num_helpers = std::min<int>(num_threads - 1, workers_.size());
+      for (int n = 0; n < num_helpers; ++n) queue_.push_back(task);
     }
+    cond_.notify_all();
+
+    task->Run();
+
+    // Helpers that pick up `task` after this point find no items left, so
+    // waiting for the completion of all items is sufficient.
+    std::unique_lock<std::mutex> lock(task->mutex);
+    task->done_cond.wait(lock, [&]() { return task->done == size; });
   }
 
  private:
-  size_t request_size_ = 0;
-  std::vector<std::thread> tasks_;
+  struct Task {
+    Task(size_t size, const std::function<void(size_t)> &func)
+        : size(size), func(func) {}
+
+    void Run() {
+      size_t i = 0;
+      size_t n = 0;
+      while ((i = std::atomic_fetch_add(&index, 1)) < size) {
+        func(i);
+        ++n;
+      }
+      if (n == 0) return;
+      std::lock_guard<std::mutex> lock(mutex);
+      done += n;
+      if (done == size) done_cond.notify_all();
+    }
+
+    const size_t size;
+    const std::function<void(size_t)> &func;
+    std::atomic<size_t> index = 0;
+    std::mutex mutex;
+    std::condition_variable done_cond;
+    size_t done = 0;
+  };
+
+  WorkerPool() = default;
+
+  // `mutex_` must be held.
+  void StartWorkers(int size) {
+    stop_ = false;
+    for (int n = 0; n < size; ++n) {
+      workers_.emplace_back([this]() { WorkerLoop(); });
+    }
+    size_ = size;
+  }
+
+  void StopWorkers() {
+    std::vector<std::thread> workers;
+    {
+      std::lock_guard<std::mutex> lock(mutex_);
+      stop_ = true;
+      size_ = 0;
+      workers.swap(workers_);
+    }
+    cond_.notify_all();
+    for (auto &worker : workers) worker.join();
+  }
+
+  void WorkerLoop() {
+    while (true) {
+      std::shared_ptr<Task> task;
+      {
+        std::unique_lock<std::mutex> lock(mutex_);
+        cond_.wait(lock, [this]() { return stop_ || !queue_.empty(); });
+        if (queue_.empty()) return;
+        task = std::move(queue_.front());
+        queue_.pop_front();
+      }
+      task->Run();
+    }
+  }
+
+  static WorkerPool *instance_;
+  static std::mutex instance_mutex_;
+
+  mutable std::mutex mutex_;
+  std::mutex resize_mutex_;
+  std::condition_variable cond_;
+  std::deque<std::shared_ptr<Task>> queue_;
+  std::vector<std::thread> workers_;
+  bool stop_ = false;
+  int size_ = -1;  // -1: not started yet.
 };
 
+WorkerPool *WorkerPool::instance_ = nullptr;
+std::mutex WorkerPool::instance_mutex_;
+
 template <typename T>
 inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
   if (*num_threads < 0) {
@@ -3613,73 +3932,134 @@ inline void InitNumThreads(const std::vector<T> &ins, int *num_threads) {
                                      static_cast<int>(ins.size()), 256}));
 }
 
+inline void ParallelFor(size_t size, int num_threads,
+                        const std::function<void(size_t)> &func) {
+  WorkerPool::GetInstance()->ParallelFor(size, num_threads, func);
+}
+
 #define DEFINE_ENCODE_BATCH_FUNC_IMPL(FuncName, InType, OutType)        \
+  CheckRewriteOptions<OutType>(*self, add_bos, add_eos, reverse,        \
+                               emit_unk_piece);                         \
+  std::vector<OutType> outs(ins.size());                                \
+  InitNumThreads(ins, &num_threads);                                    \
+  ParallelFor(outs.size(), num_threads, [&](size_t i) {                 \
+      auto out = enable_sampling ?                                      \
+                 self->Sample##FuncName(ins[i], nbest_size, alpha) :    \
+                 self->FuncName(ins[i]);                                \
+      RewriteIds(*self, &out, add_bos, add_eos, reverse,                \
+                 emit_unk_piece);                                       \
+      ConvertToUnicodeSpans(&out);                                      \
+      outs[i] = std::move(out);                                         \
+    });                                                                 \
+  return outs;
+
+// Same as DEFINE_ENCODE_BATCH_FUNC_IMPL for the n-best and sampling
+// requests, which return multiple results per input. The arguments after
+// the input are passed as `...`.
+#define DEFINE_NBEST_ENCODE_BATCH_FUNC_IMPL(FuncName, OutType, ...)     \
+  CheckRewriteOptions<OutType>(*self, add_bos, add_eos, reverse,        \
+                               emit_unk_piece);                         \
   std::vector<OutType> outs(ins.size());                                \
   InitNumThreads(ins, &num_threads);                                    \
-  {                                                                     \
-    ThreadPool pool(ins.size());                                        \
-    std::atomic<size_t> index = 0;                                      \
-    for (int n = 0;  n < num_threads; ++n) {                            \
-      pool.Schedule([&]() {                                             \
-          size_t i = 0;                                                 \
-          while ((i = std::atomic_fetch_add(&index, 1)) < outs.size()) { \
-            auto out = enable_sampling ?                                \
-                       self->Sample##FuncName(ins[i],                   \
-                                              nbest_size, alpha) :      \
-                       self->FuncName(ins[i]);                          \
-            RewriteIds(*self, &out, add_bos, add_eos, reverse,          \
-                       emit_unk_piece);                                 \
-            ConvertToUnicodeSpans(&out);                                \
-            outs[i] = std::move(out);                                   \
-          }                                                             \
-        });                                                             \
-    }                                                                   \
-  }                                                                     \
+  ParallelFor(outs.size(), num_threads, [&](size_t i) {                 \
+      auto out = self->FuncName(ins[i], __VA_ARGS__);                   \
+      RewriteIds(*self, &out, add_bos, add_eos, reverse,                \
+                 emit_unk_piece);                                       \
+      ConvertToUnicodeSpans(&out);                                      \
+      outs[i] = std::move(out);                                         \
+    });                                                                 \
   return outs;
 
 #define DEFINE_DECODE_BATCH_FUNC_IMPL(FuncName, InType, OutType)        \
   std::vector<OutType> outs(ins.size());                                \
   InitNumThreads(ins, &num_threads);                                    \
-  {                                                                     \
-    std::atomic<size_t> index = 0;                                      \
-    ThreadPool pool(ins.size());                                        \
-    for (int n = 0;  n < num_threads; ++n) {                            \
-      pool.Schedule([&]() {                                             \
-          size_t i = 0;                                                 \
-          while ((i = std::atomic_fetch_add(&index, 1)) < outs.size()) { \
-            auto out = self->FuncName(ins[i]);                          \
-            ConvertToUnicodeSpans(&out);                                \
-            outs[i] = std::move(out);                                   \
-          }                                                             \
-        });                                                             \
-    }                                                                   \
-  }                                                                     \
+  ParallelFor(outs.size(), num_threads, [&](size_t i) {                 \
+      auto out = self->FuncName(ins[i]);                                \
+      ConvertToUnicodeSpans(&out);                                      \
+      outs[i] = std::move(out);                                         \
+    });                                                                 \
+  return outs;
+
+// Encodes `ins` to ids in parallel. When `max_length` is positive, each
+// sequence is truncated to `max_length` ids. Truncation removes the tail of
+// the text, <s> and </s> are always kept.
+inline std::vector<std::vector<int>> EncodeAsIdsBatch(
+    const sentencepiece::SentencePieceProcessor &sp,
+    const std::vector<absl::string_view> &ins, int num_threads,
+    bool enable_sampling, int nbest_size, float alpha,
+    bool add_bos, bool add_eos, bool reverse, bool emit_unk_piece,
+    int max_length) {
+  std::vector<std::vector<int>> outs(ins.size());
+  const int num_specials = static_cast<int>(add_bos) + static_cast<int>(add_eos);
+  const size_t text_length = max_length > 0 ?
+                             std::max(0, max_length - num_specials) : 0;
+  InitNumThreads(ins, &num_threads);
+  ParallelFor(outs.size(), num_threads, [&](size_t i) {
+      auto &ids = outs[i];
+      ids = enable_sampling ?
+            sp.SampleEncodeAsIds(ins[i], nbest_size, alpha) :
+            sp.EncodeAsIds(ins[i]);
+      if (max_length > 0 && ids.size() > text_length) {
+        ids.resize(text_length);
+      }
+      RewriteIds(sp, &ids, add_bos, add_eos, reverse, emit_unk_piece);
+      if (max_length > 0 && ids.size() > static_cast<size_t>(max_length)) {
+        ids.resize(max_length);
+      }
+    });
   return outs;
+}
+
+// Normalizes `ins` in parallel with `normalizer`, either a
+// SentencePieceProcessor or a SentencePieceNormalizer. The offsets are
+// converted to Unicode character offsets if `unicode_input`.
+template <typename T>
+NormalizedBatch NormalizeBatch(const T &normalizer,
+                               const std::vector<absl::string_view> &ins,
+                               int num_threads, bool with_offsets,
+                               bool flat_offsets, bool unicode_input) {
+  NormalizedBatch batch;
+  batch.normalized.resize(ins.size());
+  if (with_offsets) batch.offsets.resize(ins.size());
+  batch.with_offsets = with_offsets;
+  batch.flat_offsets = flat_offsets;
+  InitNumThreads(ins, &num_threads);
+  std::vector<sentencepiece::util::Status> status(ins.size());
+  ParallelFor(ins.size(), num_threads, [&](size_t i) {
+      status[i] = with_offsets ?
+                  normalizer.Normalize(ins[i], &batch.normalized[i],
+                                       &batch.offsets[i]) :
+                  normalizer.Normalize(ins[i], &batch.normalized[i]);
+      if (with_offsets && unicode_input) {
+        sentencepiece::ConvertToUnicodeAlignment(ins[i], batch.normalized[i],
+                                                 &batch.offsets[i]);
+      }
+    });
+  for (const auto &s : status) {
+    if (!s.ok()) throw s;
+  }
+  return batch;
+}
 
 }  // namespace
 
 
-SWIGINTERNINLINE PyObject*
-  SWIG_From_unsigned_SS_int  (unsigned int value)
-{
-  return PyInt_FromSize_t((size_t) value);
+// Sets the number of threads in the worker pool shared by all batch requests.
+// A negative size uses the number of hardware threads (default).
+void SetWorkerPoolSize(int size) {
+  WorkerPool::GetInstance()->Resize(size);
 }
 
-SWIGINTERN sentencepiece::util::bytes const &sentencepiece_ImmutableSentencePieceText_ImmutableSentencePiece__surface_as_bytes(sentencepiece::ImmutableSentencePieceText_ImmutableSentencePiece const *self){
-    return self->surface();
-  }
-SWIGINTERN sentencepiece::util::bytes const &sentencepiece_ImmutableSentencePieceText_ImmutableSentencePiece__piece_as_bytes(sentencepiece::ImmutableSentencePieceText_ImmutableSentencePiece const *self){
-    return self->piece();
-  }
-
-  #define SWIG_From_long   PyInt_FromLong 
+int GetWorkerPoolSize() {
+  return WorkerPool::GetInstance()->size();
+}
 
+void _ShutdownWorkerPool() {
+  WorkerPool::GetInstance()->Resize(0);
+}
 
-SWIGINTERNINLINE PyObject* 
-SWIG_From_unsigned_SS_long  (unsigned long value)
-{
-  return (value > LONG_MAX) ?
-    PyLong_FromUnsignedLong(value) : PyInt_FromLong(static_cast< long >(value));
+void _ResetWorkerPoolAfterFork() {
+  WorkerPool::ResetAfterFork();
 }
 
 
@@ -3693,37 +4073,6 @@ SWIG_From_unsigned_SS_long  (unsigned long value)
 #endif
 
 
-#if defined(LLONG_MAX) && !defined(SWIG_LONG_LONG_AVAILABLE)
-#  define SWIG_LONG_LONG_AVAILABLE
-#endif
-
-
-#ifdef SWIG_LONG_LONG_AVAILABLE
-SWIGINTERNINLINE PyObject* 
-SWIG_From_unsigned_SS_long_SS_long  (unsigned long long value)
-{
-  return (value > LONG_MAX) ?
-    PyLong_FromUnsignedLongLong(value) : PyInt_FromLong(static_cast< long >(value));
-}
-#endif
-
-
-SWIGINTERNINLINE PyObject *
-SWIG_From_size_t  (size_t value)
-{    
-#ifdef SWIG_LONG_LONG_AVAILABLE
-  if (sizeof(size_t) <= sizeof(unsigned long)) {
-#endif
-    return SWIG_From_unsigned_SS_long  (static_cast< unsigned long >(value));
-#ifdef SWIG_LONG_LONG_AVAILABLE
-  } else {
-    /* assume sizeof(size_t) <= sizeof(unsigned long long) */
-    return SWIG_From_unsigned_SS_long_SS_long  (static_cast< unsigned long long >(value));
-  }
-#endif
-}
-
-
 SWIGINTERN int
 SWIG_AsVal_double (PyObject *obj, double *val)
 {
@@ -3872,6 +4221,68 @@ SWIG_AsVal_int (PyObject * obj, int *val)
 }
 
 
+SWIGINTERNINLINE PyObject*
+  SWIG_From_int  (int value)
+{
+  return PyInt_FromLong((long) value);
+}
+
+
+SWIGINTERNINLINE PyObject*
+  SWIG_From_unsigned_SS_int  (unsigned int value)
+{
+  return PyInt_FromSize_t((size_t) value);
+}
+
+SWIGINTERN sentencepiece::util::bytes const &sentencepiece_ImmutableSentencePieceText_ImmutableSentencePiece__surface_as_bytes(sentencepiece::ImmutableSentencePieceText_ImmutableSentencePiece const *self){
+    return self->surface();
+  }
+SWIGINTERN sentencepiece::util::bytes const &sentencepiece_ImmutableSentencePieceText_ImmutableSentencePiece__piece_as_bytes(sentencepiece::ImmutableSentencePieceText_ImmutableSentencePiece const *self){
+    return self->piece();
+  }
+
+  #define SWIG_From_long   PyInt_FromLong 
+
+
+SWIGINTERNINLINE PyObject* 
+SWIG_From_unsigned_SS_long  (unsigned long value)
+{
+  return (value > LONG_MAX) ?
+    PyLong_FromUnsignedLong(value) : PyInt_FromLong(static_cast< long >(value));
+}
+
+
+#if defined(LLONG_MAX) && !defined(SWIG_LONG_LONG_AVAILABLE)
+#  define SWIG_LONG_LONG_AVAILABLE
+#endif
+
+
+#ifdef SWIG_LONG_LONG_AVAILABLE
+SWIGINTERNINLINE PyObject* 
+SWIG_From_unsigned_SS_long_SS_long  (unsigned long long value)
+{
+  return (value > LONG_MAX) ?
+    PyLong_FromUnsignedLongLong(value) : PyInt_FromLong(static_cast< long >(value));
+}
+#endif
+
+
+SWIGINTERNINLINE PyObject *
+SWIG_From_size_t  (size_t value)
+{    
+#ifdef SWIG_LONG_LONG_AVAILABLE
+  if (sizeof(size_t) <= sizeof(unsigned long)) {
+#endif
+    return SWIG_From_unsigned_SS_long  (static_cast< unsigned long >(value));
+#ifdef SWIG_LONG_LONG_AVAILABLE
+  } else {
+    /* assume sizeof(size_t) <= sizeof(unsigned long long) */
+    return SWIG_From_unsigned_SS_long_SS_long  (static_cast< unsigned long long >(value));
+  }
+#endif
+}
+
+
   #define SWIG_From_double   PyFloat_FromDouble 
 
 
@@ -4042,13 +4453,6 @@ SWIG_AsVal_float (PyObject * obj, float *val)
 }
 
 
-SWIGINTERNINLINE PyObject*
-  SWIG_From_int  (int value)
-{
-  return PyInt_FromLong((long) value);
-}
-
-
 SWIGINTERNINLINE PyObject*
   SWIG_From_bool  (bool value)
 {
@@ -4119,6 +4523,25 @@ SWIGINTERN std::vector< sentencepiece::ImmutableSentencePieceText > sentencepiec
                                   absl::string_view,
                                   sentencepiece::ImmutableSentencePieceText);
   }
+SWIGINTERN RaggedIds sentencepiece_SentencePieceProcessor__EncodeAsIdsBatchAsBuffer(sentencepiece::SentencePieceProcessor const *self,std::vector< absl::string_view > const &ins,int num_threads,bool enable_sampling,int nbest_size,float alpha,bool add_bos,bool add_eos,bool reverse,bool emit_unk_piece,int max_length){
+    RaggedIds result;
+    result.ids = EncodeAsIdsBatch(*self, ins, num_threads, enable_sampling,
+                                  nbest_size, alpha, add_bos, add_eos, reverse,
+                                  emit_unk_piece, max_length);
+    return result;
+  }
+SWIGINTERN PaddedIds sentencepiece_SentencePieceProcessor__EncodeAsIdsBatchAsPadded(sentencepiece::SentencePieceProcessor const *self,std::vector< absl::string_view > const &ins,int num_threads,bool enable_sampling,int nbest_size,float alpha,bool add_bos,bool add_eos,bool reverse,bool emit_unk_piece,int max_length,int pad_length){
+    PaddedIds result;
+    result.ids = EncodeAsIdsBatch(*self, ins, num_threads, enable_sampling,
+                                  nbest_size, alpha, add_bos, add_eos, reverse,
+                                  emit_unk_piece, max_length);
+    result.length = pad_length > 0 ? pad_length : 0;
+    for (const auto &ids : result.ids) {
+      result.length = std::max(result.length, ids.size());
+    }
+    result.pad_id = std::max(0, self->pad_id());
+    return result;
+  }
 SWIGINTERN std::string sentencepiece_SentencePieceProcessor__DecodeIds(sentencepiece::SentencePieceProcessor const *self,std::vector< int > const &ids){
     CheckIds(ids, self->GetPieceSize());
     return self->DecodeIds(ids);
@@ -4130,24 +4553,157 @@ SWIGINTERN sentencepiece::util::bytes sentencepiece_SentencePieceProcessor__Deco
 SWIGINTERN std::string sentencepiece_SentencePieceProcessor__DecodePieces(sentencepiece::SentencePieceProcessor const *self,std::vector< absl::string_view > const &pieces){
     return self->DecodePieces(pieces);
   }
-SWIGINTERN sentencepiece::util::bytes sentencepiece_SentencePieceProcessor__DecodeIdsAsSerializedProto(sentencepiece::SentencePieceProcessor const *self,std::vector< int > const &ids){
-    CheckIds(ids, self->GetPieceSize());
-    return self->DecodeIdsAsSerializedProto(ids);
-  }
-SWIGINTERN sentencepiece::util::bytes sentencepiece_SentencePieceProcessor__DecodePiecesAsSerializedProto(sentencepiece::SentencePieceProcessor const *self,std::vector< absl::string_view > const &pieces){
-    CheckIds(pieces, self->GetPieceSize());
-    return self->DecodePiecesAsSerializedProto(pieces);
-  }
-SWIGINTERN sentencepiece::ImmutableSentencePieceText sentencepiece_SentencePieceProcessor__DecodeIdsAsImmutableProto(sentencepiece::SentencePieceProcessor const *self,std::vector< int > const &ids){
-    CheckIds(ids, self->GetPieceSize());
-    auto proto = self->DecodeIdsAsImmutableProto(ids);
-    proto.ConvertToUnicodeSpans();
-    return proto;
+SWIGINTERN sentencepiece::DecodeStream *sentencepiece_SentencePieceProcessor__NewDecodeStream(sentencepiece::SentencePieceProcessor const *self){
+    return new sentencepiece::DecodeStream(*self);
   }
-SWIGINTERN sentencepiece::ImmutableSentencePieceText sentencepiece_SentencePieceProcessor__DecodePiecesAsImmutableProto(sentencepiece::SentencePieceProcessor const *self,std::vector< absl::string_view > const &pieces){
-    CheckIds(pieces, self->GetPieceSize());
-    auto proto= self->DecodePiecesAsImmutableProto(pieces);
-    proto.ConvertToUnicodeSpans();
+
+SWIGINTERN int
+SWIG_AsVal_unsigned_SS_long (PyObject *obj, unsigned long *val) 
+{
+#if PY_VERSION_HEX < 0x03000000
+  if (PyInt_Check(obj)) {
+    long v = PyInt_AsLong(obj);
+    if (v >= 0) {
+      if (val) *val = v;
+      return SWIG_OK;
+    } else {
+      return SWIG_OverflowError;
+    }
+  } else
+#endif
+  if (PyLong_Check(obj)) {
+    unsigned long v = PyLong_AsUnsignedLong(obj);
+    if (!PyErr_Occurred()) {
+      if (val) *val = v;
+      return SWIG_OK;
+    } else {
+      PyErr_Clear();
+      return SWIG_OverflowError;
+    }
+  }
+#ifdef SWIG_PYTHON_CAST_MODE
+  {
+    int dispatch = 0;
+    unsigned long v = PyLong_AsUnsignedLong(obj);
+    if (!PyErr_Occurred()) {
+      if (val) *val = v;
+      return SWIG_AddCast(SWIG_OK);
+    } else {
+      PyErr_Clear();
+    }
+    if (!dispatch) {
+      double d;
+      int res = SWIG_AddCast(SWIG_AsVal_double (obj,&d));
+      // Largest double not larger than ULONG_MAX (not portably calculated easily)
+      // Note that double(ULONG_MAX) is stored in a double rounded up by one (for 64-bit unsigned long)
+      // 0xfffffffffffff800ULL == (uint64_t)std::nextafter(double(__uint128_t(ULONG_MAX)+1), double(0))
+      const double ulong_max = sizeof(unsigned long) == 8 ? 0xfffffffffffff800ULL : ULONG_MAX;
+      if (SWIG_IsOK(res) && SWIG_CanCastAsInteger(&d, 0, ulong_max)) {
+	if (val) *val = (unsigned long)(d);
+	return res;
+      }
+    }
+  }
+#endif
+  return SWIG_TypeError;
+}
+
+
+#ifdef SWIG_LONG_LONG_AVAILABLE
+SWIGINTERN int
+SWIG_AsVal_unsigned_SS_long_SS_long (PyObject *obj, unsigned long long *val)
+{
+  int res = SWIG_TypeError;
+  if (PyLong_Check(obj)) {
+    unsigned long long v = PyLong_AsUnsignedLongLong(obj);
+    if (!PyErr_Occurred()) {
+      if (val) *val = v;
+      return SWIG_OK;
+    } else {
+      PyErr_Clear();
+      res = SWIG_OverflowError;
+    }
+  } else {
+    unsigned long v;
+    res = SWIG_AsVal_unsigned_SS_long (obj,&v);
+    if (SWIG_IsOK(res)) {
+      if (val) *val = v;
+      return res;
+    }
+  }
+#ifdef SWIG_PYTHON_CAST_MODE
+  {
+    const double mant_max = 1LL << DBL_MANT_DIG;
+    double d;
+    res = SWIG_AsVal_double (obj,&d);
+    if (SWIG_IsOK(res) && !SWIG_CanCastAsInteger(&d, 0, mant_max))
+      return SWIG_OverflowError;
+    if (SWIG_IsOK(res) && SWIG_CanCastAsInteger(&d, 0, mant_max)) {
+      if (val) *val = (unsigned long long)(d);
+      return SWIG_AddCast(res);
+    }
+    res = SWIG_TypeError;
+  }
+#endif
+  return res;
+}
+#endif
+
+
+SWIGINTERNINLINE int
+SWIG_AsVal_size_t (PyObject * obj, size_t *val)
+{
+  int res = SWIG_TypeError;
+#ifdef SWIG_LONG_LONG_AVAILABLE
+  if (sizeof(size_t) <= sizeof(unsigned long)) {
+#endif
+    unsigned long v;
+    res = SWIG_AsVal_unsigned_SS_long (obj, val ? &v : 0);
+    if (SWIG_IsOK(res) && val) *val = static_cast< size_t >(v);
+#ifdef SWIG_LONG_LONG_AVAILABLE
+  } else if (sizeof(size_t) <= sizeof(unsigned long long)) {
+    unsigned long long v;
+    res = SWIG_AsVal_unsigned_SS_long_SS_long (obj, val ? &v : 0);
+    if (SWIG_IsOK(res) && val) *val = static_cast< size_t >(v);
+  }
+#endif
+  return res;
+}
+
+SWIGINTERN sentencepiece::util::Status sentencepiece_SentencePieceProcessor__SetParallelEncode(sentencepiece::SentencePieceProcessor *self,int num_threads,size_t chunk_size){
+    if (num_threads < 0) num_threads = std::thread::hardware_concurrency();
+    if (num_threads <= 1 || chunk_size == 0) {
+      return self->SetParallelEncode(nullptr, 0);
+    }
+    return self->SetParallelEncode(
+        [num_threads](size_t size, const std::function<void(size_t)> &func) {
+          ParallelFor(size, num_threads, func);
+        },
+        chunk_size);
+  }
+SWIGINTERN std::vector< int > sentencepiece_SentencePieceProcessor__EncodeAppended(sentencepiece::SentencePieceProcessor const *self,absl::string_view text,sentencepiece::IncrementalEncodeState *state){
+    const auto _status = self->EncodeAppended(text, state);
+    if (!_status.ok()) throw _status;
+    return state->ids();
+  }
+SWIGINTERN sentencepiece::util::bytes sentencepiece_SentencePieceProcessor__DecodeIdsAsSerializedProto(sentencepiece::SentencePieceProcessor const *self,std::vector< int > const &ids){
+    CheckIds(ids, self->GetPieceSize());
+    return self->DecodeIdsAsSerializedProto(ids);
+  }
+SWIGINTERN sentencepiece::util::bytes sentencepiece_SentencePieceProcessor__DecodePiecesAsSerializedProto(sentencepiece::SentencePieceProcessor const *self,std::vector< absl::string_view > const &pieces){
+    CheckIds(pieces, self->GetPieceSize());
+    return self->DecodePiecesAsSerializedProto(pieces);
+  }
+SWIGINTERN sentencepiece::ImmutableSentencePieceText sentencepiece_SentencePieceProcessor__DecodeIdsAsImmutableProto(sentencepiece::SentencePieceProcessor const *self,std::vector< int > const &ids){
+    CheckIds(ids, self->GetPieceSize());
+    auto proto = self->DecodeIdsAsImmutableProto(ids);
+    proto.ConvertToUnicodeSpans();
+    return proto;
+  }
+SWIGINTERN sentencepiece::ImmutableSentencePieceText sentencepiece_SentencePieceProcessor__DecodePiecesAsImmutableProto(sentencepiece::SentencePieceProcessor const *self,std::vector< absl::string_view > const &pieces){
+    CheckIds(pieces, self->GetPieceSize());
+    auto proto= self->DecodePiecesAsImmutableProto(pieces);
+    proto.ConvertToUnicodeSpans();
     return proto;
   }
 SWIGINTERN std::vector< std::string > sentencepiece_SentencePieceProcessor__DecodeIdsBatch(sentencepiece::SentencePieceProcessor const *self,std::vector< std::vector< int > > const &ins,int num_threads){
@@ -4235,6 +4791,47 @@ SWIGINTERN sentencepiece::ImmutableNBestSentencePieceText sentencepiece_Sentence
     proto.ConvertToUnicodeSpans();
     return proto;
   }
+SWIGINTERN std::vector< std::vector< std::vector< int > > > sentencepiece_SentencePieceProcessor__NBestEncodeAsIdsBatch(sentencepiece::SentencePieceProcessor const *self,std::vector< absl::string_view > const &ins,int num_threads,int nbest_size,bool add_bos,bool add_eos,bool reverse,bool emit_unk_piece){
+    DEFINE_NBEST_ENCODE_BATCH_FUNC_IMPL(NBestEncodeAsIds,
+                                        std::vector<std::vector<int>>,
+                                        nbest_size);
+  }
+SWIGINTERN std::vector< std::vector< std::vector< std::string > > > sentencepiece_SentencePieceProcessor__NBestEncodeAsPiecesBatch(sentencepiece::SentencePieceProcessor const *self,std::vector< absl::string_view > const &ins,int num_threads,int nbest_size,bool add_bos,bool add_eos,bool reverse,bool emit_unk_piece){
+    DEFINE_NBEST_ENCODE_BATCH_FUNC_IMPL(NBestEncodeAsPieces,
+                                        std::vector<std::vector<std::string>>,
+                                        nbest_size);
+  }
+SWIGINTERN BytesArray sentencepiece_SentencePieceProcessor__NBestEncodeAsSerializedProtoBatch(sentencepiece::SentencePieceProcessor const *self,std::vector< absl::string_view > const &ins,int num_threads,int nbest_size,bool add_bos,bool add_eos,bool reverse,bool emit_unk_piece){
+    DEFINE_NBEST_ENCODE_BATCH_FUNC_IMPL(NBestEncodeAsSerializedProto,
+                                        sentencepiece::util::bytes,
+                                        nbest_size);
+  }
+SWIGINTERN std::vector< sentencepiece::ImmutableNBestSentencePieceText > sentencepiece_SentencePieceProcessor__NBestEncodeAsImmutableProtoBatch(sentencepiece::SentencePieceProcessor const *self,std::vector< absl::string_view > const &ins,int num_threads,int nbest_size,bool add_bos,bool add_eos,bool reverse,bool emit_unk_piece){
+    DEFINE_NBEST_ENCODE_BATCH_FUNC_IMPL(
+        NBestEncodeAsImmutableProto,
+        sentencepiece::ImmutableNBestSentencePieceText, nbest_size);
+  }
+SWIGINTERN std::vector< std::vector< std::pair< std::vector< int >,float > > > sentencepiece_SentencePieceProcessor__SampleEncodeAndScoreAsIdsBatch(sentencepiece::SentencePieceProcessor const *self,std::vector< absl::string_view > const &ins,int num_threads,int num_samples,float alpha,bool wor,bool include_best,bool add_bos,bool add_eos,bool reverse,bool emit_unk_piece){
+    DEFINE_NBEST_ENCODE_BATCH_FUNC_IMPL(
+        SampleEncodeAndScoreAsIds, ScoredIdsArray,
+        num_samples, alpha, wor, include_best);
+  }
+SWIGINTERN std::vector< std::vector< std::pair< std::vector< std::string >,float > > > sentencepiece_SentencePieceProcessor__SampleEncodeAndScoreAsPiecesBatch(sentencepiece::SentencePieceProcessor const *self,std::vector< absl::string_view > const &ins,int num_threads,int num_samples,float alpha,bool wor,bool include_best,bool add_bos,bool add_eos,bool reverse,bool emit_unk_piece){
+    DEFINE_NBEST_ENCODE_BATCH_FUNC_IMPL(
+        SampleEncodeAndScoreAsPieces, ScoredPiecesArray,
+        num_samples, alpha, wor, include_best);
+  }
+SWIGINTERN BytesArray sentencepiece_SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProtoBatch(sentencepiece::SentencePieceProcessor const *self,std::vector< absl::string_view > const &ins,int num_threads,int num_samples,float alpha,bool wor,bool include_best,bool add_bos,bool add_eos,bool reverse,bool emit_unk_piece){
+    DEFINE_NBEST_ENCODE_BATCH_FUNC_IMPL(
+        SampleEncodeAndScoreAsSerializedProto, sentencepiece::util::bytes,
+        num_samples, alpha, wor, include_best);
+  }
+SWIGINTERN std::vector< sentencepiece::ImmutableNBestSentencePieceText > sentencepiece_SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProtoBatch(sentencepiece::SentencePieceProcessor const *self,std::vector< absl::string_view > const &ins,int num_threads,int num_samples,float alpha,bool wor,bool include_best,bool add_bos,bool add_eos,bool reverse,bool emit_unk_piece){
+    DEFINE_NBEST_ENCODE_BATCH_FUNC_IMPL(
+        SampleEncodeAndScoreAsImmutableProto,
+        sentencepiece::ImmutableNBestSentencePieceText,
+        num_samples, alpha, wor, include_best);
+  }
 SWIGINTERN std::string sentencepiece_SentencePieceProcessor__Normalize(sentencepiece::SentencePieceProcessor *self,absl::string_view text){
     return self->Normalize(text);
   }
@@ -4243,24 +4840,19 @@ SWIGINTERN std::pair< std::string,std::vector< size_t > > sentencepiece_Sentence
     self->Normalize(text, &result.first, &result.second).IgnoreError();
     return result;
   }
+SWIGINTERN NormalizedBatch sentencepiece_SentencePieceProcessor__NormalizeBatch(sentencepiece::SentencePieceProcessor const *self,std::vector< absl::string_view > const &ins,int num_threads,bool with_offsets,bool flat_offsets,bool unicode_input){
+    return NormalizeBatch(*self, ins, num_threads, with_offsets, flat_offsets,
+                          unicode_input);
+  }
 SWIGINTERN float sentencepiece_SentencePieceProcessor__CalculateEntropy(sentencepiece::SentencePieceProcessor *self,absl::string_view text,float alpha){
     return self->CalculateEntropy(text, alpha);
   }
 SWIGINTERN std::vector< float > sentencepiece_SentencePieceProcessor__CalculateEntropyBatch(sentencepiece::SentencePieceProcessor *self,std::vector< absl::string_view > const &ins,float alpha,int num_threads){
     std::vector<float> outs(ins.size());
     InitNumThreads(ins, &num_threads);
-    {
-      ThreadPool pool(ins.size());
-      std::atomic<size_t> index = 0;
-      for (int n = 0;  n < num_threads; ++n) {
-        pool.Schedule([&]() {
-           size_t i = 0;
-           while ((i = std::atomic_fetch_add(&index, 1)) < outs.size()) {
-             outs[i] = self->CalculateEntropy(ins[i], alpha);
-           }
-         });
-      }
-    }
+    ParallelFor(outs.size(), num_threads, [&](size_t i) {
+        outs[i] = self->CalculateEntropy(ins[i], alpha);
+      });
     return outs;
   }
 SWIGINTERN sentencepiece::util::Status sentencepiece_SentencePieceProcessor__OverrideNormalizerSpec(sentencepiece::SentencePieceProcessor *self,std::unordered_map< std::string,std::string > const &args){
@@ -4273,58 +4865,21 @@ SWIGINTERN sentencepiece::util::Status sentencepiece_SentencePieceProcessor__Ove
     }
     return status;
   }
-
-SWIGINTERN int
-SWIG_AsVal_unsigned_SS_long (PyObject *obj, unsigned long *val) 
-{
-#if PY_VERSION_HEX < 0x03000000
-  if (PyInt_Check(obj)) {
-    long v = PyInt_AsLong(obj);
-    if (v >= 0) {
-      if (val) *val = v;
-      return SWIG_OK;
-    } else {
-      return SWIG_OverflowError;
-    }
-  } else
-#endif
-  if (PyLong_Check(obj)) {
-    unsigned long v = PyLong_AsUnsignedLong(obj);
-    if (!PyErr_Occurred()) {
-      if (val) *val = v;
-      return SWIG_OK;
-    } else {
-      PyErr_Clear();
-      return SWIG_OverflowError;
-    }
+SWIGINTERN std::string sentencepiece_DecodeStream__Put(sentencepiece::DecodeStream *self,std::vector< int > const &ids){
+    std::string text;
+    const auto _status = self->Put(ids, &text);
+    if (!_status.ok()) throw _status;
+    return text;
   }
-#ifdef SWIG_PYTHON_CAST_MODE
-  {
-    int dispatch = 0;
-    unsigned long v = PyLong_AsUnsignedLong(obj);
-    if (!PyErr_Occurred()) {
-      if (val) *val = v;
-      return SWIG_AddCast(SWIG_OK);
-    } else {
-      PyErr_Clear();
-    }
-    if (!dispatch) {
-      double d;
-      int res = SWIG_AddCast(SWIG_AsVal_double (obj,&d));
-      // Largest double not larger than ULONG_MAX (not portably calculated easily)
-      // Note that double(ULONG_MAX) is stored in a double rounded up by one (for 64-bit unsigned long)
-      // 0xfffffffffffff800ULL == (uint64_t)std::nextafter(double(__uint128_t(ULONG_MAX)+1), double(0))
-      const double ulong_max = sizeof(unsigned long) == 8 ? 0xfffffffffffff800ULL : ULONG_MAX;
-      if (SWIG_IsOK(res) && SWIG_CanCastAsInteger(&d, 0, ulong_max)) {
-	if (val) *val = (unsigned long)(d);
-	return res;
-      }
-    }
+SWIGINTERN std::string sentencepiece_DecodeStream__Finish(sentencepiece::DecodeStream *self){
+    std::string text;
+    const auto _status = self->Finish(&text);
+    if (!_status.ok()) throw _status;
+    return text;
+  }
+SWIGINTERN std::vector< int > sentencepiece_IncrementalEncodeState__ids(sentencepiece::IncrementalEncodeState const *self){
+    return self->ids();
   }
-#endif
-  return SWIG_TypeError;
-}
-
 
 SWIGINTERN int
 SWIG_AsVal_unsigned_SS_int (PyObject * obj, unsigned int *val)
@@ -4383,6 +4938,10 @@ SWIGINTERN std::pair< std::string,std::vector< size_t > > sentencepiece_Sentence
     if (!_status.ok()) throw _status;
     return result;
   }
+SWIGINTERN NormalizedBatch sentencepiece_SentencePieceNormalizer__NormalizeBatch(sentencepiece::SentencePieceNormalizer const *self,std::vector< absl::string_view > const &ins,int num_threads,bool with_offsets,bool flat_offsets,bool unicode_input){
+    return NormalizeBatch(*self, ins, num_threads, with_offsets, flat_offsets,
+                          unicode_input);
+  }
 SWIGINTERN void sentencepiece_SentencePieceNormalizer__SetProtoField(sentencepiece::SentencePieceNormalizer *self,absl::string_view name,bool value){
     sentencepiece::SentencePieceTrainer::SetProtoField(
         name,
@@ -4392,6 +4951,69 @@ SWIGINTERN void sentencepiece_SentencePieceNormalizer__SetProtoField(sentencepie
 #ifdef __cplusplus
 extern "C" {
 #endif
+SWIGINTERN PyObject *_wrap_SetWorkerPoolSize(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  int arg1 ;
+  int val1 ;
+  int ecode1 = 0 ;
+  PyObject *swig_obj[1] ;
+  
+  (void)self;
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  ecode1 = SWIG_AsVal_int(swig_obj[0], &val1);
+  if (!SWIG_IsOK(ecode1)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode1), "in method '" "SetWorkerPoolSize" "', argument " "1"" of type '" "int""'");
+  } 
+  arg1 = static_cast< int >(val1);
+  SetWorkerPoolSize(arg1);
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_GetWorkerPoolSize(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  int result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "GetWorkerPoolSize", 0, 0, 0)) SWIG_fail;
+  result = (int)GetWorkerPoolSize();
+  resultobj = SWIG_From_int(static_cast< int >(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap__ShutdownWorkerPool(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "_ShutdownWorkerPool", 0, 0, 0)) SWIG_fail;
+  _ShutdownWorkerPool();
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap__ResetWorkerPoolAfterFork(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "_ResetWorkerPoolAfterFork", 0, 0, 0)) SWIG_fail;
+  _ResetWorkerPoolAfterFork();
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
 SWIGINTERN PyObject *_wrap_new_ImmutableSentencePieceText_ImmutableSentencePiece(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   sentencepiece::ImmutableSentencePieceText_ImmutableSentencePiece *result = 0 ;
@@ -5209,6 +5831,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor_LoadFromSerializedProto(PyObje
   }
   {
     try {
+      std::unique_lock<std::shared_mutex> lock(*arg1->mutex(), std::defer_lock);
+      {
+        ScopedGILRelease release_gil;
+        lock.lock();
+      }
       result = (arg1)->LoadFromSerializedProto(SWIG_STD_MOVE(arg2));
       ReleaseResultObject(resultobj);
     }
@@ -5255,6 +5882,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor_SetEncodeExtraOptions(PyObject
   }
   {
     try {
+      std::unique_lock<std::shared_mutex> lock(*arg1->mutex(), std::defer_lock);
+      {
+        ScopedGILRelease release_gil;
+        lock.lock();
+      }
       result = (arg1)->SetEncodeExtraOptions(SWIG_STD_MOVE(arg2));
       ReleaseResultObject(resultobj);
     }
@@ -5301,6 +5933,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor_SetDecodeExtraOptions(PyObject
   }
   {
     try {
+      std::unique_lock<std::shared_mutex> lock(*arg1->mutex(), std::defer_lock);
+      {
+        ScopedGILRelease release_gil;
+        lock.lock();
+      }
       result = (arg1)->SetDecodeExtraOptions(SWIG_STD_MOVE(arg2));
       ReleaseResultObject(resultobj);
     }
@@ -5326,6 +5963,9 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor_SetVocabulary(PyObject *self,
   std::vector< absl::string_view > *arg2 = 0 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
   PyObject *swig_obj[2] ;
   sentencepiece::util::Status result;
   
@@ -5339,10 +5979,12 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor_SetVocabulary(PyObject *self,
   {
     std::vector<absl::string_view> *out = nullptr;
     if (PyList_Check(swig_obj[1])) {
-      const size_t size = PyList_Size(swig_obj[1]);
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
       out = new std::vector<absl::string_view>(size);
       for (size_t i = 0; i < size; ++i) {
-        const PyInputString ustring(PyList_GetItem(swig_obj[1], i));
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
         if (ustring.IsAvalable()) {
           (*out)[i] = ustring.str();
         } else {
@@ -5351,6 +5993,18 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor_SetVocabulary(PyObject *self,
         }
         resultobj = ustring.input_type();
       }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
     } else {
       PyErr_SetString(PyExc_TypeError, "not a list");
       SWIG_fail;
@@ -5359,6 +6013,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor_SetVocabulary(PyObject *self,
   }
   {
     try {
+      std::unique_lock<std::shared_mutex> lock(*arg1->mutex(), std::defer_lock);
+      {
+        ScopedGILRelease release_gil;
+        lock.lock();
+      }
       result = (arg1)->SetVocabulary((std::vector< absl::string_view > const &)*arg2);
       ReleaseResultObject(resultobj);
     }
@@ -5402,6 +6061,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor_ResetVocabulary(PyObject *self
   arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
   {
     try {
+      std::unique_lock<std::shared_mutex> lock(*arg1->mutex(), std::defer_lock);
+      {
+        ScopedGILRelease release_gil;
+        lock.lock();
+      }
       result = (arg1)->ResetVocabulary();
       ReleaseResultObject(resultobj);
     }
@@ -5456,6 +6120,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor_LoadVocabulary(PyObject *self,
   arg3 = static_cast< int >(val3);
   {
     try {
+      std::unique_lock<std::shared_mutex> lock(*arg1->mutex(), std::defer_lock);
+      {
+        ScopedGILRelease release_gil;
+        lock.lock();
+      }
       result = (arg1)->LoadVocabulary(SWIG_STD_MOVE(arg2),arg3);
       ReleaseResultObject(resultobj);
     }
@@ -5475,34 +6144,291 @@ fail:
 }
 
 
-SWIGINTERN PyObject *_wrap_SentencePieceProcessor_CalculateEntropy__SWIG_0(PyObject *self, Py_ssize_t nobjs, PyObject **swig_obj) {
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor_SetEncodeCacheCapacity(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
-  absl::string_view arg2 ;
-  float arg3 ;
-  float *arg4 = (float *) 0 ;
+  int arg2 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  float val3 ;
-  int ecode3 = 0 ;
-  void *argp4 = 0 ;
-  int res4 = 0 ;
+  int val2 ;
+  int ecode2 = 0 ;
+  PyObject *swig_obj[2] ;
   sentencepiece::util::Status result;
   
   (void)self;
-  if ((nobjs < 4) || (nobjs > 4)) SWIG_fail;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor_SetEncodeCacheCapacity", 2, 2, swig_obj)) SWIG_fail;
   res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
   if (!SWIG_IsOK(res1)) {
-    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor_CalculateEntropy" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor_SetEncodeCacheCapacity" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor *""'"); 
   }
   arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  ecode2 = SWIG_AsVal_int(swig_obj[1], &val2);
+  if (!SWIG_IsOK(ecode2)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "SentencePieceProcessor_SetEncodeCacheCapacity" "', argument " "2"" of type '" "int""'");
+  } 
+  arg2 = static_cast< int >(val2);
   {
-    const PyInputString ustring(swig_obj[1]);
-    if (!ustring.IsAvalable()) {
-      PyErr_SetString(PyExc_TypeError, "not a string");
-      SWIG_fail;
-    }
-    resultobj = ustring.input_type();
+    try {
+      std::unique_lock<std::shared_mutex> lock(*arg1->mutex(), std::defer_lock);
+      {
+        ScopedGILRelease release_gil;
+        lock.lock();
+      }
+      result = (arg1)->SetEncodeCacheCapacity(arg2);
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    if (!(&result)->ok()) {
+      SWIG_exception(ToSwigError((&result)->code()), (&result)->ToString().c_str());
+    }
+    resultobj = SWIG_From_bool((&result)->ok());
+  }
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor_GetEncodeCacheCapacity(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  int result;
+  
+  (void)self;
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor_GetEncodeCacheCapacity" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    try {
+      result = (int)((sentencepiece::SentencePieceProcessor const *)arg1)->GetEncodeCacheCapacity();
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  resultobj = SWIG_From_int(static_cast< int >(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor_GetEncodeCacheHits(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  size_t result;
+  
+  (void)self;
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor_GetEncodeCacheHits" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    try {
+      result = ((sentencepiece::SentencePieceProcessor const *)arg1)->GetEncodeCacheHits();
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  resultobj = SWIG_From_size_t(static_cast< size_t >(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor_GetEncodeCacheMisses(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  size_t result;
+  
+  (void)self;
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor_GetEncodeCacheMisses" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    try {
+      result = ((sentencepiece::SentencePieceProcessor const *)arg1)->GetEncodeCacheMisses();
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  resultobj = SWIG_From_size_t(static_cast< size_t >(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor_ClearEncodeCache(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  
+  (void)self;
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor_ClearEncodeCache" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    try {
+      (arg1)->ClearEncodeCache();
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor_SetWordCacheCapacity(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  int arg2 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  int val2 ;
+  int ecode2 = 0 ;
+  PyObject *swig_obj[2] ;
+  sentencepiece::util::Status result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor_SetWordCacheCapacity", 2, 2, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor_SetWordCacheCapacity" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  ecode2 = SWIG_AsVal_int(swig_obj[1], &val2);
+  if (!SWIG_IsOK(ecode2)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "SentencePieceProcessor_SetWordCacheCapacity" "', argument " "2"" of type '" "int""'");
+  } 
+  arg2 = static_cast< int >(val2);
+  {
+    try {
+      std::unique_lock<std::shared_mutex> lock(*arg1->mutex(), std::defer_lock);
+      {
+        ScopedGILRelease release_gil;
+        lock.lock();
+      }
+      result = (arg1)->SetWordCacheCapacity(arg2);
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    if (!(&result)->ok()) {
+      SWIG_exception(ToSwigError((&result)->code()), (&result)->ToString().c_str());
+    }
+    resultobj = SWIG_From_bool((&result)->ok());
+  }
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor_GetWordCacheCapacity(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  int result;
+  
+  (void)self;
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor_GetWordCacheCapacity" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    try {
+      result = (int)((sentencepiece::SentencePieceProcessor const *)arg1)->GetWordCacheCapacity();
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  resultobj = SWIG_From_int(static_cast< int >(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor_CalculateEntropy__SWIG_0(PyObject *self, Py_ssize_t nobjs, PyObject **swig_obj) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  absl::string_view arg2 ;
+  float arg3 ;
+  float *arg4 = (float *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  float val3 ;
+  int ecode3 = 0 ;
+  void *argp4 = 0 ;
+  int res4 = 0 ;
+  sentencepiece::util::Status result;
+  
+  (void)self;
+  if ((nobjs < 4) || (nobjs > 4)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor_CalculateEntropy" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    const PyInputString ustring(swig_obj[1]);
+    if (!ustring.IsAvalable()) {
+      PyErr_SetString(PyExc_TypeError, "not a string");
+      SWIG_fail;
+    }
+    resultobj = ustring.input_type();
     arg2 = ustring.str();
   }
   ecode3 = SWIG_AsVal_float(swig_obj[2], &val3);
@@ -6117,34 +7043,25 @@ fail:
 }
 
 
-SWIGINTERN PyObject *_wrap_SentencePieceProcessor_LoadFromFile(PyObject *self, PyObject *args) {
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor_serialized_precompiled_model(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
-  absl::string_view arg2 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  PyObject *swig_obj[2] ;
-  sentencepiece::util::Status result;
+  PyObject *swig_obj[1] ;
+  sentencepiece::util::bytes result;
   
   (void)self;
-  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor_LoadFromFile", 2, 2, swig_obj)) SWIG_fail;
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
   res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
   if (!SWIG_IsOK(res1)) {
-    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor_LoadFromFile" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor *""'"); 
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor_serialized_precompiled_model" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
   }
   arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
-  {
-    const PyInputString ustring(swig_obj[1]);
-    if (!ustring.IsAvalable()) {
-      PyErr_SetString(PyExc_TypeError, "not a string");
-      SWIG_fail;
-    }
-    resultobj = ustring.input_type();
-    arg2 = ustring.str();
-  }
   {
     try {
-      result = sentencepiece_SentencePieceProcessor_LoadFromFile(arg1,SWIG_STD_MOVE(arg2));
+      result = ((sentencepiece::SentencePieceProcessor const *)arg1)->serialized_precompiled_model();
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -6152,10 +7069,104 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor_LoadFromFile(PyObject *self, P
     }
   }
   {
-    if (!(&result)->ok()) {
-      SWIG_exception(ToSwigError((&result)->code()), (&result)->ToString().c_str());
-    }
-    resultobj = SWIG_From_bool((&result)->ok());
+    resultobj = MakePyOutputBytes(result);
+  }
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor_SavePrecompiled(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  absl::string_view arg2 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[2] ;
+  sentencepiece::util::Status result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor_SavePrecompiled", 2, 2, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor_SavePrecompiled" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    const PyInputString ustring(swig_obj[1]);
+    if (!ustring.IsAvalable()) {
+      PyErr_SetString(PyExc_TypeError, "not a string");
+      SWIG_fail;
+    }
+    resultobj = ustring.input_type();
+    arg2 = ustring.str();
+  }
+  {
+    try {
+      result = ((sentencepiece::SentencePieceProcessor const *)arg1)->SavePrecompiled(SWIG_STD_MOVE(arg2));
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    if (!(&result)->ok()) {
+      SWIG_exception(ToSwigError((&result)->code()), (&result)->ToString().c_str());
+    }
+    resultobj = SWIG_From_bool((&result)->ok());
+  }
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor_LoadFromFile(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  absl::string_view arg2 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[2] ;
+  sentencepiece::util::Status result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor_LoadFromFile", 2, 2, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor_LoadFromFile" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    const PyInputString ustring(swig_obj[1]);
+    if (!ustring.IsAvalable()) {
+      PyErr_SetString(PyExc_TypeError, "not a string");
+      SWIG_fail;
+    }
+    resultobj = ustring.input_type();
+    arg2 = ustring.str();
+  }
+  {
+    try {
+      std::unique_lock<std::shared_mutex> lock(*arg1->mutex(), std::defer_lock);
+      {
+        ScopedGILRelease release_gil;
+        lock.lock();
+      }
+      result = sentencepiece_SentencePieceProcessor_LoadFromFile(arg1,SWIG_STD_MOVE(arg2));
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    if (!(&result)->ok()) {
+      SWIG_exception(ToSwigError((&result)->code()), (&result)->ToString().c_str());
+    }
+    resultobj = SWIG_From_bool((&result)->ok());
   }
   return resultobj;
 fail:
@@ -6246,7 +7257,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsIds(PyObject *self, P
   arg9 = static_cast< bool >(val9);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__EncodeAsIds((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7,arg8,arg9);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__EncodeAsIds((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7,arg8,arg9);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -6348,7 +7363,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsPieces(PyObject *self
   arg9 = static_cast< bool >(val9);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__EncodeAsPieces((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7,arg8,arg9);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__EncodeAsPieces((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7,arg8,arg9);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -6451,7 +7470,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsSerializedProto(PyObj
   arg9 = static_cast< bool >(val9);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__EncodeAsSerializedProto((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7,arg8,arg9);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__EncodeAsSerializedProto((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7,arg8,arg9);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -6550,7 +7573,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsImmutableProto(PyObje
   arg9 = static_cast< bool >(val9);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__EncodeAsImmutableProto((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7,arg8,arg9);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__EncodeAsImmutableProto((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7,arg8,arg9);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -6578,6 +7605,9 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsIdsBatch(PyObject *se
   bool arg10 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
   int val3 ;
   int ecode3 = 0 ;
   bool val4 ;
@@ -6607,10 +7637,12 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsIdsBatch(PyObject *se
   {
     std::vector<absl::string_view> *out = nullptr;
     if (PyList_Check(swig_obj[1])) {
-      const size_t size = PyList_Size(swig_obj[1]);
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
       out = new std::vector<absl::string_view>(size);
       for (size_t i = 0; i < size; ++i) {
-        const PyInputString ustring(PyList_GetItem(swig_obj[1], i));
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
         if (ustring.IsAvalable()) {
           (*out)[i] = ustring.str();
         } else {
@@ -6619,6 +7651,18 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsIdsBatch(PyObject *se
         }
         resultobj = ustring.input_type();
       }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
     } else {
       PyErr_SetString(PyExc_TypeError, "not a list");
       SWIG_fail;
@@ -6667,7 +7711,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsIdsBatch(PyObject *se
   arg10 = static_cast< bool >(val10);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__EncodeAsIdsBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__EncodeAsIdsBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -6710,6 +7758,9 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsPiecesBatch(PyObject
   bool arg10 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
   int val3 ;
   int ecode3 = 0 ;
   bool val4 ;
@@ -6739,10 +7790,12 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsPiecesBatch(PyObject
   {
     std::vector<absl::string_view> *out = nullptr;
     if (PyList_Check(swig_obj[1])) {
-      const size_t size = PyList_Size(swig_obj[1]);
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
       out = new std::vector<absl::string_view>(size);
       for (size_t i = 0; i < size; ++i) {
-        const PyInputString ustring(PyList_GetItem(swig_obj[1], i));
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
         if (ustring.IsAvalable()) {
           (*out)[i] = ustring.str();
         } else {
@@ -6751,6 +7804,18 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsPiecesBatch(PyObject
         }
         resultobj = ustring.input_type();
       }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
     } else {
       PyErr_SetString(PyExc_TypeError, "not a list");
       SWIG_fail;
@@ -6799,7 +7864,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsPiecesBatch(PyObject
   arg10 = static_cast< bool >(val10);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__EncodeAsPiecesBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__EncodeAsPiecesBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -6843,6 +7912,9 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsSerializedProtoBatch(
   bool arg10 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
   int val3 ;
   int ecode3 = 0 ;
   bool val4 ;
@@ -6872,10 +7944,12 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsSerializedProtoBatch(
   {
     std::vector<absl::string_view> *out = nullptr;
     if (PyList_Check(swig_obj[1])) {
-      const size_t size = PyList_Size(swig_obj[1]);
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
       out = new std::vector<absl::string_view>(size);
       for (size_t i = 0; i < size; ++i) {
-        const PyInputString ustring(PyList_GetItem(swig_obj[1], i));
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
         if (ustring.IsAvalable()) {
           (*out)[i] = ustring.str();
         } else {
@@ -6884,6 +7958,18 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsSerializedProtoBatch(
         }
         resultobj = ustring.input_type();
       }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
     } else {
       PyErr_SetString(PyExc_TypeError, "not a list");
       SWIG_fail;
@@ -6932,7 +8018,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsSerializedProtoBatch(
   arg10 = static_cast< bool >(val10);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__EncodeAsSerializedProtoBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__EncodeAsSerializedProtoBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -6971,6 +8061,9 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsImmutableProtoBatch(P
   bool arg10 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
   int val3 ;
   int ecode3 = 0 ;
   bool val4 ;
@@ -7000,10 +8093,12 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsImmutableProtoBatch(P
   {
     std::vector<absl::string_view> *out = nullptr;
     if (PyList_Check(swig_obj[1])) {
-      const size_t size = PyList_Size(swig_obj[1]);
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
       out = new std::vector<absl::string_view>(size);
       for (size_t i = 0; i < size; ++i) {
-        const PyInputString ustring(PyList_GetItem(swig_obj[1], i));
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
         if (ustring.IsAvalable()) {
           (*out)[i] = ustring.str();
         } else {
@@ -7012,6 +8107,18 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsImmutableProtoBatch(P
         }
         resultobj = ustring.input_type();
       }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
     } else {
       PyErr_SetString(PyExc_TypeError, "not a list");
       SWIG_fail;
@@ -7060,7 +8167,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsImmutableProtoBatch(P
   arg10 = static_cast< bool >(val10);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__EncodeAsImmutableProtoBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__EncodeAsImmutableProtoBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -7086,45 +8197,139 @@ fail:
 }
 
 
-SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodeIds(PyObject *self, PyObject *args) {
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsIdsBatchAsBuffer(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
-  std::vector< int > *arg2 = 0 ;
+  std::vector< absl::string_view > *arg2 = 0 ;
+  int arg3 ;
+  bool arg4 ;
+  int arg5 ;
+  float arg6 ;
+  bool arg7 ;
+  bool arg8 ;
+  bool arg9 ;
+  bool arg10 ;
+  int arg11 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  PyObject *swig_obj[2] ;
-  std::string result;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
+  int val3 ;
+  int ecode3 = 0 ;
+  bool val4 ;
+  int ecode4 = 0 ;
+  int val5 ;
+  int ecode5 = 0 ;
+  float val6 ;
+  int ecode6 = 0 ;
+  bool val7 ;
+  int ecode7 = 0 ;
+  bool val8 ;
+  int ecode8 = 0 ;
+  bool val9 ;
+  int ecode9 = 0 ;
+  bool val10 ;
+  int ecode10 = 0 ;
+  int val11 ;
+  int ecode11 = 0 ;
+  PyObject *swig_obj[11] ;
+  RaggedIds result;
   
   (void)self;
-  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__DecodeIds", 2, 2, swig_obj)) SWIG_fail;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__EncodeAsIdsBatchAsBuffer", 11, 11, swig_obj)) SWIG_fail;
   res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
   if (!SWIG_IsOK(res1)) {
-    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__DecodeIds" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsBuffer" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
   }
   arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
   {
-    std::vector<int> *out = nullptr;
+    std::vector<absl::string_view> *out = nullptr;
     if (PyList_Check(swig_obj[1])) {
-      const size_t size = PyList_Size(swig_obj[1]);
-      out = new std::vector<int>(size);
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
+      out = new std::vector<absl::string_view>(size);
       for (size_t i = 0; i < size; ++i) {
-        PyObject *o = PyList_GetItem(swig_obj[1], i);
-        if (PyInt_Check(o)) {
-          (*out)[i] = static_cast<int>(PyInt_AsLong(o));
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
+        if (ustring.IsAvalable()) {
+          (*out)[i] = ustring.str();
         } else {
-          PyErr_SetString(PyExc_TypeError,"list must contain integers");
+          PyErr_SetString(PyExc_TypeError, "list must contain strings");
           SWIG_fail;
         }
+        resultobj = ustring.input_type();
       }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
     } else {
-      PyErr_SetString(PyExc_TypeError,"not a list");
+      PyErr_SetString(PyExc_TypeError, "not a list");
       SWIG_fail;
     }
     arg2 = out;
   }
+  ecode3 = SWIG_AsVal_int(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsBuffer" "', argument " "3"" of type '" "int""'");
+  } 
+  arg3 = static_cast< int >(val3);
+  ecode4 = SWIG_AsVal_bool(swig_obj[3], &val4);
+  if (!SWIG_IsOK(ecode4)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode4), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsBuffer" "', argument " "4"" of type '" "bool""'");
+  } 
+  arg4 = static_cast< bool >(val4);
+  ecode5 = SWIG_AsVal_int(swig_obj[4], &val5);
+  if (!SWIG_IsOK(ecode5)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode5), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsBuffer" "', argument " "5"" of type '" "int""'");
+  } 
+  arg5 = static_cast< int >(val5);
+  ecode6 = SWIG_AsVal_float(swig_obj[5], &val6);
+  if (!SWIG_IsOK(ecode6)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode6), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsBuffer" "', argument " "6"" of type '" "float""'");
+  } 
+  arg6 = static_cast< float >(val6);
+  ecode7 = SWIG_AsVal_bool(swig_obj[6], &val7);
+  if (!SWIG_IsOK(ecode7)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode7), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsBuffer" "', argument " "7"" of type '" "bool""'");
+  } 
+  arg7 = static_cast< bool >(val7);
+  ecode8 = SWIG_AsVal_bool(swig_obj[7], &val8);
+  if (!SWIG_IsOK(ecode8)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode8), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsBuffer" "', argument " "8"" of type '" "bool""'");
+  } 
+  arg8 = static_cast< bool >(val8);
+  ecode9 = SWIG_AsVal_bool(swig_obj[8], &val9);
+  if (!SWIG_IsOK(ecode9)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode9), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsBuffer" "', argument " "9"" of type '" "bool""'");
+  } 
+  arg9 = static_cast< bool >(val9);
+  ecode10 = SWIG_AsVal_bool(swig_obj[9], &val10);
+  if (!SWIG_IsOK(ecode10)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode10), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsBuffer" "', argument " "10"" of type '" "bool""'");
+  } 
+  arg10 = static_cast< bool >(val10);
+  ecode11 = SWIG_AsVal_int(swig_obj[10], &val11);
+  if (!SWIG_IsOK(ecode11)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode11), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsBuffer" "', argument " "11"" of type '" "int""'");
+  } 
+  arg11 = static_cast< int >(val11);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__DecodeIds((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< int > const &)*arg2);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__EncodeAsIdsBatchAsBuffer((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10,arg11);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -7132,8 +8337,28 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodeIds(PyObject *self, PyO
     }
   }
   {
-    PyObject *input_type = resultobj;
-    resultobj = MakePyOutputString(result, input_type);
+    size_t total = 0;
+    for (const auto &ids : (&result)->ids) total += ids.size();
+    PyObject *ids_obj = PyByteArray_FromStringAndSize(nullptr, total * sizeof(int32_t));
+    PyObject *offsets_obj = PyByteArray_FromStringAndSize(
+      nullptr, ((&result)->ids.size() + 1) * sizeof(int64_t));
+    if (ids_obj == nullptr || offsets_obj == nullptr) {
+      Py_XDECREF(ids_obj);
+      Py_XDECREF(offsets_obj);
+      SWIG_fail;
+    }
+    int32_t *ids_data = reinterpret_cast<int32_t *>(PyByteArray_AS_STRING(ids_obj));
+    int64_t *offsets_data = reinterpret_cast<int64_t *>(PyByteArray_AS_STRING(offsets_obj));
+    int64_t offset = 0;
+    offsets_data[0] = 0;
+    for (size_t i = 0; i < (&result)->ids.size(); ++i) {
+      std::copy((&result)->ids[i].begin(), (&result)->ids[i].end(), ids_data + offset);
+      offset += (&result)->ids[i].size();
+      offsets_data[i + 1] = offset;
+    }
+    resultobj = PyTuple_Pack(2, ids_obj, offsets_obj);
+    Py_DECREF(ids_obj);
+    Py_DECREF(offsets_obj);
   }
   {
     delete arg2;
@@ -7147,106 +8372,233 @@ fail:
 }
 
 
-SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodeIdsAsBytes(PyObject *self, PyObject *args) {
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAsIdsBatchAsPadded(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
-  std::vector< int > *arg2 = 0 ;
+  std::vector< absl::string_view > *arg2 = 0 ;
+  int arg3 ;
+  bool arg4 ;
+  int arg5 ;
+  float arg6 ;
+  bool arg7 ;
+  bool arg8 ;
+  bool arg9 ;
+  bool arg10 ;
+  int arg11 ;
+  int arg12 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  PyObject *swig_obj[2] ;
-  sentencepiece::util::bytes result;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
+  int val3 ;
+  int ecode3 = 0 ;
+  bool val4 ;
+  int ecode4 = 0 ;
+  int val5 ;
+  int ecode5 = 0 ;
+  float val6 ;
+  int ecode6 = 0 ;
+  bool val7 ;
+  int ecode7 = 0 ;
+  bool val8 ;
+  int ecode8 = 0 ;
+  bool val9 ;
+  int ecode9 = 0 ;
+  bool val10 ;
+  int ecode10 = 0 ;
+  int val11 ;
+  int ecode11 = 0 ;
+  int val12 ;
+  int ecode12 = 0 ;
+  PyObject *swig_obj[12] ;
+  PaddedIds result;
   
   (void)self;
-  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__DecodeIdsAsBytes", 2, 2, swig_obj)) SWIG_fail;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__EncodeAsIdsBatchAsPadded", 12, 12, swig_obj)) SWIG_fail;
   res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
   if (!SWIG_IsOK(res1)) {
-    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__DecodeIdsAsBytes" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsPadded" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
   }
   arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
   {
-    std::vector<int> *out = nullptr;
+    std::vector<absl::string_view> *out = nullptr;
     if (PyList_Check(swig_obj[1])) {
-      const size_t size = PyList_Size(swig_obj[1]);
-      out = new std::vector<int>(size);
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
+      out = new std::vector<absl::string_view>(size);
       for (size_t i = 0; i < size; ++i) {
-        PyObject *o = PyList_GetItem(swig_obj[1], i);
-        if (PyInt_Check(o)) {
-          (*out)[i] = static_cast<int>(PyInt_AsLong(o));
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
+        if (ustring.IsAvalable()) {
+          (*out)[i] = ustring.str();
         } else {
-          PyErr_SetString(PyExc_TypeError,"list must contain integers");
+          PyErr_SetString(PyExc_TypeError, "list must contain strings");
           SWIG_fail;
         }
+        resultobj = ustring.input_type();
       }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
     } else {
-      PyErr_SetString(PyExc_TypeError,"not a list");
+      PyErr_SetString(PyExc_TypeError, "not a list");
       SWIG_fail;
     }
     arg2 = out;
   }
-  {
-    try {
-      result = sentencepiece_SentencePieceProcessor__DecodeIdsAsBytes((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< int > const &)*arg2);
-      ReleaseResultObject(resultobj);
-    }
-    catch (const sentencepiece::util::Status &status) {
-      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
-    }
-  }
-  {
-    resultobj = MakePyOutputBytes(result);
-  }
-  {
-    delete arg2;
-  }
-  return resultobj;
-fail:
-  {
+  ecode3 = SWIG_AsVal_int(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsPadded" "', argument " "3"" of type '" "int""'");
+  } 
+  arg3 = static_cast< int >(val3);
+  ecode4 = SWIG_AsVal_bool(swig_obj[3], &val4);
+  if (!SWIG_IsOK(ecode4)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode4), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsPadded" "', argument " "4"" of type '" "bool""'");
+  } 
+  arg4 = static_cast< bool >(val4);
+  ecode5 = SWIG_AsVal_int(swig_obj[4], &val5);
+  if (!SWIG_IsOK(ecode5)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode5), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsPadded" "', argument " "5"" of type '" "int""'");
+  } 
+  arg5 = static_cast< int >(val5);
+  ecode6 = SWIG_AsVal_float(swig_obj[5], &val6);
+  if (!SWIG_IsOK(ecode6)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode6), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsPadded" "', argument " "6"" of type '" "float""'");
+  } 
+  arg6 = static_cast< float >(val6);
+  ecode7 = SWIG_AsVal_bool(swig_obj[6], &val7);
+  if (!SWIG_IsOK(ecode7)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode7), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsPadded" "', argument " "7"" of type '" "bool""'");
+  } 
+  arg7 = static_cast< bool >(val7);
+  ecode8 = SWIG_AsVal_bool(swig_obj[7], &val8);
+  if (!SWIG_IsOK(ecode8)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode8), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsPadded" "', argument " "8"" of type '" "bool""'");
+  } 
+  arg8 = static_cast< bool >(val8);
+  ecode9 = SWIG_AsVal_bool(swig_obj[8], &val9);
+  if (!SWIG_IsOK(ecode9)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode9), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsPadded" "', argument " "9"" of type '" "bool""'");
+  } 
+  arg9 = static_cast< bool >(val9);
+  ecode10 = SWIG_AsVal_bool(swig_obj[9], &val10);
+  if (!SWIG_IsOK(ecode10)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode10), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsPadded" "', argument " "10"" of type '" "bool""'");
+  } 
+  arg10 = static_cast< bool >(val10);
+  ecode11 = SWIG_AsVal_int(swig_obj[10], &val11);
+  if (!SWIG_IsOK(ecode11)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode11), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsPadded" "', argument " "11"" of type '" "int""'");
+  } 
+  arg11 = static_cast< int >(val11);
+  ecode12 = SWIG_AsVal_int(swig_obj[11], &val12);
+  if (!SWIG_IsOK(ecode12)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode12), "in method '" "SentencePieceProcessor__EncodeAsIdsBatchAsPadded" "', argument " "12"" of type '" "int""'");
+  } 
+  arg12 = static_cast< int >(val12);
+  {
+    try {
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__EncodeAsIdsBatchAsPadded((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10,arg11,arg12);
+      }
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    const size_t size = (&result)->ids.size() * (&result)->length;
+    PyObject *ids_obj = PyByteArray_FromStringAndSize(nullptr, size * sizeof(int32_t));
+    PyObject *mask_obj = PyByteArray_FromStringAndSize(nullptr, size * sizeof(int32_t));
+    if (ids_obj == nullptr || mask_obj == nullptr) {
+      Py_XDECREF(ids_obj);
+      Py_XDECREF(mask_obj);
+      SWIG_fail;
+    }
+    int32_t *ids_data = reinterpret_cast<int32_t *>(PyByteArray_AS_STRING(ids_obj));
+    int32_t *mask_data = reinterpret_cast<int32_t *>(PyByteArray_AS_STRING(mask_obj));
+    for (const auto &ids : (&result)->ids) {
+      std::copy(ids.begin(), ids.end(), ids_data);
+      std::fill(ids_data + ids.size(), ids_data + (&result)->length, (&result)->pad_id);
+      std::fill(mask_data, mask_data + ids.size(), 1);
+      std::fill(mask_data + ids.size(), mask_data + (&result)->length, 0);
+      ids_data += (&result)->length;
+      mask_data += (&result)->length;
+    }
+    PyObject *length_obj = PyInt_FromLong(static_cast<long>((&result)->length));
+    resultobj = PyTuple_Pack(3, ids_obj, mask_obj, length_obj);
+    Py_DECREF(ids_obj);
+    Py_DECREF(mask_obj);
+    Py_DECREF(length_obj);
+  }
+  {
+    delete arg2;
+  }
+  return resultobj;
+fail:
+  {
     delete arg2;
   }
   return NULL;
 }
 
 
-SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePieces(PyObject *self, PyObject *args) {
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodeIds(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
-  std::vector< absl::string_view > *arg2 = 0 ;
+  std::vector< int > *arg2 = 0 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
   PyObject *swig_obj[2] ;
   std::string result;
   
   (void)self;
-  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__DecodePieces", 2, 2, swig_obj)) SWIG_fail;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__DecodeIds", 2, 2, swig_obj)) SWIG_fail;
   res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
   if (!SWIG_IsOK(res1)) {
-    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__DecodePieces" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__DecodeIds" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
   }
   arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
   {
-    std::vector<absl::string_view> *out = nullptr;
+    std::vector<int> *out = nullptr;
     if (PyList_Check(swig_obj[1])) {
       const size_t size = PyList_Size(swig_obj[1]);
-      out = new std::vector<absl::string_view>(size);
+      out = new std::vector<int>(size);
       for (size_t i = 0; i < size; ++i) {
-        const PyInputString ustring(PyList_GetItem(swig_obj[1], i));
-        if (ustring.IsAvalable()) {
-          (*out)[i] = ustring.str();
+        PyObject *o = PyList_GetItem(swig_obj[1], i);
+        if (PyInt_Check(o)) {
+          (*out)[i] = static_cast<int>(PyInt_AsLong(o));
         } else {
-          PyErr_SetString(PyExc_TypeError, "list must contain strings");
+          PyErr_SetString(PyExc_TypeError,"list must contain integers");
           SWIG_fail;
         }
-        resultobj = ustring.input_type();
       }
     } else {
-      PyErr_SetString(PyExc_TypeError, "not a list");
+      PyErr_SetString(PyExc_TypeError,"not a list");
       SWIG_fail;
     }
     arg2 = out;
   }
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__DecodePieces((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__DecodeIds((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< int > const &)*arg2);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -7269,7 +8621,7 @@ fail:
 }
 
 
-SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodeIdsAsSerializedProto(PyObject *self, PyObject *args) {
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodeIdsAsBytes(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
   std::vector< int > *arg2 = 0 ;
@@ -7279,10 +8631,10 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodeIdsAsSerializedProto(Py
   sentencepiece::util::bytes result;
   
   (void)self;
-  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__DecodeIdsAsSerializedProto", 2, 2, swig_obj)) SWIG_fail;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__DecodeIdsAsBytes", 2, 2, swig_obj)) SWIG_fail;
   res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
   if (!SWIG_IsOK(res1)) {
-    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__DecodeIdsAsSerializedProto" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__DecodeIdsAsBytes" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
   }
   arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
   {
@@ -7307,7 +8659,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodeIdsAsSerializedProto(Py
   }
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__DecodeIdsAsSerializedProto((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< int > const &)*arg2);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__DecodeIdsAsBytes((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< int > const &)*arg2);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -7329,29 +8685,34 @@ fail:
 }
 
 
-SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePiecesAsSerializedProto(PyObject *self, PyObject *args) {
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePieces(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
   std::vector< absl::string_view > *arg2 = 0 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
   PyObject *swig_obj[2] ;
-  sentencepiece::util::bytes result;
+  std::string result;
   
   (void)self;
-  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__DecodePiecesAsSerializedProto", 2, 2, swig_obj)) SWIG_fail;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__DecodePieces", 2, 2, swig_obj)) SWIG_fail;
   res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
   if (!SWIG_IsOK(res1)) {
-    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__DecodePiecesAsSerializedProto" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__DecodePieces" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
   }
   arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
   {
     std::vector<absl::string_view> *out = nullptr;
     if (PyList_Check(swig_obj[1])) {
-      const size_t size = PyList_Size(swig_obj[1]);
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
       out = new std::vector<absl::string_view>(size);
       for (size_t i = 0; i < size; ++i) {
-        const PyInputString ustring(PyList_GetItem(swig_obj[1], i));
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
         if (ustring.IsAvalable()) {
           (*out)[i] = ustring.str();
         } else {
@@ -7360,6 +8721,18 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePiecesAsSerializedProto
         }
         resultobj = ustring.input_type();
       }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
     } else {
       PyErr_SetString(PyExc_TypeError, "not a list");
       SWIG_fail;
@@ -7368,7 +8741,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePiecesAsSerializedProto
   }
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__DecodePiecesAsSerializedProto((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__DecodePieces((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -7376,7 +8753,8 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePiecesAsSerializedProto
     }
   }
   {
-    resultobj = MakePyOutputBytes(result);
+    PyObject *input_type = resultobj;
+    resultobj = MakePyOutputString(result, input_type);
   }
   {
     delete arg2;
@@ -7390,20 +8768,163 @@ fail:
 }
 
 
-SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodeIdsAsImmutableProto(PyObject *self, PyObject *args) {
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__NewDecodeStream(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  sentencepiece::DecodeStream *result = 0 ;
+  
+  (void)self;
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__NewDecodeStream" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    try {
+      result = (sentencepiece::DecodeStream *)sentencepiece_SentencePieceProcessor__NewDecodeStream((sentencepiece::SentencePieceProcessor const *)arg1);
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  resultobj = SWIG_NewPointerObj(SWIG_as_voidptr(result), SWIGTYPE_p_sentencepiece__DecodeStream, SWIG_POINTER_OWN |  0 );
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__SetParallelEncode(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  int arg2 ;
+  size_t arg3 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  int val2 ;
+  int ecode2 = 0 ;
+  size_t val3 ;
+  int ecode3 = 0 ;
+  PyObject *swig_obj[3] ;
+  sentencepiece::util::Status result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__SetParallelEncode", 3, 3, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__SetParallelEncode" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  ecode2 = SWIG_AsVal_int(swig_obj[1], &val2);
+  if (!SWIG_IsOK(ecode2)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "SentencePieceProcessor__SetParallelEncode" "', argument " "2"" of type '" "int""'");
+  } 
+  arg2 = static_cast< int >(val2);
+  ecode3 = SWIG_AsVal_size_t(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "SentencePieceProcessor__SetParallelEncode" "', argument " "3"" of type '" "size_t""'");
+  } 
+  arg3 = static_cast< size_t >(val3);
+  {
+    try {
+      std::unique_lock<std::shared_mutex> lock(*arg1->mutex(), std::defer_lock);
+      {
+        ScopedGILRelease release_gil;
+        lock.lock();
+      }
+      result = sentencepiece_SentencePieceProcessor__SetParallelEncode(arg1,arg2,SWIG_STD_MOVE(arg3));
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    if (!(&result)->ok()) {
+      SWIG_exception(ToSwigError((&result)->code()), (&result)->ToString().c_str());
+    }
+    resultobj = SWIG_From_bool((&result)->ok());
+  }
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__EncodeAppended(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  absl::string_view arg2 ;
+  sentencepiece::IncrementalEncodeState *arg3 = (sentencepiece::IncrementalEncodeState *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  void *argp3 = 0 ;
+  int res3 = 0 ;
+  PyObject *swig_obj[3] ;
+  std::vector< int > result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__EncodeAppended", 3, 3, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__EncodeAppended" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    const PyInputString ustring(swig_obj[1]);
+    if (!ustring.IsAvalable()) {
+      PyErr_SetString(PyExc_TypeError, "not a string");
+      SWIG_fail;
+    }
+    resultobj = ustring.input_type();
+    arg2 = ustring.str();
+  }
+  res3 = SWIG_ConvertPtr(swig_obj[2], &argp3,SWIGTYPE_p_sentencepiece__IncrementalEncodeState, 0 |  0 );
+  if (!SWIG_IsOK(res3)) {
+    SWIG_exception_fail(SWIG_ArgError(res3), "in method '" "SentencePieceProcessor__EncodeAppended" "', argument " "3"" of type '" "sentencepiece::IncrementalEncodeState *""'"); 
+  }
+  arg3 = reinterpret_cast< sentencepiece::IncrementalEncodeState * >(argp3);
+  {
+    try {
+      result = sentencepiece_SentencePieceProcessor__EncodeAppended((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3);
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    resultobj = PyList_New((&result)->size());
+    for (size_t i = 0; i < (&result)->size(); ++i) {
+      PyList_SET_ITEM(resultobj, i, PyInt_FromLong(static_cast<long>(result[i])));
+    }
+  }
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodeIdsAsSerializedProto(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
   std::vector< int > *arg2 = 0 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
   PyObject *swig_obj[2] ;
-  sentencepiece::ImmutableSentencePieceText result;
+  sentencepiece::util::bytes result;
   
   (void)self;
-  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__DecodeIdsAsImmutableProto", 2, 2, swig_obj)) SWIG_fail;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__DecodeIdsAsSerializedProto", 2, 2, swig_obj)) SWIG_fail;
   res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
   if (!SWIG_IsOK(res1)) {
-    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__DecodeIdsAsImmutableProto" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__DecodeIdsAsSerializedProto" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
   }
   arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
   {
@@ -7428,14 +8949,20 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodeIdsAsImmutableProto(PyO
   }
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__DecodeIdsAsImmutableProto((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< int > const &)*arg2);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__DecodeIdsAsSerializedProto((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< int > const &)*arg2);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
       SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
     }
   }
-  resultobj = SWIG_NewPointerObj((new sentencepiece::ImmutableSentencePieceText(result)), SWIGTYPE_p_sentencepiece__ImmutableSentencePieceText, SWIG_POINTER_OWN |  0 );
+  {
+    resultobj = MakePyOutputBytes(result);
+  }
   {
     delete arg2;
   }
@@ -7448,29 +8975,34 @@ fail:
 }
 
 
-SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePiecesAsImmutableProto(PyObject *self, PyObject *args) {
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePiecesAsSerializedProto(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
   std::vector< absl::string_view > *arg2 = 0 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
   PyObject *swig_obj[2] ;
-  sentencepiece::ImmutableSentencePieceText result;
+  sentencepiece::util::bytes result;
   
   (void)self;
-  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__DecodePiecesAsImmutableProto", 2, 2, swig_obj)) SWIG_fail;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__DecodePiecesAsSerializedProto", 2, 2, swig_obj)) SWIG_fail;
   res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
   if (!SWIG_IsOK(res1)) {
-    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__DecodePiecesAsImmutableProto" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__DecodePiecesAsSerializedProto" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
   }
   arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
   {
     std::vector<absl::string_view> *out = nullptr;
     if (PyList_Check(swig_obj[1])) {
-      const size_t size = PyList_Size(swig_obj[1]);
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
       out = new std::vector<absl::string_view>(size);
       for (size_t i = 0; i < size; ++i) {
-        const PyInputString ustring(PyList_GetItem(swig_obj[1], i));
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
         if (ustring.IsAvalable()) {
           (*out)[i] = ustring.str();
         } else {
@@ -7479,6 +9011,18 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePiecesAsImmutableProto(
         }
         resultobj = ustring.input_type();
       }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
     } else {
       PyErr_SetString(PyExc_TypeError, "not a list");
       SWIG_fail;
@@ -7487,14 +9031,20 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePiecesAsImmutableProto(
   }
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__DecodePiecesAsImmutableProto((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__DecodePiecesAsSerializedProto((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
       SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
     }
   }
-  resultobj = SWIG_NewPointerObj((new sentencepiece::ImmutableSentencePieceText(result)), SWIGTYPE_p_sentencepiece__ImmutableSentencePieceText, SWIG_POINTER_OWN |  0 );
+  {
+    resultobj = MakePyOutputBytes(result);
+  }
   {
     delete arg2;
   }
@@ -7507,27 +9057,169 @@ fail:
 }
 
 
-SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodeIdsBatch(PyObject *self, PyObject *args) {
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodeIdsAsImmutableProto(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
-  std::vector< std::vector< int > > *arg2 = 0 ;
-  int arg3 ;
+  std::vector< int > *arg2 = 0 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  int val3 ;
-  int ecode3 = 0 ;
-  PyObject *swig_obj[3] ;
-  std::vector< std::string > result;
+  PyObject *swig_obj[2] ;
+  sentencepiece::ImmutableSentencePieceText result;
   
   (void)self;
-  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__DecodeIdsBatch", 3, 3, swig_obj)) SWIG_fail;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__DecodeIdsAsImmutableProto", 2, 2, swig_obj)) SWIG_fail;
   res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
   if (!SWIG_IsOK(res1)) {
-    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__DecodeIdsBatch" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__DecodeIdsAsImmutableProto" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
   }
   arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
   {
-    std::vector<std::vector<int>> *out = nullptr;
+    std::vector<int> *out = nullptr;
+    if (PyList_Check(swig_obj[1])) {
+      const size_t size = PyList_Size(swig_obj[1]);
+      out = new std::vector<int>(size);
+      for (size_t i = 0; i < size; ++i) {
+        PyObject *o = PyList_GetItem(swig_obj[1], i);
+        if (PyInt_Check(o)) {
+          (*out)[i] = static_cast<int>(PyInt_AsLong(o));
+        } else {
+          PyErr_SetString(PyExc_TypeError,"list must contain integers");
+          SWIG_fail;
+        }
+      }
+    } else {
+      PyErr_SetString(PyExc_TypeError,"not a list");
+      SWIG_fail;
+    }
+    arg2 = out;
+  }
+  {
+    try {
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__DecodeIdsAsImmutableProto((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< int > const &)*arg2);
+      }
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  resultobj = SWIG_NewPointerObj((new sentencepiece::ImmutableSentencePieceText(result)), SWIGTYPE_p_sentencepiece__ImmutableSentencePieceText, SWIG_POINTER_OWN |  0 );
+  {
+    delete arg2;
+  }
+  return resultobj;
+fail:
+  {
+    delete arg2;
+  }
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePiecesAsImmutableProto(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  std::vector< absl::string_view > *arg2 = 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
+  PyObject *swig_obj[2] ;
+  sentencepiece::ImmutableSentencePieceText result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__DecodePiecesAsImmutableProto", 2, 2, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__DecodePiecesAsImmutableProto" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    std::vector<absl::string_view> *out = nullptr;
+    if (PyList_Check(swig_obj[1])) {
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
+      out = new std::vector<absl::string_view>(size);
+      for (size_t i = 0; i < size; ++i) {
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
+        if (ustring.IsAvalable()) {
+          (*out)[i] = ustring.str();
+        } else {
+          PyErr_SetString(PyExc_TypeError, "list must contain strings");
+          SWIG_fail;
+        }
+        resultobj = ustring.input_type();
+      }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
+    } else {
+      PyErr_SetString(PyExc_TypeError, "not a list");
+      SWIG_fail;
+    }
+    arg2 = out;
+  }
+  {
+    try {
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__DecodePiecesAsImmutableProto((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2);
+      }
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  resultobj = SWIG_NewPointerObj((new sentencepiece::ImmutableSentencePieceText(result)), SWIGTYPE_p_sentencepiece__ImmutableSentencePieceText, SWIG_POINTER_OWN |  0 );
+  {
+    delete arg2;
+  }
+  return resultobj;
+fail:
+  {
+    delete arg2;
+  }
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodeIdsBatch(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  std::vector< std::vector< int > > *arg2 = 0 ;
+  int arg3 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  int val3 ;
+  int ecode3 = 0 ;
+  PyObject *swig_obj[3] ;
+  std::vector< std::string > result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__DecodeIdsBatch", 3, 3, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__DecodeIdsBatch" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    std::vector<std::vector<int>> *out = nullptr;
     if (PyList_Check(swig_obj[1])) {
       const size_t size = PyList_Size(swig_obj[1]);
       out = new std::vector<std::vector<int>>(size);
@@ -7563,7 +9255,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodeIdsBatch(PyObject *self
   arg3 = static_cast< int >(val3);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__DecodeIdsBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< std::vector< int > > const &)*arg2,arg3);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__DecodeIdsBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< std::vector< int > > const &)*arg2,arg3);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -7645,7 +9341,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodeIdsAsBytesBatch(PyObjec
   arg3 = static_cast< int >(val3);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__DecodeIdsAsBytesBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< std::vector< int > > const &)*arg2,arg3);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__DecodeIdsAsBytesBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< std::vector< int > > const &)*arg2,arg3);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -7726,7 +9426,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodeIdsAsSerializedProtoBat
   arg3 = static_cast< int >(val3);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__DecodeIdsAsSerializedProtoBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< std::vector< int > > const &)*arg2,arg3);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__DecodeIdsAsSerializedProtoBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< std::vector< int > > const &)*arg2,arg3);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -7807,7 +9511,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodeIdsAsImmutableProtoBatc
   arg3 = static_cast< int >(val3);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__DecodeIdsAsImmutableProtoBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< std::vector< int > > const &)*arg2,arg3);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__DecodeIdsAsImmutableProtoBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< std::vector< int > > const &)*arg2,arg3);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -7840,6 +9548,7 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePiecesBatch(PyObject *s
   int arg3 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
+  PyObjectRefs refs2 ;
   int val3 ;
   int ecode3 = 0 ;
   PyObject *swig_obj[3] ;
@@ -7860,10 +9569,12 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePiecesBatch(PyObject *s
       for (size_t i = 0; i < size; ++i) {
         PyObject *o = PyList_GetItem(swig_obj[1], i);
         if (PyList_Check(o)) {
-          const size_t size2 = PyList_Size(o);
+          PyObject *items = refs2.Add(PyList_AsTuple(o));
+          if (items == nullptr) SWIG_fail;
+          const size_t size2 = PyTuple_GET_SIZE(items);
           (*out)[i].resize(size2);
           for (size_t j = 0; j < size2; ++j) {
-            const PyInputString ustring(PyList_GetItem(o, j));
+            const PyInputString ustring(PyTuple_GET_ITEM(items, j));
             if (ustring.IsAvalable()) {
               (*out)[i][j] = ustring.str();
             } else {
@@ -7890,7 +9601,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePiecesBatch(PyObject *s
   arg3 = static_cast< int >(val3);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__DecodePiecesBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< std::vector< absl::string_view > > const &)*arg2,arg3);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__DecodePiecesBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< std::vector< absl::string_view > > const &)*arg2,arg3);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -7917,6 +9632,7 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePiecesAsSerializedProto
   int arg3 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
+  PyObjectRefs refs2 ;
   int val3 ;
   int ecode3 = 0 ;
   PyObject *swig_obj[3] ;
@@ -7937,10 +9653,12 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePiecesAsSerializedProto
       for (size_t i = 0; i < size; ++i) {
         PyObject *o = PyList_GetItem(swig_obj[1], i);
         if (PyList_Check(o)) {
-          const size_t size2 = PyList_Size(o);
+          PyObject *items = refs2.Add(PyList_AsTuple(o));
+          if (items == nullptr) SWIG_fail;
+          const size_t size2 = PyTuple_GET_SIZE(items);
           (*out)[i].resize(size2);
           for (size_t j = 0; j < size2; ++j) {
-            const PyInputString ustring(PyList_GetItem(o, j));
+            const PyInputString ustring(PyTuple_GET_ITEM(items, j));
             if (ustring.IsAvalable()) {
               (*out)[i][j] = ustring.str();
             } else {
@@ -7967,7 +9685,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePiecesAsSerializedProto
   arg3 = static_cast< int >(val3);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__DecodePiecesAsSerializedProtoBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< std::vector< absl::string_view > > const &)*arg2,arg3);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__DecodePiecesAsSerializedProtoBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< std::vector< absl::string_view > > const &)*arg2,arg3);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -7993,6 +9715,7 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePiecesAsImmutableProtoB
   int arg3 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
+  PyObjectRefs refs2 ;
   int val3 ;
   int ecode3 = 0 ;
   PyObject *swig_obj[3] ;
@@ -8013,10 +9736,12 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePiecesAsImmutableProtoB
       for (size_t i = 0; i < size; ++i) {
         PyObject *o = PyList_GetItem(swig_obj[1], i);
         if (PyList_Check(o)) {
-          const size_t size2 = PyList_Size(o);
+          PyObject *items = refs2.Add(PyList_AsTuple(o));
+          if (items == nullptr) SWIG_fail;
+          const size_t size2 = PyTuple_GET_SIZE(items);
           (*out)[i].resize(size2);
           for (size_t j = 0; j < size2; ++j) {
-            const PyInputString ustring(PyList_GetItem(o, j));
+            const PyInputString ustring(PyTuple_GET_ITEM(items, j));
             if (ustring.IsAvalable()) {
               (*out)[i][j] = ustring.str();
             } else {
@@ -8043,7 +9768,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__DecodePiecesAsImmutableProtoB
   arg3 = static_cast< int >(val3);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__DecodePiecesAsImmutableProtoBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< std::vector< absl::string_view > > const &)*arg2,arg3);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__DecodePiecesAsImmutableProtoBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< std::vector< absl::string_view > > const &)*arg2,arg3);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -8130,7 +9859,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__NBestEncodeAsIds(PyObject *se
   arg7 = static_cast< bool >(val7);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__NBestEncodeAsIds((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__NBestEncodeAsIds((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -8220,7 +9953,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__NBestEncodeAsPieces(PyObject
   arg7 = static_cast< bool >(val7);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__NBestEncodeAsPieces((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__NBestEncodeAsPieces((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -8311,7 +10048,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__NBestEncodeAsSerializedProto(
   arg7 = static_cast< bool >(val7);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__NBestEncodeAsSerializedProto((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__NBestEncodeAsSerializedProto((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -8394,7 +10135,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__NBestEncodeAsImmutableProto(P
   arg7 = static_cast< bool >(val7);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__NBestEncodeAsImmutableProto((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__NBestEncodeAsImmutableProto((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -8499,7 +10244,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__SampleEncodeAndScoreAsIds(PyO
   arg10 = static_cast< bool >(val10);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__SampleEncodeAndScoreAsIds((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__SampleEncodeAndScoreAsIds((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -8613,7 +10362,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__SampleEncodeAndScoreAsPieces(
   arg10 = static_cast< bool >(val10);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__SampleEncodeAndScoreAsPieces((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__SampleEncodeAndScoreAsPieces((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -8728,7 +10481,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__SampleEncodeAndScoreAsSeriali
   arg10 = static_cast< bool >(val10);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProto((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProto((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -8835,7 +10592,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__SampleEncodeAndScoreAsImmutab
   arg10 = static_cast< bool >(val10);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProto((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10);
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProto((sentencepiece::SentencePieceProcessor const *)arg1,SWIG_STD_MOVE(arg2),arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -8849,34 +10610,115 @@ fail:
 }
 
 
-SWIGINTERN PyObject *_wrap_SentencePieceProcessor__Normalize(PyObject *self, PyObject *args) {
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__NBestEncodeAsIdsBatch(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
-  absl::string_view arg2 ;
+  std::vector< absl::string_view > *arg2 = 0 ;
+  int arg3 ;
+  int arg4 ;
+  bool arg5 ;
+  bool arg6 ;
+  bool arg7 ;
+  bool arg8 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  PyObject *swig_obj[2] ;
-  std::string result;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
+  int val3 ;
+  int ecode3 = 0 ;
+  int val4 ;
+  int ecode4 = 0 ;
+  bool val5 ;
+  int ecode5 = 0 ;
+  bool val6 ;
+  int ecode6 = 0 ;
+  bool val7 ;
+  int ecode7 = 0 ;
+  bool val8 ;
+  int ecode8 = 0 ;
+  PyObject *swig_obj[8] ;
+  std::vector< std::vector< std::vector< int > > > result;
   
   (void)self;
-  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__Normalize", 2, 2, swig_obj)) SWIG_fail;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__NBestEncodeAsIdsBatch", 8, 8, swig_obj)) SWIG_fail;
   res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
   if (!SWIG_IsOK(res1)) {
-    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__Normalize" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor *""'"); 
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__NBestEncodeAsIdsBatch" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
   }
   arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
   {
-    const PyInputString ustring(swig_obj[1]);
-    if (!ustring.IsAvalable()) {
-      PyErr_SetString(PyExc_TypeError, "not a string");
+    std::vector<absl::string_view> *out = nullptr;
+    if (PyList_Check(swig_obj[1])) {
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
+      out = new std::vector<absl::string_view>(size);
+      for (size_t i = 0; i < size; ++i) {
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
+        if (ustring.IsAvalable()) {
+          (*out)[i] = ustring.str();
+        } else {
+          PyErr_SetString(PyExc_TypeError, "list must contain strings");
+          SWIG_fail;
+        }
+        resultobj = ustring.input_type();
+      }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
+    } else {
+      PyErr_SetString(PyExc_TypeError, "not a list");
       SWIG_fail;
     }
-    resultobj = ustring.input_type();
-    arg2 = ustring.str();
+    arg2 = out;
   }
+  ecode3 = SWIG_AsVal_int(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "SentencePieceProcessor__NBestEncodeAsIdsBatch" "', argument " "3"" of type '" "int""'");
+  } 
+  arg3 = static_cast< int >(val3);
+  ecode4 = SWIG_AsVal_int(swig_obj[3], &val4);
+  if (!SWIG_IsOK(ecode4)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode4), "in method '" "SentencePieceProcessor__NBestEncodeAsIdsBatch" "', argument " "4"" of type '" "int""'");
+  } 
+  arg4 = static_cast< int >(val4);
+  ecode5 = SWIG_AsVal_bool(swig_obj[4], &val5);
+  if (!SWIG_IsOK(ecode5)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode5), "in method '" "SentencePieceProcessor__NBestEncodeAsIdsBatch" "', argument " "5"" of type '" "bool""'");
+  } 
+  arg5 = static_cast< bool >(val5);
+  ecode6 = SWIG_AsVal_bool(swig_obj[5], &val6);
+  if (!SWIG_IsOK(ecode6)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode6), "in method '" "SentencePieceProcessor__NBestEncodeAsIdsBatch" "', argument " "6"" of type '" "bool""'");
+  } 
+  arg6 = static_cast< bool >(val6);
+  ecode7 = SWIG_AsVal_bool(swig_obj[6], &val7);
+  if (!SWIG_IsOK(ecode7)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode7), "in method '" "SentencePieceProcessor__NBestEncodeAsIdsBatch" "', argument " "7"" of type '" "bool""'");
+  } 
+  arg7 = static_cast< bool >(val7);
+  ecode8 = SWIG_AsVal_bool(swig_obj[7], &val8);
+  if (!SWIG_IsOK(ecode8)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode8), "in method '" "SentencePieceProcessor__NBestEncodeAsIdsBatch" "', argument " "8"" of type '" "bool""'");
+  } 
+  arg8 = static_cast< bool >(val8);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__Normalize(arg1,SWIG_STD_MOVE(arg2));
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__NBestEncodeAsIdsBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6,arg7,arg8);
+      }
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -8884,43 +10726,1779 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__Normalize(PyObject *self, PyO
     }
   }
   {
-    PyObject *input_type = resultobj;
-    resultobj = MakePyOutputString(result, input_type);
+    resultobj = MakePyObject(result, nullptr);
+  }
+  {
+    delete arg2;
   }
   return resultobj;
 fail:
+  {
+    delete arg2;
+  }
   return NULL;
 }
 
 
-SWIGINTERN PyObject *_wrap_SentencePieceProcessor__NormalizeWithOffsets(PyObject *self, PyObject *args) {
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__NBestEncodeAsPiecesBatch(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
-  absl::string_view arg2 ;
+  std::vector< absl::string_view > *arg2 = 0 ;
+  int arg3 ;
+  int arg4 ;
+  bool arg5 ;
+  bool arg6 ;
+  bool arg7 ;
+  bool arg8 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  PyObject *swig_obj[2] ;
-  std::pair< std::string,std::vector< size_t > > result;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
+  int val3 ;
+  int ecode3 = 0 ;
+  int val4 ;
+  int ecode4 = 0 ;
+  bool val5 ;
+  int ecode5 = 0 ;
+  bool val6 ;
+  int ecode6 = 0 ;
+  bool val7 ;
+  int ecode7 = 0 ;
+  bool val8 ;
+  int ecode8 = 0 ;
+  PyObject *swig_obj[8] ;
+  std::vector< std::vector< std::vector< std::string > > > result;
   
   (void)self;
-  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__NormalizeWithOffsets", 2, 2, swig_obj)) SWIG_fail;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__NBestEncodeAsPiecesBatch", 8, 8, swig_obj)) SWIG_fail;
   res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
   if (!SWIG_IsOK(res1)) {
-    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__NormalizeWithOffsets" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor *""'"); 
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__NBestEncodeAsPiecesBatch" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
   }
   arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
   {
-    const PyInputString ustring(swig_obj[1]);
-    if (!ustring.IsAvalable()) {
-      PyErr_SetString(PyExc_TypeError, "not a string");
-      SWIG_fail;
-    }
-    resultobj = ustring.input_type();
-    arg2 = ustring.str();
+    std::vector<absl::string_view> *out = nullptr;
+    if (PyList_Check(swig_obj[1])) {
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
+      out = new std::vector<absl::string_view>(size);
+      for (size_t i = 0; i < size; ++i) {
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
+        if (ustring.IsAvalable()) {
+          (*out)[i] = ustring.str();
+        } else {
+          PyErr_SetString(PyExc_TypeError, "list must contain strings");
+          SWIG_fail;
+        }
+        resultobj = ustring.input_type();
+      }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
+    } else {
+      PyErr_SetString(PyExc_TypeError, "not a list");
+      SWIG_fail;
+    }
+    arg2 = out;
+  }
+  ecode3 = SWIG_AsVal_int(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "SentencePieceProcessor__NBestEncodeAsPiecesBatch" "', argument " "3"" of type '" "int""'");
+  } 
+  arg3 = static_cast< int >(val3);
+  ecode4 = SWIG_AsVal_int(swig_obj[3], &val4);
+  if (!SWIG_IsOK(ecode4)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode4), "in method '" "SentencePieceProcessor__NBestEncodeAsPiecesBatch" "', argument " "4"" of type '" "int""'");
+  } 
+  arg4 = static_cast< int >(val4);
+  ecode5 = SWIG_AsVal_bool(swig_obj[4], &val5);
+  if (!SWIG_IsOK(ecode5)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode5), "in method '" "SentencePieceProcessor__NBestEncodeAsPiecesBatch" "', argument " "5"" of type '" "bool""'");
+  } 
+  arg5 = static_cast< bool >(val5);
+  ecode6 = SWIG_AsVal_bool(swig_obj[5], &val6);
+  if (!SWIG_IsOK(ecode6)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode6), "in method '" "SentencePieceProcessor__NBestEncodeAsPiecesBatch" "', argument " "6"" of type '" "bool""'");
+  } 
+  arg6 = static_cast< bool >(val6);
+  ecode7 = SWIG_AsVal_bool(swig_obj[6], &val7);
+  if (!SWIG_IsOK(ecode7)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode7), "in method '" "SentencePieceProcessor__NBestEncodeAsPiecesBatch" "', argument " "7"" of type '" "bool""'");
+  } 
+  arg7 = static_cast< bool >(val7);
+  ecode8 = SWIG_AsVal_bool(swig_obj[7], &val8);
+  if (!SWIG_IsOK(ecode8)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode8), "in method '" "SentencePieceProcessor__NBestEncodeAsPiecesBatch" "', argument " "8"" of type '" "bool""'");
+  } 
+  arg8 = static_cast< bool >(val8);
+  {
+    try {
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__NBestEncodeAsPiecesBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6,arg7,arg8);
+      }
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    PyObject *input_type = resultobj;
+    resultobj = MakePyObject(result, input_type);
+  }
+  {
+    delete arg2;
+  }
+  return resultobj;
+fail:
+  {
+    delete arg2;
+  }
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__NBestEncodeAsSerializedProtoBatch(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  std::vector< absl::string_view > *arg2 = 0 ;
+  int arg3 ;
+  int arg4 ;
+  bool arg5 ;
+  bool arg6 ;
+  bool arg7 ;
+  bool arg8 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
+  int val3 ;
+  int ecode3 = 0 ;
+  int val4 ;
+  int ecode4 = 0 ;
+  bool val5 ;
+  int ecode5 = 0 ;
+  bool val6 ;
+  int ecode6 = 0 ;
+  bool val7 ;
+  int ecode7 = 0 ;
+  bool val8 ;
+  int ecode8 = 0 ;
+  PyObject *swig_obj[8] ;
+  BytesArray result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__NBestEncodeAsSerializedProtoBatch", 8, 8, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__NBestEncodeAsSerializedProtoBatch" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    std::vector<absl::string_view> *out = nullptr;
+    if (PyList_Check(swig_obj[1])) {
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
+      out = new std::vector<absl::string_view>(size);
+      for (size_t i = 0; i < size; ++i) {
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
+        if (ustring.IsAvalable()) {
+          (*out)[i] = ustring.str();
+        } else {
+          PyErr_SetString(PyExc_TypeError, "list must contain strings");
+          SWIG_fail;
+        }
+        resultobj = ustring.input_type();
+      }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
+    } else {
+      PyErr_SetString(PyExc_TypeError, "not a list");
+      SWIG_fail;
+    }
+    arg2 = out;
+  }
+  ecode3 = SWIG_AsVal_int(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "SentencePieceProcessor__NBestEncodeAsSerializedProtoBatch" "', argument " "3"" of type '" "int""'");
+  } 
+  arg3 = static_cast< int >(val3);
+  ecode4 = SWIG_AsVal_int(swig_obj[3], &val4);
+  if (!SWIG_IsOK(ecode4)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode4), "in method '" "SentencePieceProcessor__NBestEncodeAsSerializedProtoBatch" "', argument " "4"" of type '" "int""'");
+  } 
+  arg4 = static_cast< int >(val4);
+  ecode5 = SWIG_AsVal_bool(swig_obj[4], &val5);
+  if (!SWIG_IsOK(ecode5)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode5), "in method '" "SentencePieceProcessor__NBestEncodeAsSerializedProtoBatch" "', argument " "5"" of type '" "bool""'");
+  } 
+  arg5 = static_cast< bool >(val5);
+  ecode6 = SWIG_AsVal_bool(swig_obj[5], &val6);
+  if (!SWIG_IsOK(ecode6)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode6), "in method '" "SentencePieceProcessor__NBestEncodeAsSerializedProtoBatch" "', argument " "6"" of type '" "bool""'");
+  } 
+  arg6 = static_cast< bool >(val6);
+  ecode7 = SWIG_AsVal_bool(swig_obj[6], &val7);
+  if (!SWIG_IsOK(ecode7)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode7), "in method '" "SentencePieceProcessor__NBestEncodeAsSerializedProtoBatch" "', argument " "7"" of type '" "bool""'");
+  } 
+  arg7 = static_cast< bool >(val7);
+  ecode8 = SWIG_AsVal_bool(swig_obj[7], &val8);
+  if (!SWIG_IsOK(ecode8)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode8), "in method '" "SentencePieceProcessor__NBestEncodeAsSerializedProtoBatch" "', argument " "8"" of type '" "bool""'");
+  } 
+  arg8 = static_cast< bool >(val8);
+  {
+    try {
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__NBestEncodeAsSerializedProtoBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6,arg7,arg8);
+      }
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    resultobj = PyList_New((&result)->size());
+    for (size_t i = 0; i < (&result)->size(); ++i) {
+      PyList_SET_ITEM(resultobj, i, MakePyOutputBytes(result[i]));
+    }
+  }
+  {
+    delete arg2;
+  }
+  return resultobj;
+fail:
+  {
+    delete arg2;
+  }
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__NBestEncodeAsImmutableProtoBatch(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  std::vector< absl::string_view > *arg2 = 0 ;
+  int arg3 ;
+  int arg4 ;
+  bool arg5 ;
+  bool arg6 ;
+  bool arg7 ;
+  bool arg8 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
+  int val3 ;
+  int ecode3 = 0 ;
+  int val4 ;
+  int ecode4 = 0 ;
+  bool val5 ;
+  int ecode5 = 0 ;
+  bool val6 ;
+  int ecode6 = 0 ;
+  bool val7 ;
+  int ecode7 = 0 ;
+  bool val8 ;
+  int ecode8 = 0 ;
+  PyObject *swig_obj[8] ;
+  SwigValueWrapper< std::vector< sentencepiece::ImmutableNBestSentencePieceText > > result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__NBestEncodeAsImmutableProtoBatch", 8, 8, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__NBestEncodeAsImmutableProtoBatch" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    std::vector<absl::string_view> *out = nullptr;
+    if (PyList_Check(swig_obj[1])) {
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
+      out = new std::vector<absl::string_view>(size);
+      for (size_t i = 0; i < size; ++i) {
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
+        if (ustring.IsAvalable()) {
+          (*out)[i] = ustring.str();
+        } else {
+          PyErr_SetString(PyExc_TypeError, "list must contain strings");
+          SWIG_fail;
+        }
+        resultobj = ustring.input_type();
+      }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
+    } else {
+      PyErr_SetString(PyExc_TypeError, "not a list");
+      SWIG_fail;
+    }
+    arg2 = out;
+  }
+  ecode3 = SWIG_AsVal_int(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "SentencePieceProcessor__NBestEncodeAsImmutableProtoBatch" "', argument " "3"" of type '" "int""'");
+  } 
+  arg3 = static_cast< int >(val3);
+  ecode4 = SWIG_AsVal_int(swig_obj[3], &val4);
+  if (!SWIG_IsOK(ecode4)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode4), "in method '" "SentencePieceProcessor__NBestEncodeAsImmutableProtoBatch" "', argument " "4"" of type '" "int""'");
+  } 
+  arg4 = static_cast< int >(val4);
+  ecode5 = SWIG_AsVal_bool(swig_obj[4], &val5);
+  if (!SWIG_IsOK(ecode5)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode5), "in method '" "SentencePieceProcessor__NBestEncodeAsImmutableProtoBatch" "', argument " "5"" of type '" "bool""'");
+  } 
+  arg5 = static_cast< bool >(val5);
+  ecode6 = SWIG_AsVal_bool(swig_obj[5], &val6);
+  if (!SWIG_IsOK(ecode6)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode6), "in method '" "SentencePieceProcessor__NBestEncodeAsImmutableProtoBatch" "', argument " "6"" of type '" "bool""'");
+  } 
+  arg6 = static_cast< bool >(val6);
+  ecode7 = SWIG_AsVal_bool(swig_obj[6], &val7);
+  if (!SWIG_IsOK(ecode7)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode7), "in method '" "SentencePieceProcessor__NBestEncodeAsImmutableProtoBatch" "', argument " "7"" of type '" "bool""'");
+  } 
+  arg7 = static_cast< bool >(val7);
+  ecode8 = SWIG_AsVal_bool(swig_obj[7], &val8);
+  if (!SWIG_IsOK(ecode8)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode8), "in method '" "SentencePieceProcessor__NBestEncodeAsImmutableProtoBatch" "', argument " "8"" of type '" "bool""'");
+  } 
+  arg8 = static_cast< bool >(val8);
+  {
+    try {
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__NBestEncodeAsImmutableProtoBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6,arg7,arg8);
+      }
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    resultobj = PyList_New((&result)->size());
+    for (size_t i = 0; i < (&result)->size(); ++i) {
+      PyObject *obj = SWIG_NewPointerObj(new sentencepiece::ImmutableNBestSentencePieceText((&result)->at(i)), SWIGTYPE_p_sentencepiece__ImmutableNBestSentencePieceText, SWIG_POINTER_OWN | 0);
+      PyList_SET_ITEM(resultobj, i, obj);
+    }
+  }
+  {
+    delete arg2;
+  }
+  return resultobj;
+fail:
+  {
+    delete arg2;
+  }
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__SampleEncodeAndScoreAsIdsBatch(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  std::vector< absl::string_view > *arg2 = 0 ;
+  int arg3 ;
+  int arg4 ;
+  float arg5 ;
+  bool arg6 ;
+  bool arg7 ;
+  bool arg8 ;
+  bool arg9 ;
+  bool arg10 ;
+  bool arg11 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
+  int val3 ;
+  int ecode3 = 0 ;
+  int val4 ;
+  int ecode4 = 0 ;
+  float val5 ;
+  int ecode5 = 0 ;
+  bool val6 ;
+  int ecode6 = 0 ;
+  bool val7 ;
+  int ecode7 = 0 ;
+  bool val8 ;
+  int ecode8 = 0 ;
+  bool val9 ;
+  int ecode9 = 0 ;
+  bool val10 ;
+  int ecode10 = 0 ;
+  bool val11 ;
+  int ecode11 = 0 ;
+  PyObject *swig_obj[11] ;
+  std::vector< std::vector< std::pair< std::vector< int >,float > > > result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__SampleEncodeAndScoreAsIdsBatch", 11, 11, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsIdsBatch" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    std::vector<absl::string_view> *out = nullptr;
+    if (PyList_Check(swig_obj[1])) {
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
+      out = new std::vector<absl::string_view>(size);
+      for (size_t i = 0; i < size; ++i) {
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
+        if (ustring.IsAvalable()) {
+          (*out)[i] = ustring.str();
+        } else {
+          PyErr_SetString(PyExc_TypeError, "list must contain strings");
+          SWIG_fail;
+        }
+        resultobj = ustring.input_type();
+      }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
+    } else {
+      PyErr_SetString(PyExc_TypeError, "not a list");
+      SWIG_fail;
+    }
+    arg2 = out;
+  }
+  ecode3 = SWIG_AsVal_int(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsIdsBatch" "', argument " "3"" of type '" "int""'");
+  } 
+  arg3 = static_cast< int >(val3);
+  ecode4 = SWIG_AsVal_int(swig_obj[3], &val4);
+  if (!SWIG_IsOK(ecode4)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode4), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsIdsBatch" "', argument " "4"" of type '" "int""'");
+  } 
+  arg4 = static_cast< int >(val4);
+  ecode5 = SWIG_AsVal_float(swig_obj[4], &val5);
+  if (!SWIG_IsOK(ecode5)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode5), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsIdsBatch" "', argument " "5"" of type '" "float""'");
+  } 
+  arg5 = static_cast< float >(val5);
+  ecode6 = SWIG_AsVal_bool(swig_obj[5], &val6);
+  if (!SWIG_IsOK(ecode6)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode6), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsIdsBatch" "', argument " "6"" of type '" "bool""'");
+  } 
+  arg6 = static_cast< bool >(val6);
+  ecode7 = SWIG_AsVal_bool(swig_obj[6], &val7);
+  if (!SWIG_IsOK(ecode7)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode7), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsIdsBatch" "', argument " "7"" of type '" "bool""'");
+  } 
+  arg7 = static_cast< bool >(val7);
+  ecode8 = SWIG_AsVal_bool(swig_obj[7], &val8);
+  if (!SWIG_IsOK(ecode8)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode8), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsIdsBatch" "', argument " "8"" of type '" "bool""'");
+  } 
+  arg8 = static_cast< bool >(val8);
+  ecode9 = SWIG_AsVal_bool(swig_obj[8], &val9);
+  if (!SWIG_IsOK(ecode9)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode9), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsIdsBatch" "', argument " "9"" of type '" "bool""'");
+  } 
+  arg9 = static_cast< bool >(val9);
+  ecode10 = SWIG_AsVal_bool(swig_obj[9], &val10);
+  if (!SWIG_IsOK(ecode10)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode10), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsIdsBatch" "', argument " "10"" of type '" "bool""'");
+  } 
+  arg10 = static_cast< bool >(val10);
+  ecode11 = SWIG_AsVal_bool(swig_obj[10], &val11);
+  if (!SWIG_IsOK(ecode11)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode11), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsIdsBatch" "', argument " "11"" of type '" "bool""'");
+  } 
+  arg11 = static_cast< bool >(val11);
+  {
+    try {
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__SampleEncodeAndScoreAsIdsBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10,arg11);
+      }
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    resultobj = MakePyObject(result, nullptr);
+  }
+  {
+    delete arg2;
+  }
+  return resultobj;
+fail:
+  {
+    delete arg2;
+  }
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__SampleEncodeAndScoreAsPiecesBatch(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  std::vector< absl::string_view > *arg2 = 0 ;
+  int arg3 ;
+  int arg4 ;
+  float arg5 ;
+  bool arg6 ;
+  bool arg7 ;
+  bool arg8 ;
+  bool arg9 ;
+  bool arg10 ;
+  bool arg11 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
+  int val3 ;
+  int ecode3 = 0 ;
+  int val4 ;
+  int ecode4 = 0 ;
+  float val5 ;
+  int ecode5 = 0 ;
+  bool val6 ;
+  int ecode6 = 0 ;
+  bool val7 ;
+  int ecode7 = 0 ;
+  bool val8 ;
+  int ecode8 = 0 ;
+  bool val9 ;
+  int ecode9 = 0 ;
+  bool val10 ;
+  int ecode10 = 0 ;
+  bool val11 ;
+  int ecode11 = 0 ;
+  PyObject *swig_obj[11] ;
+  std::vector< std::vector< std::pair< std::vector< std::string >,float > > > result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__SampleEncodeAndScoreAsPiecesBatch", 11, 11, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsPiecesBatch" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    std::vector<absl::string_view> *out = nullptr;
+    if (PyList_Check(swig_obj[1])) {
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
+      out = new std::vector<absl::string_view>(size);
+      for (size_t i = 0; i < size; ++i) {
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
+        if (ustring.IsAvalable()) {
+          (*out)[i] = ustring.str();
+        } else {
+          PyErr_SetString(PyExc_TypeError, "list must contain strings");
+          SWIG_fail;
+        }
+        resultobj = ustring.input_type();
+      }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
+    } else {
+      PyErr_SetString(PyExc_TypeError, "not a list");
+      SWIG_fail;
+    }
+    arg2 = out;
+  }
+  ecode3 = SWIG_AsVal_int(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsPiecesBatch" "', argument " "3"" of type '" "int""'");
+  } 
+  arg3 = static_cast< int >(val3);
+  ecode4 = SWIG_AsVal_int(swig_obj[3], &val4);
+  if (!SWIG_IsOK(ecode4)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode4), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsPiecesBatch" "', argument " "4"" of type '" "int""'");
+  } 
+  arg4 = static_cast< int >(val4);
+  ecode5 = SWIG_AsVal_float(swig_obj[4], &val5);
+  if (!SWIG_IsOK(ecode5)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode5), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsPiecesBatch" "', argument " "5"" of type '" "float""'");
+  } 
+  arg5 = static_cast< float >(val5);
+  ecode6 = SWIG_AsVal_bool(swig_obj[5], &val6);
+  if (!SWIG_IsOK(ecode6)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode6), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsPiecesBatch" "', argument " "6"" of type '" "bool""'");
+  } 
+  arg6 = static_cast< bool >(val6);
+  ecode7 = SWIG_AsVal_bool(swig_obj[6], &val7);
+  if (!SWIG_IsOK(ecode7)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode7), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsPiecesBatch" "', argument " "7"" of type '" "bool""'");
+  } 
+  arg7 = static_cast< bool >(val7);
+  ecode8 = SWIG_AsVal_bool(swig_obj[7], &val8);
+  if (!SWIG_IsOK(ecode8)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode8), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsPiecesBatch" "', argument " "8"" of type '" "bool""'");
+  } 
+  arg8 = static_cast< bool >(val8);
+  ecode9 = SWIG_AsVal_bool(swig_obj[8], &val9);
+  if (!SWIG_IsOK(ecode9)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode9), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsPiecesBatch" "', argument " "9"" of type '" "bool""'");
+  } 
+  arg9 = static_cast< bool >(val9);
+  ecode10 = SWIG_AsVal_bool(swig_obj[9], &val10);
+  if (!SWIG_IsOK(ecode10)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode10), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsPiecesBatch" "', argument " "10"" of type '" "bool""'");
+  } 
+  arg10 = static_cast< bool >(val10);
+  ecode11 = SWIG_AsVal_bool(swig_obj[10], &val11);
+  if (!SWIG_IsOK(ecode11)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode11), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsPiecesBatch" "', argument " "11"" of type '" "bool""'");
+  } 
+  arg11 = static_cast< bool >(val11);
+  {
+    try {
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__SampleEncodeAndScoreAsPiecesBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10,arg11);
+      }
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    PyObject *input_type = resultobj;
+    resultobj = MakePyObject(result, input_type);
+  }
+  {
+    delete arg2;
+  }
+  return resultobj;
+fail:
+  {
+    delete arg2;
+  }
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProtoBatch(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  std::vector< absl::string_view > *arg2 = 0 ;
+  int arg3 ;
+  int arg4 ;
+  float arg5 ;
+  bool arg6 ;
+  bool arg7 ;
+  bool arg8 ;
+  bool arg9 ;
+  bool arg10 ;
+  bool arg11 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
+  int val3 ;
+  int ecode3 = 0 ;
+  int val4 ;
+  int ecode4 = 0 ;
+  float val5 ;
+  int ecode5 = 0 ;
+  bool val6 ;
+  int ecode6 = 0 ;
+  bool val7 ;
+  int ecode7 = 0 ;
+  bool val8 ;
+  int ecode8 = 0 ;
+  bool val9 ;
+  int ecode9 = 0 ;
+  bool val10 ;
+  int ecode10 = 0 ;
+  bool val11 ;
+  int ecode11 = 0 ;
+  PyObject *swig_obj[11] ;
+  BytesArray result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProtoBatch", 11, 11, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProtoBatch" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    std::vector<absl::string_view> *out = nullptr;
+    if (PyList_Check(swig_obj[1])) {
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
+      out = new std::vector<absl::string_view>(size);
+      for (size_t i = 0; i < size; ++i) {
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
+        if (ustring.IsAvalable()) {
+          (*out)[i] = ustring.str();
+        } else {
+          PyErr_SetString(PyExc_TypeError, "list must contain strings");
+          SWIG_fail;
+        }
+        resultobj = ustring.input_type();
+      }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
+    } else {
+      PyErr_SetString(PyExc_TypeError, "not a list");
+      SWIG_fail;
+    }
+    arg2 = out;
+  }
+  ecode3 = SWIG_AsVal_int(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProtoBatch" "', argument " "3"" of type '" "int""'");
+  } 
+  arg3 = static_cast< int >(val3);
+  ecode4 = SWIG_AsVal_int(swig_obj[3], &val4);
+  if (!SWIG_IsOK(ecode4)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode4), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProtoBatch" "', argument " "4"" of type '" "int""'");
+  } 
+  arg4 = static_cast< int >(val4);
+  ecode5 = SWIG_AsVal_float(swig_obj[4], &val5);
+  if (!SWIG_IsOK(ecode5)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode5), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProtoBatch" "', argument " "5"" of type '" "float""'");
+  } 
+  arg5 = static_cast< float >(val5);
+  ecode6 = SWIG_AsVal_bool(swig_obj[5], &val6);
+  if (!SWIG_IsOK(ecode6)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode6), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProtoBatch" "', argument " "6"" of type '" "bool""'");
+  } 
+  arg6 = static_cast< bool >(val6);
+  ecode7 = SWIG_AsVal_bool(swig_obj[6], &val7);
+  if (!SWIG_IsOK(ecode7)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode7), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProtoBatch" "', argument " "7"" of type '" "bool""'");
+  } 
+  arg7 = static_cast< bool >(val7);
+  ecode8 = SWIG_AsVal_bool(swig_obj[7], &val8);
+  if (!SWIG_IsOK(ecode8)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode8), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProtoBatch" "', argument " "8"" of type '" "bool""'");
+  } 
+  arg8 = static_cast< bool >(val8);
+  ecode9 = SWIG_AsVal_bool(swig_obj[8], &val9);
+  if (!SWIG_IsOK(ecode9)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode9), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProtoBatch" "', argument " "9"" of type '" "bool""'");
+  } 
+  arg9 = static_cast< bool >(val9);
+  ecode10 = SWIG_AsVal_bool(swig_obj[9], &val10);
+  if (!SWIG_IsOK(ecode10)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode10), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProtoBatch" "', argument " "10"" of type '" "bool""'");
+  } 
+  arg10 = static_cast< bool >(val10);
+  ecode11 = SWIG_AsVal_bool(swig_obj[10], &val11);
+  if (!SWIG_IsOK(ecode11)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode11), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProtoBatch" "', argument " "11"" of type '" "bool""'");
+  } 
+  arg11 = static_cast< bool >(val11);
+  {
+    try {
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProtoBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10,arg11);
+      }
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    resultobj = PyList_New((&result)->size());
+    for (size_t i = 0; i < (&result)->size(); ++i) {
+      PyList_SET_ITEM(resultobj, i, MakePyOutputBytes(result[i]));
+    }
+  }
+  {
+    delete arg2;
+  }
+  return resultobj;
+fail:
+  {
+    delete arg2;
+  }
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProtoBatch(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  std::vector< absl::string_view > *arg2 = 0 ;
+  int arg3 ;
+  int arg4 ;
+  float arg5 ;
+  bool arg6 ;
+  bool arg7 ;
+  bool arg8 ;
+  bool arg9 ;
+  bool arg10 ;
+  bool arg11 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
+  int val3 ;
+  int ecode3 = 0 ;
+  int val4 ;
+  int ecode4 = 0 ;
+  float val5 ;
+  int ecode5 = 0 ;
+  bool val6 ;
+  int ecode6 = 0 ;
+  bool val7 ;
+  int ecode7 = 0 ;
+  bool val8 ;
+  int ecode8 = 0 ;
+  bool val9 ;
+  int ecode9 = 0 ;
+  bool val10 ;
+  int ecode10 = 0 ;
+  bool val11 ;
+  int ecode11 = 0 ;
+  PyObject *swig_obj[11] ;
+  SwigValueWrapper< std::vector< sentencepiece::ImmutableNBestSentencePieceText > > result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProtoBatch", 11, 11, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProtoBatch" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    std::vector<absl::string_view> *out = nullptr;
+    if (PyList_Check(swig_obj[1])) {
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
+      out = new std::vector<absl::string_view>(size);
+      for (size_t i = 0; i < size; ++i) {
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
+        if (ustring.IsAvalable()) {
+          (*out)[i] = ustring.str();
+        } else {
+          PyErr_SetString(PyExc_TypeError, "list must contain strings");
+          SWIG_fail;
+        }
+        resultobj = ustring.input_type();
+      }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
+    } else {
+      PyErr_SetString(PyExc_TypeError, "not a list");
+      SWIG_fail;
+    }
+    arg2 = out;
+  }
+  ecode3 = SWIG_AsVal_int(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProtoBatch" "', argument " "3"" of type '" "int""'");
+  } 
+  arg3 = static_cast< int >(val3);
+  ecode4 = SWIG_AsVal_int(swig_obj[3], &val4);
+  if (!SWIG_IsOK(ecode4)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode4), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProtoBatch" "', argument " "4"" of type '" "int""'");
+  } 
+  arg4 = static_cast< int >(val4);
+  ecode5 = SWIG_AsVal_float(swig_obj[4], &val5);
+  if (!SWIG_IsOK(ecode5)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode5), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProtoBatch" "', argument " "5"" of type '" "float""'");
+  } 
+  arg5 = static_cast< float >(val5);
+  ecode6 = SWIG_AsVal_bool(swig_obj[5], &val6);
+  if (!SWIG_IsOK(ecode6)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode6), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProtoBatch" "', argument " "6"" of type '" "bool""'");
+  } 
+  arg6 = static_cast< bool >(val6);
+  ecode7 = SWIG_AsVal_bool(swig_obj[6], &val7);
+  if (!SWIG_IsOK(ecode7)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode7), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProtoBatch" "', argument " "7"" of type '" "bool""'");
+  } 
+  arg7 = static_cast< bool >(val7);
+  ecode8 = SWIG_AsVal_bool(swig_obj[7], &val8);
+  if (!SWIG_IsOK(ecode8)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode8), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProtoBatch" "', argument " "8"" of type '" "bool""'");
+  } 
+  arg8 = static_cast< bool >(val8);
+  ecode9 = SWIG_AsVal_bool(swig_obj[8], &val9);
+  if (!SWIG_IsOK(ecode9)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode9), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProtoBatch" "', argument " "9"" of type '" "bool""'");
+  } 
+  arg9 = static_cast< bool >(val9);
+  ecode10 = SWIG_AsVal_bool(swig_obj[9], &val10);
+  if (!SWIG_IsOK(ecode10)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode10), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProtoBatch" "', argument " "10"" of type '" "bool""'");
+  } 
+  arg10 = static_cast< bool >(val10);
+  ecode11 = SWIG_AsVal_bool(swig_obj[10], &val11);
+  if (!SWIG_IsOK(ecode11)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode11), "in method '" "SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProtoBatch" "', argument " "11"" of type '" "bool""'");
+  } 
+  arg11 = static_cast< bool >(val11);
+  {
+    try {
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProtoBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6,arg7,arg8,arg9,arg10,arg11);
+      }
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    resultobj = PyList_New((&result)->size());
+    for (size_t i = 0; i < (&result)->size(); ++i) {
+      PyObject *obj = SWIG_NewPointerObj(new sentencepiece::ImmutableNBestSentencePieceText((&result)->at(i)), SWIGTYPE_p_sentencepiece__ImmutableNBestSentencePieceText, SWIG_POINTER_OWN | 0);
+      PyList_SET_ITEM(resultobj, i, obj);
+    }
+  }
+  {
+    delete arg2;
+  }
+  return resultobj;
+fail:
+  {
+    delete arg2;
+  }
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__Normalize(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  absl::string_view arg2 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[2] ;
+  std::string result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__Normalize", 2, 2, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__Normalize" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    const PyInputString ustring(swig_obj[1]);
+    if (!ustring.IsAvalable()) {
+      PyErr_SetString(PyExc_TypeError, "not a string");
+      SWIG_fail;
+    }
+    resultobj = ustring.input_type();
+    arg2 = ustring.str();
+  }
+  {
+    try {
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__Normalize(arg1,SWIG_STD_MOVE(arg2));
+      }
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    PyObject *input_type = resultobj;
+    resultobj = MakePyOutputString(result, input_type);
+  }
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__NormalizeWithOffsets(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  absl::string_view arg2 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[2] ;
+  std::pair< std::string,std::vector< size_t > > result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__NormalizeWithOffsets", 2, 2, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__NormalizeWithOffsets" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    const PyInputString ustring(swig_obj[1]);
+    if (!ustring.IsAvalable()) {
+      PyErr_SetString(PyExc_TypeError, "not a string");
+      SWIG_fail;
+    }
+    resultobj = ustring.input_type();
+    arg2 = ustring.str();
+  }
+  {
+    try {
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__NormalizeWithOffsets(arg1,SWIG_STD_MOVE(arg2));
+      }
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    PyObject *input_type = resultobj;
+    if (PyInputString::IsUnicode(input_type)) {
+      sentencepiece::ConvertToUnicodeAlignment(arg2, (&result)->first, &(&result)->second);
+    }
+    PyObject *obj = PyList_New((&result)->second.size());
+    for (size_t i = 0; i < (&result)->second.size(); ++i) {
+      PyList_SET_ITEM(obj, i, PyInt_FromLong(static_cast<long>((&result)->second[i])));
+    }
+    resultobj = PyTuple_New(2);
+    PyTuple_SET_ITEM(resultobj, 0, MakePyOutputString((&result)->first, input_type));
+    PyTuple_SET_ITEM(resultobj, 1, obj);
+  }
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__NormalizeBatch(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  std::vector< absl::string_view > *arg2 = 0 ;
+  int arg3 ;
+  bool arg4 ;
+  bool arg5 ;
+  bool arg6 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
+  int val3 ;
+  int ecode3 = 0 ;
+  bool val4 ;
+  int ecode4 = 0 ;
+  bool val5 ;
+  int ecode5 = 0 ;
+  PyObject *swig_obj[5] ;
+  NormalizedBatch result;
+  
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__NormalizeBatch", 5, 5, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__NormalizeBatch" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor const *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    std::vector<absl::string_view> *out = nullptr;
+    if (PyList_Check(swig_obj[1])) {
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
+      out = new std::vector<absl::string_view>(size);
+      for (size_t i = 0; i < size; ++i) {
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
+        if (ustring.IsAvalable()) {
+          (*out)[i] = ustring.str();
+        } else {
+          PyErr_SetString(PyExc_TypeError, "list must contain strings");
+          SWIG_fail;
+        }
+        resultobj = ustring.input_type();
+      }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
+    } else {
+      PyErr_SetString(PyExc_TypeError, "not a list");
+      SWIG_fail;
+    }
+    arg2 = out;
+  }
+  ecode3 = SWIG_AsVal_int(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "SentencePieceProcessor__NormalizeBatch" "', argument " "3"" of type '" "int""'");
+  } 
+  arg3 = static_cast< int >(val3);
+  ecode4 = SWIG_AsVal_bool(swig_obj[3], &val4);
+  if (!SWIG_IsOK(ecode4)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode4), "in method '" "SentencePieceProcessor__NormalizeBatch" "', argument " "4"" of type '" "bool""'");
+  } 
+  arg4 = static_cast< bool >(val4);
+  ecode5 = SWIG_AsVal_bool(swig_obj[4], &val5);
+  if (!SWIG_IsOK(ecode5)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode5), "in method '" "SentencePieceProcessor__NormalizeBatch" "', argument " "5"" of type '" "bool""'");
+  } 
+  arg5 = static_cast< bool >(val5);
+  {
+    arg6 = PyInputString::IsUnicode(resultobj);
+  }
+  {
+    try {
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__NormalizeBatch((sentencepiece::SentencePieceProcessor const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6);
+      }
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    PyObject *input_type = resultobj;
+    PyObject *normalized = PyList_New((&result)->normalized.size());
+    for (size_t i = 0; i < (&result)->normalized.size(); ++i) {
+      PyList_SET_ITEM(normalized, i, MakePyOutputString((&result)->normalized[i], input_type));
+    }
+    if (!(&result)->with_offsets) {
+      resultobj = normalized;
+    } else if (!(&result)->flat_offsets) {
+      resultobj = PyList_New((&result)->normalized.size());
+      for (size_t i = 0; i < (&result)->normalized.size(); ++i) {
+        PyObject *text = PyList_GET_ITEM(normalized, i);
+        PyObject *obj = PyList_New((&result)->offsets[i].size());
+        for (size_t j = 0; j < (&result)->offsets[i].size(); ++j) {
+          PyList_SET_ITEM(obj, j, PyInt_FromLong(static_cast<long>((&result)->offsets[i][j])));
+        }
+        PyObject *pair = PyTuple_New(2);
+        Py_INCREF(text);
+        PyTuple_SET_ITEM(pair, 0, text);
+        PyTuple_SET_ITEM(pair, 1, obj);
+        PyList_SET_ITEM(resultobj, i, pair);
+      }
+      Py_DECREF(normalized);
+    } else {
+      size_t total = 0;
+      for (const auto &offsets : (&result)->offsets) total += offsets.size();
+      PyObject *offsets_obj = PyByteArray_FromStringAndSize(nullptr, total * sizeof(int64_t));
+      PyObject *splits_obj = PyByteArray_FromStringAndSize(
+        nullptr, ((&result)->offsets.size() + 1) * sizeof(int64_t));
+      if (offsets_obj == nullptr || splits_obj == nullptr) {
+        Py_DECREF(normalized);
+        Py_XDECREF(offsets_obj);
+        Py_XDECREF(splits_obj);
+        SWIG_fail;
+      }
+      int64_t *offsets_data = reinterpret_cast<int64_t *>(PyByteArray_AS_STRING(offsets_obj));
+      int64_t *splits_data = reinterpret_cast<int64_t *>(PyByteArray_AS_STRING(splits_obj));
+      int64_t split = 0;
+      splits_data[0] = 0;
+      for (size_t i = 0; i < (&result)->offsets.size(); ++i) {
+        std::copy((&result)->offsets[i].begin(), (&result)->offsets[i].end(), offsets_data + split);
+        split += (&result)->offsets[i].size();
+        splits_data[i + 1] = split;
+      }
+      resultobj = PyTuple_Pack(3, normalized, offsets_obj, splits_obj);
+      Py_DECREF(normalized);
+      Py_DECREF(offsets_obj);
+      Py_DECREF(splits_obj);
+    }
+  }
+  {
+    delete arg2;
+  }
+  return resultobj;
+fail:
+  {
+    delete arg2;
+  }
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__CalculateEntropy(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  absl::string_view arg2 ;
+  float arg3 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  float val3 ;
+  int ecode3 = 0 ;
+  PyObject *swig_obj[3] ;
+  float result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__CalculateEntropy", 3, 3, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__CalculateEntropy" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    const PyInputString ustring(swig_obj[1]);
+    if (!ustring.IsAvalable()) {
+      PyErr_SetString(PyExc_TypeError, "not a string");
+      SWIG_fail;
+    }
+    resultobj = ustring.input_type();
+    arg2 = ustring.str();
+  }
+  ecode3 = SWIG_AsVal_float(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "SentencePieceProcessor__CalculateEntropy" "', argument " "3"" of type '" "float""'");
+  } 
+  arg3 = static_cast< float >(val3);
+  {
+    try {
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = (float)sentencepiece_SentencePieceProcessor__CalculateEntropy(arg1,SWIG_STD_MOVE(arg2),arg3);
+      }
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  resultobj = SWIG_From_float(static_cast< float >(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__CalculateEntropyBatch(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  std::vector< absl::string_view > *arg2 = 0 ;
+  float arg3 ;
+  int arg4 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
+  float val3 ;
+  int ecode3 = 0 ;
+  int val4 ;
+  int ecode4 = 0 ;
+  PyObject *swig_obj[4] ;
+  std::vector< float > result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__CalculateEntropyBatch", 4, 4, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__CalculateEntropyBatch" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    std::vector<absl::string_view> *out = nullptr;
+    if (PyList_Check(swig_obj[1])) {
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
+      out = new std::vector<absl::string_view>(size);
+      for (size_t i = 0; i < size; ++i) {
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
+        if (ustring.IsAvalable()) {
+          (*out)[i] = ustring.str();
+        } else {
+          PyErr_SetString(PyExc_TypeError, "list must contain strings");
+          SWIG_fail;
+        }
+        resultobj = ustring.input_type();
+      }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
+    } else {
+      PyErr_SetString(PyExc_TypeError, "not a list");
+      SWIG_fail;
+    }
+    arg2 = out;
+  }
+  ecode3 = SWIG_AsVal_float(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "SentencePieceProcessor__CalculateEntropyBatch" "', argument " "3"" of type '" "float""'");
+  } 
+  arg3 = static_cast< float >(val3);
+  ecode4 = SWIG_AsVal_int(swig_obj[3], &val4);
+  if (!SWIG_IsOK(ecode4)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode4), "in method '" "SentencePieceProcessor__CalculateEntropyBatch" "', argument " "4"" of type '" "int""'");
+  } 
+  arg4 = static_cast< int >(val4);
+  {
+    try {
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceProcessor__CalculateEntropyBatch(arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4);
+      }
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    resultobj = PyList_New((&result)->size());
+    for (size_t i = 0; i < (&result)->size(); ++i) {
+      PyList_SET_ITEM(resultobj, i, PyFloat_FromDouble(static_cast<double>(result[i])));
+    }
+  }
+  {
+    delete arg2;
+  }
+  return resultobj;
+fail:
+  {
+    delete arg2;
+  }
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceProcessor__OverrideNormalizerSpec(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
+  std::unordered_map< std::string,std::string > *arg2 = 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[2] ;
+  sentencepiece::util::Status result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__OverrideNormalizerSpec", 2, 2, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__OverrideNormalizerSpec" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
+  {
+    std::unordered_map<std::string, std::string> *out = nullptr;
+    if (PyDict_Check(swig_obj[1])) {
+      PyObject *key, *value;
+      Py_ssize_t pos = 0;
+      out = new std::unordered_map<std::string, std::string>;
+      while (PyDict_Next(swig_obj[1], &pos, &key, &value)) {
+        const PyInputString key_ustring(key);
+        const PyInputString value_ustring(value);
+        if (key_ustring.IsAvalable() && value_ustring.IsAvalable()) {
+          out->emplace(std::string(key_ustring.data(), key_ustring.size()),
+            std::string(value_ustring.data(), value_ustring.size()));
+        } else {
+          PyErr_SetString(PyExc_TypeError, "map must contain strings.");
+          SWIG_fail;
+        }
+        resultobj = key_ustring.input_type();
+      }
+    } else {
+      PyErr_SetString(PyExc_TypeError, "not a dictionary");
+      SWIG_fail;
+    }
+    arg2 = out;
+  }
+  {
+    try {
+      std::unique_lock<std::shared_mutex> lock(*arg1->mutex(), std::defer_lock);
+      {
+        ScopedGILRelease release_gil;
+        lock.lock();
+      }
+      result = sentencepiece_SentencePieceProcessor__OverrideNormalizerSpec(arg1,(std::unordered_map< std::string,std::string > const &)*arg2);
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    if (!(&result)->ok()) {
+      SWIG_exception(ToSwigError((&result)->code()), (&result)->ToString().c_str());
+    }
+    resultobj = SWIG_From_bool((&result)->ok());
+  }
+  {
+    delete arg2;
+  }
+  return resultobj;
+fail:
+  {
+    delete arg2;
+  }
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *SentencePieceProcessor_swigregister(PyObject *SWIGUNUSEDPARM(self), PyObject *args) {
+  PyObject *obj = NULL;
+  if (!SWIG_Python_UnpackTuple(args, "swigregister", 1, 1, &obj)) return NULL;
+  SWIG_TypeNewClientData(SWIGTYPE_p_sentencepiece__SentencePieceProcessor, SWIG_NewClientData(obj));
+  return SWIG_Py_Void();
+}
+
+SWIGINTERN PyObject *SentencePieceProcessor_swiginit(PyObject *SWIGUNUSEDPARM(self), PyObject *args) {
+  return SWIG_Python_InitShadowInstance(args);
+}
+
+SWIGINTERN PyObject *_wrap_delete_DecodeStream(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::DecodeStream *arg1 = (sentencepiece::DecodeStream *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  
+  (void)self;
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__DecodeStream, SWIG_POINTER_DISOWN |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "delete_DecodeStream" "', argument " "1"" of type '" "sentencepiece::DecodeStream *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::DecodeStream * >(argp1);
+  {
+    try {
+      delete arg1;
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_DecodeStream_Reset(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::DecodeStream *arg1 = (sentencepiece::DecodeStream *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  
+  (void)self;
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__DecodeStream, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "DecodeStream_Reset" "', argument " "1"" of type '" "sentencepiece::DecodeStream *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::DecodeStream * >(argp1);
+  {
+    try {
+      (arg1)->Reset();
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_DecodeStream__Put(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::DecodeStream *arg1 = (sentencepiece::DecodeStream *) 0 ;
+  std::vector< int > *arg2 = 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[2] ;
+  std::string result;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "DecodeStream__Put", 2, 2, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__DecodeStream, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "DecodeStream__Put" "', argument " "1"" of type '" "sentencepiece::DecodeStream *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::DecodeStream * >(argp1);
+  {
+    std::vector<int> *out = nullptr;
+    if (PyList_Check(swig_obj[1])) {
+      const size_t size = PyList_Size(swig_obj[1]);
+      out = new std::vector<int>(size);
+      for (size_t i = 0; i < size; ++i) {
+        PyObject *o = PyList_GetItem(swig_obj[1], i);
+        if (PyInt_Check(o)) {
+          (*out)[i] = static_cast<int>(PyInt_AsLong(o));
+        } else {
+          PyErr_SetString(PyExc_TypeError,"list must contain integers");
+          SWIG_fail;
+        }
+      }
+    } else {
+      PyErr_SetString(PyExc_TypeError,"not a list");
+      SWIG_fail;
+    }
+    arg2 = out;
+  }
+  {
+    try {
+      result = sentencepiece_DecodeStream__Put(arg1,(std::vector< int > const &)*arg2);
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    PyObject *input_type = resultobj;
+    resultobj = MakePyOutputString(result, input_type);
+  }
+  {
+    delete arg2;
+  }
+  return resultobj;
+fail:
+  {
+    delete arg2;
+  }
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_DecodeStream__Finish(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::DecodeStream *arg1 = (sentencepiece::DecodeStream *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  std::string result;
+  
+  (void)self;
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__DecodeStream, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "DecodeStream__Finish" "', argument " "1"" of type '" "sentencepiece::DecodeStream *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::DecodeStream * >(argp1);
+  {
+    try {
+      result = sentencepiece_DecodeStream__Finish(arg1);
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    PyObject *input_type = resultobj;
+    resultobj = MakePyOutputString(result, input_type);
+  }
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *DecodeStream_swigregister(PyObject *SWIGUNUSEDPARM(self), PyObject *args) {
+  PyObject *obj = NULL;
+  if (!SWIG_Python_UnpackTuple(args, "swigregister", 1, 1, &obj)) return NULL;
+  SWIG_TypeNewClientData(SWIGTYPE_p_sentencepiece__DecodeStream, SWIG_NewClientData(obj));
+  return SWIG_Py_Void();
+}
+
+SWIGINTERN PyObject *_wrap_new_IncrementalEncodeState(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::IncrementalEncodeState *result = 0 ;
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "new_IncrementalEncodeState", 0, 0, 0)) SWIG_fail;
+  {
+    try {
+      result = (sentencepiece::IncrementalEncodeState *)new sentencepiece::IncrementalEncodeState();
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  resultobj = SWIG_NewPointerObj(SWIG_as_voidptr(result), SWIGTYPE_p_sentencepiece__IncrementalEncodeState, SWIG_POINTER_NEW |  0 );
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_delete_IncrementalEncodeState(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::IncrementalEncodeState *arg1 = (sentencepiece::IncrementalEncodeState *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  
+  (void)self;
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__IncrementalEncodeState, SWIG_POINTER_DISOWN |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "delete_IncrementalEncodeState" "', argument " "1"" of type '" "sentencepiece::IncrementalEncodeState *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::IncrementalEncodeState * >(argp1);
+  {
+    try {
+      delete arg1;
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_IncrementalEncodeState_input(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::IncrementalEncodeState *arg1 = (sentencepiece::IncrementalEncodeState *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  std::string *result = 0 ;
+  
+  (void)self;
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__IncrementalEncodeState, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "IncrementalEncodeState_input" "', argument " "1"" of type '" "sentencepiece::IncrementalEncodeState const *""'"); 
   }
+  arg1 = reinterpret_cast< sentencepiece::IncrementalEncodeState * >(argp1);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__NormalizeWithOffsets(arg1,SWIG_STD_MOVE(arg2));
+      result = (std::string *) &((sentencepiece::IncrementalEncodeState const *)arg1)->input();
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -8929,14 +12507,7 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__NormalizeWithOffsets(PyObject
   }
   {
     PyObject *input_type = resultobj;
-    if (PyInputString::IsUnicode(input_type)) {
-      sentencepiece::ConvertToUnicodeAlignment(arg2, (&result)->first, &(&result)->second);
-    }
-    PyObject *obj = PyList_New((&result)->second.size());
-    for (size_t i = 0; i < (&result)->second.size(); ++i) {
-      PyList_SET_ITEM(obj, i, PyInt_FromLong(static_cast<long>((&result)->second[i])));
-    }
-    resultobj = PyTuple_Pack(2, MakePyOutputString((&result)->first, input_type), obj);
+    resultobj = MakePyOutputString(*result, input_type);
   }
   return resultobj;
 fail:
@@ -8944,178 +12515,91 @@ fail:
 }
 
 
-SWIGINTERN PyObject *_wrap_SentencePieceProcessor__CalculateEntropy(PyObject *self, PyObject *args) {
+SWIGINTERN PyObject *_wrap_IncrementalEncodeState_normalized(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
-  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
-  absl::string_view arg2 ;
-  float arg3 ;
+  sentencepiece::IncrementalEncodeState *arg1 = (sentencepiece::IncrementalEncodeState *) 0 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  float val3 ;
-  int ecode3 = 0 ;
-  PyObject *swig_obj[3] ;
-  float result;
+  PyObject *swig_obj[1] ;
+  std::string *result = 0 ;
   
   (void)self;
-  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__CalculateEntropy", 3, 3, swig_obj)) SWIG_fail;
-  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__IncrementalEncodeState, 0 |  0 );
   if (!SWIG_IsOK(res1)) {
-    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__CalculateEntropy" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor *""'"); 
-  }
-  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
-  {
-    const PyInputString ustring(swig_obj[1]);
-    if (!ustring.IsAvalable()) {
-      PyErr_SetString(PyExc_TypeError, "not a string");
-      SWIG_fail;
-    }
-    resultobj = ustring.input_type();
-    arg2 = ustring.str();
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "IncrementalEncodeState_normalized" "', argument " "1"" of type '" "sentencepiece::IncrementalEncodeState const *""'"); 
   }
-  ecode3 = SWIG_AsVal_float(swig_obj[2], &val3);
-  if (!SWIG_IsOK(ecode3)) {
-    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "SentencePieceProcessor__CalculateEntropy" "', argument " "3"" of type '" "float""'");
-  } 
-  arg3 = static_cast< float >(val3);
+  arg1 = reinterpret_cast< sentencepiece::IncrementalEncodeState * >(argp1);
   {
     try {
-      result = (float)sentencepiece_SentencePieceProcessor__CalculateEntropy(arg1,SWIG_STD_MOVE(arg2),arg3);
+      result = (std::string *) &((sentencepiece::IncrementalEncodeState const *)arg1)->normalized();
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
       SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
     }
   }
-  resultobj = SWIG_From_float(static_cast< float >(result));
+  {
+    PyObject *input_type = resultobj;
+    resultobj = MakePyOutputString(*result, input_type);
+  }
   return resultobj;
 fail:
   return NULL;
 }
 
 
-SWIGINTERN PyObject *_wrap_SentencePieceProcessor__CalculateEntropyBatch(PyObject *self, PyObject *args) {
+SWIGINTERN PyObject *_wrap_IncrementalEncodeState_Clear(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
-  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
-  std::vector< absl::string_view > *arg2 = 0 ;
-  float arg3 ;
-  int arg4 ;
+  sentencepiece::IncrementalEncodeState *arg1 = (sentencepiece::IncrementalEncodeState *) 0 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  float val3 ;
-  int ecode3 = 0 ;
-  int val4 ;
-  int ecode4 = 0 ;
-  PyObject *swig_obj[4] ;
-  std::vector< float > result;
+  PyObject *swig_obj[1] ;
   
   (void)self;
-  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__CalculateEntropyBatch", 4, 4, swig_obj)) SWIG_fail;
-  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__IncrementalEncodeState, 0 |  0 );
   if (!SWIG_IsOK(res1)) {
-    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__CalculateEntropyBatch" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor *""'"); 
-  }
-  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
-  {
-    std::vector<absl::string_view> *out = nullptr;
-    if (PyList_Check(swig_obj[1])) {
-      const size_t size = PyList_Size(swig_obj[1]);
-      out = new std::vector<absl::string_view>(size);
-      for (size_t i = 0; i < size; ++i) {
-        const PyInputString ustring(PyList_GetItem(swig_obj[1], i));
-        if (ustring.IsAvalable()) {
-          (*out)[i] = ustring.str();
-        } else {
-          PyErr_SetString(PyExc_TypeError, "list must contain strings");
-          SWIG_fail;
-        }
-        resultobj = ustring.input_type();
-      }
-    } else {
-      PyErr_SetString(PyExc_TypeError, "not a list");
-      SWIG_fail;
-    }
-    arg2 = out;
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "IncrementalEncodeState_Clear" "', argument " "1"" of type '" "sentencepiece::IncrementalEncodeState *""'"); 
   }
-  ecode3 = SWIG_AsVal_float(swig_obj[2], &val3);
-  if (!SWIG_IsOK(ecode3)) {
-    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "SentencePieceProcessor__CalculateEntropyBatch" "', argument " "3"" of type '" "float""'");
-  } 
-  arg3 = static_cast< float >(val3);
-  ecode4 = SWIG_AsVal_int(swig_obj[3], &val4);
-  if (!SWIG_IsOK(ecode4)) {
-    SWIG_exception_fail(SWIG_ArgError(ecode4), "in method '" "SentencePieceProcessor__CalculateEntropyBatch" "', argument " "4"" of type '" "int""'");
-  } 
-  arg4 = static_cast< int >(val4);
+  arg1 = reinterpret_cast< sentencepiece::IncrementalEncodeState * >(argp1);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__CalculateEntropyBatch(arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4);
+      (arg1)->Clear();
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
       SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
     }
   }
-  {
-    resultobj = PyList_New((&result)->size());
-    for (size_t i = 0; i < (&result)->size(); ++i) {
-      PyList_SET_ITEM(resultobj, i, PyFloat_FromDouble(static_cast<double>(result[i])));
-    }
-  }
-  {
-    delete arg2;
-  }
+  resultobj = SWIG_Py_Void();
   return resultobj;
 fail:
-  {
-    delete arg2;
-  }
   return NULL;
 }
 
 
-SWIGINTERN PyObject *_wrap_SentencePieceProcessor__OverrideNormalizerSpec(PyObject *self, PyObject *args) {
+SWIGINTERN PyObject *_wrap_IncrementalEncodeState__ids(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
-  sentencepiece::SentencePieceProcessor *arg1 = (sentencepiece::SentencePieceProcessor *) 0 ;
-  std::unordered_map< std::string,std::string > *arg2 = 0 ;
+  sentencepiece::IncrementalEncodeState *arg1 = (sentencepiece::IncrementalEncodeState *) 0 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  PyObject *swig_obj[2] ;
-  sentencepiece::util::Status result;
+  PyObject *swig_obj[1] ;
+  std::vector< int > result;
   
   (void)self;
-  if (!SWIG_Python_UnpackTuple(args, "SentencePieceProcessor__OverrideNormalizerSpec", 2, 2, swig_obj)) SWIG_fail;
-  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceProcessor, 0 |  0 );
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__IncrementalEncodeState, 0 |  0 );
   if (!SWIG_IsOK(res1)) {
-    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceProcessor__OverrideNormalizerSpec" "', argument " "1"" of type '" "sentencepiece::SentencePieceProcessor *""'"); 
-  }
-  arg1 = reinterpret_cast< sentencepiece::SentencePieceProcessor * >(argp1);
-  {
-    std::unordered_map<std::string, std::string> *out = nullptr;
-    if (PyDict_Check(swig_obj[1])) {
-      PyObject *key, *value;
-      Py_ssize_t pos = 0;
-      out = new std::unordered_map<std::string, std::string>;
-      while (PyDict_Next(swig_obj[1], &pos, &key, &value)) {
-        const PyInputString key_ustring(key);
-        const PyInputString value_ustring(value);
-        if (key_ustring.IsAvalable() && value_ustring.IsAvalable()) {
-          out->emplace(std::string(key_ustring.data(), key_ustring.size()),
-            std::string(value_ustring.data(), value_ustring.size()));
-        } else {
-          PyErr_SetString(PyExc_TypeError, "map must contain strings.");
-          SWIG_fail;
-        }
-        resultobj = key_ustring.input_type();
-      }
-    } else {
-      PyErr_SetString(PyExc_TypeError, "not a dictionary");
-      SWIG_fail;
-    }
-    arg2 = out;
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "IncrementalEncodeState__ids" "', argument " "1"" of type '" "sentencepiece::IncrementalEncodeState const *""'"); 
   }
+  arg1 = reinterpret_cast< sentencepiece::IncrementalEncodeState * >(argp1);
   {
     try {
-      result = sentencepiece_SentencePieceProcessor__OverrideNormalizerSpec(arg1,(std::unordered_map< std::string,std::string > const &)*arg2);
+      result = sentencepiece_IncrementalEncodeState__ids((sentencepiece::IncrementalEncodeState const *)arg1);
       ReleaseResultObject(resultobj);
     }
     catch (const sentencepiece::util::Status &status) {
@@ -9123,31 +12607,25 @@ SWIGINTERN PyObject *_wrap_SentencePieceProcessor__OverrideNormalizerSpec(PyObje
     }
   }
   {
-    if (!(&result)->ok()) {
-      SWIG_exception(ToSwigError((&result)->code()), (&result)->ToString().c_str());
+    resultobj = PyList_New((&result)->size());
+    for (size_t i = 0; i < (&result)->size(); ++i) {
+      PyList_SET_ITEM(resultobj, i, PyInt_FromLong(static_cast<long>(result[i])));
     }
-    resultobj = SWIG_From_bool((&result)->ok());
-  }
-  {
-    delete arg2;
   }
   return resultobj;
 fail:
-  {
-    delete arg2;
-  }
   return NULL;
 }
 
 
-SWIGINTERN PyObject *SentencePieceProcessor_swigregister(PyObject *SWIGUNUSEDPARM(self), PyObject *args) {
+SWIGINTERN PyObject *IncrementalEncodeState_swigregister(PyObject *SWIGUNUSEDPARM(self), PyObject *args) {
   PyObject *obj = NULL;
   if (!SWIG_Python_UnpackTuple(args, "swigregister", 1, 1, &obj)) return NULL;
-  SWIG_TypeNewClientData(SWIGTYPE_p_sentencepiece__SentencePieceProcessor, SWIG_NewClientData(obj));
+  SWIG_TypeNewClientData(SWIGTYPE_p_sentencepiece__IncrementalEncodeState, SWIG_NewClientData(obj));
   return SWIG_Py_Void();
 }
 
-SWIGINTERN PyObject *SentencePieceProcessor_swiginit(PyObject *SWIGUNUSEDPARM(self), PyObject *args) {
+SWIGINTERN PyObject *IncrementalEncodeState_swiginit(PyObject *SWIGUNUSEDPARM(self), PyObject *args) {
   return SWIG_Python_InitShadowInstance(args);
 }
 
@@ -9587,6 +13065,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceNormalizer_LoadFromSerializedProto(PyObj
   }
   {
     try {
+      std::unique_lock<std::shared_mutex> lock(*arg1->mutex(), std::defer_lock);
+      {
+        ScopedGILRelease release_gil;
+        lock.lock();
+      }
       result = (arg1)->LoadFromSerializedProto(SWIG_STD_MOVE(arg2));
       ReleaseResultObject(resultobj);
     }
@@ -9633,6 +13116,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceNormalizer_LoadFromRuleTSV(PyObject *sel
   }
   {
     try {
+      std::unique_lock<std::shared_mutex> lock(*arg1->mutex(), std::defer_lock);
+      {
+        ScopedGILRelease release_gil;
+        lock.lock();
+      }
       result = (arg1)->LoadFromRuleTSV(SWIG_STD_MOVE(arg2));
       ReleaseResultObject(resultobj);
     }
@@ -9679,6 +13167,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceNormalizer_LoadFromRuleName(PyObject *se
   }
   {
     try {
+      std::unique_lock<std::shared_mutex> lock(*arg1->mutex(), std::defer_lock);
+      {
+        ScopedGILRelease release_gil;
+        lock.lock();
+      }
       result = (arg1)->LoadFromRuleName(SWIG_STD_MOVE(arg2));
       ReleaseResultObject(resultobj);
     }
@@ -9760,6 +13253,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceNormalizer_LoadFromFile(PyObject *self,
   }
   {
     try {
+      std::unique_lock<std::shared_mutex> lock(*arg1->mutex(), std::defer_lock);
+      {
+        ScopedGILRelease release_gil;
+        lock.lock();
+      }
       result = sentencepiece_SentencePieceNormalizer_LoadFromFile(arg1,SWIG_STD_MOVE(arg2));
       ReleaseResultObject(resultobj);
     }
@@ -9866,10 +13364,170 @@ SWIGINTERN PyObject *_wrap_SentencePieceNormalizer__NormalizeWithOffsets(PyObjec
     for (size_t i = 0; i < (&result)->second.size(); ++i) {
       PyList_SET_ITEM(obj, i, PyInt_FromLong(static_cast<long>((&result)->second[i])));
     }
-    resultobj = PyTuple_Pack(2, MakePyOutputString((&result)->first, input_type), obj);
+    resultobj = PyTuple_New(2);
+    PyTuple_SET_ITEM(resultobj, 0, MakePyOutputString((&result)->first, input_type));
+    PyTuple_SET_ITEM(resultobj, 1, obj);
+  }
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_SentencePieceNormalizer__NormalizeBatch(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  sentencepiece::SentencePieceNormalizer *arg1 = (sentencepiece::SentencePieceNormalizer *) 0 ;
+  std::vector< absl::string_view > *arg2 = 0 ;
+  int arg3 ;
+  bool arg4 ;
+  bool arg5 ;
+  bool arg6 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyBufferHolder data_buffer2 ;
+  PyBufferHolder offsets_buffer2 ;
+  PyObjectRefs refs2 ;
+  int val3 ;
+  int ecode3 = 0 ;
+  bool val4 ;
+  int ecode4 = 0 ;
+  bool val5 ;
+  int ecode5 = 0 ;
+  PyObject *swig_obj[5] ;
+  NormalizedBatch result;
+  
+  
+  (void)self;
+  if (!SWIG_Python_UnpackTuple(args, "SentencePieceNormalizer__NormalizeBatch", 5, 5, swig_obj)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(swig_obj[0], &argp1,SWIGTYPE_p_sentencepiece__SentencePieceNormalizer, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "SentencePieceNormalizer__NormalizeBatch" "', argument " "1"" of type '" "sentencepiece::SentencePieceNormalizer const *""'"); 
+  }
+  arg1 = reinterpret_cast< sentencepiece::SentencePieceNormalizer * >(argp1);
+  {
+    std::vector<absl::string_view> *out = nullptr;
+    if (PyList_Check(swig_obj[1])) {
+      PyObject *items = refs2.Add(PyList_AsTuple(swig_obj[1]));
+      if (items == nullptr) SWIG_fail;
+      const size_t size = PyTuple_GET_SIZE(items);
+      out = new std::vector<absl::string_view>(size);
+      for (size_t i = 0; i < size; ++i) {
+        const PyInputString ustring(PyTuple_GET_ITEM(items, i));
+        if (ustring.IsAvalable()) {
+          (*out)[i] = ustring.str();
+        } else {
+          PyErr_SetString(PyExc_TypeError, "list must contain strings");
+          SWIG_fail;
+        }
+        resultobj = ustring.input_type();
+      }
+    } else if (PyTuple_Check(swig_obj[1]) && PyTuple_Size(swig_obj[1]) == 2) {
+      // (data, offsets): UTF-8 buffer and int32/int64 offsets. The buffers are
+      // kept alive until the call returns, so no copy of the strings is made.
+      out = new std::vector<absl::string_view>;
+      arg2 = out;
+      if (!data_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 0), PyBUF_C_CONTIGUOUS) ||
+        !offsets_buffer2.Acquire(PyTuple_GET_ITEM(swig_obj[1], 1),
+          PyBUF_C_CONTIGUOUS | PyBUF_FORMAT) ||
+        !SplitByOffsets(data_buffer2.view(), offsets_buffer2.view(), out)) {
+        SWIG_fail;
+      }
+      resultobj = kUnicodeInput;
+    } else {
+      PyErr_SetString(PyExc_TypeError, "not a list");
+      SWIG_fail;
+    }
+    arg2 = out;
+  }
+  ecode3 = SWIG_AsVal_int(swig_obj[2], &val3);
+  if (!SWIG_IsOK(ecode3)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode3), "in method '" "SentencePieceNormalizer__NormalizeBatch" "', argument " "3"" of type '" "int""'");
+  } 
+  arg3 = static_cast< int >(val3);
+  ecode4 = SWIG_AsVal_bool(swig_obj[3], &val4);
+  if (!SWIG_IsOK(ecode4)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode4), "in method '" "SentencePieceNormalizer__NormalizeBatch" "', argument " "4"" of type '" "bool""'");
+  } 
+  arg4 = static_cast< bool >(val4);
+  ecode5 = SWIG_AsVal_bool(swig_obj[4], &val5);
+  if (!SWIG_IsOK(ecode5)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode5), "in method '" "SentencePieceNormalizer__NormalizeBatch" "', argument " "5"" of type '" "bool""'");
+  } 
+  arg5 = static_cast< bool >(val5);
+  {
+    arg6 = PyInputString::IsUnicode(resultobj);
+  }
+  {
+    try {
+      {
+        ScopedGILRelease release_gil;
+        std::shared_lock<std::shared_mutex> lock(*arg1->mutex());
+        result = sentencepiece_SentencePieceNormalizer__NormalizeBatch((sentencepiece::SentencePieceNormalizer const *)arg1,(std::vector< absl::string_view > const &)*arg2,arg3,arg4,arg5,arg6);
+      }
+      ReleaseResultObject(resultobj);
+    }
+    catch (const sentencepiece::util::Status &status) {
+      SWIG_exception(ToSwigError(status.code()), status.ToString().c_str());
+    }
+  }
+  {
+    PyObject *input_type = resultobj;
+    PyObject *normalized = PyList_New((&result)->normalized.size());
+    for (size_t i = 0; i < (&result)->normalized.size(); ++i) {
+      PyList_SET_ITEM(normalized, i, MakePyOutputString((&result)->normalized[i], input_type));
+    }
+    if (!(&result)->with_offsets) {
+      resultobj = normalized;
+    } else if (!(&result)->flat_offsets) {
+      resultobj = PyList_New((&result)->normalized.size());
+      for (size_t i = 0; i < (&result)->normalized.size(); ++i) {
+        PyObject *text = PyList_GET_ITEM(normalized, i);
+        PyObject *obj = PyList_New((&result)->offsets[i].size());
+        for (size_t j = 0; j < (&result)->offsets[i].size(); ++j) {
+          PyList_SET_ITEM(obj, j, PyInt_FromLong(static_cast<long>((&result)->offsets[i][j])));
+        }
+        PyObject *pair = PyTuple_New(2);
+        Py_INCREF(text);
+        PyTuple_SET_ITEM(pair, 0, text);
+        PyTuple_SET_ITEM(pair, 1, obj);
+        PyList_SET_ITEM(resultobj, i, pair);
+      }
+      Py_DECREF(normalized);
+    } else {
+      size_t total = 0;
+      for (const auto &offsets : (&result)->offsets) total += offsets.size();
+      PyObject *offsets_obj = PyByteArray_FromStringAndSize(nullptr, total * sizeof(int64_t));
+      PyObject *splits_obj = PyByteArray_FromStringAndSize(
+        nullptr, ((&result)->offsets.size() + 1) * sizeof(int64_t));
+      if (offsets_obj == nullptr || splits_obj == nullptr) {
+        Py_DECREF(normalized);
+        Py_XDECREF(offsets_obj);
+        Py_XDECREF(splits_obj);
+        SWIG_fail;
+      }
+      int64_t *offsets_data = reinterpret_cast<int64_t *>(PyByteArray_AS_STRING(offsets_obj));
+      int64_t *splits_data = reinterpret_cast<int64_t *>(PyByteArray_AS_STRING(splits_obj));
+      int64_t split = 0;
+      splits_data[0] = 0;
+      for (size_t i = 0; i < (&result)->offsets.size(); ++i) {
+        std::copy((&result)->offsets[i].begin(), (&result)->offsets[i].end(), offsets_data + split);
+        split += (&result)->offsets[i].size();
+        splits_data[i + 1] = split;
+      }
+      resultobj = PyTuple_Pack(3, normalized, offsets_obj, splits_obj);
+      Py_DECREF(normalized);
+      Py_DECREF(offsets_obj);
+      Py_DECREF(splits_obj);
+    }
+  }
+  {
+    delete arg2;
   }
   return resultobj;
 fail:
+  {
+    delete arg2;
+  }
   return NULL;
 }
 
@@ -9908,6 +13566,11 @@ SWIGINTERN PyObject *_wrap_SentencePieceNormalizer__SetProtoField(PyObject *self
   arg3 = static_cast< bool >(val3);
   {
     try {
+      std::unique_lock<std::shared_mutex> lock(*arg1->mutex(), std::defer_lock);
+      {
+        ScopedGILRelease release_gil;
+        lock.lock();
+      }
       sentencepiece_SentencePieceNormalizer__SetProtoField(arg1,SWIG_STD_MOVE(arg2),arg3);
       ReleaseResultObject(resultobj);
     }
@@ -9967,6 +13630,10 @@ fail:
 
 
 static PyMethodDef SwigMethods[] = {
+	 { "SetWorkerPoolSize", _wrap_SetWorkerPoolSize, METH_O, NULL},
+	 { "GetWorkerPoolSize", _wrap_GetWorkerPoolSize, METH_NOARGS, NULL},
+	 { "_ShutdownWorkerPool", _wrap__ShutdownWorkerPool, METH_NOARGS, NULL},
+	 { "_ResetWorkerPoolAfterFork", _wrap__ResetWorkerPoolAfterFork, METH_NOARGS, NULL},
 	 { "new_ImmutableSentencePieceText_ImmutableSentencePiece", _wrap_new_ImmutableSentencePieceText_ImmutableSentencePiece, METH_NOARGS, NULL},
 	 { "delete_ImmutableSentencePieceText_ImmutableSentencePiece", _wrap_delete_ImmutableSentencePieceText_ImmutableSentencePiece, METH_O, NULL},
 	 { "ImmutableSentencePieceText_ImmutableSentencePiece__piece", _wrap_ImmutableSentencePieceText_ImmutableSentencePiece__piece, METH_O, NULL},
@@ -10003,6 +13670,13 @@ static PyMethodDef SwigMethods[] = {
 	 { "SentencePieceProcessor_SetVocabulary", _wrap_SentencePieceProcessor_SetVocabulary, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor_ResetVocabulary", _wrap_SentencePieceProcessor_ResetVocabulary, METH_O, NULL},
 	 { "SentencePieceProcessor_LoadVocabulary", _wrap_SentencePieceProcessor_LoadVocabulary, METH_VARARGS, NULL},
+	 { "SentencePieceProcessor_SetEncodeCacheCapacity", _wrap_SentencePieceProcessor_SetEncodeCacheCapacity, METH_VARARGS, NULL},
+	 { "SentencePieceProcessor_GetEncodeCacheCapacity", _wrap_SentencePieceProcessor_GetEncodeCacheCapacity, METH_O, NULL},
+	 { "SentencePieceProcessor_GetEncodeCacheHits", _wrap_SentencePieceProcessor_GetEncodeCacheHits, METH_O, NULL},
+	 { "SentencePieceProcessor_GetEncodeCacheMisses", _wrap_SentencePieceProcessor_GetEncodeCacheMisses, METH_O, NULL},
+	 { "SentencePieceProcessor_ClearEncodeCache", _wrap_SentencePieceProcessor_ClearEncodeCache, METH_O, NULL},
+	 { "SentencePieceProcessor_SetWordCacheCapacity", _wrap_SentencePieceProcessor_SetWordCacheCapacity, METH_VARARGS, NULL},
+	 { "SentencePieceProcessor_GetWordCacheCapacity", _wrap_SentencePieceProcessor_GetWordCacheCapacity, METH_O, NULL},
 	 { "SentencePieceProcessor_CalculateEntropy", _wrap_SentencePieceProcessor_CalculateEntropy, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor_GetPieceSize", _wrap_SentencePieceProcessor_GetPieceSize, METH_O, NULL},
 	 { "SentencePieceProcessor_PieceToId", _wrap_SentencePieceProcessor_PieceToId, METH_VARARGS, NULL},
@@ -10017,6 +13691,8 @@ static PyMethodDef SwigMethods[] = {
 	 { "SentencePieceProcessor_eos_id", _wrap_SentencePieceProcessor_eos_id, METH_O, NULL},
 	 { "SentencePieceProcessor_pad_id", _wrap_SentencePieceProcessor_pad_id, METH_O, NULL},
 	 { "SentencePieceProcessor_serialized_model_proto", _wrap_SentencePieceProcessor_serialized_model_proto, METH_O, NULL},
+	 { "SentencePieceProcessor_serialized_precompiled_model", _wrap_SentencePieceProcessor_serialized_precompiled_model, METH_O, NULL},
+	 { "SentencePieceProcessor_SavePrecompiled", _wrap_SentencePieceProcessor_SavePrecompiled, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor_LoadFromFile", _wrap_SentencePieceProcessor_LoadFromFile, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor__EncodeAsIds", _wrap_SentencePieceProcessor__EncodeAsIds, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor__EncodeAsPieces", _wrap_SentencePieceProcessor__EncodeAsPieces, METH_VARARGS, NULL},
@@ -10026,9 +13702,14 @@ static PyMethodDef SwigMethods[] = {
 	 { "SentencePieceProcessor__EncodeAsPiecesBatch", _wrap_SentencePieceProcessor__EncodeAsPiecesBatch, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor__EncodeAsSerializedProtoBatch", _wrap_SentencePieceProcessor__EncodeAsSerializedProtoBatch, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor__EncodeAsImmutableProtoBatch", _wrap_SentencePieceProcessor__EncodeAsImmutableProtoBatch, METH_VARARGS, NULL},
+	 { "SentencePieceProcessor__EncodeAsIdsBatchAsBuffer", _wrap_SentencePieceProcessor__EncodeAsIdsBatchAsBuffer, METH_VARARGS, NULL},
+	 { "SentencePieceProcessor__EncodeAsIdsBatchAsPadded", _wrap_SentencePieceProcessor__EncodeAsIdsBatchAsPadded, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor__DecodeIds", _wrap_SentencePieceProcessor__DecodeIds, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor__DecodeIdsAsBytes", _wrap_SentencePieceProcessor__DecodeIdsAsBytes, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor__DecodePieces", _wrap_SentencePieceProcessor__DecodePieces, METH_VARARGS, NULL},
+	 { "SentencePieceProcessor__NewDecodeStream", _wrap_SentencePieceProcessor__NewDecodeStream, METH_O, NULL},
+	 { "SentencePieceProcessor__SetParallelEncode", _wrap_SentencePieceProcessor__SetParallelEncode, METH_VARARGS, NULL},
+	 { "SentencePieceProcessor__EncodeAppended", _wrap_SentencePieceProcessor__EncodeAppended, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor__DecodeIdsAsSerializedProto", _wrap_SentencePieceProcessor__DecodeIdsAsSerializedProto, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor__DecodePiecesAsSerializedProto", _wrap_SentencePieceProcessor__DecodePiecesAsSerializedProto, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor__DecodeIdsAsImmutableProto", _wrap_SentencePieceProcessor__DecodeIdsAsImmutableProto, METH_VARARGS, NULL},
@@ -10048,13 +13729,35 @@ static PyMethodDef SwigMethods[] = {
 	 { "SentencePieceProcessor__SampleEncodeAndScoreAsPieces", _wrap_SentencePieceProcessor__SampleEncodeAndScoreAsPieces, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProto", _wrap_SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProto, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProto", _wrap_SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProto, METH_VARARGS, NULL},
+	 { "SentencePieceProcessor__NBestEncodeAsIdsBatch", _wrap_SentencePieceProcessor__NBestEncodeAsIdsBatch, METH_VARARGS, NULL},
+	 { "SentencePieceProcessor__NBestEncodeAsPiecesBatch", _wrap_SentencePieceProcessor__NBestEncodeAsPiecesBatch, METH_VARARGS, NULL},
+	 { "SentencePieceProcessor__NBestEncodeAsSerializedProtoBatch", _wrap_SentencePieceProcessor__NBestEncodeAsSerializedProtoBatch, METH_VARARGS, NULL},
+	 { "SentencePieceProcessor__NBestEncodeAsImmutableProtoBatch", _wrap_SentencePieceProcessor__NBestEncodeAsImmutableProtoBatch, METH_VARARGS, NULL},
+	 { "SentencePieceProcessor__SampleEncodeAndScoreAsIdsBatch", _wrap_SentencePieceProcessor__SampleEncodeAndScoreAsIdsBatch, METH_VARARGS, NULL},
+	 { "SentencePieceProcessor__SampleEncodeAndScoreAsPiecesBatch", _wrap_SentencePieceProcessor__SampleEncodeAndScoreAsPiecesBatch, METH_VARARGS, NULL},
+	 { "SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProtoBatch", _wrap_SentencePieceProcessor__SampleEncodeAndScoreAsSerializedProtoBatch, METH_VARARGS, NULL},
+	 { "SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProtoBatch", _wrap_SentencePieceProcessor__SampleEncodeAndScoreAsImmutableProtoBatch, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor__Normalize", _wrap_SentencePieceProcessor__Normalize, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor__NormalizeWithOffsets", _wrap_SentencePieceProcessor__NormalizeWithOffsets, METH_VARARGS, NULL},
+	 { "SentencePieceProcessor__NormalizeBatch", _wrap_SentencePieceProcessor__NormalizeBatch, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor__CalculateEntropy", _wrap_SentencePieceProcessor__CalculateEntropy, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor__CalculateEntropyBatch", _wrap_SentencePieceProcessor__CalculateEntropyBatch, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor__OverrideNormalizerSpec", _wrap_SentencePieceProcessor__OverrideNormalizerSpec, METH_VARARGS, NULL},
 	 { "SentencePieceProcessor_swigregister", SentencePieceProcessor_swigregister, METH_O, NULL},
 	 { "SentencePieceProcessor_swiginit", SentencePieceProcessor_swiginit, METH_VARARGS, NULL},
+	 { "delete_DecodeStream", _wrap_delete_DecodeStream, METH_O, NULL},
+	 { "DecodeStream_Reset", _wrap_DecodeStream_Reset, METH_O, NULL},
+	 { "DecodeStream__Put", _wrap_DecodeStream__Put, METH_VARARGS, NULL},
+	 { "DecodeStream__Finish", _wrap_DecodeStream__Finish, METH_O, NULL},
+	 { "DecodeStream_swigregister", DecodeStream_swigregister, METH_O, NULL},
+	 { "new_IncrementalEncodeState", _wrap_new_IncrementalEncodeState, METH_NOARGS, NULL},
+	 { "delete_IncrementalEncodeState", _wrap_delete_IncrementalEncodeState, METH_O, NULL},
+	 { "IncrementalEncodeState_input", _wrap_IncrementalEncodeState_input, METH_O, NULL},
+	 { "IncrementalEncodeState_normalized", _wrap_IncrementalEncodeState_normalized, METH_O, NULL},
+	 { "IncrementalEncodeState_Clear", _wrap_IncrementalEncodeState_Clear, METH_O, NULL},
+	 { "IncrementalEncodeState__ids", _wrap_IncrementalEncodeState__ids, METH_O, NULL},
+	 { "IncrementalEncodeState_swigregister", IncrementalEncodeState_swigregister, METH_O, NULL},
+	 { "IncrementalEncodeState_swiginit", IncrementalEncodeState_swiginit, METH_VARARGS, NULL},
 	 { "SetRandomGeneratorSeed", _wrap_SetRandomGeneratorSeed, METH_O, NULL},
 	 { "SetMinLogLevel", _wrap_SetMinLogLevel, METH_O, NULL},
 	 { "SentencePieceTrainer__TrainFromString", _wrap_SentencePieceTrainer__TrainFromString, METH_O, NULL},
@@ -10072,6 +13775,7 @@ static PyMethodDef SwigMethods[] = {
 	 { "SentencePieceNormalizer_LoadFromFile", _wrap_SentencePieceNormalizer_LoadFromFile, METH_VARARGS, NULL},
 	 { "SentencePieceNormalizer__Normalize", _wrap_SentencePieceNormalizer__Normalize, METH_VARARGS, NULL},
 	 { "SentencePieceNormalizer__NormalizeWithOffsets", _wrap_SentencePieceNormalizer__NormalizeWithOffsets, METH_VARARGS, NULL},
+	 { "SentencePieceNormalizer__NormalizeBatch", _wrap_SentencePieceNormalizer__NormalizeBatch, METH_VARARGS, NULL},
 	 { "SentencePieceNormalizer__SetProtoField", _wrap_SentencePieceNormalizer__SetProtoField, METH_VARARGS, NULL},
 	 { "SentencePieceNormalizer_swigregister", SentencePieceNormalizer_swigregister, METH_O, NULL},
 	 { "SentencePieceNormalizer_swiginit", SentencePieceNormalizer_swiginit, METH_VARARGS, NULL},
@@ -10082,11 +13786,14 @@ static PyMethodDef SwigMethods[] = {
 
 /* -------- TYPE CONVERSION AND EQUIVALENCE RULES (BEGIN) -------- */
 
+static swig_type_info _swigt__p_ParallelForFunc = {"_p_ParallelForFunc", "ParallelForFunc *", 0, 0, (void*)0, 0};
 static swig_type_info _swigt__p_char = {"_p_char", "char *", 0, 0, (void*)0, 0};
 static swig_type_info _swigt__p_float = {"_p_float", "float *", 0, 0, (void*)0, 0};
+static swig_type_info _swigt__p_sentencepiece__DecodeStream = {"_p_sentencepiece__DecodeStream", "sentencepiece::DecodeStream *", 0, 0, (void*)0, 0};
 static swig_type_info _swigt__p_sentencepiece__ImmutableNBestSentencePieceText = {"_p_sentencepiece__ImmutableNBestSentencePieceText", "sentencepiece::ImmutableNBestSentencePieceText *", 0, 0, (void*)0, 0};
 static swig_type_info _swigt__p_sentencepiece__ImmutableSentencePieceText = {"_p_sentencepiece__ImmutableSentencePieceText", "sentencepiece::ImmutableSentencePieceText *", 0, 0, (void*)0, 0};
 static swig_type_info _swigt__p_sentencepiece__ImmutableSentencePieceText_ImmutableSentencePiece = {"_p_sentencepiece__ImmutableSentencePieceText_ImmutableSentencePiece", "sentencepiece::ImmutableSentencePieceText_ImmutableSentencePiece *", 0, 0, (void*)0, 0};
+static swig_type_info _swigt__p_sentencepiece__IncrementalEncodeState = {"_p_sentencepiece__IncrementalEncodeState", "sentencepiece::IncrementalEncodeState *", 0, 0, (void*)0, 0};
 static swig_type_info _swigt__p_sentencepiece__SentenceIterator = {"_p_sentencepiece__SentenceIterator", "sentencepiece::SentenceIterator *", 0, 0, (void*)0, 0};
 static swig_type_info _swigt__p_sentencepiece__SentencePieceNormalizer = {"_p_sentencepiece__SentencePieceNormalizer", "sentencepiece::SentencePieceNormalizer *", 0, 0, (void*)0, 0};
 static swig_type_info _swigt__p_sentencepiece__SentencePieceProcessor = {"_p_sentencepiece__SentencePieceProcessor", "sentencepiece::SentencePieceProcessor *", 0, 0, (void*)0, 0};
@@ -10099,11 +13806,14 @@ static swig_type_info _swigt__p_std__vectorT_std__vectorT_absl__string_view_t_t
 static swig_type_info _swigt__p_std__vectorT_std__vectorT_int_t_t = {"_p_std__vectorT_std__vectorT_int_t_t", "std::vector< std::vector< int > > *", 0, 0, (void*)0, 0};
 
 static swig_type_info *swig_type_initial[] = {
+  &_swigt__p_ParallelForFunc,
   &_swigt__p_char,
   &_swigt__p_float,
+  &_swigt__p_sentencepiece__DecodeStream,
   &_swigt__p_sentencepiece__ImmutableNBestSentencePieceText,
   &_swigt__p_sentencepiece__ImmutableSentencePieceText,
   &_swigt__p_sentencepiece__ImmutableSentencePieceText_ImmutableSentencePiece,
+  &_swigt__p_sentencepiece__IncrementalEncodeState,
   &_swigt__p_sentencepiece__SentenceIterator,
   &_swigt__p_sentencepiece__SentencePieceNormalizer,
   &_swigt__p_sentencepiece__SentencePieceProcessor,
@@ -10116,11 +13826,14 @@ static swig_type_info *swig_type_initial[] = {
   &_swigt__p_std__vectorT_std__vectorT_int_t_t,
 };
 
+static swig_cast_info _swigc__p_ParallelForFunc[] = {  {&_swigt__p_ParallelForFunc, 0, 0, 0},{0, 0, 0, 0}};
 static swig_cast_info _swigc__p_char[] = {  {&_swigt__p_char, 0, 0, 0},{0, 0, 0, 0}};
 static swig_cast_info _swigc__p_float[] = {  {&_swigt__p_float, 0, 0, 0},{0, 0, 0, 0}};
+static swig_cast_info _swigc__p_sentencepiece__DecodeStream[] = {  {&_swigt__p_sentencepiece__DecodeStream, 0, 0, 0},{0, 0, 0, 0}};
 static swig_cast_info _swigc__p_sentencepiece__ImmutableNBestSentencePieceText[] = {  {&_swigt__p_sentencepiece__ImmutableNBestSentencePieceText, 0, 0, 0},{0, 0, 0, 0}};
 static swig_cast_info _swigc__p_sentencepiece__ImmutableSentencePieceText[] = {  {&_swigt__p_sentencepiece__ImmutableSentencePieceText, 0, 0, 0},{0, 0, 0, 0}};
 static swig_cast_info _swigc__p_sentencepiece__ImmutableSentencePieceText_ImmutableSentencePiece[] = {  {&_swigt__p_sentencepiece__ImmutableSentencePieceText_ImmutableSentencePiece, 0, 0, 0},{0, 0, 0, 0}};
+static swig_cast_info _swigc__p_sentencepiece__IncrementalEncodeState[] = {  {&_swigt__p_sentencepiece__IncrementalEncodeState, 0, 0, 0},{0, 0, 0, 0}};
 static swig_cast_info _swigc__p_sentencepiece__SentenceIterator[] = {  {&_swigt__p_sentencepiece__SentenceIterator, 0, 0, 0},{0, 0, 0, 0}};
 static swig_cast_info _swigc__p_sentencepiece__SentencePieceNormalizer[] = {  {&_swigt__p_sentencepiece__SentencePieceNormalizer, 0, 0, 0},{0, 0, 0, 0}};
 static swig_cast_info _swigc__p_sentencepiece__SentencePieceProcessor[] = {  {&_swigt__p_sentencepiece__SentencePieceProcessor, 0, 0, 0},{0, 0, 0, 0}};
@@ -10133,11 +13846,14 @@ static swig_cast_info _swigc__p_std__vectorT_std__vectorT_absl__string_view_t_t[
 static swig_cast_info _swigc__p_std__vectorT_std__vectorT_int_t_t[] = {  {&_swigt__p_std__vectorT_std__vectorT_int_t_t, 0, 0, 0},{0, 0, 0, 0}};
 
 static swig_cast_info *swig_cast_initial[] = {
+  _swigc__p_ParallelForFunc,
   _swigc__p_char,
   _swigc__p_float,
+  _swigc__p_sentencepiece__DecodeStream,
   _swigc__p_sentencepiece__ImmutableNBestSentencePieceText,
   _swigc__p_sentencepiece__ImmutableSentencePieceText,
   _swigc__p_sentencepiece__ImmutableSentencePieceText_ImmutableSentencePiece,
+  _swigc__p_sentencepiece__IncrementalEncodeState,
   _swigc__p_sentencepiece__SentenceIterator,
   _swigc__p_sentencepiece__SentencePieceNormalizer,
   _swigc__p_sentencepiece__SentencePieceProcessor,
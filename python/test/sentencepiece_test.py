@@ -15,6 +15,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.!
 
+import array
+import asyncio
 from collections import defaultdict
 import io
 import os
@@ -720,6 +722,39 @@ class TestSentencepieceProcessor(unittest.TestCase):
     sp.sample_encode_and_score_as_immutable_proto(text, 10)
     sp.sample_encode_and_score_as_serialized_proto(text, 10)
 
+  def test_nbest_batch(self):
+    sp = self.sp_
+    with open(os.path.join(data_dir, 'botchan.txt'), 'r') as file:
+      texts = [line.strip() for line in file.readlines()[1:201]]
+
+    for out_type in [str, int, 'serialized_proto', 'immutable_proto']:
+      r1 = [sp.nbest_encode(s, nbest_size=5, out_type=out_type) for s in texts]
+      for num_threads in [1, 4]:
+        r2 = sp.nbest_encode(
+            texts, nbest_size=5, out_type=out_type, num_threads=num_threads
+        )
+        self.assertEqual(r1, r2)
+
+      r1 = sp.sample_encode_and_score(texts, num_samples=3, out_type=out_type)
+      self.assertEqual(len(r1), len(texts))
+      if out_type in [str, int]:
+        for text, samples in zip(texts, r1):
+          self.assertEqual(len(samples), 3)
+          for n in samples:
+            self.assertEqual(
+                sp.decode(n[0]), sp.decode(sp.encode(text, out_type=out_type))
+            )
+            self.assertEqual(type(n[1]), float)
+
+    r1 = sp.nbest_encode(texts, nbest_size=5, add_bos=True, reverse=True)
+    r2 = [sp.nbest_encode(s, nbest_size=5, add_bos=True, reverse=True)
+          for s in texts]
+    self.assertEqual(r1, r2)
+
+    with self.assertRaises(RuntimeError):
+      sp.nbest_encode(texts, nbest_size=5, add_bos=True,
+                      out_type='immutable_proto', num_threads=4)
+
   def test_valid_range(self):
     size = self.sp_.piece_size()
     funcs = [
@@ -778,6 +813,423 @@ class TestSentencepieceProcessor(unittest.TestCase):
     self.assertEqual(e1, e2)
     self.assertEqual(e1, e3)
 
+  def test_batch_buffer(self):
+    sp = self.sp_
+    texts = ['hello world', '', 'I have a pen.']
+    expected = sp.encode(texts, out_type=int, add_bos=True, reverse=True)
+
+    ids, offsets = sp.encode(
+        texts, out_type='buffer', add_bos=True, reverse=True
+    )
+    self.assertEqual(type(ids), memoryview)
+    self.assertEqual(ids.itemsize, 4)
+    self.assertEqual(offsets.itemsize, 8)
+    self.assertEqual(len(offsets), len(texts) + 1)
+    self.assertEqual(
+        [ids[offsets[i] : offsets[i + 1]].tolist() for i in range(len(texts))],
+        expected,
+    )
+
+    ids = sp.encode(texts[0], out_type='buffer')
+    self.assertEqual(ids.tolist(), sp.encode(texts[0]))
+
+    ids, offsets = sp.encode([], out_type='buffer')
+    self.assertEqual(len(ids), 0)
+    self.assertEqual(offsets.tolist(), [0])
+
+    try:
+      import numpy as np
+    except ImportError:
+      return
+
+    ids, offsets = sp.encode(texts, out_type='numpy', num_threads=2)
+    self.assertEqual(ids.dtype, np.int32)
+    self.assertEqual(offsets.dtype, np.int64)
+    self.assertEqual(
+        [ids[offsets[i] : offsets[i + 1]].tolist() for i in range(len(texts))],
+        sp.encode(texts),
+    )
+
+  def test_padding(self):
+    sp = self.sp_
+    texts = ['hello world', '', 'I have a pen.']
+    ids = sp.encode(texts, add_bos=True, add_eos=True)
+    pad_id = max(sp.pad_id(), 0)
+    longest = max(len(x) for x in ids)
+
+    padded, mask = sp.encode(
+        texts, add_bos=True, add_eos=True, padding='longest'
+    )
+    self.assertEqual(
+        padded, [x + [pad_id] * (longest - len(x)) for x in ids]
+    )
+    self.assertEqual(mask, [[1] * len(x) + [0] * (longest - len(x)) for x in ids])
+
+    padded, mask = sp.encode(
+        texts, add_bos=True, add_eos=True, padding='max_length', max_length=20
+    )
+    self.assertEqual(padded, [x + [pad_id] * (20 - len(x)) for x in ids])
+    self.assertEqual(mask, [[1] * len(x) + [0] * (20 - len(x)) for x in ids])
+
+    # truncation keeps <s> and </s>.
+    padded, mask = sp.encode(
+        texts,
+        add_bos=True,
+        add_eos=True,
+        padding='max_length',
+        max_length=4,
+        truncation=True,
+    )
+    self.assertEqual(padded[0], ids[0][:3] + [sp.eos_id()])
+    self.assertEqual(padded[1], [sp.bos_id(), sp.eos_id(), pad_id, pad_id])
+    self.assertEqual(mask[1], [1, 1, 0, 0])
+
+    self.assertEqual(
+        sp.encode(texts, max_length=2, truncation=True),
+        [x[:2] for x in sp.encode(texts)],
+    )
+    self.assertEqual(
+        sp.encode(texts[0], max_length=2, truncation=True),
+        sp.encode(texts[0])[:2],
+    )
+
+    padded, mask = sp.encode(
+        texts, out_type='buffer', padding='max_length', max_length=8
+    )
+    self.assertEqual(padded.shape, (3, 8))
+    self.assertEqual(mask.shape, (3, 8))
+
+    single = sp.encode(texts[0])
+    padded, mask = sp.encode(texts[0], padding='max_length', max_length=8)
+    self.assertEqual(padded, single + [pad_id] * (8 - len(single)))
+    self.assertEqual(mask, [1] * len(single) + [0] * (8 - len(single)))
+
+    with self.assertRaises(RuntimeError):
+      sp.encode(texts, padding='max_length')
+    with self.assertRaises(RuntimeError):
+      sp.encode(texts, truncation=True)
+    with self.assertRaises(RuntimeError):
+      sp.encode(texts, out_type=str, padding='longest')
+
+    try:
+      import numpy as np
+    except ImportError:
+      return
+
+    padded, mask = sp.encode(
+        texts, out_type='numpy', padding='max_length', max_length=8
+    )
+    self.assertEqual(padded.shape, (3, 8))
+    self.assertEqual(padded.dtype, np.int32)
+    self.assertEqual(mask.sum(), sum(len(x) - 2 for x in ids))
+
+  def test_batch_offsets_input(self):
+    sp = self.sp_
+    texts = ['hello world', '', '吾輩は猫である。', 'I have a pen.']
+    data = ''.join(texts).encode('utf-8')
+    offsets = [0]
+    for text in texts:
+      offsets.append(offsets[-1] + len(text.encode('utf-8')))
+
+    for typecode in ['i', 'q']:
+      input = (data, array.array(typecode, offsets))
+      self.assertEqual(sp.encode(input), sp.encode(texts))
+      self.assertEqual(
+          sp.encode(input, out_type=str), sp.encode(texts, out_type=str)
+      )
+      ids, offs = sp.encode(input, out_type='buffer')
+      self.assertEqual(offs.tolist()[-1], len(ids))
+      padded, _ = sp.encode(input, padding='longest')
+      self.assertEqual(len(padded), len(texts))
+      self.assertEqual(
+          sp.calculate_entropy(input, alpha=1.0),
+          sp.calculate_entropy(texts, alpha=1.0),
+      )
+
+    # sliced buffers (non-zero first offset) are supported.
+    input = (memoryview(data), array.array('i', offsets[1:]))
+    self.assertEqual(sp.encode(input), sp.encode(texts[1:]))
+
+    with self.assertRaises(ValueError):
+      sp.encode((data, array.array('i', [0, len(data) + 1])))
+    with self.assertRaises(ValueError):
+      sp.encode((data, array.array('i', [3, 2])))
+    with self.assertRaises(TypeError):
+      sp.encode((data, array.array('d', [0.0, 1.0])))
+
+    # Tuples of strings are not taken as (data, offsets).
+    for input in [('hello', 'world'), (b'hello', b'world'), ('hello',)]:
+      with self.assertRaisesRegex(TypeError, 'expected list of str'):
+        sp.encode(input)
+      with self.assertRaisesRegex(TypeError, 'expected list of str'):
+        sp.normalize(input)
+      with self.assertRaisesRegex(TypeError, 'expected list of str'):
+        sp.calculate_entropy(input, alpha=1.0)
+
+  def test_worker_pool(self):
+    sp = self.sp_
+    with open(os.path.join(data_dir, 'botchan.txt'), 'r') as file:
+      texts = file.readlines()[:200]
+
+    expected = [sp.encode(s) for s in texts]
+    size = spm.get_worker_pool_size()
+    try:
+      for n in [0, 1, 4]:
+        spm.set_worker_pool_size(n)
+        self.assertEqual(spm.get_worker_pool_size(), n)
+        self.assertEqual(sp.encode(texts, num_threads=8), expected)
+        self.assertEqual(
+            sp.decode(expected, num_threads=8), sp.decode(expected)
+        )
+    finally:
+      spm.set_worker_pool_size(size)
+
+  def test_python_threads(self):
+    sp = self.sp_
+    with open(os.path.join(data_dir, 'botchan.txt'), 'r') as file:
+      texts = file.readlines()[:100]
+
+    ids = sp.encode(texts)
+    pieces = sp.encode(texts, out_type=str)
+    decoded = sp.decode(ids)
+    nbests = [sp.nbest_encode(s, nbest_size=5) for s in texts[:10]]
+    results = {}
+
+    def run(n):
+      results[n] = (
+          [sp.encode(s) for s in texts],
+          sp.encode(texts, out_type=str, num_threads=2),
+          sp.decode(ids),
+          [sp.nbest_encode(s, nbest_size=5) for s in texts[:10]],
+      )
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(8)]
+    for t in threads:
+      t.start()
+    for t in threads:
+      t.join()
+
+    for n in range(8):
+      self.assertEqual(results[n][0], ids)
+      self.assertEqual(results[n][1], pieces)
+      self.assertEqual(results[n][2], decoded)
+      self.assertEqual(results[n][3], nbests)
+
+  def test_python_threads_with_load(self):
+    model_file = os.path.join(HERE, 'test_model.model')
+    sp = spm.SentencePieceProcessor(model_file=model_file)
+    with open(os.path.join(data_dir, 'botchan.txt'), 'r') as file:
+      text = ' '.join(file.readlines()[:2000])
+    ids = sp.encode(text)
+    results = []
+
+    def run():
+      for _ in range(10):
+        results.append(sp.encode(text))
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    for _ in range(20):
+      sp.Load(model_file=model_file)
+    thread.join()
+
+    self.assertEqual(len(results), 10)
+    for result in results:
+      self.assertEqual(result, ids)
+
+  def test_async(self):
+    sp = spm.SentencePieceProcessor(
+        model_file=os.path.join(HERE, 'test_model.model')
+    )
+    texts = ['hello world', 'I have a pen.', 'this is a test']
+    calls = []
+    encode = sp.Encode
+
+    def counting_encode(input, **kwargs):
+      calls.append(input)
+      return encode(input, **kwargs)
+
+    sp.Encode = counting_encode
+
+    async def run():
+      ids = await asyncio.gather(*[sp.encode_async(s) for s in texts])
+      pieces = await asyncio.gather(
+          *[sp.EncodeAsync(s, out_type=str) for s in texts]
+      )
+      batch = await sp.EncodeAsync(texts)
+      decoded = await asyncio.gather(*[sp.DecodeAsync(x) for x in ids])
+      return ids, pieces, batch, decoded
+
+    ids, pieces, batch, decoded = asyncio.run(run())
+    self.assertEqual(ids, encode(texts))
+    self.assertEqual(pieces, encode(texts, out_type=str))
+    self.assertEqual(batch, ids)
+    self.assertEqual(decoded, texts)
+    # concurrent requests with the same options are merged into one call.
+    self.assertEqual(calls, [texts, texts, texts])
+
+    async def run_error():
+      return await sp.EncodeAsync('hello', out_type='foo')
+
+    with self.assertRaises(RuntimeError):
+      asyncio.run(run_error())
+
+    # an invalid request does not fail the others merged into its batch.
+    async def run_partial_error():
+      return await asyncio.gather(
+          sp.DecodeAsync(ids[0]),
+          sp.DecodeAsync([10, 10**6]),
+          return_exceptions=True,
+      )
+
+    decoded, error = asyncio.run(run_partial_error())
+    self.assertEqual(decoded, texts[0])
+    self.assertIsInstance(error, IndexError)
+
+  def test_encode_cache(self):
+    sp = spm.SentencePieceProcessor(
+        model_file=os.path.join('test', 'test_model.model'),
+        encode_cache_capacity=16,
+    )
+    self.assertEqual(sp.get_encode_cache_capacity(), 16)
+    text = 'I saw a girl with a telescope.'
+    ids = self.sp_.encode(text)
+    pieces = self.sp_.encode(text, out_type=str)
+
+    self.assertEqual(sp.encode(text), ids)
+    self.assertEqual(sp.encode(text, add_bos=True), [sp.bos_id()] + ids)
+    self.assertEqual(sp.encode([text, text], out_type=str), [pieces, pieces])
+    self.assertEqual(
+        sp.encode(text, out_type=str, reverse=True), pieces[::-1]
+    )
+    self.assertEqual(sp.get_encode_cache_misses(), 2)
+    self.assertEqual(sp.get_encode_cache_hits(), 3)
+
+    for _ in range(3):
+      sp.encode(text, enable_sampling=True, alpha=0.1, nbest_size=-1)
+    self.assertEqual(sp.get_encode_cache_misses(), 2)
+    self.assertEqual(sp.get_encode_cache_hits(), 3)
+
+    sp.clear_encode_cache()
+    self.assertEqual(sp.get_encode_cache_hits(), 0)
+    self.assertEqual(sp.get_encode_cache_misses(), 0)
+    sp.set_encode_cache_capacity(0)
+    self.assertEqual(sp.encode(text), ids)
+    self.assertEqual(sp.get_encode_cache_misses(), 0)
+    with self.assertRaises(RuntimeError):
+      sp.set_encode_cache_capacity(-1)
+
+  def test_word_cache(self):
+    model = io.BytesIO()
+    spm.SentencePieceTrainer.train(
+        input=os.path.join(data_dir, 'botchan.txt'),
+        model_writer=model,
+        model_type='bpe',
+        vocab_size=1000,
+    )
+    sp1 = spm.SentencePieceProcessor(model_proto=model.getvalue())
+    sp2 = spm.SentencePieceProcessor(
+        model_proto=model.getvalue(), word_cache_capacity=64
+    )
+    self.assertEqual(sp2.get_word_cache_capacity(), 64)
+    with open(os.path.join(data_dir, 'botchan.txt'), 'r') as f:
+      lines = [line.rstrip() for line in f][:200]
+    self.assertEqual(sp1.encode(lines), sp2.encode(lines))
+    self.assertEqual(
+        sp1.encode(lines, out_type=str), sp2.encode(lines, out_type=str)
+    )
+    sp2.set_word_cache_capacity(0)
+    self.assertEqual(sp2.get_word_cache_capacity(), 0)
+
+    # Unigram models already segment in linear time.
+    with self.assertRaises(RuntimeError):
+      self.sp_.set_word_cache_capacity(64)
+
+  def test_decode_stream(self):
+    model = io.BytesIO()
+    spm.SentencePieceTrainer.train(
+        input=os.path.join(data_dir, 'botchan.txt'),
+        model_writer=model,
+        vocab_size=1000,
+        byte_fallback=True,
+    )
+    sp = spm.SentencePieceProcessor(model_proto=model.getvalue())
+    for text in ['I saw a girl with a telescope.', 'これはテストです。']:
+      ids = sp.encode(text)
+      stream = sp.new_decode_stream()
+      outputs = [stream.put(id) for id in ids]
+      outputs.append(stream.finish())
+      self.assertEqual(sp.decode(ids), ''.join(outputs))
+      self.assertEqual(sp.decode(ids), stream.put(ids) + stream.finish())
+
+    # Bytes of an incomplete character are returned once completed.
+    ids = sp.encode('テ')
+    self.assertEqual(len(ids), 4)
+    stream = sp.new_decode_stream()
+    self.assertEqual(stream.put(ids[:3]), '')
+    self.assertEqual(stream.put(ids[3]), 'テ')
+    self.assertEqual(stream.put(ids[1]), '')
+    self.assertEqual(stream.finish(), '�')
+
+    with self.assertRaises(IndexError):
+      stream.put(sp.get_piece_size())
+
+  def test_parallel_encode(self):
+    model = io.BytesIO()
+    spm.SentencePieceTrainer.train(
+        input=os.path.join(data_dir, 'botchan.txt'),
+        model_writer=model,
+        vocab_size=1000,
+        model_type='bpe',
+    )
+    with open(os.path.join(data_dir, 'botchan.txt'), encoding='utf-8') as f:
+      text = f.read()
+    sp1 = spm.SentencePieceProcessor(model_proto=model.getvalue())
+    sp2 = spm.SentencePieceProcessor(
+        model_proto=model.getvalue(), num_threads=4,
+        parallel_encode_chunk_size=1000)
+    self.assertEqual(sp1.encode(text), sp2.encode(text))
+    self.assertEqual(sp1.encode(text, out_type=str),
+                     sp2.encode(text, out_type=str))
+    self.assertEqual(sp1.encode(text, out_type='immutable_proto'),
+                     sp2.encode(text, out_type='immutable_proto'))
+
+  def test_encode_appended(self):
+    state = spm.IncrementalEncodeState()
+    turns = ['Hello, how are you?', '\nI am fine.', ' Thanks', '!']
+    for turn in turns:
+      ids = self.sp_.encode_appended(turn, state)
+      self.assertEqual(self.sp_.encode(state.input()), ids)
+      self.assertEqual(ids, state.ids())
+    self.assertEqual(''.join(turns), state.input())
+    state.clear()
+    self.assertEqual('', state.input())
+    self.assertEqual([], state.ids())
+
+  def test_precompiled(self):
+    tid = threading.get_native_id()
+    model_file = f'precompiled_{tid}.model'
+    self.sp_.SavePrecompiled(model_file)
+    try:
+      sp = spm.SentencePieceProcessor(model_file=model_file)
+      self.assertEqual(
+          self.sp_.serialized_model_proto(), sp.serialized_model_proto()
+      )
+      self.assertEqual(
+          self.sp_.serialized_precompiled_model(),
+          sp.serialized_precompiled_model(),
+      )
+      text = 'I saw a girl with a telescope.'
+      self.assertEqual(self.sp_.encode(text), sp.encode(text))
+      self.assertEqual(
+          self.sp_.encode(text, out_type=str), sp.encode(text, out_type=str)
+      )
+      self.assertEqual(
+          self.sp_.piece_to_id('▁girl'), sp.piece_to_id('▁girl')
+      )
+    finally:
+      os.remove(model_file)
+
   def test_pickle(self):
     tid = threading.get_native_id()
     with open(f'sp_{tid}.pickle', 'wb') as f:
@@ -792,6 +1244,18 @@ class TestSentencepieceProcessor(unittest.TestCase):
 
     self.assertEqual(id1, id2)
 
+    # The pickled state carries the prebuilt index. States holding only the
+    # model proto are still accepted.
+    self.assertEqual(
+        self.sp_.__getstate__(), self.sp_.serialized_precompiled_model()
+    )
+    self.assertEqual(spm.SentencePieceProcessor().__getstate__(), b'')
+    sp = pickle.loads(pickle.dumps(sp))
+    self.assertEqual(sp.encode('hello world.', out_type=int), id1)
+    sp = spm.SentencePieceProcessor()
+    sp.__setstate__(self.sp_.serialized_model_proto())
+    self.assertEqual(sp.encode('hello world.', out_type=int), id1)
+
   def test_global_params(self):
     spm.SetRandomGeneratorSeed(0)
     spm.SetMinLogLevel(2)
@@ -841,6 +1305,46 @@ class TestSentencepieceProcessor(unittest.TestCase):
     self.assertEqual('▁平成', x[1][0])
     self.assertEqual([0, 0, 0, 1], x[1][1])
 
+  def test_normalize_batch(self):
+    sp = spm.SentencePieceProcessor(
+        model_file=os.path.join(HERE, 'test_model.model')
+    )
+    normalizer = spm.SentencePieceNormalizer(
+        model_file=os.path.join(HERE, 'test_model.model')
+    )
+    texts = ['ＫＡＤＯＫＡＷＡABC', '㍻', '', ' hello  world '] * 10
+    for n in [sp, normalizer]:
+      expected = [n.normalize(text, with_offsets=True) for text in texts]
+      for num_threads in [1, 4]:
+        self.assertEqual(
+            [x[0] for x in expected],
+            n.normalize(texts, num_threads=num_threads),
+        )
+        self.assertEqual(
+            expected,
+            n.normalize(texts, with_offsets=True, num_threads=num_threads),
+        )
+
+        normalized, offsets, splits = n.normalize(
+            texts, with_offsets=True, num_threads=num_threads,
+            out_type='buffer')
+        self.assertEqual([x[0] for x in expected], normalized)
+        self.assertEqual(len(texts) + 1, len(splits))
+        for i, (_, expected_offsets) in enumerate(expected):
+          self.assertEqual(expected_offsets,
+                           offsets[splits[i]:splits[i + 1]].tolist())
+
+      # (data, offsets) buffers are accepted as in encode().
+      data = ''.join(texts).encode('utf-8')
+      boundaries = array.array('q', [0])
+      for text in texts:
+        boundaries.append(boundaries[-1] + len(text.encode('utf-8')))
+      self.assertEqual([x[0] for x in expected],
+                       n.normalize((data, boundaries)))
+
+    with self.assertRaises(RuntimeError):
+      sp.normalize(texts, out_type='list')
+
   def test_normalizer(self):
     sp = spm.SentencePieceNormalizer(
         model_file=os.path.join(HERE, 'test_model.model')
@@ -14,9 +14,8 @@
 
 #include "bpe_model.h"
 
-#include <functional>
+#include <algorithm>
 #include <memory>
-#include <queue>
 #include <random>
 #include <utility>
 #include <vector>
@@ -27,81 +26,184 @@
 
 namespace sentencepiece {
 namespace bpe {
+namespace {
+
+struct SymbolPair {
+  int left;     // left index of this pair
+  int right;    // right index of this pair
+  int id;       // id of the merged piece.
+  float score;  // score of this pair. large is better.
+  size_t size;  // length of this piece
+};
+
+class SymbolPairComparator {
+ public:
+  const bool operator()(SymbolPair *h1, SymbolPair *h2) const {
+    return (h1->score < h2->score ||
+            (h1->score == h2->score && h1->left > h2->left));
+  }
+};
+
+struct Symbol {
+  int prev;     // prev index of this symbol. -1 for BOS.
+  int next;     // next index of tihs symbol. -1 for EOS.
+  int id;       // id of this symbol. -1 if it is not a piece.
+  bool freeze;  // this symbol is never be merged.
+  absl::string_view piece;
+};
+
+// Pre-allocates SymbolPair for efficiency.
+constexpr size_t kPreallocateSymbolPairSize = 256;
+
+// Largest number of symbols for which the scratch buffers are kept after
+// SampleEncode() returns.
+constexpr size_t kMaxReusedSymbolSize = 1 << 16;
+
+// Working buffers of SampleEncode(). They are kept per thread and cleared,
+// rather than reallocated, by each call.
+struct EncodeScratch {
+  EncodeScratch() : symbol_pair_allocator(kPreallocateSymbolPairSize) {}
+
+  void Clear() {
+    agenda.clear();
+    symbols.clear();
+    if (!rev_merge.empty()) rev_merge.clear();
+    symbol_pair_allocator.Free();
+  }
+
+  // Releases the buffers grown by an exceptionally long input.
+  void Shrink() {
+    if (symbols.capacity() <= kMaxReusedSymbolSize) return;
+    std::vector<SymbolPair *>().swap(agenda);
+    std::vector<Symbol>().swap(symbols);
+    model::FreeList<SymbolPair> empty_allocator(kPreallocateSymbolPairSize);
+    symbol_pair_allocator.swap(empty_allocator);
+  }
+
+  // Binary heap of the candidate pairs, ordered by SymbolPairComparator.
+  std::vector<SymbolPair *> agenda;
+  std::vector<Symbol> symbols;
+
+  // Reverse merge rules.
+  // key: merged symbol, value: pair of original symbols.
+  absl::flat_hash_map<absl::string_view,
+                      std::pair<absl::string_view, absl::string_view>>
+      rev_merge;
+
+  model::FreeList<SymbolPair> symbol_pair_allocator;
+};
+}  // namespace
 
 Model::Model(const ModelProto &model_proto) {
   model_proto_ = &model_proto;
   InitializePieces();
+  InitializeMerges();
+}
+
+Model::Model(const ModelProto &model_proto, absl::string_view index) {
+  model_proto_ = &model_proto;
+  InitializePieces(&index);
+  if (!status().ok()) return;
+
+  absl::string_view merges;
+  if (!ConsumeIndexSection(&index, &merges) || !index.empty() ||
+      !merges_.Load(merges, model_proto_->pieces_size())) {
+    status_ = util::InternalError("invalid merge index.");
+  }
 }
 
 Model::~Model() {}
 
+void Model::InitializeMerges() {
+  merges_.Reset(0);
+  if (!status().ok()) return;
+
+  // Registers every split of a piece into two pieces, so that a merge is
+  // found from the ids of its symbols without hashing their surface. The
+  // surface of the merged piece is the concatenation of the two, so a pair
+  // of ids is never registered twice.
+  std::vector<std::pair<uint64_t, int>> merges;
+  for (int i = 0; i < model_proto_->pieces_size(); ++i) {
+    const absl::string_view piece = model_proto_->pieces(i).piece();
+    if (FindPiece(piece) != i) continue;
+    for (size_t pos = 1; pos < piece.size(); ++pos) {
+      const int left = FindPiece(piece.substr(0, pos));
+      if (left < 0) continue;
+      const int right = FindPiece(piece.substr(pos));
+      if (right < 0) continue;
+      merges.emplace_back(MergeKey(left, right), i);
+    }
+  }
+
+  merges_.Reset(merges.size());
+  for (const auto &it : merges) merges_.Insert(it.first, it.second);
+}
+
+util::bytes Model::SerializeIndex() const {
+  util::bytes index = ModelInterface::SerializeIndex();
+  if (index.empty()) return "";
+  AppendIndexSection(merges_.data(), &index);
+  return index;
+}
+
+EncodeResult Model::Encode(absl::string_view normalized) const {
+  EncodeResult result;
+  if (EncodeWithWordCache(
+          normalized,
+          [this](absl::string_view word) { return SampleEncode(word, 0.0); },
+          &result)) {
+    return result;
+  }
+  return SampleEncode(normalized, 0.0);
+}
+
 std::vector<std::pair<absl::string_view, int>> Model::SampleEncode(
     absl::string_view normalized, float alpha) const {
   if (!status().ok() || normalized.empty()) {
     return {};
   }
 
-  struct SymbolPair {
-    int left;     // left index of this pair
-    int right;    // right index of this pair
-    float score;  // score of this pair. large is better.
-    size_t size;  // length of this piece
-  };
-
-  class SymbolPairComparator {
-   public:
-    const bool operator()(SymbolPair *h1, SymbolPair *h2) {
-      return (h1->score < h2->score ||
-              (h1->score == h2->score && h1->left > h2->left));
-    }
-  };
-
-  struct Symbol {
-    int prev;     // prev index of this symbol. -1 for BOS.
-    int next;     // next index of tihs symbol. -1 for EOS.
-    bool freeze;  // this symbol is never be merged.
-    absl::string_view piece;
-  };
+  thread_local EncodeScratch scratch;
+  scratch.Clear();
 
-  using Agenda = std::priority_queue<SymbolPair *, std::vector<SymbolPair *>,
-                                     SymbolPairComparator>;
-  Agenda agenda;
-  std::vector<Symbol> symbols;
+  auto &agenda = scratch.agenda;
+  auto &symbols = scratch.symbols;
+  auto &rev_merge = scratch.rev_merge;
   symbols.reserve(normalized.size());
 
-  // Reverse merge rules.
-  // key: merged symbol, value: pair of original symbols.
-  absl::flat_hash_map<absl::string_view,
-                      std::pair<absl::string_view, absl::string_view>>
-      rev_merge;
-
-  // Pre-allocates SymbolPair for efficiency.
-  constexpr size_t kPreallocateSymbolPairSize = 256;
-  model::FreeList<SymbolPair> symbol_pair_allocator(kPreallocateSymbolPairSize);
+  const SymbolPairComparator comparator;
 
   // Lookup new symbol pair at [left, right] and inserts it to agenda.
-  auto MaybeAddNewSymbolPair = [this, &symbol_pair_allocator, &symbols, &agenda,
-                                &rev_merge](int left, int right) {
+  auto MaybeAddNewSymbolPair = [this, &comparator](int left, int right) {
+    auto &symbols = scratch.symbols;
     if (left == -1 || right == -1 || symbols[left].freeze ||
         symbols[right].freeze)
       return;
     const absl::string_view piece(
         symbols[left].piece.data(),
         symbols[left].piece.size() + symbols[right].piece.size());
-    const auto it = pieces_.find(piece);
-    if (it == pieces_.end()) {
+    int id = -1;
+    if (symbols[left].id >= 0 && symbols[right].id >= 0) {
+      id = GetMergedId(symbols[left].id, symbols[right].id);
+    } else {
+      // Symbols out of the vocabulary are looked up by their surface.
+      id = FindPiece(piece);
+    }
+    if (id == -1) {
       return;
     }
-    auto *h = symbol_pair_allocator.Allocate();
+    auto *h = scratch.symbol_pair_allocator.Allocate();
     h->left = left;
     h->right = right;
-    h->score = GetScore(it->second);
+    h->id = id;
+    h->score = GetScore(id);
     h->size = piece.size();
-    agenda.push(h);
+    scratch.agenda.push_back(h);
+    std::push_heap(scratch.agenda.begin(), scratch.agenda.end(), comparator);
 
     // Makes `rev_merge` for resegmentation.
-    if (IsUnusedInlined(it->second)) {
-      rev_merge[piece] =
+    if (IsUnusedInlined(id)) {
+      scratch.rev_merge[piece] =
           std::make_pair(symbols[left].piece, symbols[right].piece);
     }
   };
@@ -112,6 +214,7 @@ std::vector<std::pair<absl::string_view, int>> Model::SampleEncode(
     Symbol s;
     const int mblen = matcher_->PrefixMatch(normalized, &s.freeze);
     s.piece = absl::string_view(normalized.data(), mblen);
+    s.id = FindPiece(s.piece);
     s.prev = index == 0 ? -1 : index - 1;
     normalized.remove_prefix(mblen);
     s.next = normalized.empty() ? -1 : index + 1;
@@ -138,10 +241,14 @@ std::vector<std::pair<absl::string_view, int>> Model::SampleEncode(
     return gen(*rand_gen) < alpha;
   };
 
+  // Number of symbols left after the merges.
+  size_t num_symbols = symbols.size();
+
   // Main loop.
   while (!agenda.empty()) {
-    SymbolPair *top = agenda.top();
-    agenda.pop();
+    SymbolPair *top = agenda.front();
+    std::pop_heap(agenda.begin(), agenda.end(), comparator);
+    agenda.pop_back();
 
     // `top` is no longer available.
     if (symbols[top->left].piece.empty() || symbols[top->right].piece.empty() ||
@@ -159,6 +266,7 @@ std::vector<std::pair<absl::string_view, int>> Model::SampleEncode(
     symbols[top->left].piece = absl::string_view(
         symbols[top->left].piece.data(),
         symbols[top->left].piece.size() + symbols[top->right].piece.size());
+    symbols[top->left].id = top->id;
 
     // Updates prev/next pointers.
     symbols[top->left].next = symbols[top->right].next;
@@ -166,16 +274,15 @@ std::vector<std::pair<absl::string_view, int>> Model::SampleEncode(
       symbols[symbols[top->right].next].prev = top->left;
     }
     symbols[top->right].piece = absl::string_view("");
+    --num_symbols;
 
     // Adds new symbol pairs which are newly added after symbol replacement.
     MaybeAddNewSymbolPair(symbols[top->left].prev, top->left);
     MaybeAddNewSymbolPair(top->left, symbols[top->left].next);
   }
 
-  std::function<void(absl::string_view, EncodeResult *)> resegment;
-  resegment = [this, &resegment, &rev_merge](absl::string_view w,
-                                             EncodeResult *output) -> void {
-    const int id = PieceToId(w);
+  auto resegment = [this, &rev_merge](auto &resegment, absl::string_view w,
+                                      int id, EncodeResult *output) -> void {
     if (id == -1 || !IsUnusedInlined(id)) {
       output->emplace_back(w, id);
       return;
@@ -188,17 +295,23 @@ std::vector<std::pair<absl::string_view, int>> Model::SampleEncode(
       return;
     }
     // Recursively resegment left and right symbols.
-    resegment(p->second.first, output);
-    resegment(p->second.second, output);
+    resegment(resegment, p->second.first, PieceToId(p->second.first), output);
+    resegment(resegment, p->second.second, PieceToId(p->second.second),
+              output);
   };
 
   EncodeResult output;
+  output.reserve(num_symbols);
   for (int index = 0; index != -1; index = symbols[index].next) {
     if (index >= 0 && index < static_cast<int>(symbols.size())) {
-      resegment(symbols[index].piece, &output);
+      const Symbol &s = symbols[index];
+      resegment(resegment, s.piece, s.id >= 0 ? s.id : PieceToId(s.piece),
+                &output);
     }
   }
 
+  scratch.Shrink();
+
   return output;
 }
 }  // namespace bpe
@@ -15,6 +15,8 @@
 #ifndef BPE_MODEL_H_
 #define BPE_MODEL_H_
 
+#include <cstdint>
+
 #include "model_interface.h"
 #include "sentencepiece_model.pb.h"
 
@@ -30,11 +32,13 @@ namespace bpe {
 class Model : public ModelInterface {
  public:
   explicit Model(const ModelProto &model_proto);
+
+  // Creates the model with the tables in `index` returned by SerializeIndex().
+  // `index` is not copied and must outlive the model.
+  Model(const ModelProto &model_proto, absl::string_view index);
   ~Model() override;
 
-  EncodeResult Encode(absl::string_view normalized) const override {
-    return SampleEncode(normalized, 0.0);
-  }
+  EncodeResult Encode(absl::string_view normalized) const override;
 
   // Sampling with BPE-dropout: https://arxiv.org/pdf/1910.13267.pdf
   // `alpha` is dropout probability in BPE-dropout paper.
@@ -46,6 +50,39 @@ class Model : public ModelInterface {
   bool IsSampleEncodeAvailable() const override { return true; }
 
   bool IsNBestEncodeAvailable() const override { return false; }
+
+  bool IsWordCacheAvailable() const override { return true; }
+
+  // Merges never cross word boundaries, so the scores are not needed.
+  EncodeResult ResumeEncode(absl::string_view normalized, float prefix_score,
+                            std::vector<float> *scores) const override {
+    auto result = Encode(normalized);
+    scores->assign(result.size(), 0.0);
+    return result;
+  }
+
+  bool IsResumeEncodeAvailable() const override { return true; }
+
+  // Appends the merge table to the tables of ModelInterface.
+  util::bytes SerializeIndex() const override;
+
+ private:
+  // Builds `merges_` from the pieces.
+  void InitializeMerges();
+
+  // Returns the id of the piece made by merging the pieces `left` and
+  // `right`, or -1 if there is no such piece.
+  int GetMergedId(int left, int right) const {
+    return merges_.Find(MergeKey(left, right));
+  }
+
+  static uint64_t MergeKey(int left, int right) {
+    return (static_cast<uint64_t>(left) << 32) | static_cast<uint32_t>(right);
+  }
+
+  // Merge table.
+  // key: MergeKey(left id, right id), value: id of the merged piece.
+  FlatHashTable merges_;
 };
 }  // namespace bpe
 }  // namespace sentencepiece
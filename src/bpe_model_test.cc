@@ -20,6 +20,10 @@
 #include "testharness.h"
 
 namespace sentencepiece {
+
+// Space symbol
+#define WS "\xe2\x96\x81"
+
 namespace bpe {
 namespace {
 
@@ -186,6 +190,59 @@ TEST(BPEModelTest, EncodeAmbiguousTest) {
   EXPECT_EQ(broken_utf8, result[0].first);
 }
 
+TEST(BPEModelTest, MergeTableTest) {
+  ModelProto model_proto = MakeBaseModelProto();
+
+  AddPiece(&model_proto, "a", 0.0);        // 3
+  AddPiece(&model_proto, "b", -0.1);       // 4
+  AddPiece(&model_proto, "ab", -0.2);      // 5
+  AddPiece(&model_proto, "xy", -0.3);      // 6
+  AddPiece(&model_proto, "z", -0.4);       // 7
+  AddPiece(&model_proto, "xyz", -0.5);     // 8
+  AddPiece(&model_proto, "abxyz", -0.6);   // 9
+  AddPiece(&model_proto, "あい", -0.7);    // 10
+  AddPiece(&model_proto, "あ", -0.8);      // 11
+  AddPiece(&model_proto, "い", -0.9);      // 12
+
+  const Model model(model_proto);
+
+  // "x" and "y" are not pieces, so "xy" is found from their surface, and
+  // the following merges from the ids of the pieces.
+  auto result = model.SampleEncode("abxyz", 0.0);
+  ASSERT_EQ(1, result.size());
+  EXPECT_EQ("abxyz", result[0].first);
+  EXPECT_EQ(9, result[0].second);
+
+  result = model.SampleEncode("xyzab", 0.0);
+  ASSERT_EQ(2, result.size());
+  EXPECT_EQ("xyz", result[0].first);
+  EXPECT_EQ(8, result[0].second);
+  EXPECT_EQ("ab", result[1].first);
+  EXPECT_EQ(5, result[1].second);
+
+  result = model.SampleEncode("yxzあいう", 0.0);
+  ASSERT_EQ(5, result.size());
+  EXPECT_EQ("y", result[0].first);
+  EXPECT_EQ(0, result[0].second);
+  EXPECT_EQ("x", result[1].first);
+  EXPECT_EQ("z", result[2].first);
+  EXPECT_EQ("あい", result[3].first);
+  EXPECT_EQ(10, result[3].second);
+  EXPECT_EQ("う", result[4].first);
+  EXPECT_EQ(0, result[4].second);
+
+  // The buffers grown by a long input are not reused by the next call.
+  std::string input;
+  for (int i = 0; i < 100000; ++i) input += "abxyz";
+  result = model.SampleEncode(input, 0.0);
+  ASSERT_EQ(100000, result.size());
+  for (const auto &piece : result) EXPECT_EQ(9, piece.second);
+
+  result = model.SampleEncode("ab", 0.0);
+  ASSERT_EQ(1, result.size());
+  EXPECT_EQ(5, result[0].second);
+}
+
 TEST(BPEModelTest, NotSupportedTest) {
   ModelProto model_proto = MakeBaseModelProto();
   const Model model(model_proto);
@@ -249,6 +306,36 @@ TEST(BPEModelTest, EncodeWithUnusedTest) {
   }
 }
 
+TEST(BPEModelTest, WordCacheTest) {
+  ModelProto model_proto = MakeBaseModelProto();
+  AddPiece(&model_proto, WS "ab", 0.0);  // 3
+  AddPiece(&model_proto, WS "a", -0.1);   // 4
+  AddPiece(&model_proto, WS, -0.2);       // 5
+  AddPiece(&model_proto, "ab", -0.3);     // 6
+  AddPiece(&model_proto, "a", -0.4);      // 7
+  AddPiece(&model_proto, "b", -0.5);      // 8
+  AddPiece(&model_proto, "c", -0.6);      // 9
+  AddPiece(&model_proto, "bc", -0.7);     // 10
+  model_proto.mutable_pieces(10)->set_type(ModelProto::SentencePiece::UNUSED);
+
+  const Model model(model_proto);
+  Model cached_model(model_proto);
+  EXPECT_TRUE(cached_model.SetWordCacheCapacity(2).ok());
+
+  for (const char *text : {"", WS "ab", "ab" WS "abc" WS "ab",
+                           WS WS "ab" WS "bc" WS "ab", WS "x" WS "ab" WS "abc",
+                           WS "ab"}) {
+    for (int i = 0; i < 2; ++i) {
+      EXPECT_EQ(model.Encode(text), cached_model.Encode(text));
+    }
+  }
+
+  ModelProto spanning_model_proto = model_proto;
+  AddPiece(&spanning_model_proto, "b" WS, -0.8);
+  Model spanning_model(spanning_model_proto);
+  EXPECT_FALSE(spanning_model.SetWordCacheCapacity(2).ok());
+}
+
 TEST(SampleModelTest, EncodeTest) {
   ModelProto model_proto = MakeBaseModelProto();
 
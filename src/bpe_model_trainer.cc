@@ -15,11 +15,16 @@
 #include "bpe_model_trainer.h"
 
 #include <algorithm>
+#include <functional>
+#include <limits>
+#include <memory>
 #include <string>
 #include <unordered_set>
+#include <utility>
 #include <vector>
 
 #include "pretokenizer_for_training.h"
+#include "third_party/absl/container/flat_hash_map.h"
 #include "third_party/absl/container/flat_hash_set.h"
 #include "third_party/absl/strings/str_join.h"
 #include "third_party/absl/strings/str_replace.h"
@@ -27,6 +32,28 @@
 
 namespace sentencepiece {
 namespace bpe {
+namespace {
+
+// Runs |func|(n) for n in [0, num_tasks). Tasks run on separate threads if
+// there are more than one.
+void RunTasks(int num_tasks, const std::function<void(int)> &func) {
+  if (num_tasks == 1) {
+    func(0);
+    return;
+  }
+  auto pool = std::make_unique<ThreadPool>(num_tasks);
+  pool->StartWorkers();
+  for (int n = 0; n < num_tasks; ++n) {
+    pool->Schedule([&func, n]() { func(n); });
+  }
+}
+
+// Returns the beginning of the |n|-th of |num_tasks| ranges of [0, size).
+size_t TaskBegin(size_t size, int num_tasks, int n) {
+  return size * n / num_tasks;
+}
+
+}  // namespace
 
 std::string Trainer::Symbol::ToString() const {
   return string_util::UnicodeTextToUTF8(chars);
@@ -117,33 +144,159 @@ int Trainer::GetPrevIndex(int sid, int index) const {
   return -1;
 }
 
-void Trainer::AddNewPair(int sid, int left, int right) {
-  if (left == -1 || right == -1) return;
-  auto *symbol = GetPairSymbol(symbols_[sid][left], symbols_[sid][right]);
-  if (symbol != nullptr) {
-    active_symbols_.insert(symbol);
-    symbol->positions.insert(EncodePos(sid, left, right));
+Trainer::Symbol *Trainer::AddNewPair(const Symbol *left,
+                                     const Symbol *right) {
+  auto *symbol = GetPairSymbol(left, right);
+  if (symbol != nullptr && active_symbols_.insert(symbol).second) {
+    // The frequency is computed when the entry is popped.
+    PushAgenda(symbol, std::numeric_limits<uint64_t>::max());
   }
+  return symbol;
 }
 
-void Trainer::ResetFreq(int sid, int left, int right, const Symbol *best) {
-  if (left == -1 || right == -1) return;
-  auto *symbol = GetPairSymbol(symbols_[sid][left], symbols_[sid][right]);
+void Trainer::ResetFreq(const Symbol *left, const Symbol *right,
+                        const Symbol *best) {
+  auto *symbol = GetPairSymbol(left, right);
   if (symbol != nullptr && symbol != best) {
     symbol->freq = 0;
   }
 }
 
+void Trainer::AddPositions(
+    const std::vector<std::pair<Symbol *, std::vector<uint64_t>>> &positions) {
+  size_t size = 0;
+  for (const auto &it : positions) size += it.second.size();
+
+  // Each symbol is updated by exactly one task.
+  const int num_tasks = NumTasks(size);
+  RunTasks(num_tasks, [&](int n) {
+    for (const auto &it : positions) {
+      if (it.first->fp % num_tasks == static_cast<uint64_t>(n)) {
+        it.first->positions.insert(it.second.begin(), it.second.end());
+      }
+    }
+  });
+}
+
+util::Status Trainer::MergeSymbol(Symbol *best) {
+  // Affected symbols around a merged bigram [left, right].
+  struct Neighbors {
+    int sid;
+    int prev;  // index of the symbol before left, or -1.
+    int left;
+    int next;  // index of the symbol after right, or -1.
+    const Symbol *prev_symbol;
+    const Symbol *left_symbol;
+    const Symbol *right_symbol;
+    const Symbol *next_symbol;
+  };
+
+  // Sentences are merged in parallel. As the positions in a sentence must be
+  // merged in order, task ranges are aligned to the sentence boundaries.
+  const std::vector<uint64_t> positions(best->positions.begin(),
+                                        best->positions.end());
+  const int num_tasks = NumTasks(positions.size());
+  std::vector<size_t> begins(num_tasks + 1, positions.size());
+  begins[0] = 0;
+  for (int n = 1; n < num_tasks; ++n) {
+    size_t i =
+        std::max(begins[n - 1], TaskBegin(positions.size(), num_tasks, n));
+    while (i > 0 && i < positions.size() &&
+           DecodePos(positions[i]).sid == DecodePos(positions[i - 1]).sid) {
+      ++i;
+    }
+    begins[n] = i;
+  }
+
+  std::vector<std::vector<Neighbors>> neighbors(num_tasks);
+  std::vector<char> failed(num_tasks, false);
+  RunTasks(num_tasks, [&](int n) {
+    for (size_t i = begins[n]; i < begins[n + 1]; ++i) {
+      const Position pos = DecodePos(positions[i]);
+      auto &symbols = symbols_[pos.sid];
+
+      if (symbols[pos.left] == nullptr) {
+        // left index might be NULL (set in the previous iteration)
+        // when left_symbol == right_symbol.
+        continue;
+      }
+      if (symbols[pos.right] == nullptr) {
+        failed[n] = true;
+        return;
+      }
+
+      // We have three bigrams [prev, left], [left, right], [right, next],
+      // which are affected with this symbol replacement.
+      const int next = GetNextIndex(pos.sid, pos.right);
+      const int prev = GetPrevIndex(pos.sid, pos.left);
+      neighbors[n].push_back({pos.sid, prev, pos.left, next,
+                              prev == -1 ? nullptr : symbols[prev],
+                              symbols[pos.left], symbols[pos.right],
+                              next == -1 ? nullptr : symbols[next]});
+
+      // Merges two symbols.
+      symbols[pos.left] = best;
+      symbols[pos.right] = nullptr;
+    }
+  });
+  for (const char f : failed) CHECK_OR_RETURN(!f);
+
+  // Updates the bigrams in the order of positions, as new symbols are added
+  // to symbols_cache_ in this order.
+  std::vector<std::pair<Symbol *, std::vector<uint64_t>>> new_positions;
+  absl::flat_hash_map<const Symbol *, size_t> index;
+  auto add_new_pair = [&](int sid, int left, int right,
+                          const Symbol *left_symbol,
+                          const Symbol *right_symbol) {
+    auto *symbol = AddNewPair(left_symbol, right_symbol);
+    if (symbol == nullptr) return;
+    const auto it = index.emplace(symbol, new_positions.size());
+    if (it.second) new_positions.emplace_back(symbol, std::vector<uint64_t>());
+    new_positions[it.first->second].second.push_back(
+        EncodePos(sid, left, right));
+  };
+
+  for (const auto &task_neighbors : neighbors) {
+    for (const auto &nb : task_neighbors) {
+      // Resets the frequencies of bigrams [prev, left] and [right, next].
+      ResetFreq(nb.prev_symbol, nb.left_symbol, best);
+      ResetFreq(nb.right_symbol, nb.next_symbol, best);
+
+      // Makes new symbol bigrams [prev, left] and [left, next].
+      add_new_pair(nb.sid, nb.prev, nb.left, nb.prev_symbol, best);
+      add_new_pair(nb.sid, nb.left, nb.next, best, nb.next_symbol);
+    }
+  }
+
+  AddPositions(new_positions);
+
+  return util::OkStatus();
+}
+
+int Trainer::NumTasks(size_t size) const {
+  // Starting a thread is not worth it for fewer items.
+  constexpr size_t kMinTaskSize = 4096;
+  return std::max<int>(
+      1, std::min<size_t>(trainer_spec_.num_threads(), size / kMinTaskSize));
+}
+
 void Trainer::UpdateActiveSymbols() {
   std::vector<Symbol *> symbols;
   for (auto &it : symbols_cache_) {
     Symbol *symbol = it.second;
     if (symbol->IsBigram()) {
-      ComputeFreq(symbol);
       symbols.push_back(symbol);
     }
   }
 
+  // Each symbol only updates its own frequency and positions.
+  const int num_tasks = NumTasks(symbols.size());
+  RunTasks(num_tasks, [&](int n) {
+    for (size_t i = n; i < symbols.size(); i += num_tasks) {
+      ComputeFreq(symbols[i]);
+    }
+  });
+
   // At least kMinActiveSymbolsSize symbols must be in |active_symbols_|.
   constexpr int kMinActiveSymbolsSize = 1000;
 
@@ -161,6 +314,48 @@ void Trainer::UpdateActiveSymbols() {
 
   active_symbols_.clear();
   active_symbols_.insert(symbols.begin(), symbols.begin() + size);
+
+  agenda_.clear();
+  for (Symbol *symbol : active_symbols_) {
+    agenda_.push_back({symbol->freq, symbol});
+  }
+  std::make_heap(agenda_.begin(), agenda_.end(), IsLessPreferred);
+}
+
+bool Trainer::IsLessPreferred(const AgendaEntry &e1, const AgendaEntry &e2) {
+  if (e1.freq != e2.freq) return e1.freq < e2.freq;
+  const auto &chars1 = e1.symbol->chars;
+  const auto &chars2 = e2.symbol->chars;
+  if (chars1.size() != chars2.size()) return chars1.size() > chars2.size();
+  // Same as comparing the UTF-8 strings, as UTF-8 keeps the order of the
+  // code points.
+  if (chars1 != chars2) return chars1 > chars2;
+  // Prefers the symbol which comes first in |active_symbols_|.
+  return std::less<Symbol *>()(e2.symbol, e1.symbol);
+}
+
+void Trainer::PushAgenda(Symbol *symbol, uint64_t freq) {
+  agenda_.push_back({freq, symbol});
+  std::push_heap(agenda_.begin(), agenda_.end(), IsLessPreferred);
+}
+
+Trainer::Symbol *Trainer::PopBestSymbol() {
+  while (!agenda_.empty()) {
+    const AgendaEntry top = agenda_.front();
+    std::pop_heap(agenda_.begin(), agenda_.end(), IsLessPreferred);
+    agenda_.pop_back();
+    if (active_symbols_.count(top.symbol) == 0) continue;
+
+    // When the frequency is stale, pushes the entry again with the current
+    // one. Otherwise, no other active symbol can be preferred to this.
+    ComputeFreq(top.symbol);
+    if (top.freq != top.symbol->freq) {
+      PushAgenda(top.symbol, top.symbol->freq);
+      continue;
+    }
+    return top.symbol;
+  }
+  return nullptr;
 }
 
 util::Status Trainer::Train() {
@@ -173,6 +368,7 @@ util::Status Trainer::Train() {
   allocated_.clear();
   symbols_cache_.clear();
   active_symbols_.clear();
+  agenda_.clear();
 
   // Load all sentences
   RETURN_IF_ERROR(LoadSentences());
@@ -200,19 +396,75 @@ util::Status Trainer::Train() {
   }
 
   // Initializes symbols_. symbols_[sid][i] stores an unary symbol.
+  // Sentences are processed in parallel, while new symbols are made in the
+  // order of their first occurrence so that the model does not depend on
+  // num_threads.
   symbols_.resize(sentences_.size());
-  for (size_t i = 0; i < sentences_.size(); ++i) {
-    for (const char32 c : string_util::UTF8ToUnicodeText(sentences_[i].first)) {
-      symbols_[i].push_back(GetCharSymbol(c));
+  const int num_tasks = NumTasks(sentences_.size());
+  auto task_end = [&](int n) {
+    return TaskBegin(sentences_.size(), num_tasks, n + 1);
+  };
+
+  std::vector<std::vector<char32>> new_chars(num_tasks);
+  RunTasks(num_tasks, [&](int n) {
+    absl::flat_hash_set<char32> seen;
+    for (size_t i = TaskBegin(sentences_.size(), num_tasks, n); i < task_end(n);
+         ++i) {
+      for (const char32 c :
+           string_util::UTF8ToUnicodeText(sentences_[i].first)) {
+        if (seen.insert(c).second) new_chars[n].push_back(c);
+      }
     }
+  });
+  for (const auto &chars : new_chars) {
+    for (const char32 c : chars) GetCharSymbol(c);
   }
 
+  RunTasks(num_tasks, [&](int n) {
+    for (size_t i = TaskBegin(sentences_.size(), num_tasks, n); i < task_end(n);
+         ++i) {
+      for (const char32 c :
+           string_util::UTF8ToUnicodeText(sentences_[i].first)) {
+        symbols_[i].push_back(port::FindOrDie(symbols_cache_, c));
+      }
+    }
+  });
+
   // Makes all bigram symbols.
-  for (size_t sid = 0; sid < symbols_.size(); ++sid) {
-    for (size_t i = 1; i < symbols_[sid].size(); ++i) {
-      AddNewPair(sid, i - 1, i);
+  struct Bigram {
+    const Symbol *left;
+    const Symbol *right;
+    std::vector<uint64_t> positions;
+  };
+  std::vector<std::vector<Bigram>> bigrams(num_tasks);
+  RunTasks(num_tasks, [&](int n) {
+    absl::flat_hash_map<uint64_t, size_t> index;
+    for (size_t sid = TaskBegin(sentences_.size(), num_tasks, n);
+         sid < task_end(n); ++sid) {
+      for (size_t i = 1; i < symbols_[sid].size(); ++i) {
+        const Symbol *left = symbols_[sid][i - 1];
+        const Symbol *right = symbols_[sid][i];
+        const auto it = index.emplace(port::FingerprintCat(left->fp, right->fp),
+                                      bigrams[n].size());
+        if (it.second) bigrams[n].push_back({left, right, {}});
+        bigrams[n][it.first->second].positions.push_back(
+            EncodePos(sid, i - 1, i));
+      }
+    }
+  });
+
+  std::vector<std::pair<Symbol *, std::vector<uint64_t>>> positions;
+  for (auto &task_bigrams : bigrams) {
+    for (auto &bigram : task_bigrams) {
+      auto *symbol = AddNewPair(bigram.left, bigram.right);
+      if (symbol != nullptr) {
+        positions.emplace_back(symbol, std::move(bigram.positions));
+      }
     }
   }
+  AddPositions(positions);
+  positions.clear();
+  bigrams.clear();
 
   const int vocab_size =
       trainer_spec_.vocab_size() - meta_pieces_.size() - required_chars_.size();
@@ -231,22 +483,10 @@ util::Status Trainer::Train() {
       UpdateActiveSymbols();
     }
 
-    // Scanning active symbols, finds the best_symbol with highest freq.
-    Symbol *best_symbol = nullptr;
-    for (auto &it : active_symbols_) {
-      Symbol *symbol = it;
-      ComputeFreq(symbol);
-      // If the frequency is the same, take shorter symbol.
-      // if the length is the same, use lexicographical comparison
-      if (best_symbol == nullptr ||
-          (symbol->freq > best_symbol->freq ||
-           (symbol->freq == best_symbol->freq &&
-            (symbol->chars.size() < best_symbol->chars.size() ||
-             (symbol->chars.size() == best_symbol->chars.size() &&
-              symbol->ToString() < best_symbol->ToString()))))) {
-        best_symbol = symbol;
-      }
-    }
+    // Finds the best_symbol with highest freq in the active symbols.
+    // If the frequency is the same, take shorter symbol.
+    // if the length is the same, use lexicographical comparison
+    Symbol *best_symbol = PopBestSymbol();
 
     if (best_symbol == nullptr) {
       LOG(WARNING) << "No valid symbol found";
@@ -275,33 +515,7 @@ util::Status Trainer::Train() {
     // Add new bigrams which are created after symbol replacement.
     // We do not need to scan all characters, but scan the neighbors in
     // best_symbol.
-    for (const uint64_t &encoded_pos : best_symbol->positions) {
-      const Position pos = DecodePos(encoded_pos);
-
-      if (symbols_[pos.sid][pos.left] == nullptr) {
-        // left index might be NULL (set in the previous iteration)
-        // when left_symbol == right_symbol.
-        continue;
-      }
-      CHECK_OR_RETURN(symbols_[pos.sid][pos.right]);
-
-      // We have three bigrams [prev, left], [left, right], [right, next],
-      // which are affected with this symbol replacement.
-      const int next = GetNextIndex(pos.sid, pos.right);
-      const int prev = GetPrevIndex(pos.sid, pos.left);
-
-      // Resets the frequencies of bigrams [prev, left] and [right, next].
-      ResetFreq(pos.sid, prev, pos.left, best_symbol);
-      ResetFreq(pos.sid, pos.right, next, best_symbol);
-
-      // Merges two symbols.
-      symbols_[pos.sid][pos.left] = best_symbol;
-      symbols_[pos.sid][pos.right] = nullptr;
-
-      // Makes new symbol bigrams [prev, left] and [left, next].
-      AddNewPair(pos.sid, prev, pos.left);
-      AddNewPair(pos.sid, pos.left, next);
-    }
+    RETURN_IF_ERROR(MergeSymbol(best_symbol));
 
     // Removes best_symbol so it is not selected again.
     symbols_cache_.erase(best_symbol->fp);
@@ -18,6 +18,7 @@
 #include <cstdint>
 #include <limits>
 #include <string>
+#include <utility>
 #include <vector>
 
 #include "sentencepiece_model.pb.h"
@@ -101,24 +102,58 @@ class Trainer : public TrainerInterface {
   // Returns the valid index after symbols_[sid][index].
   int GetPrevIndex(int sid, int index) const;
 
-  // Makes a new bigram from [symbols_[sid][left], symbols_[sid][right]] and
-  // Adds it to symbols_cache_ and active_symbols_.
-  void AddNewPair(int sid, int left, int right);
+  // Makes a new bigram from [left, right] and adds it to symbols_cache_ and
+  // active_symbols_. Returns nullptr if the bigram is not a valid piece.
+  Symbol *AddNewPair(const Symbol *left, const Symbol *right);
 
-  // Resets the fequency of bigram [symbols_[sid][left] symbols_[sid][right]],
-  // if this bigram is not |best|.
-  void ResetFreq(int sid, int left, int right, const Symbol *best);
+  // Resets the fequency of bigram [left, right], if this bigram is not |best|.
+  void ResetFreq(const Symbol *left, const Symbol *right, const Symbol *best);
+
+  // Adds the positions of each symbol in |positions| to symbol->positions.
+  void AddPositions(
+      const std::vector<std::pair<Symbol *, std::vector<uint64_t>>> &positions);
+
+  // Replaces all occurrences of the bigram |best| in symbols_ with |best| and
+  // makes the new bigrams with their neighbors.
+  util::Status MergeSymbol(Symbol *best);
+
+  // Returns the number of parallel tasks to process |size| items.
+  int NumTasks(size_t size) const;
 
   // Updates |active_symbols_| by copying the top 5% frequent symbols in
   // symbols_cache_.
   void UpdateActiveSymbols();
 
+  // Entry of |agenda_|. |freq| is the frequency of |symbol| when the entry
+  // was pushed. As the frequency of a symbol never increases after it is
+  // computed, |freq| is an upper bound of the current one.
+  struct AgendaEntry {
+    uint64_t freq;
+    Symbol *symbol;
+  };
+
+  // Returns true if |e1| is less preferred than |e2|. Higher frequency,
+  // shorter and lexicographically smaller symbols are preferred.
+  static bool IsLessPreferred(const AgendaEntry &e1, const AgendaEntry &e2);
+
+  // Pushes |symbol| to |agenda_| with |freq|.
+  void PushAgenda(Symbol *symbol, uint64_t freq);
+
+  // Returns the most preferred symbol in |active_symbols_|, or nullptr if
+  // there is none.
+  Symbol *PopBestSymbol();
+
   // All unique symbols. Key is a fingerprint of Symbol.
   absl::flat_hash_map<uint64_t, Symbol *> symbols_cache_;
 
   // Set of symbols from which we find the best symbol in each iteration.
   absl::btree_set<Symbol *> active_symbols_;
 
+  // Binary heap of |active_symbols_| ordered by IsLessPreferred(). Entries are
+  // not updated when the frequency changes, but re-pushed when they are
+  // popped with a stale frequency.
+  std::vector<AgendaEntry> agenda_;
+
   // Stores symbols allocated in heap so that we can delete them at onece.
   std::vector<Symbol *> allocated_;
 
@@ -87,6 +87,13 @@ TEST(BPETrainerTest, BasicTest) {
             RunTrainer({"hellohe"}, 20));
   EXPECT_EQ("app le en in ine pen pine ne pe e l n p i",
             RunTrainer({"pen", "pineapple", "apple"}, 20, {"app"}));
+  // Ties are broken by the length and then lexicographically.
+  EXPECT_EQ("yx ab ba xyx xy x a b y",
+            RunTrainer({"yx", "xyx", "ba", "ab"}, 15));
+  // The frequency of "ab" drops from 4 to 1 after "bc" is merged.
+  EXPECT_EQ("bc abc xy ab b c a x y",
+            RunTrainer({"abc", "abc", "abc", "bc", "bc", "ab", "xy", "xy"},
+                       15));
 }
 
 static constexpr char kTestInputData[] = "wagahaiwa_nekodearu.txt";
@@ -134,6 +141,35 @@ TEST(BPETrainerTest, EndToEndTest) {
             absl::StrJoin(tok, " "));
 }
 
+TEST(BPETrainerTest, NumThreadsTest) {
+  const std::string input = util::JoinPath(::testing::SrcDir(), "botchan.txt");
+
+  auto train = [&](int num_threads) {
+    const std::string model_prefix = util::JoinPath(
+        ::testing::TempDir(), absl::StrCat("tmp_model_", num_threads));
+    EXPECT_TRUE(
+        SentencePieceTrainer::Train(
+            absl::StrCat("--model_prefix=", model_prefix, " --input=", input,
+                         " --vocab_size=8000 --model_type=bpe"
+                         " --num_threads=",
+                         num_threads))
+            .ok());
+    SentencePieceProcessor sp;
+    EXPECT_TRUE(sp.Load(model_prefix + ".model").ok());
+    std::vector<std::string> pieces;
+    for (int i = 0; i < sp.GetPieceSize(); ++i) {
+      pieces.emplace_back(sp.IdToPiece(i));
+    }
+    return pieces;
+  };
+
+  // The model does not depend on the number of threads.
+  const auto expected = train(1);
+  EXPECT_EQ(8000, expected.size());
+  EXPECT_EQ(expected, train(4));
+  EXPECT_EQ(expected, train(16));
+}
+
 }  // namespace
 }  // namespace bpe
 }  // namespace sentencepiece
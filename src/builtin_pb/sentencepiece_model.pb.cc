@@ -383,6 +383,12 @@ class TrainerSpec::_Internal {
   static void set_has_pad_id(HasBits* has_bits) {
     (*has_bits)[1] |= 512u;
   }
+  static void set_has_lattice_cache_size(HasBits* has_bits) {
+    (*has_bits)[1] |= 1024u;
+  }
+  static void set_has_seed_sentencepiece_shard_size(HasBits* has_bits) {
+    (*has_bits)[1] |= 2048u;
+  }
   static void set_has_unk_piece(HasBits* has_bits) {
     (*has_bits)[0] |= 16u;
   }
@@ -482,8 +488,8 @@ TrainerSpec::TrainerSpec(const TrainerSpec& from)
       GetArena());
   }
   ::memcpy(&self_test_sample_size_, &from.self_test_sample_size_,
-    static_cast<size_t>(reinterpret_cast<char*>(&pad_id_) -
-    reinterpret_cast<char*>(&self_test_sample_size_)) + sizeof(pad_id_));
+    static_cast<size_t>(reinterpret_cast<char*>(&seed_sentencepiece_shard_size_) -
+    reinterpret_cast<char*>(&self_test_sample_size_)) + sizeof(seed_sentencepiece_shard_size_));
   // @@protoc_insertion_point(copy_constructor:sentencepiece.TrainerSpec)
 }
 
@@ -521,6 +527,8 @@ void TrainerSpec::SharedCtor() {
   bos_id_ = 1;
   eos_id_ = 2;
   pad_id_ = -1;
+  lattice_cache_size_ = PROTOBUF_ULONGLONG(0);
+  seed_sentencepiece_shard_size_ = PROTOBUF_ULONGLONG(0);
 }
 
 TrainerSpec::~TrainerSpec() {
@@ -635,9 +643,11 @@ void TrainerSpec::Clear() {
     hard_vocab_limit_ = true;
     bos_id_ = 1;
   }
-  if (cached_has_bits & 0x00000300u) {
+  if (cached_has_bits & 0x00000f00u) {
     eos_id_ = 2;
     pad_id_ = -1;
+    lattice_cache_size_ = PROTOBUF_ULONGLONG(0);
+    seed_sentencepiece_shard_size_ = PROTOBUF_ULONGLONG(0);
   }
   _has_bits_.Clear();
   _internal_metadata_.Clear<std::string>();
@@ -1042,6 +1052,22 @@ const char* TrainerSpec::_InternalParse(const char* ptr, ::PROTOBUF_NAMESPACE_ID
           CHK_(ptr);
         } else goto handle_unusual;
         continue;
+      // optional uint64 lattice_cache_size = 55 [default = 0];
+      case 55:
+        if (PROTOBUF_PREDICT_TRUE(static_cast<::PROTOBUF_NAMESPACE_ID::uint8>(tag) == 184)) {
+          _Internal::set_has_lattice_cache_size(&_has_bits_);
+          lattice_cache_size_ = ::PROTOBUF_NAMESPACE_ID::internal::ReadVarint64(&ptr);
+          CHK_(ptr);
+        } else goto handle_unusual;
+        continue;
+      // optional uint64 seed_sentencepiece_shard_size = 56 [default = 0];
+      case 56:
+        if (PROTOBUF_PREDICT_TRUE(static_cast<::PROTOBUF_NAMESPACE_ID::uint8>(tag) == 192)) {
+          _Internal::set_has_seed_sentencepiece_shard_size(&_has_bits_);
+          seed_sentencepiece_shard_size_ = ::PROTOBUF_NAMESPACE_ID::internal::ReadVarint64(&ptr);
+          CHK_(ptr);
+        } else goto handle_unusual;
+        continue;
       default: {
       handle_unusual:
         if ((tag & 7) == 4 || tag == 0) {
@@ -1360,6 +1386,19 @@ failure:
         54, this->_internal_seed_sentencepieces_file(), target);
   }
 
+  cached_has_bits = _has_bits_[1];
+  // optional uint64 lattice_cache_size = 55 [default = 0];
+  if (cached_has_bits & 0x00000400u) {
+    target = stream->EnsureSpace(target);
+    target = ::PROTOBUF_NAMESPACE_ID::internal::WireFormatLite::WriteUInt64ToArray(55, this->_internal_lattice_cache_size(), target);
+  }
+
+  // optional uint64 seed_sentencepiece_shard_size = 56 [default = 0];
+  if (cached_has_bits & 0x00000800u) {
+    target = stream->EnsureSpace(target);
+    target = ::PROTOBUF_NAMESPACE_ID::internal::WireFormatLite::WriteUInt64ToArray(56, this->_internal_seed_sentencepiece_shard_size(), target);
+  }
+
   // Extension range [200, 536870912)
   target = _extensions_._InternalSerialize(
       200, 536870912, target, stream);
@@ -1673,7 +1712,7 @@ size_t TrainerSpec::ByteSizeLong() const {
     }
 
   }
-  if (cached_has_bits & 0x00000300u) {
+  if (cached_has_bits & 0x00000f00u) {
     // optional int32 eos_id = 42 [default = 2];
     if (cached_has_bits & 0x00000100u) {
       total_size += 2 +
@@ -1688,6 +1727,20 @@ size_t TrainerSpec::ByteSizeLong() const {
           this->_internal_pad_id());
     }
 
+    // optional uint64 lattice_cache_size = 55 [default = 0];
+    if (cached_has_bits & 0x00000400u) {
+      total_size += 2 +
+        ::PROTOBUF_NAMESPACE_ID::internal::WireFormatLite::UInt64Size(
+          this->_internal_lattice_cache_size());
+    }
+
+    // optional uint64 seed_sentencepiece_shard_size = 56 [default = 0];
+    if (cached_has_bits & 0x00000800u) {
+      total_size += 2 +
+        ::PROTOBUF_NAMESPACE_ID::internal::WireFormatLite::UInt64Size(
+          this->_internal_seed_sentencepiece_shard_size());
+    }
+
   }
   if (PROTOBUF_PREDICT_FALSE(_internal_metadata_.have_unknown_fields())) {
     total_size += _internal_metadata_.unknown_fields<std::string>(::PROTOBUF_NAMESPACE_ID::internal::GetEmptyString).size();
@@ -1851,13 +1904,19 @@ void TrainerSpec::MergeFrom(const TrainerSpec& from) {
     }
     _has_bits_[1] |= cached_has_bits;
   }
-  if (cached_has_bits & 0x00000300u) {
+  if (cached_has_bits & 0x00000f00u) {
     if (cached_has_bits & 0x00000100u) {
       eos_id_ = from.eos_id_;
     }
     if (cached_has_bits & 0x00000200u) {
       pad_id_ = from.pad_id_;
     }
+    if (cached_has_bits & 0x00000400u) {
+      lattice_cache_size_ = from.lattice_cache_size_;
+    }
+    if (cached_has_bits & 0x00000800u) {
+      seed_sentencepiece_shard_size_ = from.seed_sentencepiece_shard_size_;
+    }
     _has_bits_[1] |= cached_has_bits;
   }
 }
@@ -1921,6 +1980,8 @@ void TrainerSpec::InternalSwap(TrainerSpec* other) {
   swap(bos_id_, other->bos_id_);
   swap(eos_id_, other->eos_id_);
   swap(pad_id_, other->pad_id_);
+  swap(lattice_cache_size_, other->lattice_cache_size_);
+  swap(seed_sentencepiece_shard_size_, other->seed_sentencepiece_shard_size_);
 }
 
 std::string TrainerSpec::GetTypeName() const {
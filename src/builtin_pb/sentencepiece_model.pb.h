@@ -307,6 +307,8 @@ class TrainerSpec PROTOBUF_FINAL :
     kBosIdFieldNumber = 41,
     kEosIdFieldNumber = 42,
     kPadIdFieldNumber = 43,
+    kLatticeCacheSizeFieldNumber = 55,
+    kSeedSentencepieceShardSizeFieldNumber = 56,
   };
   // repeated string input = 1;
   int input_size() const;
@@ -1020,6 +1022,32 @@ class TrainerSpec PROTOBUF_FINAL :
   void _internal_set_pad_id(::PROTOBUF_NAMESPACE_ID::int32 value);
   public:
 
+  // optional uint64 lattice_cache_size = 55 [default = 0];
+  bool has_lattice_cache_size() const;
+  private:
+  bool _internal_has_lattice_cache_size() const;
+  public:
+  void clear_lattice_cache_size();
+  ::PROTOBUF_NAMESPACE_ID::uint64 lattice_cache_size() const;
+  void set_lattice_cache_size(::PROTOBUF_NAMESPACE_ID::uint64 value);
+  private:
+  ::PROTOBUF_NAMESPACE_ID::uint64 _internal_lattice_cache_size() const;
+  void _internal_set_lattice_cache_size(::PROTOBUF_NAMESPACE_ID::uint64 value);
+  public:
+
+  // optional uint64 seed_sentencepiece_shard_size = 56 [default = 0];
+  bool has_seed_sentencepiece_shard_size() const;
+  private:
+  bool _internal_has_seed_sentencepiece_shard_size() const;
+  public:
+  void clear_seed_sentencepiece_shard_size();
+  ::PROTOBUF_NAMESPACE_ID::uint64 seed_sentencepiece_shard_size() const;
+  void set_seed_sentencepiece_shard_size(::PROTOBUF_NAMESPACE_ID::uint64 value);
+  private:
+  ::PROTOBUF_NAMESPACE_ID::uint64 _internal_seed_sentencepiece_shard_size() const;
+  void _internal_set_seed_sentencepiece_shard_size(::PROTOBUF_NAMESPACE_ID::uint64 value);
+  public:
+
   GOOGLE_PROTOBUF_EXTENSION_ACCESSORS(TrainerSpec)
   // @@protoc_insertion_point(class_scope:sentencepiece.TrainerSpec)
  private:
@@ -1083,6 +1111,8 @@ class TrainerSpec PROTOBUF_FINAL :
   ::PROTOBUF_NAMESPACE_ID::int32 bos_id_;
   ::PROTOBUF_NAMESPACE_ID::int32 eos_id_;
   ::PROTOBUF_NAMESPACE_ID::int32 pad_id_;
+  ::PROTOBUF_NAMESPACE_ID::uint64 lattice_cache_size_;
+  ::PROTOBUF_NAMESPACE_ID::uint64 seed_sentencepiece_shard_size_;
   friend struct ::TableStruct_sentencepiece_5fmodel_2eproto;
 };
 // -------------------------------------------------------------------
@@ -3519,6 +3549,62 @@ inline void TrainerSpec::set_pad_id(::PROTOBUF_NAMESPACE_ID::int32 value) {
   // @@protoc_insertion_point(field_set:sentencepiece.TrainerSpec.pad_id)
 }
 
+// optional uint64 lattice_cache_size = 55 [default = 0];
+inline bool TrainerSpec::_internal_has_lattice_cache_size() const {
+  bool value = (_has_bits_[1] & 0x00000400u) != 0;
+  return value;
+}
+inline bool TrainerSpec::has_lattice_cache_size() const {
+  return _internal_has_lattice_cache_size();
+}
+inline void TrainerSpec::clear_lattice_cache_size() {
+  lattice_cache_size_ = PROTOBUF_ULONGLONG(0);
+  _has_bits_[1] &= ~0x00000400u;
+}
+inline ::PROTOBUF_NAMESPACE_ID::uint64 TrainerSpec::_internal_lattice_cache_size() const {
+  return lattice_cache_size_;
+}
+inline ::PROTOBUF_NAMESPACE_ID::uint64 TrainerSpec::lattice_cache_size() const {
+  // @@protoc_insertion_point(field_get:sentencepiece.TrainerSpec.lattice_cache_size)
+  return _internal_lattice_cache_size();
+}
+inline void TrainerSpec::_internal_set_lattice_cache_size(::PROTOBUF_NAMESPACE_ID::uint64 value) {
+  _has_bits_[1] |= 0x00000400u;
+  lattice_cache_size_ = value;
+}
+inline void TrainerSpec::set_lattice_cache_size(::PROTOBUF_NAMESPACE_ID::uint64 value) {
+  _internal_set_lattice_cache_size(value);
+  // @@protoc_insertion_point(field_set:sentencepiece.TrainerSpec.lattice_cache_size)
+}
+
+// optional uint64 seed_sentencepiece_shard_size = 56 [default = 0];
+inline bool TrainerSpec::_internal_has_seed_sentencepiece_shard_size() const {
+  bool value = (_has_bits_[1] & 0x00000800u) != 0;
+  return value;
+}
+inline bool TrainerSpec::has_seed_sentencepiece_shard_size() const {
+  return _internal_has_seed_sentencepiece_shard_size();
+}
+inline void TrainerSpec::clear_seed_sentencepiece_shard_size() {
+  seed_sentencepiece_shard_size_ = PROTOBUF_ULONGLONG(0);
+  _has_bits_[1] &= ~0x00000800u;
+}
+inline ::PROTOBUF_NAMESPACE_ID::uint64 TrainerSpec::_internal_seed_sentencepiece_shard_size() const {
+  return seed_sentencepiece_shard_size_;
+}
+inline ::PROTOBUF_NAMESPACE_ID::uint64 TrainerSpec::seed_sentencepiece_shard_size() const {
+  // @@protoc_insertion_point(field_get:sentencepiece.TrainerSpec.seed_sentencepiece_shard_size)
+  return _internal_seed_sentencepiece_shard_size();
+}
+inline void TrainerSpec::_internal_set_seed_sentencepiece_shard_size(::PROTOBUF_NAMESPACE_ID::uint64 value) {
+  _has_bits_[1] |= 0x00000800u;
+  seed_sentencepiece_shard_size_ = value;
+}
+inline void TrainerSpec::set_seed_sentencepiece_shard_size(::PROTOBUF_NAMESPACE_ID::uint64 value) {
+  _internal_set_seed_sentencepiece_shard_size(value);
+  // @@protoc_insertion_point(field_set:sentencepiece.TrainerSpec.seed_sentencepiece_shard_size)
+}
+
 // optional string unk_piece = 45 [default = "<unk>"];
 inline bool TrainerSpec::_internal_has_unk_piece() const {
   bool value = (_has_bits_[0] & 0x00000010u) != 0;
@@ -23,6 +23,14 @@ Model::Model(const ModelProto &model_proto) {
   InitializePieces();
 }
 
+Model::Model(const ModelProto &model_proto, absl::string_view index) {
+  model_proto_ = &model_proto;
+  InitializePieces(&index);
+  if (status().ok() && !index.empty()) {
+    status_ = util::InternalError("invalid piece index.");
+  }
+}
+
 Model::~Model() {}
 
 EncodeResult Model::Encode(absl::string_view normalized) const {
@@ -25,6 +25,10 @@ namespace character {
 class Model : public ModelInterface {
  public:
   explicit Model(const ModelProto &model_proto);
+
+  // Creates the model with the tables in `index` returned by SerializeIndex().
+  // `index` is not copied and must outlive the model.
+  Model(const ModelProto &model_proto, absl::string_view index);
   ~Model() override;
 
   EncodeResult Encode(absl::string_view normalized) const override;
@@ -18,8 +18,16 @@
 #include <iostream>
 #include <memory>
 
+#include "third_party/absl/strings/str_cat.h"
 #include "util.h"
 
+#ifdef OS_UNIX
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif
+
 #if defined(OS_WIN) && defined(UNICODE) && defined(_UNICODE)
 #define WPATH(path) (::sentencepiece::util::Utf8ToWide(path).c_str())
 #else
@@ -99,8 +107,84 @@ class PosixWritableFile : public WritableFile {
   std::ostream *os_;
 };
 
+#ifdef OS_UNIX
+class PosixMappedFile : public MappedFile {
+ public:
+  explicit PosixMappedFile(absl::string_view filename) {
+    const std::string path(filename);
+    const int fd = open(path.c_str(), O_RDONLY);
+    if (fd < 0) {
+      status_ = util::StatusBuilder(util::StatusCode::kNotFound, GTL_LOC)
+                << "\"" << path << "\": " << util::StrError(errno);
+      return;
+    }
+    struct stat st;
+    if (fstat(fd, &st) != 0) {
+      status_ = util::StatusBuilder(util::StatusCode::kInternal, GTL_LOC)
+                << "\"" << path << "\": " << util::StrError(errno);
+    } else if (!S_ISREG(st.st_mode)) {
+      // Pipes and devices report no size and cannot be mapped.
+      status_ = util::StatusBuilder(util::StatusCode::kUnimplemented, GTL_LOC)
+                << "\"" << path << "\": not a regular file";
+    } else if (st.st_size > 0) {
+      void *addr =
+          mmap(nullptr, st.st_size, PROT_READ, MAP_SHARED, fd, 0);
+      if (addr == MAP_FAILED) {
+        status_ = util::StatusBuilder(util::StatusCode::kInternal, GTL_LOC)
+                  << "\"" << path << "\": " << util::StrError(errno);
+      } else {
+        addr_ = addr;
+        size_ = st.st_size;
+      }
+    }
+    close(fd);
+  }
+
+  ~PosixMappedFile() {
+    if (addr_ != nullptr) munmap(addr_, size_);
+  }
+
+  util::Status status() const { return status_; }
+
+  absl::string_view data() const {
+    return absl::string_view(static_cast<const char *>(addr_), size_);
+  }
+
+ private:
+  util::Status status_;
+  void *addr_ = nullptr;
+  size_t size_ = 0;
+};
+#else
+// Reads the whole file into memory.
+class InMemoryMappedFile : public MappedFile {
+ public:
+  explicit InMemoryMappedFile(absl::string_view filename) {
+    PosixReadableFile file(filename, true);
+    status_ = file.status();
+    if (status_.ok() && !file.ReadAll(&data_)) {
+      status_ = util::InternalError(
+          absl::StrCat("could not read ", filename));
+    }
+  }
+
+  util::Status status() const { return status_; }
+
+  absl::string_view data() const { return data_; }
+
+ private:
+  util::Status status_;
+  std::string data_;
+};
+#endif  // OS_UNIX
+
 using DefaultReadableFile = PosixReadableFile;
 using DefaultWritableFile = PosixWritableFile;
+#ifdef OS_UNIX
+using DefaultMappedFile = PosixMappedFile;
+#else
+using DefaultMappedFile = InMemoryMappedFile;
+#endif
 
 std::unique_ptr<ReadableFile> NewReadableFile(absl::string_view filename,
                                               bool is_binary) {
@@ -112,5 +196,9 @@ std::unique_ptr<WritableFile> NewWritableFile(absl::string_view filename,
   return std::make_unique<DefaultWritableFile>(filename, is_binary);
 }
 
+std::unique_ptr<MappedFile> NewMappedFile(absl::string_view filename) {
+  return std::make_unique<DefaultMappedFile>(filename);
+}
+
 }  // namespace filesystem
 }  // namespace sentencepiece
@@ -49,10 +49,24 @@ class WritableFile {
   virtual bool WriteLine(absl::string_view text) = 0;
 };
 
+// Read-only view of the whole content of a file. The file is mapped with
+// mmap(2) where available, so that processes mapping the same file share
+// its pages. Otherwise, the content is read into memory. status() is
+// kUnimplemented if the file is not a regular file, e.g., a pipe.
+class MappedFile {
+ public:
+  MappedFile() {}
+  virtual ~MappedFile() {}
+
+  virtual util::Status status() const = 0;
+  virtual absl::string_view data() const = 0;
+};
+
 std::unique_ptr<ReadableFile> NewReadableFile(absl::string_view filename,
                                               bool is_binary = false);
 std::unique_ptr<WritableFile> NewWritableFile(absl::string_view filename,
                                               bool is_binary = false);
+std::unique_ptr<MappedFile> NewMappedFile(absl::string_view filename);
 
 }  // namespace filesystem
 }  // namespace sentencepiece
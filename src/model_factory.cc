@@ -47,4 +47,31 @@ std::unique_ptr<ModelInterface> ModelFactory::Create(
 
   return std::make_unique<unigram::Model>(model_proto);
 }
+
+std::unique_ptr<ModelInterface> ModelFactory::Create(
+    const ModelProto& model_proto, absl::string_view index) {
+  if (index.empty()) return Create(model_proto);
+
+  switch (model_proto.trainer_spec().model_type()) {
+    case TrainerSpec::UNIGRAM:
+      return std::make_unique<unigram::Model>(model_proto, index);
+      break;
+    case TrainerSpec::BPE:
+      return std::make_unique<bpe::Model>(model_proto, index);
+      break;
+    case TrainerSpec::WORD:
+      return std::make_unique<word::Model>(model_proto, index);
+      break;
+    case TrainerSpec::CHAR:
+      return std::make_unique<character::Model>(model_proto, index);
+      break;
+    default:
+      LOG(ERROR) << "Unknown model_type: "
+                 << model_proto.trainer_spec().model_type();
+      return nullptr;
+      break;
+  }
+
+  return nullptr;
+}
 }  // namespace sentencepiece
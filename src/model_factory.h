@@ -26,6 +26,12 @@ class ModelFactory {
  public:
   // Creates Model instance from |model_proto|.
   static std::unique_ptr<ModelInterface> Create(const ModelProto &model_proto);
+
+  // Creates Model instance from |model_proto| and the |index| returned by
+  // ModelInterface::SerializeIndex(). |index| is not copied and must outlive
+  // the model.
+  static std::unique_ptr<ModelInterface> Create(const ModelProto &model_proto,
+                                                absl::string_view index);
 };
 }  // namespace sentencepiece
 #endif  // MODEL_FACTORY_H_
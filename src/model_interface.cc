@@ -15,6 +15,7 @@
 #include "model_interface.h"
 
 #include <algorithm>
+#include <cstring>
 
 #include "sentencepiece_model.pb.h"
 #include "third_party/absl/strings/str_format.h"
@@ -53,18 +54,30 @@ int ModelInterface::PieceToId(absl::string_view piece) const {
   if (it != reserved_id_map_.end()) {
     return it->second;
   }
-  auto it2 = pieces_.find(piece);
-  if (it2 != pieces_.end()) {
-    return it2->second;
-  }
-  return unk_id_;
+  const int id = FindPiece(piece);
+  return id >= 0 ? id : unk_id_;
 }
 
-void ModelInterface::InitializePieces() {
-  pieces_.clear();
+void ModelInterface::InitializePieces(absl::string_view *index) {
+  pieces_.Reset(0);
   reserved_id_map_.clear();
   unk_id_ = -1;
 
+  if (index == nullptr) {
+    InitializeScores();
+  } else {
+    absl::string_view pieces, scores;
+    if (!ConsumeIndexSection(index, &pieces) ||
+        !ConsumeIndexSection(index, &scores) ||
+        !pieces_.Load(pieces, model_proto_->pieces_size()) ||
+        scores.size() != model_proto_->pieces_size() * sizeof(float)) {
+      status_ = util::InternalError("invalid piece index.");
+      return;
+    }
+    scores_buffer_.clear();
+    scores_ = reinterpret_cast<const float *>(scores.data());
+  }
+
   std::set<absl::string_view> user_defined_symbols;
   std::vector<bool> byte_found(256, false);
 
@@ -82,7 +95,7 @@ void ModelInterface::InitializePieces() {
       ++reserved_id_map_size;
     }
   }
-  pieces_.reserve(pieces_size);
+  if (index == nullptr) pieces_.Reset(pieces_size);
   reserved_id_map_.reserve(reserved_id_map_size);
 
   for (int i = 0; i < model_proto_->pieces_size(); ++i) {
@@ -96,8 +109,16 @@ void ModelInterface::InitializePieces() {
         (sp.type() == ModelProto::SentencePiece::NORMAL ||
          sp.type() == ModelProto::SentencePiece::USER_DEFINED ||
          sp.type() == ModelProto::SentencePiece::UNUSED);
-    if (!port::InsertIfNotPresent(
-            is_normal_piece ? &pieces_ : &reserved_id_map_, sp.piece(), i)) {
+    if (is_normal_piece) {
+      // The loaded table was built from the pieces checked in the same way.
+      if (index == nullptr) {
+        if (FindPiece(sp.piece()) >= 0) {
+          status_ = util::InternalError(sp.piece() + " is already defined.");
+          return;
+        }
+        pieces_.Insert(port::Fingerprint(sp.piece()), i);
+      }
+    } else if (!port::InsertIfNotPresent(&reserved_id_map_, sp.piece(), i)) {
       status_ = util::InternalError(sp.piece() + " is already defined.");
       return;
     }
@@ -150,6 +171,104 @@ void ModelInterface::InitializePieces() {
   matcher_ = std::make_unique<normalizer::PrefixMatcher>(user_defined_symbols);
 }
 
+void ModelInterface::InitializeScores() {
+  scores_buffer_.resize(model_proto_->pieces_size());
+  for (int i = 0; i < model_proto_->pieces_size(); ++i) {
+    scores_buffer_[i] = model_proto_->pieces(i).score();
+  }
+  scores_ = scores_buffer_.data();
+}
+
+util::bytes ModelInterface::SerializeIndex() const {
+  if (!status().ok() || !scores_) return "";
+  util::bytes index;
+  AppendIndexSection(pieces_.data(), &index);
+  AppendIndexSection(
+      absl::string_view(reinterpret_cast<const char *>(scores_),
+                        model_proto_->pieces_size() * sizeof(float)),
+      &index);
+  return index;
+}
+
+util::Status ModelInterface::SetWordCacheCapacity(int capacity) {
+  RETURN_IF_ERROR(status());
+  CHECK_GE_OR_RETURN(capacity, 0) << "capacity must be non-negative.";
+  if (capacity == 0) {
+    word_cache_.reset();
+    return util::OkStatus();
+  }
+
+  CHECK_OR_RETURN(IsWordCacheAvailable())
+      << "word cache is not available in this model.";
+  RETURN_IF_ERROR(VerifyWordIndependence());
+
+  word_cache_ =
+      std::make_unique<LruCache<std::vector<std::pair<int, int>>>>(capacity);
+  return util::OkStatus();
+}
+
+util::Status ModelInterface::VerifyWordIndependence() const {
+  RETURN_IF_ERROR(status());
+  std::call_once(word_independence_once_, [this]() {
+    word_independence_ = [this]() -> util::Status {
+      const auto &spec = model_proto_->trainer_spec();
+      CHECK_OR_RETURN(spec.split_by_whitespace())
+          << "words are not independent without split_by_whitespace.";
+      // Encoding words separately gives the same pieces only when no piece
+      // crosses a word boundary.
+      for (const auto &sp : model_proto_->pieces()) {
+        CHECK_LE_OR_RETURN(SplitIntoWords(sp.piece(),
+                                          spec.treat_whitespace_as_suffix(),
+                                          spec.allow_whitespace_only_pieces())
+                               .size(),
+                           1)
+            << "words are not independent as piece " << sp.piece()
+            << " spans multiple words.";
+      }
+      return util::OkStatus();
+    }();
+  });
+  return word_independence_;
+}
+
+bool ModelInterface::EncodeWithWordCache(
+    absl::string_view normalized,
+    const std::function<EncodeResult(absl::string_view)> &encode_word,
+    EncodeResult *result) const {
+  if (!word_cache_ || !status().ok()) return false;
+
+  // Long words are rarely repeated and would only evict the frequent ones.
+  constexpr size_t kMaxCachedWordLength = 128;
+
+  const auto &spec = model_proto_->trainer_spec();
+  std::vector<std::pair<int, int>> pieces;
+  result->clear();
+  for (const auto word :
+       SplitIntoWords(normalized, spec.treat_whitespace_as_suffix(),
+                      spec.allow_whitespace_only_pieces())) {
+    const bool cacheable = word.size() <= kMaxCachedWordLength;
+    if (cacheable && word_cache_->Lookup(word, &pieces)) {
+      size_t begin = 0;
+      for (const auto &p : pieces) {
+        result->emplace_back(word.substr(begin, p.first), p.second);
+        begin += p.first;
+      }
+      continue;
+    }
+    const auto word_result = encode_word(word);
+    result->insert(result->end(), word_result.begin(), word_result.end());
+    if (cacheable) {
+      pieces.clear();
+      for (const auto &p : word_result) {
+        pieces.emplace_back(p.first.size(), p.second);
+      }
+      word_cache_->Insert(word, pieces);
+    }
+  }
+
+  return true;
+}
+
 std::vector<absl::string_view> SplitIntoWords(absl::string_view text,
                                               bool treat_ws_as_suffix,
                                               bool allow_ws_only_pieces) {
@@ -207,6 +326,77 @@ std::vector<absl::string_view> SplitIntoWords(absl::string_view text,
   return result;
 }
 
+void AppendIndexSection(absl::string_view section, util::bytes *index) {
+  const uint64_t size = section.size();
+  index->append(reinterpret_cast<const char *>(&size), sizeof(size));
+  index->append(section.data(), section.size());
+  index->resize((index->size() + 7) & ~size_t{7}, '\0');
+}
+
+bool ConsumeIndexSection(absl::string_view *index, absl::string_view *section) {
+  uint64_t size = 0;
+  if (index->size() < sizeof(size)) return false;
+  memcpy(&size, index->data(), sizeof(size));
+  index->remove_prefix(sizeof(size));
+  if (size > index->size()) return false;
+  *section = index->substr(0, size);
+  const uint64_t padded_size = (size + 7) & ~uint64_t{7};
+  index->remove_prefix(std::min<uint64_t>(padded_size, index->size()));
+  return true;
+}
+
+void FlatHashTable::Reset(size_t size) {
+  buffer_.clear();
+  slots_ = nullptr;
+  num_slots_ = 0;
+  shift_ = 0;
+  if (size == 0) return;
+
+  // Keeps the load factor below 2/3.
+  num_slots_ = 2;
+  shift_ = 63;
+  while (num_slots_ < size + size / 2 + 1) {
+    num_slots_ *= 2;
+    --shift_;
+  }
+  buffer_.assign(num_slots_, Slot{0, -1, 0});
+  slots_ = buffer_.data();
+}
+
+void FlatHashTable::Insert(uint64_t key, int value) {
+  size_t i = SlotIndex(key);
+  while (buffer_[i].value >= 0) i = (i + 1) & (num_slots_ - 1);
+  buffer_[i].key = key;
+  buffer_[i].value = value;
+}
+
+bool FlatHashTable::Load(absl::string_view data, int max_value) {
+  Reset(0);
+  if (data.empty()) return true;
+
+  const size_t num_slots = data.size() / sizeof(Slot);
+  if (data.size() % sizeof(Slot) != 0 || num_slots < 2 ||
+      (num_slots & (num_slots - 1)) != 0 ||
+      reinterpret_cast<uintptr_t>(data.data()) % alignof(Slot) != 0) {
+    return false;
+  }
+
+  // Find() stops at an empty slot, so there must be one.
+  const Slot *slots = reinterpret_cast<const Slot *>(data.data());
+  bool has_empty_slot = false;
+  for (size_t i = 0; i < num_slots; ++i) {
+    if (slots[i].value < -1 || slots[i].value >= max_value) return false;
+    if (slots[i].value == -1) has_empty_slot = true;
+  }
+  if (!has_empty_slot) return false;
+
+  slots_ = slots;
+  num_slots_ = num_slots;
+  shift_ = 64;
+  for (size_t n = num_slots; n > 1; n /= 2) --shift_;
+  return true;
+}
+
 std::string ByteToPiece(unsigned char c) {
   return absl::StrFormat("<0x%02X>", c);
 }
@@ -15,7 +15,9 @@
 #ifndef MODEL_INTERFACE_H_
 #define MODEL_INTERFACE_H_
 
+#include <cstdint>
 #include <memory>
+#include <mutex>
 #include <set>
 #include <string>
 #include <utility>
@@ -47,6 +49,71 @@ int PieceToByte(absl::string_view piece);
 using EncodeResult = std::vector<std::pair<absl::string_view, int>>;
 using NBestEncodeResult = std::vector<std::pair<EncodeResult, float>>;
 
+// The lookup index of a model is a sequence of sections. A section is its size
+// (uint64) followed by its bytes padded to 8 bytes, so that the arrays in the
+// sections are aligned when the index is.
+void AppendIndexSection(absl::string_view section, util::bytes *index);
+
+// Removes the first section from `index` and stores it in `section`. Returns
+// false if `index` is truncated.
+bool ConsumeIndexSection(absl::string_view *index, absl::string_view *section);
+
+// Hash table from 64-bit keys to non-negative ints, whose slots are laid out
+// in one flat array. The array is serialized as it is and used in place, e.g.,
+// from a mapped precompiled model. The keys are hashes computed by the caller,
+// so different entries may have the same key. Find() tells them apart with a
+// predicate on the value.
+class FlatHashTable {
+ public:
+  // Clears the table and reserves the slots for `size` entries.
+  void Reset(size_t size);
+
+  // Inserts `value` with `key`. Reset() must have reserved a slot for it.
+  void Insert(uint64_t key, int value);
+
+  // Uses `data` returned by data() without copying it. Returns false if `data`
+  // is not a table of values less than `max_value`.
+  bool Load(absl::string_view data, int max_value);
+
+  // Returns the slots as a byte array.
+  absl::string_view data() const {
+    return absl::string_view(reinterpret_cast<const char *>(slots_),
+                             num_slots_ * sizeof(Slot));
+  }
+
+  // Returns the value of `key` for which match(value) is true, or -1.
+  template <typename Match>
+  int Find(uint64_t key, const Match &match) const {
+    if (num_slots_ == 0) return -1;
+    for (size_t i = SlotIndex(key);; i = (i + 1) & (num_slots_ - 1)) {
+      const Slot &slot = slots_[i];
+      if (slot.value < 0) return -1;
+      if (slot.key == key && match(slot.value)) return slot.value;
+    }
+  }
+
+  int Find(uint64_t key) const {
+    return Find(key, [](int value) { return true; });
+  }
+
+ private:
+  struct Slot {
+    uint64_t key;
+    int32_t value;  // -1 if the slot is empty.
+    int32_t padding;
+  };
+
+  // Multiplicative hashing spreads the keys which differ only in upper bits.
+  size_t SlotIndex(uint64_t key) const {
+    return (key * 0x9e3779b97f4a7c15) >> shift_;
+  }
+
+  std::vector<Slot> buffer_;
+  const Slot *slots_ = nullptr;
+  size_t num_slots_ = 0;  // 0 or a power of 2 larger than 1.
+  int shift_ = 0;         // 64 - log2(num_slots_).
+};
+
 class ModelProto;
 
 // Underlying model interface.
@@ -129,6 +196,45 @@ class ModelInterface {
   // Return true if CalculateEntropy returns a valid result.
   virtual bool IsCalculateEntropyAvailable() const { return false; }
 
+  // Return true if Encode uses the word cache.
+  virtual bool IsWordCacheAvailable() const { return false; }
+
+  // Return true if ResumeEncode returns a valid result.
+  virtual bool IsResumeEncodeAvailable() const { return false; }
+
+  // Encodes `normalized`, which follows a prefix of a longer text ending at a
+  // word boundary, into the same pieces as Encode() of the whole text.
+  // `prefix_score` is the score of the best path of the prefix, and the score
+  // of the best path at the end of each piece is stored in `scores`. Requires
+  // VerifyWordIndependence().
+  virtual EncodeResult ResumeEncode(absl::string_view normalized,
+                                    float prefix_score,
+                                    std::vector<float> *scores) const {
+    LOG(ERROR) << "Not implemented.";
+    return EncodeResult();
+  }
+
+  // Returns OK if `split_by_whitespace` is set and no piece spans two words
+  // split by SplitIntoWords(), so that the pieces of a word do not depend on
+  // the other words. The pieces are checked only once.
+  util::Status VerifyWordIndependence() const;
+
+  // Memoizes the pieces of up to `capacity` words split by SplitIntoWords(),
+  // so that Encode segments frequent words only once. Requires
+  // `split_by_whitespace` and that no piece spans two words. Sampling is not
+  // memoized. `capacity` = 0 disables the cache.
+  virtual util::Status SetWordCacheCapacity(int capacity);
+
+  // Returns the capacity of the word cache.
+  virtual int GetWordCacheCapacity() const {
+    return word_cache_ ? word_cache_->capacity() : 0;
+  }
+
+  // Drops the memoized words, e.g., after the piece types are changed.
+  virtual void ClearWordCache() const {
+    if (word_cache_) word_cache_->Clear(false);
+  }
+
   // Returns the vocab id of `piece`.
   // Returns UNK(0) if `piece` is unknown
   virtual int PieceToId(absl::string_view piece) const;
@@ -149,9 +255,7 @@ class ModelInterface {
   // Returns the score of `id`.
   // Score represents a log probability of the piece.
   // We can roughly estimate the unigram frequency of the piece.
-  virtual float GetScore(int id) const {
-    return model_proto_->pieces(id).score();
-  }
+  virtual float GetScore(int id) const { return scores_[id]; }
 
   // Returns true if `id` is unknown symbol.
   virtual bool IsUnknown(int id) const {
@@ -186,6 +290,13 @@ class ModelInterface {
     return model_proto_ && model_proto_->trainer_spec().byte_fallback();
   }
 
+  // Returns the lookup tables built from the model proto, e.g., the piece
+  // table, the scores and the double-array trie of the unigram model, as a
+  // flat byte array. Passing it to ModelFactory::Create() skips building the
+  // tables, which are then used in place. Returns an empty string if the model
+  // is not initialized.
+  virtual util::bytes SerializeIndex() const;
+
   // Verifies if the `expected` and `actual` outputs are equivalent. `expected`
   // and `actual` are sentence pieces joined by space (` `). Normally it means
   // that the two strings are identical. In some model, due to float rounding
@@ -197,12 +308,25 @@ class ModelInterface {
   }
 
  protected:
-  void InitializePieces();
+  // Initializes the pieces and the scores from the model proto. If `index` is
+  // not null, the piece table and the scores are not built but used in place
+  // from the sections at the front of `*index` written by SerializeIndex().
+  // The sections are removed from `*index`.
+  void InitializePieces(absl::string_view *index = nullptr);
+
+  // Copies the scores from the model proto.
+  void InitializeScores();
+
+  // Returns the id of `piece` if it is a normal, user defined or unused piece.
+  // Otherwise returns -1.
+  int FindPiece(absl::string_view piece) const {
+    return pieces_.Find(port::Fingerprint(piece), [this, piece](int id) {
+      return model_proto_->pieces(id).piece() == piece;
+    });
+  }
 
   // Non-virtual (inlined) implementation for faster execution.
-  inline float GetScoreInlined(int id) const {
-    return model_proto_->pieces(id).score();
-  }
+  inline float GetScoreInlined(int id) const { return scores_[id]; }
 
   inline bool IsUnknownInlined(int id) const {
     return (model_proto_->pieces(id).type() ==
@@ -228,13 +352,25 @@ class ModelInterface {
     return (model_proto_->pieces(id).type() == ModelProto::SentencePiece::BYTE);
   }
 
+  // Encodes `normalized` word by word with `encode_word`, reusing the
+  // memoized pieces of the words. Returns false without encoding when the
+  // word cache is disabled.
+  bool EncodeWithWordCache(
+      absl::string_view normalized,
+      const std::function<EncodeResult(absl::string_view)> &encode_word,
+      EncodeResult *result) const;
+
   const ModelProto *model_proto_ = nullptr;
 
   // PrefixMatcher for user defined symbols.
   std::unique_ptr<normalizer::PrefixMatcher> matcher_;
 
-  // piece -> id map for normal pieces
-  PieceToIdMap pieces_;
+  // piece -> id table for normal pieces. Use FindPiece() to look it up.
+  FlatHashTable pieces_;
+
+  // Scores of the pieces, either `scores_buffer_` or a section of the index.
+  const float *scores_ = nullptr;
+  std::vector<float> scores_buffer_;
 
   // piece -> id map for control, unknown, and byte pieces
   PieceToIdMap reserved_id_map_;
@@ -242,6 +378,13 @@ class ModelInterface {
   // unknown id.
   int unk_id_ = 0;
 
+  // word -> (length, id) of its pieces.
+  std::unique_ptr<LruCache<std::vector<std::pair<int, int>>>> word_cache_;
+
+  // Result of VerifyWordIndependence().
+  mutable std::once_flag word_independence_once_;
+  mutable util::Status word_independence_;
+
   // status.
   util::Status status_;
 };
@@ -498,5 +498,53 @@ TEST(ModelInterfaceTest, VerifyOutputsEquivalent) {
   }
 }
 
+TEST(ModelInterfaceTest, IndexSectionTest) {
+  util::bytes index;
+  AppendIndexSection("abc", &index);
+  AppendIndexSection("", &index);
+  AppendIndexSection("defghijkl", &index);
+  EXPECT_EQ(0, index.size() % 8);
+
+  absl::string_view input = index, section;
+  EXPECT_TRUE(ConsumeIndexSection(&input, &section));
+  EXPECT_EQ("abc", section);
+  EXPECT_TRUE(ConsumeIndexSection(&input, &section));
+  EXPECT_EQ("", section);
+  EXPECT_TRUE(ConsumeIndexSection(&input, &section));
+  EXPECT_EQ("defghijkl", section);
+  EXPECT_TRUE(input.empty());
+  EXPECT_FALSE(ConsumeIndexSection(&input, &section));
+
+  input = absl::string_view(index).substr(0, 10);
+  EXPECT_FALSE(ConsumeIndexSection(&input, &section));
+}
+
+TEST(ModelInterfaceTest, FlatHashTableTest) {
+  FlatHashTable table;
+  EXPECT_EQ(-1, table.Find(1));
+
+  table.Reset(100);
+  for (int i = 0; i < 100; ++i) table.Insert(i * 7, i);
+  table.Insert(7, 100);  // Same key as 1.
+  for (int i = 0; i < 100; ++i) EXPECT_EQ(i, table.Find(i * 7));
+  EXPECT_EQ(-1, table.Find(1));
+  EXPECT_EQ(100, table.Find(7, [](int value) { return value != 1; }));
+  EXPECT_EQ(-1, table.Find(7, [](int value) { return false; }));
+
+  // The serialized table is used in place.
+  const util::bytes data(table.data());
+  FlatHashTable loaded;
+  EXPECT_TRUE(loaded.Load(data, 101));
+  EXPECT_EQ(data.data(), loaded.data().data());
+  for (int i = 0; i < 100; ++i) EXPECT_EQ(i, loaded.Find(i * 7));
+  EXPECT_EQ(-1, loaded.Find(1));
+
+  EXPECT_FALSE(loaded.Load(data, 100));
+  EXPECT_FALSE(loaded.Load(absl::string_view(data).substr(0, 48), 101));
+  EXPECT_FALSE(loaded.Load(absl::string_view(data).substr(0, 20), 101));
+  EXPECT_TRUE(loaded.Load("", 101));
+  EXPECT_EQ(-1, loaded.Find(7));
+}
+
 }  // namespace
 }  // namespace sentencepiece
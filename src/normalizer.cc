@@ -35,18 +35,27 @@ Normalizer::Normalizer(const NormalizerSpec &spec,
     : spec_(&spec),
       treat_whitespace_as_suffix_(trainer_spec.treat_whitespace_as_suffix()),
       status_(util::OkStatus()) {
-  Init();
+  Init(spec.precompiled_charsmap());
+}
+
+Normalizer::Normalizer(const NormalizerSpec &spec,
+                       const TrainerSpec &trainer_spec,
+                       absl::string_view precompiled_charsmap)
+    : spec_(&spec),
+      treat_whitespace_as_suffix_(trainer_spec.treat_whitespace_as_suffix()),
+      status_(util::OkStatus()) {
+  Init(precompiled_charsmap);
 }
 
 Normalizer::Normalizer(const NormalizerSpec &spec)
     : spec_(&spec), status_(util::OkStatus()) {
-  Init();
+  Init(spec.precompiled_charsmap());
 }
 
 Normalizer::~Normalizer() {}
 
-void Normalizer::Init() {
-  absl::string_view index = spec_->precompiled_charsmap();
+void Normalizer::Init(absl::string_view precompiled_charsmap) {
+  absl::string_view index = precompiled_charsmap;
   if (!index.empty()) {
     absl::string_view trie_blob;
 #ifdef IS_BIG_ENDIAN
@@ -70,7 +79,7 @@ void Normalizer::Init() {
 util::Status Normalizer::Normalize(absl::string_view input,
                                    std::string *normalized,
                                    std::vector<size_t> *norm_to_orig) const {
-  norm_to_orig->clear();
+  if (norm_to_orig != nullptr) norm_to_orig->clear();
   normalized->clear();
 
   if (input.empty()) {
@@ -101,7 +110,7 @@ util::Status Normalizer::Normalize(absl::string_view input,
   // Reserves the output buffer to avoid re-allocations.
   const size_t kReservedSize = input.size() * 3;
   normalized->reserve(kReservedSize);
-  norm_to_orig->reserve(kReservedSize);
+  if (norm_to_orig != nullptr) norm_to_orig->reserve(kReservedSize);
 
   // Replaces white space with U+2581 (LOWER ONE EIGHT BLOCK)
   // if escape_whitespaces() is set (default = true).
@@ -111,12 +120,13 @@ util::Status Normalizer::Normalize(absl::string_view input,
   auto add_ws = [this, &consumed, &normalized, &norm_to_orig, &kSpaceSymbol]() {
     if (spec_->escape_whitespaces()) {
       normalized->append(kSpaceSymbol.data(), kSpaceSymbol.size());
-      for (size_t n = 0; n < kSpaceSymbol.size(); ++n) {
-        norm_to_orig->push_back(consumed);
+      if (norm_to_orig != nullptr) {
+        norm_to_orig->insert(norm_to_orig->end(), kSpaceSymbol.size(),
+                             consumed);
       }
     } else {
       normalized->append(" ");
-      norm_to_orig->push_back(consumed);
+      if (norm_to_orig != nullptr) norm_to_orig->push_back(consumed);
     }
   };
 
@@ -142,12 +152,13 @@ util::Status Normalizer::Normalize(absl::string_view input,
         if (spec_->escape_whitespaces() && data[n] == ' ') {
           // replace ' ' with kSpaceSymbol.
           normalized->append(kSpaceSymbol.data(), kSpaceSymbol.size());
-          for (size_t m = 0; m < kSpaceSymbol.size(); ++m) {
-            norm_to_orig->push_back(consumed);
+          if (norm_to_orig != nullptr) {
+            norm_to_orig->insert(norm_to_orig->end(), kSpaceSymbol.size(),
+                                 consumed);
           }
         } else {
           *normalized += data[n];
-          norm_to_orig->push_back(consumed);
+          if (norm_to_orig != nullptr) norm_to_orig->push_back(consumed);
         }
       }
       // Checks whether the last character of sp is whitespace.
@@ -168,26 +179,28 @@ util::Status Normalizer::Normalize(absl::string_view input,
     while (absl::EndsWith(*normalized, space)) {
       const int length = normalized->size() - space.size();
       CHECK_GE_OR_RETURN(length, 0);
-      consumed = (*norm_to_orig)[length];
       normalized->resize(length);
-      norm_to_orig->resize(length);
+      if (norm_to_orig != nullptr) {
+        consumed = (*norm_to_orig)[length];
+        norm_to_orig->resize(length);
+      }
     }
   }
 
   // Adds a space symbol as a suffix (default is false)
   if (treat_whitespace_as_suffix_ && spec_->add_dummy_prefix()) add_ws();
 
-  norm_to_orig->push_back(consumed);
-
-  CHECK_EQ_OR_RETURN(norm_to_orig->size(), normalized->size() + 1);
+  if (norm_to_orig != nullptr) {
+    norm_to_orig->push_back(consumed);
+    CHECK_EQ_OR_RETURN(norm_to_orig->size(), normalized->size() + 1);
+  }
 
   return util::OkStatus();
 }
 
 std::string Normalizer::Normalize(absl::string_view input) const {
-  std::vector<size_t> norm_to_orig;
   std::string normalized;
-  Normalize(input, &normalized, &norm_to_orig).IgnoreError();
+  Normalize(input, &normalized, nullptr).IgnoreError();
   return normalized;
 }
 
@@ -66,6 +66,12 @@ class Normalizer {
   // |spec| should not be deleted until Normalizer is destroyed.
   explicit Normalizer(const NormalizerSpec &spec);
   Normalizer(const NormalizerSpec &spec, const TrainerSpec &trainer_Spec);
+
+  // Uses |precompiled_charsmap| in place of spec.precompiled_charsmap(), e.g.,
+  // a section of a mapped precompiled model. |precompiled_charsmap| is not
+  // copied and must outlive the Normalizer.
+  Normalizer(const NormalizerSpec &spec, const TrainerSpec &trainer_spec,
+             absl::string_view precompiled_charsmap);
   virtual ~Normalizer();
 
   virtual void SetPrefixMatcher(const PrefixMatcher *matcher) {
@@ -78,7 +84,9 @@ class Normalizer {
 
   // Normalizes a plain utf8 string into an internal representation for
   // Sentencepiece model. |norm_to_orig| stores the byte-alignment from
-  // normalized string to the original input.
+  // normalized string to the original input. When |norm_to_orig| is nullptr,
+  // the alignment is not tracked at all, which avoids one size_t of
+  // bookkeeping per output byte.
   // This function can do the following normalizations:
   // - Character normalization.
   //   (NFKC / full-width to half-width conversion etc).
@@ -90,7 +98,8 @@ class Normalizer {
                                  std::vector<size_t> *norm_to_orig) const;
 
   // Returns a normalized string without alignments.
-  // This function is used in sentencepiece training.
+  // This function is used in sentencepiece training and never tracks the
+  // alignment.
   virtual std::string Normalize(absl::string_view input) const;
 
   friend class Builder;
@@ -98,7 +107,7 @@ class Normalizer {
  private:
   FRIEND_TEST(NormalizerTest, EncodeDecodePrecompiledCharsMapTest);
 
-  void Init();
+  void Init(absl::string_view precompiled_charsmap);
 
   // Normalizes the prefix of |input| and returns the pair of
   // normalized prefix and length we must consume after
@@ -357,6 +357,39 @@ TEST(NormalizerTest, NormalizeFullTest) {
   }
 }
 
+TEST(NormalizerTest, NormalizeWithoutAlignmentTest) {
+  const std::vector<std::string> inputs = {
+      "",           " ",          "I saw a girl", " I   saw a　 　girl　　",
+      " ｸﾞｰｸﾞﾙ ", "①②③",       "㍿",           "a\xFF" "b  ",
+      "   abc   ",  "hello world"};
+
+  for (const bool remove_extra_whitespaces : {true, false}) {
+    for (const bool add_dummy_prefix : {true, false}) {
+      for (const bool escape_whitespaces : {true, false}) {
+        for (const bool treat_whitespace_as_suffix : {true, false}) {
+          auto spec = MakeDefaultSpec();
+          spec.set_remove_extra_whitespaces(remove_extra_whitespaces);
+          spec.set_add_dummy_prefix(add_dummy_prefix);
+          spec.set_escape_whitespaces(escape_whitespaces);
+          TrainerSpec trainer_spec;
+          trainer_spec.set_treat_whitespace_as_suffix(
+              treat_whitespace_as_suffix);
+          const Normalizer normalizer(spec, trainer_spec);
+
+          for (const auto &input : inputs) {
+            std::string expected, output;
+            std::vector<size_t> n2i;
+            EXPECT_TRUE(normalizer.Normalize(input, &expected, &n2i).ok());
+            EXPECT_TRUE(normalizer.Normalize(input, &output, nullptr).ok());
+            EXPECT_EQ(expected, output);
+            EXPECT_EQ(expected, normalizer.Normalize(input));
+          }
+        }
+      }
+    }
+  }
+}
+
 TEST(NormalizerTest, EncodeDecodePrecompiledCharsMapTest) {
   // some string of 256 4-byte units
   const std::string test_trie_blob =
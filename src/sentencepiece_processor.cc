@@ -15,11 +15,16 @@
 #include "sentencepiece_processor.h"
 
 #include <algorithm>
+#include <cerrno>
 #include <cmath>
 #include <cstddef>
+#include <cstdio>
+#include <cstring>
 #include <iterator>
 #include <map>
 #include <memory>
+#include <mutex>
+#include <random>
 #include <set>
 #include <utility>
 #include <vector>
@@ -30,6 +35,7 @@
 #include "model_interface.h"
 #include "normalizer.h"
 #include "sentencepiece.pb.h"
+#include "third_party/absl/strings/match.h"
 #include "third_party/absl/strings/numbers.h"
 #include "third_party/absl/strings/str_cat.h"
 #include "third_party/absl/strings/str_join.h"
@@ -54,6 +60,20 @@ const char kDefaultUnknownSymbol[] = " \xE2\x81\x87 ";
 // REPLACEMENT CHARACTER (U+FFFD) in UTF-8.
 const char kReplacementCharacter[] = "\xef\xbf\xbd";
 
+// Returns true if `text` is split at `pos` by SplitIntoWords(), so that no
+// piece of the models trained with `split_by_whitespace` spans `pos`.
+bool IsWordBoundary(absl::string_view text, size_t pos,
+                    const TrainerSpec &spec) {
+  if (pos == text.size()) return true;
+  const absl::string_view ws = kSpaceSymbol;
+  const bool ws_before = absl::EndsWith(text.substr(0, pos), ws);
+  const bool ws_after = absl::StartsWith(text.substr(pos), ws);
+  if (spec.treat_whitespace_as_suffix()) {
+    return ws_before && !(spec.allow_whitespace_only_pieces() && ws_after);
+  }
+  return ws_after && !(spec.allow_whitespace_only_pieces() && ws_before);
+}
+
 std::vector<absl::string_view> ToPieceArray(const std::vector<std::string> &v) {
   std::vector<absl::string_view> out(v.size());
   for (int i = 0; i < v.size(); ++i) out[i] = v[i];
@@ -88,6 +108,75 @@ void ConvertToUnicodeSpansInternal(SentencePieceText *spt) {
   }
 }
 
+// Header of the precompiled model written by SavePrecompiled().
+// The model proto follows the header, and the index follows the proto at the
+// next 8-byte aligned offset. The index is a sequence of the sections written
+// by AppendIndexSection(): the precompiled charsmaps of the normalizer and the
+// denormalizer, then the sections of ModelInterface::SerializeIndex(). The
+// leading '\0' is never a valid tag of a serialized ModelProto.
+struct PrecompiledModelHeader {
+  char magic[8];
+  uint32_t version;
+  uint32_t byte_order;
+  uint64_t proto_size;
+  uint64_t index_size;
+};
+
+constexpr char kPrecompiledModelMagic[8] = {'\0', 'S', 'P', 'M',
+                                            'P', 'R', 'E', '\0'};
+constexpr uint32_t kPrecompiledModelVersion = 2;
+constexpr uint32_t kPrecompiledModelByteOrder = 0x01020304;
+
+size_t PrecompiledModelIndexOffset(uint64_t proto_size) {
+  return (sizeof(PrecompiledModelHeader) + proto_size + 7) & ~size_t{7};
+}
+
+bool IsPrecompiledModel(absl::string_view data) {
+  return data.size() >= sizeof(kPrecompiledModelMagic) &&
+         memcmp(data.data(), kPrecompiledModelMagic,
+                sizeof(kPrecompiledModelMagic)) == 0;
+}
+
+template <typename T>
+T ByteSwap(T x) {
+  T y = 0;
+  for (size_t i = 0; i < sizeof(T); ++i, x >>= 8) y = (y << 8) | (x & 0xFF);
+  return y;
+}
+
+// Splits the precompiled model `data` into the proto and the index. The index
+// is empty if the model was saved by another version or with a different byte
+// order, and the caller builds the lookup tables from the proto. The header and the
+// proto are laid out in the same way in all versions.
+util::Status ParsePrecompiledModel(absl::string_view data,
+                                   absl::string_view *proto,
+                                   absl::string_view *index) {
+  PrecompiledModelHeader header;
+  CHECK_GE_OR_RETURN(data.size(), sizeof(header))
+      << "precompiled model is truncated.";
+  memcpy(&header, data.data(), sizeof(header));
+  if (header.byte_order == ByteSwap(kPrecompiledModelByteOrder)) {
+    header.version = ByteSwap(header.version);
+    header.proto_size = ByteSwap(header.proto_size);
+    header.index_size = ByteSwap(header.index_size);
+  } else {
+    CHECK_EQ_OR_RETURN(header.byte_order, kPrecompiledModelByteOrder)
+        << "precompiled model has an invalid byte order.";
+  }
+  CHECK_LE_OR_RETURN(header.proto_size, data.size())
+      << "precompiled model is truncated.";
+  const size_t offset = PrecompiledModelIndexOffset(header.proto_size);
+  CHECK_LE_OR_RETURN(offset, data.size()) << "precompiled model is truncated.";
+  CHECK_LE_OR_RETURN(header.index_size, data.size() - offset)
+      << "precompiled model is truncated.";
+  *proto = data.substr(sizeof(header), header.proto_size);
+  *index = header.version == kPrecompiledModelVersion &&
+                   header.byte_order == kPrecompiledModelByteOrder
+               ? data.substr(offset, header.index_size)
+               : absl::string_view();
+  return util::OkStatus();
+}
+
 }  // namespace
 
 ImmutableSentencePieceText::ImmutableSentencePieceText()
@@ -212,13 +301,142 @@ util::bytes ImmutableNBestSentencePieceText::SerializeAsString() const {
   return rep_ ? rep_->SerializeAsString() : "";
 }
 
+// Least recently used cache of the results of Encode(), keyed by the input.
+class SentencePieceProcessor::EncodeCache {
+ public:
+  explicit EncodeCache(size_t capacity) : ids_(capacity), pieces_(capacity) {}
+
+  size_t capacity() const { return ids_.capacity(); }
+  size_t hits() const { return ids_.hits() + pieces_.hits(); }
+  size_t misses() const { return ids_.misses() + pieces_.misses(); }
+
+  bool Lookup(absl::string_view input, std::vector<int> *ids) {
+    return ids_.Lookup(input, ids);
+  }
+  bool Lookup(absl::string_view input, std::vector<std::string> *pieces) {
+    return pieces_.Lookup(input, pieces);
+  }
+
+  void Insert(absl::string_view input, const std::vector<int> &ids) {
+    ids_.Insert(input, ids);
+  }
+  void Insert(absl::string_view input,
+              const std::vector<std::string> &pieces) {
+    pieces_.Insert(input, pieces);
+  }
+
+  void Clear(bool reset_counters) {
+    ids_.Clear(reset_counters);
+    pieces_.Clear(reset_counters);
+  }
+
+ private:
+  LruCache<std::vector<int>> ids_;
+  LruCache<std::vector<std::string>> pieces_;
+};
+
+// Decoded surface of every id, so that Decode() can concatenate them without
+// building SentencePieceText. The table is built on the first use.
+class SentencePieceProcessor::DecodeTable {
+ public:
+  enum Type : uint8_t { NORMAL, CONTROL, UNKNOWN, BYTE };
+
+  struct Entry {
+    uint32_t offset = 0;  // Surface is surfaces_[offset, offset + length).
+    uint32_t length = 0;
+    Type type = NORMAL;
+    bool has_ws_prefix = false;  // The piece starts with kSpaceSymbol.
+    int16_t byte = -1;           // Byte value of the BYTE piece.
+  };
+
+  // Builds the table from `sp` only once. Thread-safe.
+  void Init(const SentencePieceProcessor &sp) {
+    std::call_once(once_, [this, &sp]() { Build(sp); });
+  }
+
+  const Entry &entry(int id) const { return entries_[id]; }
+
+  absl::string_view surface(const Entry &entry) const {
+    return absl::string_view(surfaces_.data() + entry.offset, entry.length);
+  }
+
+ private:
+  void Build(const SentencePieceProcessor &sp) {
+    const int size = sp.GetPieceSize();
+    entries_.resize(size);
+    for (int id = 0; id < size; ++id) {
+      const std::string &piece = sp.IdToPiece(id);
+      // Decode() looks up the type with the id of the piece.
+      const int piece_id = sp.PieceToId(piece);
+      auto *entry = &entries_[id];
+      std::string surface;
+      if (sp.IsByte(piece_id)) {
+        entry->type = BYTE;
+        entry->byte = PieceToByte(piece);
+      } else if (sp.IsControl(piece_id)) {
+        entry->type = CONTROL;
+      } else if (sp.IsUnknown(piece_id) && sp.IdToPiece(piece_id) == piece) {
+        entry->type = UNKNOWN;
+      } else if (sp.IsUnknown(piece_id)) {
+        surface = piece;  // Pieces other than <unk> are kept as-is.
+      } else {
+        entry->has_ws_prefix = absl::StartsWith(piece, kSpaceSymbol);
+        surface = absl::StrReplaceAll(piece, {{kSpaceSymbol, " "}});
+      }
+      entry->offset = surfaces_.size();
+      entry->length = surface.size();
+      surfaces_.append(surface);
+    }
+  }
+
+  std::once_flag once_;
+  std::vector<Entry> entries_;
+  std::string surfaces_;
+};
+
 SentencePieceProcessor::SentencePieceProcessor() {}
 SentencePieceProcessor::~SentencePieceProcessor() {}
 
 util::Status SentencePieceProcessor::Load(absl::string_view filename) {
   auto model_proto = std::make_unique<ModelProto>();
-  RETURN_IF_ERROR(io::LoadModelProto(filename, model_proto.get()));
-  return Load(std::move(model_proto));
+  if (filename.empty()) {
+    return util::NotFoundError("model file path should not be empty.");
+  }
+
+  auto model_file = filesystem::NewMappedFile(filename);
+  if (model_file->status().code() == util::StatusCode::kUnimplemented) {
+    // Pipes, e.g., /dev/stdin, are read into memory.
+    auto input = filesystem::NewReadableFile(filename, true);
+    RETURN_IF_ERROR(input->status());
+    std::string serialized;
+    if (!input->ReadAll(&serialized)) {
+      return util::InternalError(absl::StrCat("could not read ", filename));
+    }
+    return LoadFromSerializedProto(serialized);
+  }
+  RETURN_IF_ERROR(model_file->status());
+  if (!IsPrecompiledModel(model_file->data())) {
+    // The file is read once. The mapping is released after parsing.
+    if (!model_proto->ParseFromArray(model_file->data().data(),
+                                     model_file->data().size())) {
+      return util::InternalError(
+          absl::StrCat("could not parse ModelProto from ", filename));
+    }
+    return Load(std::move(model_proto));
+  }
+
+  absl::string_view proto, index;
+  RETURN_IF_ERROR(ParsePrecompiledModel(model_file->data(), &proto, &index));
+  if (!model_proto->ParseFromArray(proto.data(), proto.size())) {
+    return util::InternalError(
+        absl::StrCat("could not parse ModelProto from ", filename));
+  }
+
+  // The old model may refer to the old file until it is replaced.
+  const auto status = LoadInternal(std::move(model_proto), index);
+  model_file_ = std::move(model_file);
+  model_index_.clear();
+  return status;
 }
 
 void SentencePieceProcessor::LoadOrDie(absl::string_view filename) {
@@ -234,21 +452,79 @@ util::Status SentencePieceProcessor::Load(const ModelProto &model_proto) {
 util::Status SentencePieceProcessor::LoadFromSerializedProto(
     absl::string_view serialized) {
   auto model_proto = std::make_unique<ModelProto>();
-  CHECK_OR_RETURN(
-      model_proto->ParseFromArray(serialized.data(), serialized.size()));
-  return Load(std::move(model_proto));
+  if (!IsPrecompiledModel(serialized)) {
+    CHECK_OR_RETURN(
+        model_proto->ParseFromArray(serialized.data(), serialized.size()));
+    return Load(std::move(model_proto));
+  }
+
+  absl::string_view proto, index;
+  RETURN_IF_ERROR(ParsePrecompiledModel(serialized, &proto, &index));
+  CHECK_OR_RETURN(model_proto->ParseFromArray(proto.data(), proto.size()));
+
+  // `serialized` is owned by the caller. The moved vector keeps its buffer.
+  std::vector<char> model_index(index.begin(), index.end());
+  const auto status = LoadInternal(
+      std::move(model_proto),
+      absl::string_view(model_index.data(), model_index.size()));
+  model_file_.reset();
+  model_index_ = std::move(model_index);
+  return status;
 }
 
 util::Status SentencePieceProcessor::Load(
     std::unique_ptr<ModelProto> model_proto) {
+  const auto status = LoadInternal(std::move(model_proto), "");
+  model_file_.reset();
+  model_index_.clear();
+  return status;
+}
+
+util::Status SentencePieceProcessor::LoadInternal(
+    std::unique_ptr<ModelProto> model_proto, absl::string_view index) {
+  InvalidateEncodeCache();
   model_proto_ = std::move(model_proto);
-  model_ = ModelFactory::Create(*model_proto_);
+  normalizer_charsmap_ = model_proto_->normalizer_spec().precompiled_charsmap();
+  denormalizer_charsmap_ =
+      model_proto_->denormalizer_spec().precompiled_charsmap();
+  if (!index.empty()) {
+    // The charsmaps in the index are used in place of the copies parsed into
+    // `model_proto_`, which are released until RestorePrecompiledCharsMaps().
+    absl::string_view normalizer_charsmap, denormalizer_charsmap;
+    if (!ConsumeIndexSection(&index, &normalizer_charsmap) ||
+        !ConsumeIndexSection(&index, &denormalizer_charsmap) ||
+        normalizer_charsmap != normalizer_charsmap_ ||
+        denormalizer_charsmap != denormalizer_charsmap_) {
+      model_.reset();
+      normalizer_.reset();
+      denormalizer_.reset();
+      return util::InternalError("invalid charsmap index.");
+    }
+    normalizer_charsmap_ = normalizer_charsmap;
+    denormalizer_charsmap_ = denormalizer_charsmap;
+    std::string().swap(*model_proto_->mutable_normalizer_spec()
+                            ->mutable_precompiled_charsmap());
+    if (model_proto_->has_denormalizer_spec()) {
+      std::string().swap(*model_proto_->mutable_denormalizer_spec()
+                              ->mutable_precompiled_charsmap());
+    }
+    charsmaps_released_ = true;
+  } else {
+    charsmaps_released_ = false;
+  }
+
+  model_ = ModelFactory::Create(*model_proto_, index);
+  decode_table_ = std::make_unique<DecodeTable>();
+  CHECK_OR_RETURN(model_) << "Model is not initialized.";
   normalizer_ = std::make_unique<normalizer::Normalizer>(
-      model_proto_->normalizer_spec(), model_proto_->trainer_spec());
+      model_proto_->normalizer_spec(), model_proto_->trainer_spec(),
+      normalizer_charsmap_);
+  denormalizer_.reset();
   if (model_proto_->has_denormalizer_spec() &&
-      !model_proto_->denormalizer_spec().precompiled_charsmap().empty()) {
+      !denormalizer_charsmap_.empty()) {
     denormalizer_ = std::make_unique<normalizer::Normalizer>(
-        model_proto_->denormalizer_spec());
+        model_proto_->denormalizer_spec(), TrainerSpec::default_instance(),
+        denormalizer_charsmap_);
   }
 
   // Escapes user-defined-symbols in normalizer.
@@ -282,6 +558,7 @@ util::Status SentencePieceProcessor::Load(
 
 util::Status SentencePieceProcessor::SetEncodeExtraOptions(
     absl::string_view extra_options) {
+  InvalidateEncodeCache();
   return ParseExtraOptions(extra_options, &encode_extra_options_);
 }
 
@@ -307,6 +584,8 @@ util::Status SentencePieceProcessor::SetVocabulary(
   CHECK_OR_RETURN(type == TrainerSpec::UNIGRAM || type == TrainerSpec::BPE)
       << "Vocabulary constraint is only enabled in subword units.";
 
+  InvalidateEncodeCache();
+
   const std::set<absl::string_view> vocab(valid_vocab.begin(),
                                           valid_vocab.end());
 
@@ -331,6 +610,7 @@ util::Status SentencePieceProcessor::SetVocabulary(
 
 util::Status SentencePieceProcessor::ResetVocabulary() {
   RETURN_IF_ERROR(status());
+  InvalidateEncodeCache();
   for (auto &piece : *(model_proto_->mutable_pieces())) {
     if (piece.type() == ModelProto::SentencePiece::UNUSED)
       piece.set_type(ModelProto::SentencePiece::NORMAL);
@@ -364,6 +644,101 @@ util::Status SentencePieceProcessor::LoadVocabulary(absl::string_view filename,
   return SetVocabulary(ToPieceArray(vocab));
 }
 
+util::Status SentencePieceProcessor::SetEncodeCacheCapacity(int capacity) {
+  CHECK_GE_OR_RETURN(capacity, 0) << "capacity must be non-negative.";
+  if (capacity == GetEncodeCacheCapacity()) return util::OkStatus();
+  if (capacity == 0) {
+    encode_cache_.reset();
+  } else {
+    encode_cache_ = std::make_unique<EncodeCache>(capacity);
+  }
+  return util::OkStatus();
+}
+
+int SentencePieceProcessor::GetEncodeCacheCapacity() const {
+  return encode_cache_ ? encode_cache_->capacity() : 0;
+}
+
+size_t SentencePieceProcessor::GetEncodeCacheHits() const {
+  return encode_cache_ ? encode_cache_->hits() : 0;
+}
+
+size_t SentencePieceProcessor::GetEncodeCacheMisses() const {
+  return encode_cache_ ? encode_cache_->misses() : 0;
+}
+
+void SentencePieceProcessor::ClearEncodeCache() {
+  if (encode_cache_) encode_cache_->Clear(true);
+}
+
+void SentencePieceProcessor::InvalidateEncodeCache() const {
+  if (encode_cache_) encode_cache_->Clear(false);
+  if (model_) model_->ClearWordCache();
+}
+
+util::Status SentencePieceProcessor::SetWordCacheCapacity(int capacity) {
+  RETURN_IF_ERROR(status());
+  return model_->SetWordCacheCapacity(capacity);
+}
+
+int SentencePieceProcessor::GetWordCacheCapacity() const {
+  return model_ ? model_->GetWordCacheCapacity() : 0;
+}
+
+util::Status SentencePieceProcessor::SetParallelEncode(
+    ParallelForFunc parallel_for, size_t chunk_size) {
+  CHECK_OR_RETURN(!parallel_for || chunk_size > 0)
+      << "chunk_size must be positive.";
+  parallel_for_ = std::move(parallel_for);
+  parallel_chunk_size_ = chunk_size;
+  return util::OkStatus();
+}
+
+std::vector<std::pair<absl::string_view, int>>
+SentencePieceProcessor::EncodeNormalized(absl::string_view normalized) const {
+  // The models supporting the word cache segment every word independently.
+  if (!parallel_for_ || normalized.size() <= parallel_chunk_size_ ||
+      !model_->IsWordCacheAvailable() ||
+      !model_->VerifyWordIndependence().ok()) {
+    return model_->Encode(normalized);
+  }
+
+  const auto &spec = model_proto_->trainer_spec();
+  const absl::string_view ws = kSpaceSymbol;
+  std::vector<absl::string_view> chunks;
+  size_t begin = 0;
+  while (begin < normalized.size()) {
+    size_t end = normalized.size();
+    size_t pos = begin + parallel_chunk_size_;
+    while (pos < normalized.size()) {
+      pos = normalized.find(ws, pos);
+      if (pos == absl::string_view::npos) break;
+      const size_t boundary =
+          spec.treat_whitespace_as_suffix() ? pos + ws.size() : pos;
+      if (IsWordBoundary(normalized, boundary, spec)) {
+        end = boundary;
+        break;
+      }
+      pos += ws.size();
+    }
+    chunks.push_back(normalized.substr(begin, end - begin));
+    begin = end;
+  }
+
+  if (chunks.size() == 1) return model_->Encode(normalized);
+
+  std::vector<EncodeResult> results(chunks.size());
+  parallel_for_(chunks.size(),
+                [&](size_t i) { results[i] = model_->Encode(chunks[i]); });
+
+  size_t size = 0;
+  for (const auto &result : results) size += result.size();
+  EncodeResult result;
+  result.reserve(size);
+  for (const auto &r : results) result.insert(result.end(), r.begin(), r.end());
+  return result;
+}
+
 #define CHECK_OR_RETURN_STATUS_STL(container)               \
   RETURN_IF_ERROR(status());                                \
   CHECK_OR_RETURN(container) << "output container is null"; \
@@ -379,27 +754,35 @@ util::Status SentencePieceProcessor::LoadVocabulary(absl::string_view filename,
 util::Status SentencePieceProcessor::Encode(
     absl::string_view input, std::vector<std::string> *pieces) const {
   CHECK_OR_RETURN_STATUS_STL(pieces);
-
-  SentencePieceText spt;
-  RETURN_IF_ERROR(Encode(input, &spt));
-  for (const auto &sp : spt.pieces()) {
-    pieces->emplace_back(sp.piece());
+  if (encode_cache_ && encode_cache_->Lookup(input, pieces)) {
+    return util::OkStatus();
   }
 
+  std::string normalized;
+  RETURN_IF_ERROR(normalizer_->Normalize(input, &normalized, nullptr));
+
+  std::vector<int> ids;
+  RETURN_IF_ERROR(PopulateIdsAndPieces(
+      normalized, EncodeNormalized(normalized), &ids, pieces));
+
+  if (encode_cache_) encode_cache_->Insert(input, *pieces);
   return util::OkStatus();
 }
 
 util::Status SentencePieceProcessor::Encode(absl::string_view input,
                                             std::vector<int> *ids) const {
   CHECK_OR_RETURN_STATUS_STL(ids);
-
-  SentencePieceText spt;
-  RETURN_IF_ERROR(Encode(input, &spt));
-  ids->reserve(spt.pieces().size());
-  for (const auto &sp : spt.pieces()) {
-    ids->emplace_back(sp.id());
+  if (encode_cache_ && encode_cache_->Lookup(input, ids)) {
+    return util::OkStatus();
   }
 
+  std::string normalized;
+  RETURN_IF_ERROR(normalizer_->Normalize(input, &normalized, nullptr));
+
+  RETURN_IF_ERROR(PopulateIdsAndPieces(
+      normalized, EncodeNormalized(normalized), ids, nullptr));
+
+  if (encode_cache_) encode_cache_->Insert(input, *ids);
   return util::OkStatus();
 }
 
@@ -424,13 +807,195 @@ util::Status SentencePieceProcessor::Decode(const std::vector<int> &ids,
                                             std::string *detokenized) const {
   CHECK_OR_RETURN_STATUS_STL(detokenized);
 
-  SentencePieceText spt;
-  RETURN_IF_ERROR(Decode(ids, &spt));
-  *detokenized = std::move(*spt.mutable_text());
+  // The table does not model "unk" option, which rewrites the pieces.
+  if (!decode_table_ ||
+      std::find(decode_extra_options_.begin(), decode_extra_options_.end(),
+                UNK_PIECE) != decode_extra_options_.end()) {
+    SentencePieceText spt;
+    RETURN_IF_ERROR(Decode(ids, &spt));
+    *detokenized = std::move(*spt.mutable_text());
+    return util::OkStatus();
+  }
+
+  const int num_pieces = GetPieceSize();
+  for (const int id : ids) {
+    if (id < 0 || id >= num_pieces) {
+      return util::Status(util::StatusCode::kOutOfRange,
+                          absl::StrCat("Invalid id: ", id));
+    }
+  }
+
+  std::vector<int> extended_ids;
+  if (!decode_extra_options_.empty()) {
+    extended_ids = ids;
+    for (const auto &extra_option : decode_extra_options_) {
+      switch (extra_option) {
+        case REVERSE:
+          std::reverse(extended_ids.begin(), extended_ids.end());
+          break;
+        case EOS:
+          extended_ids.push_back(
+              PieceToId(absl::string_view(model_->eos_piece().data())));
+          break;
+        case BOS:
+          extended_ids.insert(
+              extended_ids.begin(),
+              PieceToId(absl::string_view(model_->bos_piece().data())));
+          break;
+        default:
+          return util::InternalError("unknown extra_option type.");
+      }
+    }
+  }
+
+  const auto &decoded_ids = decode_extra_options_.empty() ? ids : extended_ids;
+  DecodeStream stream(*this);
+  RETURN_IF_ERROR(
+      stream.Append(decoded_ids.data(), decoded_ids.size(), detokenized));
+  stream.FlushBytes(true, detokenized);
+
+  if (denormalizer_) {
+    *detokenized = denormalizer_->Normalize(*detokenized);
+  }
 
   return util::OkStatus();
 }
 
+std::unique_ptr<DecodeStream> SentencePieceProcessor::NewDecodeStream() const {
+  return std::make_unique<DecodeStream>(*this);
+}
+
+DecodeStream::DecodeStream(const SentencePieceProcessor &processor)
+    : processor_(processor) {}
+
+DecodeStream::~DecodeStream() {}
+
+util::Status DecodeStream::Put(const std::vector<int> &ids,
+                               std::string *text) {
+  return PutInternal(ids.data(), ids.size(), text);
+}
+
+util::Status DecodeStream::Put(int id, std::string *text) {
+  return PutInternal(&id, 1, text);
+}
+
+util::Status DecodeStream::PutInternal(const int *ids, size_t size,
+                                       std::string *text) {
+  RETURN_IF_ERROR(processor_.status());
+  CHECK_OR_RETURN(text) << "output container is null";
+  CHECK_OR_RETURN(processor_.decode_table_) << "Model is not initialized.";
+  text->clear();
+
+  const int num_pieces = processor_.GetPieceSize();
+  for (size_t i = 0; i < size; ++i) {
+    if (ids[i] < 0 || ids[i] >= num_pieces) {
+      return util::Status(util::StatusCode::kOutOfRange,
+                          absl::StrCat("Invalid id: ", ids[i]));
+    }
+  }
+
+  RETURN_IF_ERROR(Append(ids, size, text));
+  FlushBytes(false, text);
+
+  if (processor_.denormalizer_ && !text->empty()) {
+    *text = processor_.denormalizer_->Normalize(*text);
+  }
+
+  return util::OkStatus();
+}
+
+util::Status DecodeStream::Finish(std::string *text) {
+  RETURN_IF_ERROR(processor_.status());
+  CHECK_OR_RETURN(text) << "output container is null";
+  text->clear();
+
+  FlushBytes(true, text);
+  if (processor_.denormalizer_ && !text->empty()) {
+    *text = processor_.denormalizer_->Normalize(*text);
+  }
+  Reset();
+
+  return util::OkStatus();
+}
+
+void DecodeStream::Reset() {
+  bytes_.clear();
+  is_bos_ws_ = true;
+  bos_ws_seen_ = false;
+  has_text_ = false;
+}
+
+util::Status DecodeStream::Append(const int *ids, size_t size,
+                                  std::string *text) {
+  auto *table = processor_.decode_table_.get();
+  table->Init(processor_);
+
+  const ModelProto *model_proto = processor_.model_proto_.get();
+  const char *unk_surface = kDefaultUnknownSymbol;
+  if (model_proto && model_proto->trainer_spec().has_unk_surface())
+    unk_surface = model_proto->trainer_spec().unk_surface().c_str();
+
+  // Same rules as DecodeSentencePiece in Decode(pieces, spt).
+  const bool remove_extra_whitespaces =
+      model_proto && model_proto->normalizer_spec().remove_extra_whitespaces();
+  const bool strip_bos_ws =
+      !model_proto || model_proto->normalizer_spec().add_dummy_prefix() ||
+      remove_extra_whitespaces;
+
+  using DecodeTable = SentencePieceProcessor::DecodeTable;
+  for (size_t i = 0; i < size; ++i) {
+    const auto &entry = table->entry(ids[i]);
+    if (entry.type == DecodeTable::BYTE) {
+      CHECK_LE_OR_RETURN(0, entry.byte);
+      bytes_.push_back(entry.byte);
+      continue;
+    }
+
+    FlushBytes(true, text);
+
+    // if we have seen a bos_ws token or any non-empty token
+    if (bos_ws_seen_ || has_text_) is_bos_ws_ = false;
+
+    bos_ws_seen_ = false;
+    absl::string_view surface;
+    switch (entry.type) {
+      case DecodeTable::CONTROL:
+        break;
+      case DecodeTable::UNKNOWN:
+        surface = unk_surface;
+        break;
+      default:
+        surface = table->surface(entry);
+        if (is_bos_ws_ && strip_bos_ws && entry.has_ws_prefix) {
+          surface.remove_prefix(1);
+          bos_ws_seen_ = !remove_extra_whitespaces;
+        }
+    }
+    if (!surface.empty()) has_text_ = true;
+    text->append(surface.data(), surface.size());
+  }
+
+  return util::OkStatus();
+}
+
+void DecodeStream::FlushBytes(bool finish, std::string *text) {
+  size_t offset = 0;
+  while (offset < bytes_.size()) {
+    const absl::string_view rest = absl::string_view(bytes_).substr(offset);
+    if (!finish && rest.size() < string_util::OneCharLen(rest.data())) break;
+    size_t consumed = 0;
+    if (string_util::IsValidDecodeUTF8(rest, &consumed)) {
+      text->append(rest.data(), consumed);
+    } else {
+      text->append(kReplacementCharacter);
+      consumed = 1;
+    }
+    offset += consumed;
+    has_text_ = true;
+  }
+  bytes_.erase(0, offset);
+}
+
 util::Status SentencePieceProcessor::NBestEncode(
     absl::string_view input, int nbest_size,
     std::vector<std::vector<std::string>> *pieces) const {
@@ -639,6 +1204,195 @@ util::Status SentencePieceProcessor::PopulateSentencePieceText(
   return util::OkStatus();
 }  // namespace sentencepiece
 
+util::Status SentencePieceProcessor::PopulateIdsAndPieces(
+    absl::string_view normalized, const EncodeResult &result,
+    std::vector<int> *ids, std::vector<std::string> *pieces) const {
+  RETURN_IF_ERROR(AppendIdsAndPieces(normalized, result, ids, pieces, nullptr));
+  return ApplyExtraOptions(encode_extra_options_, ids, pieces);
+}
+
+util::Status SentencePieceProcessor::AppendIdsAndPieces(
+    absl::string_view normalized, const EncodeResult &result,
+    std::vector<int> *ids, std::vector<std::string> *pieces,
+    std::vector<size_t> *ids_ends) const {
+  auto add_piece = [ids, pieces](int id, absl::string_view piece) {
+    ids->emplace_back(id);
+    if (pieces) pieces->emplace_back(piece);
+  };
+
+  ids->reserve(ids->size() + result.size());
+  if (pieces) pieces->reserve(pieces->size() + result.size());
+  if (ids_ends) ids_ends->reserve(ids_ends->size() + result.size());
+
+  size_t consumed = 0;
+  bool is_prev_unk = false;
+  for (const auto &p : result) {
+    const absl::string_view w = p.first;  // piece
+    const int id = p.second;              // id
+
+    CHECK_OR_RETURN(!w.empty()) << "Empty piece is not allowed.";
+
+    const bool is_unk = IsUnknown(id);
+
+    if (IsControl(id)) {
+      add_piece(id, w);
+    } else {
+      if (is_unk && model_->ByteFallbackEnabled()) {
+        // Decomposes an unknown piece into UTF-8 bytes
+        for (const char b : w) {
+          const auto piece = ByteToPiece(b);
+          add_piece(model_->PieceToId(piece), piece);
+        }
+      } else if (is_prev_unk && is_unk) {
+        // Merges continuous run of unknown pieces.
+        if (pieces) pieces->back().append(w.data(), w.size());
+      } else {
+        add_piece(id, w);
+      }
+      consumed += w.size();
+    }
+    is_prev_unk = is_unk;
+    if (ids_ends) ids_ends->push_back(ids->size());
+  }
+
+  CHECK_EQ_OR_RETURN(consumed, normalized.size())
+      << "all normalized characters are not consumed.";
+
+  return util::OkStatus();
+}
+
+util::Status SentencePieceProcessor::ApplyExtraOptions(
+    const std::vector<ExtraOption> &extra_options, std::vector<int> *ids,
+    std::vector<std::string> *pieces) const {
+  for (const auto &extra_option : extra_options) {
+    switch (extra_option) {
+      case REVERSE:
+        std::reverse(ids->begin(), ids->end());
+        if (pieces) std::reverse(pieces->begin(), pieces->end());
+        break;
+      case EOS:
+        ids->push_back(PieceToId(absl::string_view(model_->eos_piece().data())));
+        if (pieces) pieces->emplace_back(model_->eos_piece());
+        break;
+      case BOS:
+        ids->insert(ids->begin(),
+                    PieceToId(absl::string_view(model_->bos_piece().data())));
+        if (pieces) {
+          pieces->emplace(pieces->begin(), model_->bos_piece());
+        }
+        break;
+      case UNK_PIECE:
+        if (pieces) {
+          for (size_t i = 0; i < ids->size(); ++i) {
+            if (IsUnknown((*ids)[i])) {
+              (*pieces)[i].assign(model_->unk_piece().data(),
+                                  model_->unk_piece().size());
+            }
+          }
+        }
+        break;
+      default:
+        return util::InternalError("unknown extra_option type.");
+    }
+  }
+
+  return util::OkStatus();
+}
+
+util::Status SentencePieceProcessor::EncodeAppended(
+    absl::string_view text, IncrementalEncodeState *state) const {
+  RETURN_IF_ERROR(status());
+  CHECK_OR_RETURN(state) << "output state is null";
+
+  state->input_.append(text.data(), text.size());
+  std::string normalized;
+  RETURN_IF_ERROR(normalizer_->Normalize(state->input_, &normalized, nullptr));
+
+  const bool resumable = model_->IsResumeEncodeAvailable() &&
+                         model_->VerifyWordIndependence().ok();
+
+  // Finds the last piece starting at a word boundary which is shared by the
+  // previous and the new normalized input. No piece crosses the boundary, so
+  // the pieces before it do not depend on the text after it.
+  auto &pieces = state->pieces_;
+  const absl::string_view prev = state->normalized_;
+  size_t resume = 0;  // Number of the pieces to keep.
+  if (resumable) {
+    const auto &spec = model_proto_->trainer_spec();
+    const size_t common =
+        std::mismatch(prev.begin(), prev.end(), normalized.begin(),
+                      normalized.end())
+            .first -
+        prev.begin();
+    for (size_t k = pieces.size(); k > 0; --k) {
+      const size_t pos = k < pieces.size() ? pieces[k].begin : prev.size();
+      if (pos > common) continue;
+      // Unknown pieces on both sides would be merged.
+      if (IsUnknown(pieces[k - 1].id) && !model_->ByteFallbackEnabled()) {
+        continue;
+      }
+      if (IsWordBoundary(normalized, pos, spec) &&
+          IsWordBoundary(prev, pos, spec)) {
+        resume = k;
+        break;
+      }
+    }
+  }
+
+  const size_t begin = resume > 0 ? (resume < pieces.size()
+                                         ? pieces[resume].begin
+                                         : prev.size())
+                                  : 0;
+  const float prefix_score = resume > 0 ? pieces[resume - 1].score : 0.0;
+  state->ids_.resize(resume > 0 ? pieces[resume - 1].ids_end : 0);
+  pieces.resize(resume);
+
+  const absl::string_view rest = absl::string_view(normalized).substr(begin);
+  std::vector<float> scores;
+  EncodeResult result;
+  if (resumable) {
+    result = model_->ResumeEncode(rest, prefix_score, &scores);
+  } else {
+    result = model_->Encode(rest);
+    scores.assign(result.size(), 0.0);
+  }
+  CHECK_EQ_OR_RETURN(result.size(), scores.size());
+
+  std::vector<size_t> ids_ends;
+  RETURN_IF_ERROR(
+      AppendIdsAndPieces(rest, result, &state->ids_, nullptr, &ids_ends));
+  size_t offset = begin;
+  for (size_t i = 0; i < result.size(); ++i) {
+    pieces.push_back({offset, ids_ends[i], result[i].second, scores[i]});
+    if (!IsControl(result[i].second)) offset += result[i].first.size();
+  }
+  state->normalized_ = std::move(normalized);
+
+  state->has_extra_options_ = !encode_extra_options_.empty();
+  if (state->has_extra_options_) {
+    state->extended_ids_ = state->ids_;
+    RETURN_IF_ERROR(ApplyExtraOptions(encode_extra_options_,
+                                      &state->extended_ids_, nullptr));
+  } else {
+    state->extended_ids_.clear();
+  }
+
+  return util::OkStatus();
+}
+
+IncrementalEncodeState::IncrementalEncodeState() {}
+
+IncrementalEncodeState::~IncrementalEncodeState() {}
+
+void IncrementalEncodeState::Clear() {
+  input_.clear();
+  normalized_.clear();
+  pieces_.clear();
+  ids_.clear();
+  extended_ids_.clear();
+  has_extra_options_ = false;
+}
+
 util::Status SentencePieceProcessor::Encode(absl::string_view input,
                                             SentencePieceText *spt) const {
   CHECK_OR_RETURN_STATUS_PROTO(spt);
@@ -647,7 +1401,7 @@ util::Status SentencePieceProcessor::Encode(absl::string_view input,
   std::vector<size_t> norm_to_orig;
   RETURN_IF_ERROR(normalizer_->Normalize(input, &normalized, &norm_to_orig));
 
-  const auto result = model_->Encode(normalized);
+  const auto result = EncodeNormalized(normalized);
   RETURN_IF_ERROR(
       PopulateSentencePieceText(input, normalized, norm_to_orig, result, spt));
 
@@ -937,9 +1691,8 @@ util::Status SentencePieceProcessor::Decode(const std::vector<int> &ids,
 
 util::Status SentencePieceProcessor::Normalize(absl::string_view input,
                                                std::string *normalized) const {
-  std::vector<size_t> norm_to_orig;
   CHECK_OR_RETURN(normalizer_);
-  return normalizer_->Normalize(input, normalized, &norm_to_orig);
+  return normalizer_->Normalize(input, normalized, nullptr);
 }
 
 util::Status SentencePieceProcessor::Normalize(
@@ -1106,24 +1859,114 @@ util::Status SentencePieceProcessor::ParseExtraOptions(
 }
 
 void SentencePieceProcessor::SetModel(std::unique_ptr<ModelInterface> &&model) {
+  InvalidateEncodeCache();
   model_ = std::move(model);
+  decode_table_ = std::make_unique<DecodeTable>();
 }
 
 void SentencePieceProcessor::SetNormalizer(
     std::unique_ptr<normalizer::Normalizer> &&normalizer) {
+  InvalidateEncodeCache();
   normalizer_ = std::move(normalizer);
 }
 
+void SentencePieceProcessor::RestorePrecompiledCharsMaps() const {
+  std::lock_guard<std::mutex> lock(charsmaps_mutex_);
+  if (!charsmaps_released_) return;
+  model_proto_->mutable_normalizer_spec()->set_precompiled_charsmap(
+      normalizer_charsmap_.data(), normalizer_charsmap_.size());
+  if (model_proto_->has_denormalizer_spec()) {
+    model_proto_->mutable_denormalizer_spec()->set_precompiled_charsmap(
+        denormalizer_charsmap_.data(), denormalizer_charsmap_.size());
+  }
+  charsmaps_released_ = false;
+}
+
 const ModelProto &SentencePieceProcessor::model_proto() const {
+  RestorePrecompiledCharsMaps();
   return *model_proto_;
 }
 
 std::string SentencePieceProcessor::serialized_model_proto() const {
-  return model_proto_ ? model_proto_->SerializeAsString() : "";
+  if (!model_proto_) return "";
+  RestorePrecompiledCharsMaps();
+  return model_proto_->SerializeAsString();
+}
+
+std::string SentencePieceProcessor::serialized_precompiled_model() const {
+  if (!model_proto_ || !model_) return "";
+
+  RestorePrecompiledCharsMaps();
+  const std::string proto = model_proto_->SerializeAsString();
+  std::string index = model_->SerializeIndex();
+  if (!index.empty()) {
+    std::string charsmaps;
+    AppendIndexSection(
+        model_proto_->normalizer_spec().precompiled_charsmap(), &charsmaps);
+    AppendIndexSection(
+        model_proto_->denormalizer_spec().precompiled_charsmap(), &charsmaps);
+    index.insert(0, charsmaps);
+  }
+
+  PrecompiledModelHeader header;
+  memcpy(header.magic, kPrecompiledModelMagic, sizeof(header.magic));
+  header.version = kPrecompiledModelVersion;
+  header.byte_order = kPrecompiledModelByteOrder;
+  header.proto_size = proto.size();
+  header.index_size = index.size();
+
+  std::string serialized(reinterpret_cast<const char *>(&header),
+                         sizeof(header));
+  serialized.append(proto);
+  serialized.resize(PrecompiledModelIndexOffset(proto.size()), '\0');
+  serialized.append(index);
+  return serialized;
+}
+
+util::Status SentencePieceProcessor::SavePrecompiled(
+    absl::string_view filename) const {
+  RETURN_IF_ERROR(status());
+  if (filename.empty()) {
+    auto output = filesystem::NewWritableFile(filename, true);
+    RETURN_IF_ERROR(output->status());
+    CHECK_OR_RETURN(output->Write(serialized_precompiled_model()))
+        << "could not write to stdout";
+    return util::OkStatus();
+  }
+
+  // Load() keeps `filename` mapped, so the file is never rewritten in place.
+  // The model is written to a temporary file which then replaces `filename`,
+  // and the processes mapping the old file keep reading its content.
+  const std::string path(filename);
+  const std::string tmp_path =
+      absl::StrCat(path, ".tmp", std::random_device()());
+  {
+    auto output = filesystem::NewWritableFile(tmp_path, true);
+    RETURN_IF_ERROR(output->status());
+    if (!output->Write(serialized_precompiled_model())) {
+      output.reset();
+      std::remove(tmp_path.c_str());
+      return util::InternalError(absl::StrCat("could not write ", filename));
+    }
+  }
+#ifdef OS_WIN
+  // rename() does not replace an existing file on Windows.
+  std::remove(path.c_str());
+#endif  // OS_WIN
+  if (std::rename(tmp_path.c_str(), path.c_str()) != 0) {
+    const int error = errno;
+    std::remove(tmp_path.c_str());
+    return util::StatusBuilder(util::StatusCode::kPermissionDenied, GTL_LOC)
+           << "\"" << path << "\": " << util::StrError(error);
+  }
+  return util::OkStatus();
 }
 
 NormalizerSpec *SentencePieceProcessor::mutable_normalizer_spec() const {
-  return model_proto_ ? model_proto_->mutable_normalizer_spec() : nullptr;
+  InvalidateEncodeCache();
+  if (!model_proto_) return nullptr;
+  RestorePrecompiledCharsMaps();
+  return model_proto_->mutable_normalizer_spec();
 }
 
 // Set seed value of random generator.
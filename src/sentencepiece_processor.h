@@ -17,7 +17,10 @@
 
 #include <cstdint>
 #include <cstring>
+#include <functional>
 #include <memory>
+#include <mutex>
+#include <shared_mutex>
 #include <string>
 #include <string_view>
 #include <utility>
@@ -141,6 +144,10 @@ namespace normalizer {
 class Normalizer;
 }  // namespace normalizer
 
+namespace filesystem {
+class MappedFile;
+}  // namespace filesystem
+
 #ifndef SWIGGO
 namespace util {
 // Redefine std::string for serialized_proto interface as Python's string is
@@ -154,6 +161,8 @@ class NBestSentencePieceText;
 class ModelInterface;
 class SentencePieceText;
 class SentencePieceText_SentencePiece;
+class DecodeStream;
+class IncrementalEncodeState;
 
 // Wrapper class of SentencePieceText
 // This wrapper only allows an immutable access to the proto and
@@ -243,6 +252,9 @@ class SentencePieceProcessor {
 
   // Loads model from `filename`.
   // Returns false if `filename` cannot be loaded.
+  // `filename` can either be a serialized model proto or a precompiled model
+  // written by SavePrecompiled(). The precompiled model is memory-mapped, so
+  // the prebuilt lookup index is shared across the processes loading it.
   virtual util::Status Load(absl::string_view filename);
 
   // Loads model from `filename`.
@@ -257,7 +269,9 @@ class SentencePieceProcessor {
   // `model_proto` is moved.
   virtual util::Status Load(std::unique_ptr<ModelProto> model_proto);
 
-  // Loads model from `serialized`, which is a string-serialized model proto.
+  // Loads model from `serialized`, which is a string-serialized model proto
+  // or serialized_precompiled_model(). The latter skips building the lookup
+  // index of the model.
   // Useful to load the model from a platform independent blob object.
   virtual util::Status LoadFromSerializedProto(absl::string_view serialized);
 
@@ -289,6 +303,55 @@ class SentencePieceProcessor {
   virtual util::Status LoadVocabulary(absl::string_view filename,
                                       int threshold);
 
+  //////////////////////////////////////////////////////////////
+  // Encode cache.
+  //
+  // Caches the pieces and ids returned by Encode() for up to `capacity`
+  // distinct inputs each, evicting the least recently used ones. Sampling
+  // APIs are never cached. The cache is safe to use from multiple threads and
+  // is cleared whenever the model or the encode options change.
+  // `capacity` = 0 disables the cache (default).
+  virtual util::Status SetEncodeCacheCapacity(int capacity);
+
+  // Returns the capacity of the encode cache.
+  virtual int GetEncodeCacheCapacity() const;
+
+  // Returns the number of Encode() calls served from the cache.
+  virtual size_t GetEncodeCacheHits() const;
+
+  // Returns the number of Encode() calls not found in the cache.
+  virtual size_t GetEncodeCacheMisses() const;
+
+  // Drops all cached results and resets the counters.
+  virtual void ClearEncodeCache();
+
+  // Memoizes the pieces of up to `capacity` words, so that frequent words are
+  // segmented only once even in different inputs. Available in BPE models
+  // trained with `split_by_whitespace` whose pieces never span multiple words.
+  // Loading a model disables it.
+  // `capacity` = 0 disables the cache (default).
+  virtual util::Status SetWordCacheCapacity(int capacity);
+
+  // Returns the capacity of the word cache.
+  virtual int GetWordCacheCapacity() const;
+
+  //////////////////////////////////////////////////////////////
+  // Parallel encoding of long inputs.
+  //
+  // Calls `func(i)` for every i in [0, size) and returns when all the calls
+  // have finished. The calls may run in parallel.
+  using ParallelForFunc = std::function<void(
+      size_t size, const std::function<void(size_t)> &func)>;
+
+  // Splits the normalized inputs longer than `chunk_size` bytes at the first
+  // word boundary after every `chunk_size` bytes and lets Encode() segment
+  // the chunks with `parallel_for`. The results are the same as the ones of
+  // the whole input. Available in the same models as SetWordCacheCapacity();
+  // the other models always segment the whole input.
+  // Empty `parallel_for` disables it (default).
+  virtual util::Status SetParallelEncode(ParallelForFunc parallel_for,
+                                         size_t chunk_size);
+
   //////////////////////////////////////////////////////////////
   // Simple Encode and Decode API.
   //
@@ -300,6 +363,15 @@ class SentencePieceProcessor {
   virtual util::Status Encode(absl::string_view input,
                               std::vector<int> *ids) const;
 
+  // Appends `text` to the input of `state` and updates state->ids() to
+  // Encode(state->input()). Only the end of the input from the last word
+  // boundary which `text` cannot affect is segmented again. Falls back to
+  // the segmentation of the whole input when the model cannot resume from a
+  // word boundary, e.g., without `split_by_whitespace`.
+  // `state` must only be used with this instance and the same options.
+  virtual util::Status EncodeAppended(absl::string_view text,
+                                      IncrementalEncodeState *state) const;
+
   // Given a sequence of pieces, decodes it into a detokenized output.
   virtual util::Status Decode(const std::vector<std::string> &pieces,
                               std::string *detokenized) const;
@@ -312,6 +384,10 @@ class SentencePieceProcessor {
   virtual util::Status Decode(const std::vector<int> &ids,
                               std::string *detokenized) const;
 
+  // Returns a DecodeStream, which decodes ids incrementally.
+  // This instance must outlive the returned object.
+  virtual std::unique_ptr<DecodeStream> NewDecodeStream() const;
+
   //////////////////////////////////////////////////////////////
   // NBest API.
   //
@@ -694,14 +770,38 @@ class SentencePieceProcessor {
   // Useful to save the state of this instance via Python's pickle object.
   util::bytes serialized_model_proto() const;
 
+  // Returns the model proto together with the prebuilt lookup index of the
+  // model: the piece table, the scores, the precompiled charsmaps and the
+  // unigram trie or the BPE merge table. Load() maps the file and uses the
+  // index in place, so the processes loading the same file share it. The
+  // index is rebuilt when it was saved by another version or on a host of
+  // another byte order.
+  util::bytes serialized_precompiled_model() const;
+
+  // Saves serialized_precompiled_model() to `filename`.
+  util::Status SavePrecompiled(absl::string_view filename) const;
+
   // Returns mutable normalizer_spec.
   // Updating the intenral normalization during the encoding/decoding are not
   // recommended and may result in unexpected behavior. Use at your own risk.
   NormalizerSpec *mutable_normalizer_spec() const;
 
+  // Returns the lock for callers which run the const methods in parallel
+  // with the methods updating this instance, e.g., Load(). The former hold
+  // it shared and the latter exclusively. The methods of this class do not
+  // take it by themselves.
+  std::shared_mutex *mutex() const { return &mutex_; }
+
  private:
   enum ExtraOption { REVERSE, BOS, EOS, UNK_PIECE };
 
+  class EncodeCache;
+  class DecodeTable;
+  friend class DecodeStream;
+
+  // Drops the cached results, which are no longer valid.
+  void InvalidateEncodeCache() const;
+
   util::Status ParseExtraOptions(absl::string_view extra_option,
                                  std::vector<ExtraOption> *extra_options) const;
 
@@ -714,6 +814,40 @@ class SentencePieceProcessor {
       const std::vector<std::pair<absl::string_view, int>> &result,
       SentencePieceText *spt) const;
 
+  // Same as PopulateSentencePieceText(), but only populates `ids` and
+  // `pieces` (if not null) without building SentencePieceText.
+  util::Status PopulateIdsAndPieces(
+      absl::string_view normalized,
+      const std::vector<std::pair<absl::string_view, int>> &result,
+      std::vector<int> *ids, std::vector<std::string> *pieces) const;
+
+  // Appends the ids and `pieces` (if not null) of `result` without the extra
+  // options. Stores the size of `ids` after each piece of `result` in
+  // `ids_ends` if not null.
+  util::Status AppendIdsAndPieces(
+      absl::string_view normalized,
+      const std::vector<std::pair<absl::string_view, int>> &result,
+      std::vector<int> *ids, std::vector<std::string> *pieces,
+      std::vector<size_t> *ids_ends) const;
+
+  util::Status ApplyExtraOptions(const std::vector<ExtraOption> &extra_options,
+                                 std::vector<int> *ids,
+                                 std::vector<std::string> *pieces) const;
+
+  // Returns model_->Encode(normalized). Segments the chunks of a long input
+  // in parallel if SetParallelEncode() is enabled.
+  std::vector<std::pair<absl::string_view, int>> EncodeNormalized(
+      absl::string_view normalized) const;
+
+  // Loads `model_proto` with the lookup `index` of the model. `index` must
+  // outlive the model.
+  util::Status LoadInternal(std::unique_ptr<ModelProto> model_proto,
+                            absl::string_view index);
+
+  // Copies the precompiled charsmaps back to `model_proto_` if LoadInternal()
+  // released them in favor of the ones in the index.
+  void RestorePrecompiledCharsMaps() const;
+
   std::unique_ptr<ModelInterface> model_;
   std::unique_ptr<normalizer::Normalizer> normalizer_;
   std::unique_ptr<normalizer::Normalizer> denormalizer_;
@@ -721,8 +855,137 @@ class SentencePieceProcessor {
   // Underlying model protocol buffer. The same lifetime as model_.
   std::unique_ptr<ModelProto> model_proto_;
 
+  // Storage of the lookup index of model_, if any. The same lifetime as
+  // model_.
+  std::unique_ptr<filesystem::MappedFile> model_file_;
+  std::vector<char> model_index_;
+
+  // Precompiled charsmaps of normalizer_ and denormalizer_, either in
+  // `model_proto_` or in the index.
+  absl::string_view normalizer_charsmap_;
+  absl::string_view denormalizer_charsmap_;
+  mutable bool charsmaps_released_ = false;
+  mutable std::mutex charsmaps_mutex_;
+
   std::vector<ExtraOption> encode_extra_options_;
   std::vector<ExtraOption> decode_extra_options_;
+
+  std::unique_ptr<EncodeCache> encode_cache_;
+
+  ParallelForFunc parallel_for_;
+  size_t parallel_chunk_size_ = 0;
+
+  // Decoded surfaces of the ids of model_. The same lifetime as model_.
+  std::unique_ptr<DecodeTable> decode_table_;
+
+  mutable std::shared_mutex mutex_;
+};
+
+// Decodes ids incrementally, e.g., the outputs of a language model generated
+// token by token. Put() returns only the text finalized by the new ids and
+// takes amortized constant time per id. The bytes of an incomplete UTF-8
+// character made of byte pieces are kept until the following ids complete it.
+//
+// The concatenation of all the outputs of Put() and Finish() is the same as
+// Decode(ids), except that the decode extra options are not applied and the
+// denormalization rules are applied to each output separately.
+//
+// The SentencePieceProcessor must outlive this object and must not be
+// reloaded while the stream is in use.
+//
+// Usage:
+//   auto stream = sp.NewDecodeStream();
+//   std::string text;
+//   for (const int id : generated_ids) {
+//     stream->Put(id, &text);
+//     std::cout << text;
+//   }
+//   stream->Finish(&text);
+//   std::cout << text;
+class DecodeStream {
+ public:
+  explicit DecodeStream(const SentencePieceProcessor &processor);
+  virtual ~DecodeStream();
+
+  // Appends `ids` and stores the newly finalized text in `text`.
+  util::Status Put(const std::vector<int> &ids, std::string *text);
+
+  // Appends `id` and stores the newly finalized text in `text`.
+  util::Status Put(int id, std::string *text);
+
+  // Stores the remaining text in `text` and resets the stream. Incomplete
+  // UTF-8 characters are decoded into U+FFFD.
+  util::Status Finish(std::string *text);
+
+  // Discards the state, so that the next Put() starts a new sequence.
+  void Reset();
+
+ private:
+  friend class SentencePieceProcessor;
+
+  // Appends the decoded `ids` to `text` without denormalization.
+  // `ids` must be valid.
+  util::Status Append(const int *ids, size_t size, std::string *text);
+
+  // Appends the buffered bytes to `text`. Keeps the bytes of the last
+  // incomplete character unless `finish` is true.
+  void FlushBytes(bool finish, std::string *text);
+
+  util::Status PutInternal(const int *ids, size_t size, std::string *text);
+
+  const SentencePieceProcessor &processor_;
+
+  std::string bytes_;        // Bytes of the byte pieces not decoded yet.
+  bool is_bos_ws_ = true;    // Whether we expect a bos ws token to consume.
+  bool bos_ws_seen_ = false;
+  bool has_text_ = false;    // Whether any non-empty text is decoded.
+};
+
+// Encoding of a text which only grows by appending, e.g., a chat conversation.
+// SentencePieceProcessor::EncodeAppended() updates it.
+//
+// Usage:
+//   IncrementalEncodeState state;
+//   for (const auto &turn : conversation) {
+//     sp.EncodeAppended(turn, &state);
+//     Generate(state.ids());
+//   }
+class IncrementalEncodeState {
+ public:
+  IncrementalEncodeState();
+  virtual ~IncrementalEncodeState();
+
+  // Returns the whole input appended so far.
+  const std::string &input() const { return input_; }
+
+  // Returns the normalized input.
+  const std::string &normalized() const { return normalized_; }
+
+  // Returns Encode(input()).
+  const std::vector<int> &ids() const {
+    return has_extra_options_ ? extended_ids_ : ids_;
+  }
+
+  // Clears the input.
+  void Clear();
+
+ private:
+  friend class SentencePieceProcessor;
+
+  // A piece returned by the model.
+  struct Piece {
+    size_t begin;     // Offset in normalized_.
+    size_t ids_end;   // Size of ids_ up to this piece.
+    int id;           // Vocab id.
+    float score;      // Score of the best path at the end of this piece.
+  };
+
+  std::string input_;
+  std::string normalized_;
+  std::vector<Piece> pieces_;
+  std::vector<int> ids_;           // Ids without the extra options.
+  std::vector<int> extended_ids_;  // Ids with the extra options.
+  bool has_extra_options_ = false;
 };
 
 // Set seed value of random generator.
@@ -14,6 +14,12 @@
 
 #include "sentencepiece_processor.h"
 
+#include <algorithm>
+#include <atomic>
+#include <cstring>
+#include <functional>
+#include <random>
+#include <thread>
 #include <utility>
 
 #include "builder.h"
@@ -26,9 +32,14 @@
 #include "testharness.h"
 #include "third_party/absl/container/flat_hash_map.h"
 #include "third_party/absl/strings/str_cat.h"
+#include "third_party/absl/strings/str_replace.h"
 #include "third_party/absl/strings/string_view.h"
 #include "util.h"
 
+#ifdef OS_UNIX
+#include <unistd.h>
+#endif  // OS_UNIX
+
 namespace sentencepiece {
 
 // Space symbol
@@ -954,6 +965,14 @@ TEST(SentencePieceProcessorTest, LoadInvalidModelTest) {
   SentencePieceProcessor sp;
   EXPECT_FALSE(sp.Load("").ok());
   EXPECT_FALSE(sp.Load("__UNKNOWN_FILE__").ok());
+
+  const std::string filename =
+      util::JoinPath(::testing::TempDir(), "invalid.model");
+  {
+    auto output = filesystem::NewWritableFile(filename, true);
+    output->Write("__NOT_A_PROTO__");
+  }
+  EXPECT_FALSE(sp.Load(filename).ok());
 }
 
 TEST(SentencePieceProcessorTest, LoadSerializedProtoTest) {
@@ -971,6 +990,688 @@ TEST(SentencePieceProcessorTest, LoadSerializedProtoTest) {
             sp.model_proto().SerializeAsString());
 }
 
+TEST(SentencePieceProcessorTest, EncodeIdsAndPiecesTest) {
+  ModelProto model_proto;
+  auto *unk = model_proto.add_pieces();
+  unk->set_type(ModelProto::SentencePiece::UNKNOWN);
+  unk->set_piece("<unk>");
+  auto *bos = model_proto.add_pieces();
+  bos->set_type(ModelProto::SentencePiece::CONTROL);
+  bos->set_piece("<s>");
+  auto *eos = model_proto.add_pieces();
+  eos->set_type(ModelProto::SentencePiece::CONTROL);
+  eos->set_piece("</s>");
+  AddPiece(&model_proto, "a", 0.0);
+  AddPiece(&model_proto, "b", 0.3);
+  AddPiece(&model_proto, "ab", 1.0);
+  AddPiece(&model_proto, WS, 3.0);
+  AddPiece(&model_proto, WS "ab", 4.0);
+  *(model_proto.mutable_normalizer_spec()) = MakeDefaultNormalizerSpec();
+
+  ModelProto byte_model_proto = model_proto;
+  for (int i = 0; i < 256; ++i) {
+    auto *sp = byte_model_proto.add_pieces();
+    sp->set_piece(ByteToPiece(i));
+    sp->set_type(ModelProto::SentencePiece::BYTE);
+  }
+  byte_model_proto.mutable_trainer_spec()->set_byte_fallback(true);
+
+  // Ids and pieces are the same as the ones in SentencePieceText.
+  for (const auto &proto : {model_proto, byte_model_proto}) {
+    SentencePieceProcessor sp;
+    ASSERT_TRUE(sp.Load(proto).ok());
+    for (const char *extra_options :
+         {"", "bos", "eos", "reverse", "unk", "bos:eos", "reverse:bos:unk",
+          "eos:reverse", "unk:bos:eos:reverse"}) {
+      ASSERT_TRUE(sp.SetEncodeExtraOptions(extra_options).ok());
+      for (const char *text :
+           {"", "ab", "ab ba", "xyz ab", "abあい b", "  c ab x", "ⅷ"}) {
+        std::vector<int> ids;
+        std::vector<std::string> pieces;
+        SentencePieceText spt;
+        EXPECT_TRUE(sp.Encode(text, &ids).ok());
+        EXPECT_TRUE(sp.Encode(text, &pieces).ok());
+        EXPECT_TRUE(sp.Encode(text, &spt).ok());
+        ASSERT_EQ(spt.pieces_size(), ids.size());
+        ASSERT_EQ(spt.pieces_size(), pieces.size());
+        for (int i = 0; i < spt.pieces_size(); ++i) {
+          EXPECT_EQ(spt.pieces(i).id(), ids[i]);
+          EXPECT_EQ(spt.pieces(i).piece(), pieces[i]);
+        }
+      }
+    }
+  }
+}
+
+TEST(SentencePieceProcessorTest, DecodeIdsTest) {
+  ModelProto model_proto;
+  auto *unk = model_proto.add_pieces();
+  unk->set_type(ModelProto::SentencePiece::UNKNOWN);
+  unk->set_piece("<unk>");
+  auto *bos = model_proto.add_pieces();
+  bos->set_type(ModelProto::SentencePiece::CONTROL);
+  bos->set_piece("<s>");
+  auto *eos = model_proto.add_pieces();
+  eos->set_type(ModelProto::SentencePiece::CONTROL);
+  eos->set_piece("</s>");
+  AddPiece(&model_proto, "a", 0.0);
+  AddPiece(&model_proto, "b", 0.3);
+  AddPiece(&model_proto, "ab", 1.0);
+  AddPiece(&model_proto, WS, 3.0);
+  AddPiece(&model_proto, WS "ab", 4.0);
+  AddPiece(&model_proto, "b" WS WS "a", 0.0);
+  AddPiece(&model_proto, "ｱ", 0.0);
+  auto *user = model_proto.add_pieces();
+  user->set_type(ModelProto::SentencePiece::USER_DEFINED);
+  user->set_piece(WS "<sep>");
+  *(model_proto.mutable_normalizer_spec()) = MakeDefaultNormalizerSpec();
+
+  ModelProto byte_model_proto = model_proto;
+  for (int i = 0; i < 256; ++i) {
+    auto *sp = byte_model_proto.add_pieces();
+    sp->set_piece(ByteToPiece(i));
+    sp->set_type(ModelProto::SentencePiece::BYTE);
+  }
+  byte_model_proto.mutable_trainer_spec()->set_byte_fallback(true);
+  byte_model_proto.mutable_trainer_spec()->set_unk_surface("");
+
+  ModelProto denormalizer_model_proto = model_proto;
+  *(denormalizer_model_proto.mutable_denormalizer_spec()) =
+      SentencePieceTrainer::GetNormalizerSpec("nfkc");
+  denormalizer_model_proto.mutable_denormalizer_spec()->set_add_dummy_prefix(
+      false);
+
+  // Decoded text is the same as the one in SentencePieceText.
+  std::mt19937 mt(0);
+  for (const auto &proto :
+       {model_proto, byte_model_proto, denormalizer_model_proto}) {
+    for (const bool add_dummy_prefix : {true, false}) {
+      for (const bool remove_extra_whitespaces : {true, false}) {
+        SentencePieceProcessor sp;
+        ASSERT_TRUE(sp.Load(proto).ok());
+        sp.mutable_normalizer_spec()->set_add_dummy_prefix(add_dummy_prefix);
+        sp.mutable_normalizer_spec()->set_remove_extra_whitespaces(
+            remove_extra_whitespaces);
+        std::uniform_int_distribution<int> dist(0, sp.GetPieceSize() - 1);
+        for (const char *extra_options :
+             {"", "bos", "eos", "reverse", "unk", "bos:eos", "reverse:bos"}) {
+          ASSERT_TRUE(sp.SetDecodeExtraOptions(extra_options).ok());
+          for (int n = 0; n < 100; ++n) {
+            std::vector<int> ids(n % 10);
+            for (auto &id : ids) id = dist(mt);
+            if (n % 2 == 0) {
+              // Byte sequences are mostly valid UTF-8.
+              const std::string text = "あbｱ ab";
+              for (const char c : text) {
+                ids.push_back(sp.PieceToId(ByteToPiece(c & 0xff)));
+              }
+            }
+            std::string detokenized;
+            SentencePieceText spt;
+            EXPECT_TRUE(sp.Decode(ids, &detokenized).ok());
+            EXPECT_TRUE(sp.Decode(ids, &spt).ok());
+            EXPECT_EQ(spt.text(), detokenized);
+          }
+        }
+      }
+    }
+  }
+
+  SentencePieceProcessor sp;
+  ASSERT_TRUE(sp.Load(model_proto).ok());
+  std::string detokenized;
+  EXPECT_EQ(sp.Decode(std::vector<int>{3, 100}, &detokenized).code(),
+            util::StatusCode::kOutOfRange);
+  EXPECT_EQ(sp.Decode(std::vector<int>{-1}, &detokenized).code(),
+            util::StatusCode::kOutOfRange);
+}
+
+TEST(SentencePieceProcessorTest, DecodeStreamTest) {
+  ModelProto model_proto;
+  auto *unk = model_proto.add_pieces();
+  unk->set_type(ModelProto::SentencePiece::UNKNOWN);
+  unk->set_piece("<unk>");
+  auto *bos = model_proto.add_pieces();
+  bos->set_type(ModelProto::SentencePiece::CONTROL);
+  bos->set_piece("<s>");
+  auto *eos = model_proto.add_pieces();
+  eos->set_type(ModelProto::SentencePiece::CONTROL);
+  eos->set_piece("</s>");
+  AddPiece(&model_proto, "a", 0.0);
+  AddPiece(&model_proto, "b", 0.3);
+  AddPiece(&model_proto, "ab", 1.0);
+  AddPiece(&model_proto, WS, 3.0);
+  AddPiece(&model_proto, WS "ab", 4.0);
+  AddPiece(&model_proto, "b" WS WS "a", 0.0);
+  for (int i = 0; i < 256; ++i) {
+    auto *sp = model_proto.add_pieces();
+    sp->set_piece(ByteToPiece(i));
+    sp->set_type(ModelProto::SentencePiece::BYTE);
+  }
+  *(model_proto.mutable_normalizer_spec()) = MakeDefaultNormalizerSpec();
+  model_proto.mutable_trainer_spec()->set_byte_fallback(true);
+
+  auto ToByteIds = [](const SentencePieceProcessor &sp,
+                      absl::string_view text) {
+    std::vector<int> ids;
+    for (const char c : text) {
+      ids.push_back(sp.PieceToId(ByteToPiece(c & 0xff)));
+    }
+    return ids;
+  };
+
+  // The concatenated outputs are the same as Decode().
+  std::mt19937 mt(0);
+  for (const bool add_dummy_prefix : {true, false}) {
+    for (const bool remove_extra_whitespaces : {true, false}) {
+      SentencePieceProcessor sp;
+      ASSERT_TRUE(sp.Load(model_proto).ok());
+      sp.mutable_normalizer_spec()->set_add_dummy_prefix(add_dummy_prefix);
+      sp.mutable_normalizer_spec()->set_remove_extra_whitespaces(
+          remove_extra_whitespaces);
+      std::uniform_int_distribution<int> dist(0, 8);
+      auto stream = sp.NewDecodeStream();
+      for (int n = 0; n < 200; ++n) {
+        std::vector<int> ids;
+        for (int i = 0; i < n % 20; ++i) {
+          const int r = dist(mt);
+          if (r < 6) {
+            ids.push_back(r);
+          } else {
+            // Valid, truncated and broken UTF-8 sequences.
+            const char *texts[] = {"あ", "\xe3\x81", "\x82 a"};
+            for (const int id : ToByteIds(sp, texts[r - 6])) ids.push_back(id);
+          }
+        }
+
+        std::string expected, output, text;
+        EXPECT_TRUE(sp.Decode(ids, &expected).ok());
+        for (size_t i = 0; i < ids.size();) {
+          const size_t size = std::min<size_t>(ids.size() - i, 1 + n % 3);
+          EXPECT_TRUE(
+              stream
+                  ->Put(std::vector<int>(ids.begin() + i,
+                                         ids.begin() + i + size),
+                        &text)
+                  .ok());
+          output += text;
+          i += size;
+        }
+        EXPECT_TRUE(stream->Finish(&text).ok());
+        output += text;
+        EXPECT_EQ(expected, output);
+      }
+    }
+  }
+
+  SentencePieceProcessor sp;
+  ASSERT_TRUE(sp.Load(model_proto).ok());
+  DecodeStream stream(sp);
+  std::string text;
+
+  // Incomplete UTF-8 characters are not returned until completed.
+  const auto ids = ToByteIds(sp, "あい");
+  EXPECT_TRUE(stream.Put(3, &text).ok());
+  EXPECT_EQ("a", text);
+  for (int i = 0; i < 5; ++i) {
+    EXPECT_TRUE(stream.Put(ids[i], &text).ok());
+    EXPECT_EQ(i == 2 ? "あ" : "", text);
+  }
+  EXPECT_TRUE(stream.Put(ids[5], &text).ok());
+  EXPECT_EQ("い", text);
+
+  // Finish() flushes incomplete characters.
+  EXPECT_TRUE(stream.Put(ids[0], &text).ok());
+  EXPECT_EQ("", text);
+  EXPECT_TRUE(stream.Finish(&text).ok());
+  EXPECT_EQ("\xef\xbf\xbd", text);
+
+  // The stream is reset after Finish().
+  EXPECT_TRUE(stream.Put(sp.PieceToId(WS "ab"), &text).ok());
+  EXPECT_EQ("ab", text);
+  EXPECT_TRUE(stream.Put(sp.PieceToId(WS "ab"), &text).ok());
+  EXPECT_EQ(" ab", text);
+  stream.Reset();
+  EXPECT_TRUE(stream.Put(sp.PieceToId(WS "ab"), &text).ok());
+  EXPECT_EQ("ab", text);
+
+  EXPECT_EQ(stream.Put(-1, &text).code(), util::StatusCode::kOutOfRange);
+  EXPECT_EQ(stream.Put(sp.GetPieceSize(), &text).code(),
+            util::StatusCode::kOutOfRange);
+
+  SentencePieceProcessor empty;
+  EXPECT_FALSE(empty.NewDecodeStream()->Put(0, &text).ok());
+}
+
+TEST(SentencePieceProcessorTest, EncodeAppendedTest) {
+  const std::string input = util::JoinPath(::testing::SrcDir(), "botchan.txt");
+  const std::string model_prefix =
+      util::JoinPath(::testing::TempDir(), "encode_appended");
+  const std::vector<std::string> fragments = {
+      "I", " am", " a", " cat", ".", " ", "  ", "\t", "\n", "don't",
+      "pre", "tty", " ab", "c", "吾輩", "は", "猫", " ▁", "Ⅻ", ",",
+      // Normalized together with the previous characters.
+      "ｶ", "ﾞ", "e", "\xcc\x81"};
+
+  std::mt19937 mt(0);
+  std::uniform_int_distribution<int> dist(0, fragments.size() - 1);
+  for (const char *args :
+       {"--model_type=unigram",
+        "--model_type=unigram --byte_fallback --treat_whitespace_as_suffix "
+        "--allow_whitespace_only_pieces",
+        "--model_type=bpe", "--model_type=bpe --byte_fallback",
+        "--model_type=unigram --split_by_whitespace=false"}) {
+    ASSERT_TRUE(SentencePieceTrainer::Train(
+                    absl::StrCat("--input=", input,
+                                 " --model_prefix=", model_prefix,
+                                 " --vocab_size=1000 ", args))
+                    .ok());
+    SentencePieceProcessor sp;
+    ASSERT_TRUE(sp.Load(model_prefix + ".model").ok());
+    for (const bool remove_extra_whitespaces : {true, false}) {
+      sp.mutable_normalizer_spec()->set_remove_extra_whitespaces(
+          remove_extra_whitespaces);
+      for (const char *extra_options : {"", "bos:eos", "reverse"}) {
+        ASSERT_TRUE(sp.SetEncodeExtraOptions(extra_options).ok());
+        // The ids are the same as the ones of the whole input.
+        IncrementalEncodeState state;
+        for (int n = 0; n < 300; ++n) {
+          std::string text;
+          for (int i = 0; i < n % 4; ++i) text += fragments[dist(mt)];
+          EXPECT_TRUE(sp.EncodeAppended(text, &state).ok());
+          std::vector<int> ids;
+          EXPECT_TRUE(sp.Encode(state.input(), &ids).ok());
+          EXPECT_EQ(ids, state.ids());
+          if (n % 100 == 99) {
+            state.Clear();
+            EXPECT_TRUE(state.input().empty());
+          }
+        }
+      }
+    }
+  }
+
+  SentencePieceProcessor empty;
+  IncrementalEncodeState state;
+  EXPECT_FALSE(empty.EncodeAppended("a", &state).ok());
+}
+
+TEST(SentencePieceProcessorTest, ParallelEncodeTest) {
+  const std::string model_prefix =
+      util::JoinPath(::testing::TempDir(), "parallel_encode");
+  const std::string input = model_prefix + ".txt";
+
+  // Sentences with runs of whitespace, which are pieces in the models trained
+  // with `allow_whitespace_only_pieces`.
+  std::string text;
+  {
+    auto fs = filesystem::NewReadableFile(
+        util::JoinPath(::testing::SrcDir(), "botchan.txt"));
+    auto output = filesystem::NewWritableFile(input);
+    std::string line;
+    for (int n = 0; n < 2000 && fs->ReadLine(&line); ++n) {
+      line = absl::StrReplaceAll(line, {{" ", n % 3 == 0 ? "   " : " "}});
+      output->WriteLine(line);
+      if (n < 200) text += line + (n % 2 == 0 ? "  " : " ") + "吾輩は猫";
+    }
+  }
+
+  std::atomic<int> num_calls(0);
+  auto parallel_for = [&num_calls](size_t size,
+                                   const std::function<void(size_t)> &func) {
+    ++num_calls;
+    std::vector<std::thread> threads;
+    for (size_t i = 0; i < size; ++i) threads.emplace_back(func, i);
+    for (auto &thread : threads) thread.join();
+  };
+
+  for (const char *args :
+       {"--model_type=bpe", "--model_type=bpe --byte_fallback",
+        "--model_type=bpe --allow_whitespace_only_pieces",
+        "--model_type=bpe --treat_whitespace_as_suffix "
+        "--allow_whitespace_only_pieces",
+        "--model_type=unigram"}) {
+    ASSERT_TRUE(SentencePieceTrainer::Train(
+                    absl::StrCat("--input=", input,
+                                 " --model_prefix=", model_prefix,
+                                 " --vocab_size=1000",
+                                 " --remove_extra_whitespaces=false ", args))
+                    .ok());
+    SentencePieceProcessor sp1, sp2;
+    ASSERT_TRUE(sp1.Load(model_prefix + ".model").ok());
+    ASSERT_TRUE(sp2.Load(model_prefix + ".model").ok());
+    for (const size_t chunk_size : {1, 10, 1000, 100000}) {
+      ASSERT_TRUE(sp2.SetParallelEncode(parallel_for, chunk_size).ok());
+      std::vector<int> ids1, ids2;
+      std::vector<std::string> pieces1, pieces2;
+      SentencePieceText spt1, spt2;
+      EXPECT_TRUE(sp1.Encode(text, &ids1).ok());
+      EXPECT_TRUE(sp2.Encode(text, &ids2).ok());
+      EXPECT_EQ(ids1, ids2);
+      EXPECT_TRUE(sp1.Encode(text, &pieces1).ok());
+      EXPECT_TRUE(sp2.Encode(text, &pieces2).ok());
+      EXPECT_EQ(pieces1, pieces2);
+      EXPECT_TRUE(sp1.Encode(text, &spt1).ok());
+      EXPECT_TRUE(sp2.Encode(text, &spt2).ok());
+      EXPECT_EQ(spt1.SerializeAsString(), spt2.SerializeAsString());
+    }
+  }
+
+  // Only the inputs longer than chunk_size are split in BPE models.
+  EXPECT_EQ(num_calls, 4 * 3 * 3);
+
+  SentencePieceProcessor sp;
+  EXPECT_FALSE(sp.SetParallelEncode(parallel_for, 0).ok());
+  EXPECT_TRUE(sp.SetParallelEncode(nullptr, 0).ok());
+}
+
+// Returns the offset of the `n`-th section of the index in `precompiled`. The
+// sections are the charsmaps of the normalizer and the denormalizer, the
+// piece table, the scores and the sections of each model type.
+size_t IndexSectionOffset(const std::string &precompiled, int n) {
+  uint64_t index_size = 0;
+  memcpy(&index_size, precompiled.data() + 24, sizeof(index_size));
+  size_t offset = precompiled.size() - index_size;
+  for (int i = 0; i < n; ++i) {
+    uint64_t size = 0;
+    memcpy(&size, precompiled.data() + offset, sizeof(size));
+    offset += sizeof(size) + ((size + 7) & ~uint64_t{7});
+  }
+  return offset + sizeof(uint64_t);
+}
+
+TEST(SentencePieceProcessorTest, LoadPrecompiledModelTest) {
+  ModelProto model_proto;
+  auto *unk = model_proto.add_pieces();
+  unk->set_type(ModelProto::SentencePiece::UNKNOWN);
+  unk->set_piece("<unk>");
+  AddPiece(&model_proto, "a", 0.0);
+  AddPiece(&model_proto, "b", 0.3);
+  AddPiece(&model_proto, "ab", 1.0);
+  AddPiece(&model_proto, WS, 3.0);
+  *(model_proto.mutable_normalizer_spec()) = MakeDefaultNormalizerSpec();
+
+  SentencePieceProcessor sp1;
+  ASSERT_TRUE(sp1.Load(model_proto).ok());
+  const std::string filename =
+      util::JoinPath(::testing::TempDir(), "precompiled.model");
+  ASSERT_TRUE(sp1.SavePrecompiled(filename).ok());
+
+  SentencePieceProcessor sp2;
+  ASSERT_TRUE(sp2.Load(filename).ok());
+  EXPECT_EQ(model_proto.SerializeAsString(),
+            sp2.model_proto().SerializeAsString());
+  EXPECT_EQ(sp1.serialized_precompiled_model(),
+            sp2.serialized_precompiled_model());
+
+  for (const char *text : {"ab", "a b ab ba", "abc", ""}) {
+    std::vector<int> ids1, ids2;
+    EXPECT_TRUE(sp1.Encode(text, &ids1).ok());
+    EXPECT_TRUE(sp2.Encode(text, &ids2).ok());
+    EXPECT_EQ(ids1, ids2);
+  }
+  EXPECT_EQ(3, sp2.PieceToId("ab"));
+  EXPECT_EQ(0, sp2.PieceToId("abc"));
+
+  // Saving over the mapped file does not change the loaded model.
+  const std::vector<int> expected_ids = sp2.EncodeAsIds("a b ab ba");
+  ASSERT_TRUE(sp2.SavePrecompiled(filename).ok());
+  EXPECT_EQ(expected_ids, sp2.EncodeAsIds("a b ab ba"));
+  ASSERT_TRUE(sp1.SavePrecompiled(filename).ok());
+  EXPECT_EQ(expected_ids, sp2.EncodeAsIds("a b ab ba"));
+  EXPECT_EQ(3, sp2.PieceToId("ab"));
+
+  // Reloading a regular model drops the mapped file.
+  ASSERT_TRUE(sp2.Load(model_proto).ok());
+  EXPECT_EQ(3, sp2.PieceToId("ab"));
+
+  // The precompiled model can also be loaded from memory.
+  std::string precompiled = sp1.serialized_precompiled_model();
+  SentencePieceProcessor sp3;
+  ASSERT_TRUE(sp3.LoadFromSerializedProto(precompiled).ok());
+  precompiled.assign(precompiled.size(), '\0');  // sp3 keeps its own copy.
+  EXPECT_EQ(model_proto.SerializeAsString(),
+            sp3.model_proto().SerializeAsString());
+  EXPECT_EQ(3, sp3.PieceToId("ab"));
+  EXPECT_EQ(sp1.EncodeAsIds("a b ab ba"), sp3.EncodeAsIds("a b ab ba"));
+
+  // Truncated or corrupted models are rejected.
+  precompiled = sp1.serialized_precompiled_model();
+  EXPECT_FALSE(
+      sp3.LoadFromSerializedProto(precompiled.substr(0, precompiled.size() - 1))
+          .ok());
+  for (const auto &data :
+       {precompiled.substr(0, 16), precompiled.substr(0, precompiled.size() - 1),
+        precompiled.substr(0, 12) + std::string(4, '\xff') +
+            precompiled.substr(16)}) {
+    {
+      auto output = filesystem::NewWritableFile(filename, true);
+      output->Write(data);
+    }
+    EXPECT_FALSE(sp2.Load(filename).ok());
+  }
+
+  // The trie index is verified against the pieces.
+  uint64_t index_size = 0;
+  memcpy(&index_size, precompiled.data() + 24, sizeof(index_size));
+  const size_t index_offset = precompiled.size() - index_size;
+  const size_t trie_offset = IndexSectionOffset(precompiled, 4);
+  auto corrupt = [&](std::function<void(std::string *)> func) {
+    std::string data = precompiled;
+    func(&data);
+    return data;
+  };
+  for (const auto &data : {
+           // trie_results_size_ is less than the matches of "ab".
+           corrupt([&](std::string *data) {
+             const int32_t trie_results_size = 1;
+             memcpy(&(*data)[trie_offset], &trie_results_size,
+                    sizeof(trie_results_size));
+           }),
+           // The offset of the root goes out of the array.
+           corrupt([&](std::string *data) {
+             memset(&(*data)[trie_offset + 8], 0xff, 4);
+           }),
+           // The values are not valid piece ids.
+           corrupt([&](std::string *data) {
+             for (size_t i = trie_offset + 8; i < data->size(); i += 4) {
+               uint32_t unit = 0;
+               memcpy(&unit, data->data() + i, sizeof(unit));
+               if (unit & (1U << 31)) unit = (1U << 31) | 1000;
+               memcpy(&(*data)[i], &unit, sizeof(unit));
+             }
+           }),
+           // The charsmap differs from the one in the proto.
+           corrupt([&](std::string *data) {
+             ++(*data)[IndexSectionOffset(precompiled, 0) + 100];
+           }),
+           // The scores are truncated.
+           corrupt([&](std::string *data) {
+             const uint64_t size = 4;
+             memcpy(&(*data)[IndexSectionOffset(precompiled, 3) - 8], &size,
+                    sizeof(size));
+           }),
+       }) {
+    EXPECT_TRUE(sp3.LoadFromSerializedProto(precompiled).ok());
+    EXPECT_FALSE(sp3.LoadFromSerializedProto(data).ok());
+  }
+
+  // Models saved by another version or with another byte order are loaded
+  // from their proto.
+  for (const auto &data : {
+           corrupt([&](std::string *data) { (*data)[8] = 1; }),
+           corrupt([&](std::string *data) {
+             std::reverse(data->begin() + 8, data->begin() + 12);
+             std::reverse(data->begin() + 12, data->begin() + 16);
+             std::reverse(data->begin() + 16, data->begin() + 24);
+             std::reverse(data->begin() + 24, data->begin() + 32);
+             // The index of the other byte order is not read.
+             memset(&(*data)[index_offset], 0xff, index_size);
+           }),
+       }) {
+    SentencePieceProcessor sp4;
+    ASSERT_TRUE(sp4.LoadFromSerializedProto(data).ok());
+    EXPECT_EQ(model_proto.SerializeAsString(),
+              sp4.model_proto().SerializeAsString());
+    EXPECT_EQ(3, sp4.PieceToId("ab"));
+    EXPECT_EQ(sp1.EncodeAsIds("a b ab ba"), sp4.EncodeAsIds("a b ab ba"));
+  }
+}
+
+TEST(SentencePieceProcessorTest, LoadPrecompiledModelTypesTest) {
+  for (const auto type : {TrainerSpec::UNIGRAM, TrainerSpec::BPE,
+                          TrainerSpec::WORD, TrainerSpec::CHAR}) {
+    ModelProto model_proto;
+    model_proto.mutable_trainer_spec()->set_model_type(type);
+    auto *unk = model_proto.add_pieces();
+    unk->set_type(ModelProto::SentencePiece::UNKNOWN);
+    unk->set_piece("<unk>");
+    AddPiece(&model_proto, "a", -1.0);
+    AddPiece(&model_proto, "b", -2.0);
+    AddPiece(&model_proto, "ab", -0.5);
+    AddPiece(&model_proto, WS, -0.1);
+    AddPiece(&model_proto, WS "a", -0.2);
+    AddPiece(&model_proto, WS "ab", -0.3);
+    *(model_proto.mutable_normalizer_spec()) = MakeDefaultNormalizerSpec();
+
+    SentencePieceProcessor sp1;
+    ASSERT_TRUE(sp1.Load(model_proto).ok());
+    const std::string precompiled = sp1.serialized_precompiled_model();
+
+    // The tables and the charsmap in the index are used before model_proto()
+    // restores the charsmap.
+    SentencePieceProcessor sp2;
+    ASSERT_TRUE(sp2.LoadFromSerializedProto(precompiled).ok());
+    for (const char *text : {"ab", "a b ab ba", "ａｂ　ａ", "abc", ""}) {
+      EXPECT_EQ(sp1.EncodeAsPieces(text), sp2.EncodeAsPieces(text));
+      EXPECT_EQ(sp1.EncodeAsIds(text), sp2.EncodeAsIds(text));
+      EXPECT_EQ(sp1.Normalize(text), sp2.Normalize(text));
+    }
+    for (int id = 0; id < model_proto.pieces_size(); ++id) {
+      EXPECT_EQ(id, sp2.PieceToId(model_proto.pieces(id).piece()));
+      EXPECT_EQ(sp1.GetScore(id), sp2.GetScore(id));
+    }
+    EXPECT_EQ(0, sp2.PieceToId("abc"));
+    EXPECT_EQ(precompiled, sp2.serialized_precompiled_model());
+    EXPECT_EQ(model_proto.SerializeAsString(),
+              sp2.model_proto().SerializeAsString());
+    EXPECT_EQ(sp1.EncodeAsIds("ａｂ　ａ"), sp2.EncodeAsIds("ａｂ　ａ"));
+
+    // The piece table is verified against the number of pieces.
+    if (type != TrainerSpec::UNIGRAM) {
+      std::string data = precompiled;
+      const size_t offset = IndexSectionOffset(precompiled, 2);
+      for (size_t i = offset + 8; i < IndexSectionOffset(precompiled, 3) - 8;
+           i += 16) {
+        const int32_t value = 1000;
+        memcpy(&data[i], &value, sizeof(value));
+      }
+      SentencePieceProcessor sp3;
+      EXPECT_FALSE(sp3.LoadFromSerializedProto(data).ok());
+    }
+  }
+}
+
+#ifdef OS_UNIX
+TEST(SentencePieceProcessorTest, LoadFromPipeTest) {
+  ModelProto model_proto;
+  auto *unk = model_proto.add_pieces();
+  unk->set_type(ModelProto::SentencePiece::UNKNOWN);
+  unk->set_piece("<unk>");
+  AddPiece(&model_proto, "a", 0.0);
+  AddPiece(&model_proto, "b", 0.3);
+  AddPiece(&model_proto, "ab", 1.0);
+  AddPiece(&model_proto, WS, 3.0);
+  *(model_proto.mutable_normalizer_spec()) = MakeDefaultNormalizerSpec();
+
+  SentencePieceProcessor sp1;
+  ASSERT_TRUE(sp1.Load(model_proto).ok());
+
+  // Pipes cannot be mapped, e.g., --model=<(cat m.model) or /dev/stdin.
+  for (const auto &data : {sp1.serialized_model_proto(),
+                           sp1.serialized_precompiled_model()}) {
+    int fds[2];
+    ASSERT_EQ(0, pipe(fds));
+    // The model is larger than the buffer of the pipe.
+    std::thread writer([&]() {
+      EXPECT_EQ(static_cast<ssize_t>(data.size()),
+                write(fds[1], data.data(), data.size()));
+      close(fds[1]);
+    });
+    SentencePieceProcessor sp2;
+    EXPECT_TRUE(sp2.Load(absl::StrCat("/dev/fd/", fds[0])).ok());
+    writer.join();
+    close(fds[0]);
+    EXPECT_EQ(model_proto.SerializeAsString(),
+              sp2.model_proto().SerializeAsString());
+    EXPECT_EQ(sp1.EncodeAsIds("a b ab ba"), sp2.EncodeAsIds("a b ab ba"));
+  }
+}
+#endif  // OS_UNIX
+
+TEST(SentencePieceProcessorTest, EncodeCacheTest) {
+  ModelProto model_proto;
+  auto *unk = model_proto.add_pieces();
+  unk->set_type(ModelProto::SentencePiece::UNKNOWN);
+  unk->set_piece("<unk>");
+  AddPiece(&model_proto, "a", 0.0);
+  AddPiece(&model_proto, "b", 0.3);
+  AddPiece(&model_proto, "ab", 1.0);
+  AddPiece(&model_proto, WS, 3.0);
+  *(model_proto.mutable_normalizer_spec()) = MakeDefaultNormalizerSpec();
+
+  SentencePieceProcessor sp;
+  ASSERT_TRUE(sp.Load(model_proto).ok());
+  EXPECT_EQ(0, sp.GetEncodeCacheCapacity());
+  EXPECT_FALSE(sp.SetEncodeCacheCapacity(-1).ok());
+  EXPECT_TRUE(sp.SetEncodeCacheCapacity(2).ok());
+  EXPECT_EQ(2, sp.GetEncodeCacheCapacity());
+
+  const std::vector<int> expected_ids = sp.EncodeAsIds("ab b");
+  const std::vector<std::string> expected_pieces = sp.EncodeAsPieces("ab b");
+  EXPECT_EQ(0, sp.GetEncodeCacheHits());
+  EXPECT_EQ(2, sp.GetEncodeCacheMisses());
+  EXPECT_EQ(expected_ids, sp.EncodeAsIds("ab b"));
+  EXPECT_EQ(expected_pieces, sp.EncodeAsPieces("ab b"));
+  EXPECT_EQ(2, sp.GetEncodeCacheHits());
+
+  // The least recently used input is evicted.
+  sp.EncodeAsIds("a");
+  sp.EncodeAsIds("ab b");
+  sp.EncodeAsIds("b");
+  sp.EncodeAsIds("ab b");
+  sp.EncodeAsIds("a");
+  EXPECT_EQ(4, sp.GetEncodeCacheHits());
+  EXPECT_EQ(5, sp.GetEncodeCacheMisses());
+  sp.EncodeAsIds("b");
+  EXPECT_EQ(4, sp.GetEncodeCacheHits());
+  EXPECT_EQ(6, sp.GetEncodeCacheMisses());
+
+  // Changing the options drops the cached results.
+  ASSERT_TRUE(sp.SetEncodeExtraOptions("reverse").ok());
+  std::vector<int> reversed_ids = expected_ids;
+  std::reverse(reversed_ids.begin(), reversed_ids.end());
+  EXPECT_EQ(reversed_ids, sp.EncodeAsIds("ab b"));
+  EXPECT_EQ(reversed_ids, sp.EncodeAsIds("ab b"));
+  ASSERT_TRUE(sp.SetEncodeExtraOptions("").ok());
+  EXPECT_EQ(expected_ids, sp.EncodeAsIds("ab b"));
+
+  // Sampling is not cached.
+  const size_t misses = sp.GetEncodeCacheMisses();
+  sp.SampleEncodeAsIds("ab b", -1, 0.5);
+  EXPECT_EQ(misses, sp.GetEncodeCacheMisses());
+
+  sp.ClearEncodeCache();
+  EXPECT_EQ(0, sp.GetEncodeCacheHits());
+  EXPECT_EQ(0, sp.GetEncodeCacheMisses());
+  EXPECT_EQ(expected_ids, sp.EncodeAsIds("ab b"));
+  EXPECT_EQ(1, sp.GetEncodeCacheMisses());
+
+  EXPECT_TRUE(sp.SetEncodeCacheCapacity(0).ok());
+  EXPECT_EQ(expected_ids, sp.EncodeAsIds("ab b"));
+  EXPECT_EQ(0, sp.GetEncodeCacheMisses());
+}
+
 TEST(SentencePieceProcessorTest, EndToEndTest) {
   ModelProto model_proto;
   auto *sp1 = model_proto.add_pieces();
@@ -341,8 +341,7 @@ util::Status SentencePieceNormalizer::LoadFromRuleName(absl::string_view name) {
 util::Status SentencePieceNormalizer::Normalize(absl::string_view input,
                                                 std::string *normalized) const {
   CHECK_OR_RETURN(normalizer_);
-  std::vector<size_t> norm_to_orig;
-  return normalizer_->Normalize(input, normalized, &norm_to_orig);
+  return normalizer_->Normalize(input, normalized, nullptr);
 }
 
 util::Status SentencePieceNormalizer::Normalize(
@@ -15,6 +15,7 @@
 #ifndef SENTENCEPIECE_TRAINER_H_
 #define SENTENCEPIECE_TRAINER_H_
 
+#include <shared_mutex>
 #include <string>
 #include <unordered_map>
 #include <vector>
@@ -192,9 +193,14 @@ class SentencePieceNormalizer {
 
   virtual std::string serialized_model_proto() const;
 
+  // Returns the lock for callers which run Normalize() in parallel with
+  // Load(). See SentencePieceProcessor::mutex().
+  std::shared_mutex *mutex() const { return &mutex_; }
+
  private:
   std::unique_ptr<normalizer::Normalizer> normalizer_;
   std::unique_ptr<ModelProto> model_proto_;
+  mutable std::shared_mutex mutex_;
 };
 
 // Converts the utf8 byte spans into Unicode char span.
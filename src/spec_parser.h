@@ -139,6 +139,7 @@ inline std::string PrintProto(const TrainerSpec &message,
   PRINT_PARAM(max_sentence_length);
   PRINT_PARAM(num_threads);
   PRINT_PARAM(num_sub_iterations);
+  PRINT_PARAM(lattice_cache_size);
   PRINT_PARAM(max_sentencepiece_length);
   PRINT_PARAM(split_by_unicode_script);
   PRINT_PARAM(split_by_number);
@@ -154,6 +155,7 @@ inline std::string PrintProto(const TrainerSpec &message,
   PRINT_PARAM(vocabulary_output_piece_score);
   PRINT_PARAM(train_extremely_large_corpus);
   PRINT_PARAM(seed_sentencepieces_file);
+  PRINT_PARAM(seed_sentencepiece_shard_size);
   PRINT_PARAM(hard_vocab_limit);
   PRINT_PARAM(use_all_vocab);
   PRINT_PARAM(unk_id);
@@ -219,6 +221,7 @@ util::Status SentencePieceTrainer::SetProtoField(absl::string_view name,
   PARSE_INT32(max_sentence_length);
   PARSE_INT32(num_threads);
   PARSE_INT32(num_sub_iterations);
+  PARSE_UINT64(lattice_cache_size);
   PARSE_INT32(max_sentencepiece_length);
   PARSE_BOOL(split_by_unicode_script);
   PARSE_BOOL(split_by_number);
@@ -235,6 +238,7 @@ util::Status SentencePieceTrainer::SetProtoField(absl::string_view name,
   PARSE_BOOL(vocabulary_output_piece_score);
   PARSE_BOOL(train_extremely_large_corpus);
   PARSE_STRING(seed_sentencepieces_file);
+  PARSE_UINT64(seed_sentencepiece_shard_size);
   PARSE_BOOL(use_all_vocab);
   PARSE_INT32(unk_id);
   PARSE_INT32(bos_id);
@@ -59,12 +59,20 @@ ABSL_FLAG(int32_t, seed_sentencepiece_size,
           "the size of seed sentencepieces");
 ABSL_FLAG(std::string, seed_sentencepieces_file, "",
           "file to load seed sentencepieces from");
+ABSL_FLAG(std::uint64_t, seed_sentencepiece_shard_size,
+          kDefaultTrainerSpec.seed_sentencepiece_shard_size(),
+          "size in bytes of the corpus shards to extract seed sentencepieces "
+          "from (0 disables sharding)");
 ABSL_FLAG(double, shrinking_factor, kDefaultTrainerSpec.shrinking_factor(),
           "Keeps top shrinking_factor pieces with respect to the loss");
 ABSL_FLAG(int32_t, num_threads, kDefaultTrainerSpec.num_threads(),
           "number of threads for training");
 ABSL_FLAG(int32_t, num_sub_iterations, kDefaultTrainerSpec.num_sub_iterations(),
           "number of EM sub-iterations");
+ABSL_FLAG(std::uint64_t, lattice_cache_size,
+          kDefaultTrainerSpec.lattice_cache_size(),
+          "memory budget in bytes to cache the pieces matched in each "
+          "sentence during EM (0 disables the cache)");
 ABSL_FLAG(int32_t, max_sentencepiece_length,
           kDefaultTrainerSpec.max_sentencepiece_length(),
           "maximum length of sentence piece");
@@ -224,9 +232,11 @@ int main(int argc, char *argv[]) {
   SetTrainerSpecFromFlag(shuffle_input_sentence);
   SetTrainerSpecFromFlag(seed_sentencepiece_size);
   SetTrainerSpecFromFlag(seed_sentencepieces_file);
+  SetTrainerSpecFromFlag(seed_sentencepiece_shard_size);
   SetTrainerSpecFromFlag(shrinking_factor);
   SetTrainerSpecFromFlag(num_threads);
   SetTrainerSpecFromFlag(num_sub_iterations);
+  SetTrainerSpecFromFlag(lattice_cache_size);
   SetTrainerSpecFromFlag(max_sentencepiece_length);
   SetTrainerSpecFromFlag(max_sentence_length);
   SetTrainerSpecFromFlag(split_by_unicode_script);
@@ -611,6 +611,29 @@ void TrainerInterface::SplitSentencesByWhitespace() {
   LOG(INFO) << "Done! " << sentences_.size();
 }
 
+void TrainerInterface::DeduplicateSentences() {
+  LOG(INFO) << "Deduplicating sentences: " << sentences_.size();
+  std::vector<bool> is_dup(sentences_.size(), false);
+  {
+    absl::flat_hash_map<absl::string_view, size_t> index;
+    for (size_t i = 0; i < sentences_.size(); ++i) {
+      const auto it = index.emplace(sentences_[i].first, i);
+      if (!it.second) {
+        sentences_[it.first->second].second += sentences_[i].second;
+        is_dup[i] = true;
+      }
+    }
+  }
+  size_t size = 0;
+  for (size_t i = 0; i < sentences_.size(); ++i) {
+    if (is_dup[i]) continue;
+    if (size != i) sentences_[size] = std::move(sentences_[i]);
+    ++size;
+  }
+  sentences_.resize(size);
+  LOG(INFO) << "Done! " << sentences_.size();
+}
+
 util::Status TrainerInterface::Serialize(ModelProto *model_proto) const {
   RETURN_IF_ERROR(status());
 
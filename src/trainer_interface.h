@@ -106,6 +106,7 @@ class TrainerInterface {
   FRIEND_TEST(TrainerInterfaceTest, BytePiecesTest);
   FRIEND_TEST(TrainerInterfaceTest, SerializeTest);
   FRIEND_TEST(TrainerInterfaceTest, CharactersTest);
+  FRIEND_TEST(TrainerInterfaceTest, DeduplicateSentencesTest);
 
   // Loads all sentences from spec.input() or SentenceIterator.
   // It loads at most input_sentence_size sentences.
@@ -124,6 +125,13 @@ class TrainerInterface {
   //  [ ["hello", 1], ["hi", 1], ["world", 2] ]
   void SplitSentencesByWhitespace();
 
+  // Merges identical sentences in |sentences_| into the first one and
+  // accumulates their frequencies.
+  // e.g.,
+  //  [ ["hello", 1], ["hi", 2], ["hello", 3] ] =>
+  //  [ ["hello", 4], ["hi", 2] ]
+  void DeduplicateSentences();
+
   // Save model files into spec.model_prefix().
   util::Status Save() const;
 
@@ -555,6 +555,25 @@ TEST(TrainerInterfaceTest, CharactersTest) {
   }
 }
 
+TEST(TrainerInterfaceTest, DeduplicateSentencesTest) {
+  TrainerSpec trainer_spec;
+  NormalizerSpec normalizer_spec;
+  NormalizerSpec denormalizer_spec;
+  trainer_spec.set_model_prefix("model");
+
+  TrainerInterface trainer(trainer_spec, normalizer_spec, denormalizer_spec);
+  trainer.sentences_ = {
+      {"hello", 1}, {"hi", 2}, {"hello", 3}, {"world", 1}, {"hi", 1}};
+  trainer.DeduplicateSentences();
+  const TrainerInterface::Sentences expected = {
+      {"hello", 4}, {"hi", 3}, {"world", 1}};
+  EXPECT_EQ(expected, trainer.sentences_);
+
+  trainer.sentences_.clear();
+  trainer.DeduplicateSentences();
+  EXPECT_TRUE(trainer.sentences_.empty());
+}
+
 TEST(TrainerInterfaceTest, MultiFileSentenceIteratorTest) {
   std::vector<std::string> files;
   std::vector<std::string> expected;
@@ -18,7 +18,9 @@
 #include <cfloat>
 #include <cmath>
 #include <complex>
+#include <cstring>
 #include <map>
+#include <memory>
 #include <queue>
 #include <string>
 #include <utility>
@@ -36,6 +38,13 @@ namespace {
 // Size of nodes pre-allocated in Lattice.
 constexpr size_t kPreallocateLatticeNodeSize = 1024;
 
+// Largest sentence (in Unicode characters) whose lattice is kept for reuse
+// by the following calls on the same thread.
+constexpr int kMaxReusedLatticeSize = 1 << 16;
+
+// Largest number of hypotheses kept for reuse by Lattice::NBest().
+constexpr size_t kMaxReusedHypothesisSize = 1 << 16;
+
 constexpr float kUnkPenalty = 10.0;
 constexpr float kEpsilon = 1e-7;
 
@@ -68,6 +77,46 @@ inline float Gumbel() {
 
   return noise;
 }
+// Lattice of the calling thread, which is reset rather than reallocated for
+// every sentence. A new lattice is used when the thread's lattice is already
+// in use.
+class ScopedLattice {
+ public:
+  ScopedLattice() : shared_(GetShared()) {
+    if (shared_->in_use) {
+      owned_ = std::make_unique<Lattice>();
+      lattice_ = owned_.get();
+      return;
+    }
+    if (!shared_->lattice) shared_->lattice = std::make_unique<Lattice>();
+    shared_->in_use = true;
+    lattice_ = shared_->lattice.get();
+  }
+
+  ~ScopedLattice() {
+    if (owned_) return;
+    if (lattice_->size() > kMaxReusedLatticeSize) shared_->lattice.reset();
+    shared_->in_use = false;
+  }
+
+  Lattice *get() const { return lattice_; }
+  Lattice *operator->() const { return lattice_; }
+
+ private:
+  struct Shared {
+    std::unique_ptr<Lattice> lattice;
+    bool in_use = false;
+  };
+
+  static Shared *GetShared() {
+    thread_local Shared shared;
+    return &shared;
+  }
+
+  Shared *shared_ = nullptr;
+  Lattice *lattice_ = nullptr;
+  std::unique_ptr<Lattice> owned_;
+};
 }  // namespace
 
 Lattice::Lattice() : node_allocator_(kPreallocateLatticeNodeSize) {}
@@ -103,8 +152,13 @@ Lattice::Node *Lattice::NewNode() {
 }
 
 void Lattice::Clear() {
-  begin_nodes_.clear();
-  end_nodes_.clear();
+  // Only empties the node lists so that their storage is reused by the next
+  // sentence. The lists after the current sentence are always empty.
+  const size_t used = std::min(surface_.size(), begin_nodes_.size());
+  for (size_t i = 0; i < used; ++i) {
+    begin_nodes_[i].clear();
+    end_nodes_[i].clear();
+  }
   sentence_ = absl::string_view("");
   surface_.clear();
   node_allocator_.Free();
@@ -125,8 +179,10 @@ void Lattice::SetSentence(absl::string_view sentence) {
   surface_.push_back(sentence.data());
 
   const int len = size();
-  begin_nodes_.resize(len + 1);
-  end_nodes_.resize(len + 1);
+  if (begin_nodes_.size() < static_cast<size_t>(len) + 1) {
+    begin_nodes_.resize(len + 1);
+    end_nodes_.resize(len + 1);
+  }
 
   constexpr size_t kReservedNodeSize = 16;
   for (int i = 0; i <= len; ++i) {
@@ -368,17 +424,31 @@ std::vector<Lattice::LatticePathWithScore> Lattice::NBest(size_t nbest_size,
 
   class HypothesisComparator {
    public:
-    const bool operator()(Hypothesis *h1, Hypothesis *h2) {
+    const bool operator()(Hypothesis *h1, Hypothesis *h2) const {
       return (h1->fx < h2->fx);
     }
   };
 
-  using Agenda = std::priority_queue<Hypothesis *, std::vector<Hypothesis *>,
-                                     HypothesisComparator>;
+  // The agenda is a binary heap on `agenda`. The heap and the hypotheses are
+  // kept per thread and reused by the following calls.
+  using Agenda = std::vector<Hypothesis *>;
   constexpr size_t kPreallocatedHypothesisSize = 512;
-  model::FreeList<Hypothesis> hypothesis_allocator(kPreallocatedHypothesisSize);
+  thread_local model::FreeList<Hypothesis> hypothesis_allocator(
+      kPreallocatedHypothesisSize);
+  thread_local Agenda agenda;
+  hypothesis_allocator.Free();
+  agenda.clear();
+
+  const HypothesisComparator comparator;
+  auto push = [&comparator](Agenda *agenda, Hypothesis *hyp) {
+    agenda->push_back(hyp);
+    std::push_heap(agenda->begin(), agenda->end(), comparator);
+  };
+  auto pop = [&comparator](Agenda *agenda) {
+    std::pop_heap(agenda->begin(), agenda->end(), comparator);
+    agenda->pop_back();
+  };
 
-  Agenda agenda;
   std::vector<Lattice::LatticePathWithScore> results;
 
   auto *eos = hypothesis_allocator.Allocate();
@@ -386,7 +456,7 @@ std::vector<Lattice::LatticePathWithScore> Lattice::NBest(size_t nbest_size,
   eos->next = nullptr;
   eos->gx = 0.0;
 
-  std::vector<float> alpha(node_allocator_.size(), 0.0);
+  std::vector<float> alpha;
 
   if (sample) {
     // Run forwards algorithm to get normalising constants
@@ -398,13 +468,17 @@ std::vector<Lattice::LatticePathWithScore> Lattice::NBest(size_t nbest_size,
     Viterbi();
     eos->fx = eos->node->backtrace_score;
   }
-  agenda.push(eos);
+  push(&agenda, eos);
+
+  std::vector<float> probs;
+  std::vector<float> perturbed_probs;
+  std::vector<double> adjusted_probs;
 
   int shrink_count = 0;  // Number of times agenda has shrunk. For logging only.
   bool printed_memory_warning = false;  // For logging only.
   while (!agenda.empty()) {
-    auto *top = agenda.top();
-    agenda.pop();
+    auto *top = agenda.front();
+    pop(&agenda);
     auto *node = top->node;
 
     // Reaches to BOS
@@ -421,11 +495,11 @@ std::vector<Lattice::LatticePathWithScore> Lattice::NBest(size_t nbest_size,
     }
 
     const int end_nodes_size = end_nodes(node->pos).size();
-    std::vector<float> probs(end_nodes_size, 0.0);
-    std::vector<float> perturbed_probs(end_nodes_size, 0.0);
-    std::vector<double> adjusted_probs(end_nodes_size, 0.0);
-    const float Z = alpha[node->node_id];
+    probs.assign(end_nodes_size, 0.0);
+    perturbed_probs.assign(end_nodes_size, 0.0);
+    adjusted_probs.assign(end_nodes_size, 0.0);
     if (sample) {
+      const float Z = alpha[node->node_id];
       float max_score = -1e8;
       // Calculate the marginal and perturbed scores for stochastic search
       for (int i = 0; i < end_nodes(node->pos).size(); i++) {
@@ -463,7 +537,7 @@ std::vector<Lattice::LatticePathWithScore> Lattice::NBest(size_t nbest_size,
             lnode->backtrace_score + top->gx;  // backtrace_score is h(node).
       }
       hyp->next = top;
-      agenda.push(hyp);
+      push(&agenda, hyp);
     }
 
     static constexpr int kOneBillion = 1000000000;  // 10^9.
@@ -494,17 +568,24 @@ std::vector<Lattice::LatticePathWithScore> Lattice::NBest(size_t nbest_size,
                    << ". Shrinking (round " << shrink_count << ") down to "
                    << size << ".";
       for (int i = 0; i < size; ++i) {
-        const Hypothesis *top_hyp = agenda.top();
+        const Hypothesis *top_hyp = agenda.front();
         Hypothesis *cloned_hyp =
             CloneHypAndDependents(top_hyp, &clone_map, &new_allocator);
-        new_agenda.push(cloned_hyp);
-        agenda.pop();
+        push(&new_agenda, cloned_hyp);
+        pop(&agenda);
       }
-      agenda = std::move(new_agenda);
+      agenda.swap(new_agenda);
       hypothesis_allocator.swap(new_allocator);
     }
   }
 
+  // Releases the arena after an exceptionally large search instead of
+  // keeping it for the rest of the thread.
+  if (hypothesis_allocator.size() > kMaxReusedHypothesisSize) {
+    model::FreeList<Hypothesis> empty_allocator(kPreallocatedHypothesisSize);
+    hypothesis_allocator.swap(empty_allocator);
+  }
+
   return results;
 }
 
@@ -512,9 +593,7 @@ std::vector<Lattice::Node *> Lattice::Sample(float inv_theta) {
   const int len = size();
   if (len == 0) return {};
 
-  std::vector<float> alpha(node_allocator_.size(), 0.0);
-
-  alpha = ForwardAlgorithm(inv_theta);
+  const std::vector<float> alpha = ForwardAlgorithm(inv_theta);
 
   auto *mt = random::GetRandomGenerator();
 
@@ -595,6 +674,74 @@ void Model::PopulateNodes(Lattice *lattice) const {
   }
 }
 
+void Model::LookupPieces(const Lattice &lattice,
+                         std::vector<PieceMatch> *matches) const {
+  auto get_chars_length = [&lattice](int begin_pos, const char *end) {
+    int pos = begin_pos;
+    while (lattice.surface(pos) < end) ++pos;
+    return pos - begin_pos;
+  };
+
+  matches->clear();
+
+  const int len = lattice.size();
+  const char *end = lattice.sentence() + lattice.utf8_size();
+
+  // +1 just in case.
+  std::vector<Darts::DoubleArray::result_pair_type> trie_results(
+      trie_results_size_ + 1);
+
+  for (int begin_pos = 0; begin_pos < len; ++begin_pos) {
+    const char *begin = lattice.surface(begin_pos);
+
+    // Finds all pieces which are prefix of surface(begin_pos).
+    const size_t num_nodes = trie_->commonPrefixSearch(
+        begin, trie_results.data(), trie_results.size(),
+        static_cast<int>(end - begin));
+    CHECK_LT(num_nodes, trie_results.size());
+
+    for (size_t k = 0; k < num_nodes; ++k) {
+      const int id = trie_results[k].value;
+      if (IsUnusedInlined(id)) continue;
+      const int length =
+          get_chars_length(begin_pos, begin + trie_results[k].length);
+      matches->push_back({begin_pos, length, id});
+    }
+  }
+}
+
+void Model::PopulateNodes(const std::vector<PieceMatch> &matches,
+                          Lattice *lattice) const {
+  const float unk_score = min_score() - kUnkPenalty;
+
+  const int len = lattice->size();
+  auto it = matches.begin();
+
+  for (int begin_pos = 0; begin_pos < len; ++begin_pos) {
+    bool has_single_node = false;
+
+    // |matches| is sorted by position.
+    for (; it != matches.end() && it->pos == begin_pos; ++it) {
+      const int id = it->id;
+      if (IsUnusedInlined(id)) continue;
+      Lattice::Node *node = lattice->Insert(begin_pos, it->length);
+      node->id = id;
+      // User defined symbol receives extra bonus to always be selected.
+      node->score = IsUserDefinedInlined(id) ? (it->length * max_score_ - 0.1)
+                                             : GetScoreInlined(id);
+      if (!has_single_node && node->length == 1) {
+        has_single_node = true;
+      }
+    }
+
+    if (!has_single_node) {
+      Lattice::Node *node = lattice->Insert(begin_pos, 1);
+      node->id = unk_id_;  // add UNK node.
+      node->score = unk_score;
+    }
+  }
+}
+
 int Model::PieceToId(absl::string_view piece) const {
   auto it = reserved_id_map_.find(piece);
   if (it != reserved_id_map_.end()) {
@@ -643,16 +790,104 @@ void Model::BuildTrie(std::vector<std::pair<absl::string_view, int>> *pieces) {
     trie_results_size_ = std::max(trie_results_size_, num_nodes);
   }
 
-  pieces_.clear();
+  pieces_.Reset(0);
 
   if (trie_results_size_ == 0)
     status_ = util::InternalError("no entry is found in the trie.");
 }
 
-Model::Model(const ModelProto &model_proto) {
-  model_proto_ = &model_proto;
+namespace {
+
+// Returns the maximum number of the prefix matches of any key in the double
+// array `units`, or -1 if a node reachable from the root goes out of the
+// array, is shared by two parents, or stores a value not less than
+// `num_values`.
+int MaxPrefixMatches(const Darts::Details::DoubleArrayUnit *units, size_t size,
+                     int num_values) {
+  std::vector<bool> visited(size, false);
+  // pairs of the position of the children and the number of matches so far.
+  std::vector<std::pair<size_t, int>> stack;
+  int max_matches = 0;
+
+  const size_t root = units[0].offset();
+  if ((root | 0xFF) >= size) return -1;
+  stack.emplace_back(root, 0);
+  while (!stack.empty()) {
+    const auto [node_pos, num_matches] = stack.back();
+    stack.pop_back();
+    for (size_t c = 1; c <= 0xFF; ++c) {
+      const size_t child = node_pos ^ c;
+      const auto &unit = units[child];
+      if (unit.label() != c) continue;
+      if (visited[child]) return -1;
+      visited[child] = true;
+      const size_t child_pos = child ^ unit.offset();
+      if ((child_pos | 0xFF) >= size) return -1;
+      int child_matches = num_matches;
+      if (unit.has_leaf()) {
+        if (units[child_pos].value() >= num_values) return -1;
+        max_matches = std::max(max_matches, ++child_matches);
+      }
+      stack.emplace_back(child_pos, child_matches);
+    }
+  }
+
+  return max_matches;
+}
+
+}  // namespace
+
+void Model::LoadTrie(absl::string_view index) {
+  if (!status().ok()) return;
+
+  // The index is trie_results_size_ (int32), padding (int32) and the units of
+  // the double array.
+  constexpr size_t kHeaderSize = 8;
+  const size_t unit_size = Darts::DoubleArray().unit_size();
+  if (index.size() <= kHeaderSize ||
+      (index.size() - kHeaderSize) % unit_size != 0 ||
+      reinterpret_cast<uintptr_t>(index.data()) % unit_size != 0) {
+    status_ = util::InternalError("invalid trie index.");
+    return;
+  }
 
-  InitializePieces();
+  int32_t trie_results_size = 0;
+  memcpy(&trie_results_size, index.data(), sizeof(trie_results_size));
+  trie_results_size_ = trie_results_size;
+
+  // The index comes from the model file. Verifies that it is a trie of the
+  // piece ids before the lookups index the arrays with its values.
+  const size_t num_units = (index.size() - kHeaderSize) / unit_size;
+  const int max_matches = MaxPrefixMatches(
+      reinterpret_cast<const Darts::Details::DoubleArrayUnit *>(index.data() +
+                                                                kHeaderSize),
+      num_units, model_proto_->pieces_size());
+  if (max_matches < 0 || trie_results_size_ < max_matches) {
+    status_ = util::InternalError("invalid trie index.");
+    return;
+  }
+
+  trie_ = std::make_unique<Darts::DoubleArray>();
+  trie_->set_array(index.data() + kHeaderSize, num_units);
+
+  pieces_.Reset(0);
+
+  if (trie_results_size_ <= 0)
+    status_ = util::InternalError("no entry is found in the trie.");
+}
+
+util::bytes Model::SerializeIndex() const {
+  if (!status().ok() || !trie_) return "";
+  const int32_t header[2] = {static_cast<int32_t>(trie_results_size_), 0};
+  util::bytes trie(reinterpret_cast<const char *>(header), sizeof(header));
+  trie.append(static_cast<const char *>(trie_->array()), trie_->total_size());
+  util::bytes index = ModelInterface::SerializeIndex();
+  AppendIndexSection(trie, &index);
+  return index;
+}
+
+void Model::InitializePiecesAndScores(absl::string_view *index) {
+  InitializePieces(index);
 
   min_score_ = FLT_MAX;
   max_score_ = FLT_MIN;
@@ -662,30 +897,58 @@ Model::Model(const ModelProto &model_proto) {
       max_score_ = std::max(max_score_, sp.score());
     }
   }
+}
+
+Model::Model(const ModelProto &model_proto) {
+  model_proto_ = &model_proto;
 
+  InitializePiecesAndScores();
+
+  // The trie replaces the piece table.
   std::vector<std::pair<absl::string_view, int>> pieces;
-  for (const auto &it : pieces_) pieces.emplace_back(it.first, it.second);
+  for (int i = 0; i < model_proto_->pieces_size(); ++i) {
+    const auto &sp = model_proto_->pieces(i);
+    if (sp.type() == ModelProto::SentencePiece::NORMAL ||
+        sp.type() == ModelProto::SentencePiece::USER_DEFINED ||
+        sp.type() == ModelProto::SentencePiece::UNUSED) {
+      pieces.emplace_back(sp.piece(), i);
+    }
+  }
 
   BuildTrie(&pieces);
 }
 
+Model::Model(const ModelProto &model_proto, absl::string_view index) {
+  model_proto_ = &model_proto;
+
+  InitializePiecesAndScores(&index);
+
+  absl::string_view trie;
+  if (status().ok() &&
+      (!ConsumeIndexSection(&index, &trie) || !index.empty())) {
+    status_ = util::InternalError("invalid trie index.");
+    return;
+  }
+  LoadTrie(trie);
+}
+
 Model::~Model() {}
 
 EncodeResult Model::Encode(absl::string_view normalized) const {
   if (encoder_version_ == EncoderVersion::kOptimized) {
-    return EncodeOptimized(normalized);
+    return EncodeOptimized(normalized, 0.0, nullptr);
   }
 
   if (!status().ok() || normalized.empty()) {
     return {};
   }
 
-  Lattice lattice;
-  lattice.SetSentence(normalized);
-  PopulateNodes(&lattice);
+  ScopedLattice lattice;
+  lattice->SetSentence(normalized);
+  PopulateNodes(lattice.get());
 
   EncodeResult results;
-  for (const auto *node : lattice.Viterbi().first) {
+  for (const auto *node : lattice->Viterbi().first) {
     results.emplace_back(node->piece, node->id);
   }
 
@@ -704,12 +967,12 @@ NBestEncodeResult Model::NBestEncode(absl::string_view normalized,
     return {std::pair<EncodeResult, float>(Encode(normalized), 0.0)};
   }
 
-  Lattice lattice;
-  lattice.SetSentence(normalized);
-  PopulateNodes(&lattice);
+  ScopedLattice lattice;
+  lattice->SetSentence(normalized);
+  PopulateNodes(lattice.get());
 
   NBestEncodeResult nbest_results;
-  for (const auto &nbest : lattice.NBest(nbest_size, false, 0.0)) {
+  for (const auto &nbest : lattice->NBest(nbest_size, false, 0.0)) {
     EncodeResult results;
     for (const auto *node : nbest.first) {
       results.emplace_back(node->piece, node->id);
@@ -726,12 +989,12 @@ EncodeResult Model::SampleEncode(absl::string_view normalized,
     return {};
   }
 
-  Lattice lattice;
-  lattice.SetSentence(normalized);
-  PopulateNodes(&lattice);
+  ScopedLattice lattice;
+  lattice->SetSentence(normalized);
+  PopulateNodes(lattice.get());
 
   EncodeResult results;
-  for (const auto *node : lattice.Sample(inv_theta)) {
+  for (const auto *node : lattice->Sample(inv_theta)) {
     results.emplace_back(node->piece, node->id);
   }
 
@@ -746,12 +1009,12 @@ NBestEncodeResult Model::SampleEncodeAndScore(absl::string_view normalized,
     return {};
   }
   NBestEncodeResult results;
-  Lattice lattice;
-  lattice.SetSentence(normalized);
-  PopulateNodes(&lattice);
+  ScopedLattice lattice;
+  lattice->SetSentence(normalized);
+  PopulateNodes(lattice.get());
 
-  const std::vector<float> alpha = lattice.ForwardAlgorithm(inv_theta);
-  const float marginal = alpha[lattice.eos_node()->node_id];
+  const std::vector<float> alpha = lattice->ForwardAlgorithm(inv_theta);
+  const float marginal = alpha[lattice->eos_node()->node_id];
 
   if (include_best) {
     if (!wor) {
@@ -759,7 +1022,7 @@ NBestEncodeResult Model::SampleEncodeAndScore(absl::string_view normalized,
       return {};
     }
     EncodeResult result;
-    const auto best_path = lattice.Viterbi();
+    const auto best_path = lattice->Viterbi();
     for (const auto *node : best_path.first) {
       result.emplace_back(node->piece, node->id);
     }
@@ -770,7 +1033,7 @@ NBestEncodeResult Model::SampleEncodeAndScore(absl::string_view normalized,
 
   if (wor) {
     // Draw k+1 samples as we need perturbed score of k+1th element
-    auto nbest_samples = lattice.NBest(samples + 1, true, inv_theta);
+    auto nbest_samples = lattice->NBest(samples + 1, true, inv_theta);
 
     if (include_best) {
       std::vector<std::vector<Lattice::Node *>> nbest_paths(
@@ -779,7 +1042,7 @@ NBestEncodeResult Model::SampleEncodeAndScore(absl::string_view normalized,
         nbest_paths[i] = nbest_samples[i].first;
       }
       // Remove the best result from the samples if necessary
-      const auto best_path = lattice.Viterbi();
+      const auto best_path = lattice->Viterbi();
 
       const int index_of_best =
           (std::find(nbest_paths.begin(), nbest_paths.end(), best_path.first) -
@@ -827,13 +1090,9 @@ NBestEncodeResult Model::SampleEncodeAndScore(absl::string_view normalized,
     }
   } else {
     while (results.size() < samples) {
-      Lattice lattice;
-      lattice.SetSentence(normalized);
-      PopulateNodes(&lattice);
-
       float score = 0.0;
       EncodeResult result;
-      const std::vector<Lattice::Node *> sample = lattice.Sample(inv_theta);
+      const std::vector<Lattice::Node *> sample = lattice->Sample(inv_theta);
       for (const auto *node : sample) {
         result.emplace_back(node->piece, node->id);
         score += (inv_theta * node->score);
@@ -847,11 +1106,11 @@ NBestEncodeResult Model::SampleEncodeAndScore(absl::string_view normalized,
 
 float Model::CalculateEntropy(absl::string_view normalized,
                               float inv_theta) const {
-  Lattice lattice;
-  lattice.SetSentence(normalized);
-  PopulateNodes(&lattice);
+  ScopedLattice lattice;
+  lattice->SetSentence(normalized);
+  PopulateNodes(lattice.get());
 
-  return lattice.CalculateEntropy(inv_theta);
+  return lattice->CalculateEntropy(inv_theta);
 }
 
 bool Model::VerifyOutputsEquivalent(absl::string_view expected,
@@ -886,7 +1145,20 @@ bool Model::VerifyOutputsEquivalent(absl::string_view expected,
   return true;
 }
 
-EncodeResult Model::EncodeOptimized(absl::string_view normalized) const {
+EncodeResult Model::ResumeEncode(absl::string_view normalized,
+                                 float prefix_score,
+                                 std::vector<float> *scores) const {
+  scores->clear();
+  if (!IsResumeEncodeAvailable()) {
+    LOG(ERROR) << "ResumeEncode requires the optimized encoder.";
+    return {};
+  }
+  return EncodeOptimized(normalized, prefix_score, scores);
+}
+
+EncodeResult Model::EncodeOptimized(absl::string_view normalized,
+                                    float prefix_score,
+                                    std::vector<float> *scores) const {
   // An optimized Viterbi algorithm for unigram language models. Benchmarking
   // results show that it generates almost identical outputs and achieves 2.1x
   // speedup on average for 102 languages compared to the original
@@ -955,6 +1227,7 @@ EncodeResult Model::EncodeOptimized(absl::string_view normalized) const {
   const float unk_score = min_score() - kUnkPenalty;
   // The ends are exclusive.
   std::vector<BestPathNode> best_path_ends_at(size + 1);
+  best_path_ends_at[0].best_path_score = prefix_score;
   // Generate lattice on-the-fly (not stored) and update best_path_ends_at.
   int starts_at = 0;
   while (starts_at < size) {
@@ -1013,9 +1286,11 @@ EncodeResult Model::EncodeOptimized(absl::string_view normalized) const {
     const auto &node = best_path_ends_at[ends_at];
     results.emplace_back(
         normalized.substr(node.starts_at, ends_at - node.starts_at), node.id);
+    if (scores) scores->push_back(node.best_path_score);
     ends_at = node.starts_at;
   }
   std::reverse(results.begin(), results.end());
+  if (scores) std::reverse(scores->begin(), scores->end());
   return results;
 }
 }  // namespace unigram
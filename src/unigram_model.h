@@ -127,6 +127,11 @@ class Lattice {
 class Model : public ModelInterface {
  public:
   explicit Model(const ModelProto &model_proto);
+
+  // Creates the model with the scores and the trie in `index` returned by
+  // SerializeIndex().
+  // `index` is not copied and must outlive the model.
+  Model(const ModelProto &model_proto, absl::string_view index);
   Model() {}
   ~Model() override;
 
@@ -153,6 +158,14 @@ class Model : public ModelInterface {
 
   bool IsNBestEncodeAvailable() const override { return true; }
 
+  EncodeResult ResumeEncode(absl::string_view normalized, float prefix_score,
+                            std::vector<float> *scores) const override;
+
+  // Only the optimized encoder keeps the score of the best path.
+  bool IsResumeEncodeAvailable() const override {
+    return encoder_version_ == kOptimized;
+  }
+
   // Returns the minimum score in sentence pieces.
   // min_score() - 10 is used for the cost of unknown sentence.
   float min_score() const { return min_score_; }
@@ -166,9 +179,31 @@ class Model : public ModelInterface {
   // best segmentation.
   void PopulateNodes(Lattice *lattice) const;
 
+  // A piece found in a sentence by the Trie lookup. |pos| and |length| are
+  // in characters as in Lattice::Insert(), and |id| is the vocab id.
+  struct PieceMatch {
+    int pos;
+    int length;
+    int id;
+  };
+
+  // Stores the pieces found in the sentence of |lattice| to |matches| in the
+  // order PopulateNodes() inserts them. Unknown nodes are not stored.
+  void LookupPieces(const Lattice &lattice,
+                    std::vector<PieceMatch> *matches) const;
+
+  // Populates the pieces in |matches| returned by LookupPieces() to
+  // |lattice| with their current scores. The result is the same as
+  // PopulateNodes(lattice) as long as the pieces in |matches| are still
+  // in the vocabulary.
+  void PopulateNodes(const std::vector<PieceMatch> &matches,
+                     Lattice *lattice) const;
+
   // Returns a vocab id of |piece|.
   int PieceToId(absl::string_view piece) const override;
 
+  util::bytes SerializeIndex() const override;
+
   // Verifies if two outputs are equivalent by comparing their scores.
   bool VerifyOutputsEquivalent(absl::string_view expected,
                                absl::string_view actual) const override;
@@ -189,6 +224,13 @@ class Model : public ModelInterface {
   // Builds a Trie index.
   void BuildTrie(std::vector<std::pair<absl::string_view, int>> *pieces);
 
+  // Uses the Trie index serialized by SerializeIndex() without copying it.
+  void LoadTrie(absl::string_view index);
+
+  // Initializes pieces and the range of their scores. See InitializePieces()
+  // for `index`.
+  void InitializePiecesAndScores(absl::string_view *index = nullptr);
+
   // The optimized Viterbi encode.
   // Main differences from the original function:
   // 1. Memorizes the best path at each postion so far,
@@ -198,7 +240,10 @@ class Model : public ModelInterface {
   // 5. Does not depend on `class Lattice` nor call `SetSentence()`,
   // `PopulateNodes()`, or `Viterbi()`. It does everything in one function.
   // For detailed explanations please see the comments inside the function body.
-  EncodeResult EncodeOptimized(absl::string_view normalized) const;
+  // The best path starts with `prefix_score`, and the score of the best path at
+  // the end of each piece is stored in `scores` if not null.
+  EncodeResult EncodeOptimized(absl::string_view normalized, float prefix_score,
+                               std::vector<float> *scores) const;
 
   float min_score_ = 0.0;
   float max_score_ = 0.0;
@@ -17,6 +17,7 @@
 #include <cmath>
 #include <map>
 #include <string>
+#include <thread>
 #include <vector>
 
 #include "sentencepiece_model.pb.h"
@@ -237,6 +238,44 @@ TEST(LatticeTest, NBestTest) {
   EXPECT_EQ(nbests1.size(), 1);
 }
 
+TEST(LatticeTest, ReuseTest) {
+  Lattice lattice;
+  lattice.SetSentence("ABCDE");
+  for (int pos = 0; pos < 5; ++pos) {
+    for (int length = 1; pos + length <= 5; ++length) {
+      InsertWithScore(&lattice, pos, length, 0.0);
+    }
+  }
+  EXPECT_EQ(5, lattice.begin_nodes(0).size());
+  EXPECT_EQ(5, lattice.end_nodes(5).size());
+
+  // The node lists of the previous sentence must not leak into the next one.
+  lattice.SetSentence("AB");
+  EXPECT_EQ(2, lattice.size());
+  EXPECT_EQ(0, lattice.begin_nodes(0).size());
+  EXPECT_EQ(0, lattice.begin_nodes(1).size());
+  EXPECT_EQ(1, lattice.begin_nodes(2).size());
+  EXPECT_EQ(1, lattice.end_nodes(0).size());
+  EXPECT_EQ(0, lattice.end_nodes(1).size());
+  EXPECT_EQ(0, lattice.end_nodes(2).size());
+  EXPECT_EQ(lattice.eos_node(), lattice.begin_nodes(2).front());
+
+  InsertWithScore(&lattice, 0, 1, 0.0);  // A
+  InsertWithScore(&lattice, 1, 1, 0.0);  // B
+  InsertWithScore(&lattice, 0, 2, 1.0);  // AB
+  const auto nbests = lattice.NBest(10, false, 0.0);
+  EXPECT_EQ(2, nbests.size());
+  EXPECT_EQ("AB", GetTokenized(nbests[0].first));
+  EXPECT_EQ("A B", GetTokenized(nbests[1].first));
+
+  lattice.SetSentence("ABCDE");
+  for (int pos = 0; pos < 5; ++pos) {
+    EXPECT_EQ(0, lattice.begin_nodes(pos).size());
+    EXPECT_EQ(pos == 0 ? 1 : 0, lattice.end_nodes(pos).size());
+  }
+  EXPECT_EQ(0, lattice.end_nodes(5).size());
+}
+
 TEST(LatticeTest, NBestSampleTest) {
   Lattice lattice;
   lattice.SetSentence("ABC");
@@ -779,6 +818,58 @@ TEST_P(UnigramModelTest, ModelNBestTest) {
   EXPECT_FALSE(sample.empty());
 }
 
+TEST(UnigramModelTest, ReusedLatticeTest) {
+  ModelProto model_proto = MakeBaseModelProto();
+  AddPiece(&model_proto, "a", 0.0);     // 3
+  AddPiece(&model_proto, "b", 0.0);     // 4
+  AddPiece(&model_proto, "c", 0.0);     // 5
+  AddPiece(&model_proto, "ab", 2.0);    // 6
+  AddPiece(&model_proto, "bc", 5.0);    // 7
+  AddPiece(&model_proto, "abc", 10.0);  // 8
+
+  const Model model(model_proto);
+
+  // Each call resets the lattice of the thread left by the previous one.
+  const std::vector<std::string> inputs = {"abcabcabc", "abc", "ab", "",
+                                           "cbacba", "abc"};
+  std::vector<NBestEncodeResult> expected;
+  std::vector<float> entropies;
+  for (const auto &input : inputs) {
+    expected.push_back(model.NBestEncode(input, 10));
+    entropies.push_back(model.CalculateEntropy(input, 0.5));
+  }
+  EXPECT_EQ(expected[1], expected[5]);
+  EXPECT_EQ(4, expected[1].size());
+  EXPECT_EQ(entropies[1], entropies[5]);
+
+  for (int i = inputs.size() - 1; i >= 0; --i) {
+    EXPECT_EQ(expected[i], model.NBestEncode(inputs[i], 10));
+    EXPECT_EQ(entropies[i], model.CalculateEntropy(inputs[i], 0.5));
+    for (const auto &sample :
+         model.SampleEncodeAndScore(inputs[i], 0.5, 3, false, false)) {
+      std::string decoded;
+      for (const auto &piece : sample.first) decoded += piece.first;
+      EXPECT_EQ(inputs[i], decoded);
+    }
+  }
+
+  std::vector<std::thread> threads;
+  std::vector<int> matched(4, 1);
+  for (int n = 0; n < matched.size(); ++n) {
+    threads.emplace_back([&, n]() {
+      for (int trial = 0; trial < 100; ++trial) {
+        for (int i = 0; i < inputs.size(); ++i) {
+          if (model.NBestEncode(inputs[i], 10) != expected[i]) {
+            matched[n] = 0;
+          }
+        }
+      }
+    });
+  }
+  for (auto &thread : threads) thread.join();
+  for (int m : matched) EXPECT_EQ(1, m);
+}
+
 TEST_P(UnigramModelTest, EncodeTest) {
   ModelProto model_proto = MakeBaseModelProto();
   AddPiece(&model_proto, "ab", 0.0);         // 3
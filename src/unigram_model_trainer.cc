@@ -132,16 +132,179 @@ void TrainerModel::SetSentencePieces(SentencePieces &&sentencepieces) {
     piece->set_score(score);
   }
 
+  InitializeScores();
   BuildTrie(&pieces);
   CHECK(status().ok());
 }
 
+LatticeCache::LatticeCache(size_t num_sentences, uint64_t max_bytes,
+                           int num_threads)
+    : num_threads_(num_threads),
+      max_bytes_per_thread_(max_bytes / num_threads),
+      matches_(num_sentences),
+      bytes_(num_threads, 0),
+      buffers_(num_threads) {}
+
+void LatticeCache::SetModel(const TrainerModel &model) {
+  const auto &sentencepieces = model.GetSentencePieces();
+
+  absl::flat_hash_map<absl::string_view, int> ids;
+  for (size_t i = 0; i < sentencepieces.size(); ++i) {
+    ids[sentencepieces[i].first] = i;
+  }
+
+  std::vector<int> new_ids(pieces_.size(), -1);
+  size_t num_found = 0;
+  bool is_identity = pieces_.size() == sentencepieces.size();
+  for (size_t i = 0; i < pieces_.size(); ++i) {
+    const auto it = ids.find(pieces_[i]);
+    if (it == ids.end()) continue;
+    new_ids[i] = it->second;
+    is_identity &= new_ids[i] == static_cast<int>(i);
+    ++num_found;
+  }
+
+  const bool has_new_piece = num_found != sentencepieces.size();
+
+  if (!is_identity) {
+    auto pool = std::make_unique<ThreadPool>(num_threads_);
+    pool->StartWorkers();
+    for (int n = 0; n < num_threads_; ++n) {
+      pool->Schedule([&, n]() {
+        bytes_[n] = 0;
+        for (size_t i = n; i < matches_.size(); i += num_threads_) {
+          auto &matches = matches_[i];
+          if (has_new_piece) {
+            std::vector<Model::PieceMatch>().swap(matches);
+            continue;
+          }
+          auto last = matches.begin();
+          for (const auto &m : matches) {
+            const int id = new_ids[m.id];
+            if (id >= 0) *last++ = {m.pos, m.length, id};
+          }
+          matches.erase(last, matches.end());
+          if (matches.size() < matches.capacity() / 2) {
+            matches.shrink_to_fit();
+          }
+          bytes_[n] += matches.capacity() * sizeof(Model::PieceMatch);
+        }
+      });
+    }
+    pool.reset(nullptr);
+  }
+
+  pieces_.resize(sentencepieces.size());
+  for (size_t i = 0; i < sentencepieces.size(); ++i) {
+    pieces_[i] = sentencepieces[i].first;
+  }
+}
+
+void LatticeCache::PopulateNodes(const TrainerModel &model, size_t sid,
+                                 Lattice *lattice) {
+  auto &matches = matches_[sid];
+  if (!matches.empty()) {
+    model.PopulateNodes(matches, lattice);
+    return;
+  }
+
+  const int n = sid % num_threads_;
+  auto &buffer = buffers_[n];
+  model.LookupPieces(*lattice, &buffer);
+  model.PopulateNodes(buffer, lattice);
+
+  const uint64_t bytes = buffer.size() * sizeof(Model::PieceMatch);
+  if (bytes_[n] + bytes <= max_bytes_per_thread_) {
+    matches.assign(buffer.begin(), buffer.end());
+    bytes_[n] += matches.capacity() * sizeof(Model::PieceMatch);
+  }
+}
+
 TrainerModel::SentencePieces Trainer::MakeSeedSentencePieces() {
   return trainer_spec_.train_extremely_large_corpus()
              ? MakeSeedSentencePiecesInternal<int64_t>()
              : MakeSeedSentencePiecesInternal<int32_t>();
 }
 
+template <typename node_int_type>
+std::vector<std::pair<std::string, int64_t>> Trainer::ExtractFrequentSubstrings(
+    const std::vector<char32> &array,
+    const std::vector<size_t> &sentence_begins, size_t first_sentence,
+    size_t size) const {
+  CHECK_LE(array.size(),
+           static_cast<size_t>(std::numeric_limits<node_int_type>::max()))
+      << "Input corpus too large, try with train_extremely_large_corpus=true "
+         "or seed_sentencepiece_shard_size";
+  const node_int_type n = array.size();
+
+  std::vector<node_int_type> SA(n);  // suffix array
+  std::vector<node_int_type> L(n);   // left boundaries of internal node
+  std::vector<node_int_type> R(n);   // right boundaries of internal node
+  std::vector<node_int_type> D(n);   // depths of internal node
+
+  // Makes a suffix array to extract all sub strings occurring
+  // more than 2 times in the sentence.
+  constexpr node_int_type kAlphabetSize = 0x110000;  // All UCS4 range.
+  node_int_type node_num = 0;
+  LOG(INFO) << "Making suffix array...";
+  CHECK_EQ(0, esaxx(array.begin(), SA.begin(), L.begin(), R.begin(),
+                    D.begin(), n, kAlphabetSize, node_num));
+
+  // W[i] stores the sum of the weights of the suffixes SA[0, i).
+  std::vector<int64_t> W;
+  const bool is_weighted = !sentence_begins.empty();
+  if (is_weighted) {
+    W.resize(n + 1, 0);
+    for (node_int_type i = 0; i < n; ++i) {
+      const size_t sid = std::upper_bound(sentence_begins.begin(),
+                                          sentence_begins.end(), SA[i]) -
+                         sentence_begins.begin() - 1;
+      W[i + 1] = W[i] + sentences_[first_sentence + sid].second;
+    }
+  }
+
+  LOG(INFO) << "Extracting frequent sub strings... node_num=" << node_num;
+  BoundedPriorityQueue<node_int_type> queue(size);
+
+  for (node_int_type i = 0; i < node_num; ++i) {
+    const node_int_type offset = SA[L[i]];
+    const node_int_type len = D[i];
+    if (len <= 1 || offset >= array.size() || offset + len >= array.size()) {
+      continue;
+    }
+    const char32 *begin = &array[offset];
+    const char32 *end = &array[offset + len];
+    // Skips if a substring contains a sentence boundary.
+    if (std::find(begin, end, kSentenceBoundary) != end) {
+      continue;
+    }
+    const UnicodeText uw(begin, end);
+    if (!IsValidSentencePiece(uw)) {
+      continue;
+    }
+
+    // character-wise coverage is the default score.
+    const int64_t freq = is_weighted ? W[R[i]] - W[L[i]] : R[i] - L[i];
+    const int64_t score = freq * len;
+    queue.push(i, score);
+  }
+
+  std::vector<std::pair<std::string, int64_t>> substrings;
+  for (const auto &p : queue.get()) {
+    const node_int_type offset = SA[L[p.first]];
+    const node_int_type len = D[p.first];
+    CHECK_GT(len, 0);
+    const char32 *begin = &array[offset];
+    const char32 *end = &array[offset + len];
+    const UnicodeText uw(begin, end);
+    const std::string w = string_util::UnicodeTextToUTF8(uw);
+    CHECK(IsValidSentencePiece(uw));  // just in case.
+    substrings.emplace_back(w, p.second);
+  }
+
+  return substrings;
+}
+
 // Returns seed sentencepieces for EM training.
 template <typename node_int_type>
 TrainerModel::SentencePieces Trainer::MakeSeedSentencePiecesInternal() {
@@ -151,59 +314,247 @@ TrainerModel::SentencePieces Trainer::MakeSeedSentencePiecesInternal() {
   // Pretokenizer applied only in training time.
   // Pretokenizer is used as a constraint of piece extractions.
   const auto *pretokenizer = SentencePieceTrainer::GetPretokenizerForTraining();
+  const absl::string_view delimiter = trainer_spec_.pretokenization_delimiter();
 
-  auto pretokenize_or_rewrite = [&](std::pair<std::string, int64_t> *w) {
+  // Returns the characters of |sentence|. The pretokenized words are
+  // delimited by kSentenceBoundary.
+  auto pretokenize = [&](absl::string_view sentence) {
     if (pretokenizer) {
       std::vector<char32> chars;
-      for (const auto &w : pretokenizer->PreTokenize(w->first)) {
+      for (const auto &w : pretokenizer->PreTokenize(sentence)) {
         for (const auto &c : string_util::UTF8ToUnicodeText(w)) {
           chars.push_back(c);
         }
         chars.push_back(kSentenceBoundary);
       }
       return chars;
-    } else if (!trainer_spec_.pretokenization_delimiter().empty()) {
+    } else if (!delimiter.empty()) {
       // When delimiter is specified, tokenize the input with the delimiter.
-      // For EM training, we assume that the delimiter doesn't exist and
-      // rewrite the original sentence.
       std::vector<char32> chars;
-      absl::string_view delimiter = trainer_spec_.pretokenization_delimiter();
-      for (const auto &w : absl::StrSplit(w->first, delimiter)) {
+      for (const auto &w : absl::StrSplit(sentence, delimiter)) {
         for (const auto &c : string_util::UTF8ToUnicodeText(w)) {
           chars.push_back(c);
         }
         chars.push_back(kSentenceBoundary);
       }
-      // Removes the delimiter.
-      w->first = absl::StrReplaceAll(w->first, {{delimiter, ""}});
       return chars;
     }
-    return string_util::UTF8ToUnicodeText(w->first);
+    return string_util::UTF8ToUnicodeText(sentence);
   };
 
-  // Merges all sentences into one array with 0x0000 delimiter.
-  std::vector<char32> array;
   absl::flat_hash_map<std::string, int64_t> all_chars;
 
   const bool is_tsv = trainer_spec_.input_format() == "tsv";
 
-  for (auto &w : sentences_) {
-    const auto ut = pretokenize_or_rewrite(&w);
+  // In text mode, the frequency of a sentence is the number of its
+  // occurrences in the corpus (see DeduplicateSentences). The frequency of a
+  // sub string is then counted by weighting its occurrences with them.
+  const bool is_weighted =
+      !is_tsv && std::any_of(sentences_.begin(), sentences_.end(),
+                             [](const Sentence &w) { return w.second != 1; });
+
+  // Appends |w| to |array| with 0x0000 delimiter, and counts its characters
+  // in |all_chars|. The offset of |w| in |array| is stored to
+  // |sentence_begins| when the sentences are weighted.
+  auto append_sentence = [&](const Sentence &w, std::vector<char32> *array,
+                             std::vector<size_t> *sentence_begins) {
+    if (is_weighted) sentence_begins->push_back(array->size());
+    const auto ut = pretokenize(w.first);
     for (const auto &c : ut) {
-      array.push_back(c);
+      array->push_back(c);
       if (c != kUNKChar && c != kSentenceBoundary) {
         all_chars[string_util::UnicodeCharToUTF8(c)] += w.second;
       }
     }
-    array.push_back(kSentenceBoundary);  // sentence boundary marker.
+    array->push_back(kSentenceBoundary);  // sentence boundary marker.
 
     // Naive workaround to over-sample the input.
     // In TSV mode, the frequency field is not used to extract the seed piece.
     // we can at least extract all pieces by copying the input because
     // the occurrence gets at least larger than or equals to 2.
     if (is_tsv) {
-      for (const auto &c : ut) array.push_back(c);
-      array.push_back(kSentenceBoundary);
+      for (const auto &c : ut) array->push_back(c);
+      array->push_back(kSentenceBoundary);
+    }
+  };
+
+  const uint64_t shard_size = trainer_spec_.seed_sentencepiece_shard_size();
+  const size_t seed_size = trainer_spec_.seed_sentencepiece_size();
+  std::vector<std::pair<std::string, int64_t>> substrings;
+
+  if (!trainer_spec_.seed_sentencepieces_file().empty()) {
+    std::vector<char32> array;
+    std::vector<size_t> sentence_begins;
+    for (const auto &w : sentences_) {
+      array.clear();
+      sentence_begins.clear();
+      append_sentence(w, &array, &sentence_begins);
+    }
+  } else if (shard_size == 0) {
+    // Merges all sentences into one array with 0x0000 delimiter.
+    std::vector<char32> array;
+    std::vector<size_t> sentence_begins;
+    for (const auto &w : sentences_) {
+      append_sentence(w, &array, &sentence_begins);
+    }
+    substrings = ExtractFrequentSubstrings<node_int_type>(
+        array, sentence_begins, 0, seed_size);
+  } else {
+    // Splits the sentences into shards. shards[i] is the range of the
+    // sentences in the i-th shard.
+    std::vector<std::pair<size_t, size_t>> shards;
+    uint64_t size = 0;
+    for (size_t i = 0; i < sentences_.size(); ++i) {
+      const uint64_t length = sentences_[i].first.size();
+      if (shards.empty() || (size > 0 && size + length > shard_size)) {
+        shards.emplace_back(i, i);
+        size = 0;
+      }
+      shards.back().second = i + 1;
+      size += length;
+    }
+
+    const int num_threads = trainer_spec_.num_threads();
+    LOG(INFO) << "Extracting frequent sub strings from " << shards.size()
+              << " shards...";
+
+    // Extracts the candidates from every |num_threads| shards in parallel.
+    // The sentences are pretokenized in the main thread. |candidates| stores
+    // the sum of the scores in the shards, and is bounded in the same way
+    // as BoundedPriorityQueue.
+    absl::flat_hash_map<std::string, int64_t> candidates;
+    for (size_t s = 0; s < shards.size(); s += num_threads) {
+      const size_t num_shards =
+          std::min<size_t>(num_threads, shards.size() - s);
+      std::vector<std::vector<char32>> arrays(num_shards);
+      std::vector<std::vector<size_t>> sentence_begins(num_shards);
+      std::vector<std::vector<std::pair<std::string, int64_t>>> results(
+          num_shards);
+      for (size_t k = 0; k < num_shards; ++k) {
+        for (size_t i = shards[s + k].first; i < shards[s + k].second; ++i) {
+          append_sentence(sentences_[i], &arrays[k], &sentence_begins[k]);
+        }
+      }
+
+      auto pool = std::make_unique<ThreadPool>(num_shards);
+      pool->StartWorkers();
+      for (size_t k = 0; k < num_shards; ++k) {
+        pool->Schedule([&, k]() {
+          results[k] = ExtractFrequentSubstrings<node_int_type>(
+              arrays[k], sentence_begins[k], shards[s + k].first, seed_size);
+          std::vector<char32>().swap(arrays[k]);
+        });
+      }
+      pool.reset(nullptr);
+
+      for (const auto &result : results) {
+        for (const auto &p : result) candidates[p.first] += p.second;
+      }
+      if (candidates.size() > 4 * seed_size) {
+        auto sorted = Sorted(candidates);
+        sorted.resize(2 * seed_size);
+        candidates.clear();
+        candidates.insert(sorted.begin(), sorted.end());
+      }
+    }
+
+    // A candidate is not counted in the shards where it is not extracted.
+    // Recounts the candidates over all shards with a Trie.
+    std::vector<std::string> keys;
+    keys.reserve(candidates.size());
+    for (const auto &it : candidates) keys.push_back(it.first);
+    absl::flat_hash_map<std::string, int64_t>().swap(candidates);
+    std::sort(keys.begin(), keys.end());
+
+    Darts::DoubleArray trie;
+    {
+      std::vector<const char *> key_ptrs;
+      std::vector<int> values;
+      for (size_t i = 0; i < keys.size(); ++i) {
+        key_ptrs.push_back(keys[i].c_str());
+        values.push_back(i);
+      }
+      if (!keys.empty()) {
+        CHECK_EQ(0, trie.build(keys.size(), const_cast<char **>(&key_ptrs[0]),
+                               nullptr, &values[0]))
+            << "cannot build double-array";
+      }
+    }
+
+    LOG(INFO) << "Recounting " << keys.size() << " candidates...";
+    std::vector<std::vector<int64_t>> freqs(num_threads);
+    for (size_t s = 0; s < shards.size() && !keys.empty(); s += num_threads) {
+      const size_t num_shards =
+          std::min<size_t>(num_threads, shards.size() - s);
+
+      // texts[k] stores the sentences in UTF-8, whose pretokenized words are
+      // delimited by '\0'. ends[k][j] is the end of the j-th sentence.
+      std::vector<std::string> texts(num_shards);
+      std::vector<std::vector<size_t>> ends(num_shards);
+      for (size_t k = 0; k < num_shards; ++k) {
+        for (size_t i = shards[s + k].first; i < shards[s + k].second; ++i) {
+          texts[k] += string_util::UnicodeTextToUTF8(
+              pretokenize(sentences_[i].first));
+          texts[k] += '\0';
+          ends[k].push_back(texts[k].size());
+        }
+      }
+
+      auto pool = std::make_unique<ThreadPool>(num_shards);
+      pool->StartWorkers();
+      for (size_t k = 0; k < num_shards; ++k) {
+        pool->Schedule([&, k]() {
+          auto &freq = freqs[k];
+          freq.resize(keys.size(), 0);
+          std::vector<Darts::DoubleArray::result_pair_type> trie_results(
+              trainer_spec_.max_sentencepiece_length() + 1);
+          const char *text = texts[k].data();
+          size_t begin = 0;
+          for (size_t j = 0; j < ends[k].size(); ++j) {
+            const size_t i = shards[s + k].first + j;
+            const int64_t weight =
+                is_tsv ? 2 : (is_weighted ? sentences_[i].second : 1);
+            size_t word_end = begin;
+            for (size_t pos = begin; pos < ends[k][j]; ++pos) {
+              // Skips the word boundaries and the UTF-8 trailing bytes.
+              if (text[pos] == '\0' || (text[pos] & 0xc0) == 0x80) continue;
+              if (pos >= word_end) {
+                word_end =
+                    std::find(text + pos, text + ends[k][j], '\0') - text;
+              }
+              const size_t num_results = trie.commonPrefixSearch(
+                  text + pos, trie_results.data(), trie_results.size(),
+                  word_end - pos);
+              CHECK_LT(num_results, trie_results.size());
+              for (size_t r = 0; r < num_results; ++r) {
+                freq[trie_results[r].value] += weight;
+              }
+            }
+            begin = ends[k][j];
+          }
+        });
+      }
+      pool.reset(nullptr);
+    }
+
+    for (size_t i = 0; i < keys.size(); ++i) {
+      int64_t freq = 0;
+      for (const auto &f : freqs) {
+        if (!f.empty()) freq += f[i];
+      }
+      // character-wise coverage is the default score.
+      const int64_t len = string_util::UTF8ToUnicodeText(keys[i]).size();
+      substrings.emplace_back(std::move(keys[i]), freq * len);
+    }
+    substrings = Sorted(substrings);
+    if (substrings.size() > seed_size) substrings.resize(seed_size);
+  }
+
+  // Removes the delimiter. For EM training, we assume that the delimiter
+  // doesn't exist and rewrite the original sentence.
+  if (!pretokenizer && !delimiter.empty()) {
+    for (auto &w : sentences_) {
+      w.first = absl::StrReplaceAll(w.first, {{delimiter, ""}});
     }
   }
 
@@ -248,62 +599,9 @@ TrainerModel::SentencePieces Trainer::MakeSeedSentencePiecesInternal() {
     LOG(INFO) << "Initialized " << seed_sentencepieces.size()
               << " seed sentencepieces from file.";
   } else {
-    CHECK_LE(array.size(),
-             static_cast<size_t>(std::numeric_limits<node_int_type>::max()))
-        << "Input corpus too large, try with train_extremely_large_corpus=true";
-    const node_int_type n = array.size();
-
-    std::vector<node_int_type> SA(n);  // suffix array
-    std::vector<node_int_type> L(n);   // left boundaries of internal node
-    std::vector<node_int_type> R(n);   // right boundaries of internal node
-    std::vector<node_int_type> D(n);   // depths of internal node
-
-    // Makes a suffix array to extract all sub strings occurring
-    // more than 2 times in the sentence.
-    constexpr node_int_type kAlphabetSize = 0x110000;  // All UCS4 range.
-    node_int_type node_num = 0;
-    LOG(INFO) << "Making suffix array...";
-    CHECK_EQ(0, esaxx(array.begin(), SA.begin(), L.begin(), R.begin(),
-                      D.begin(), n, kAlphabetSize, node_num));
-
-    LOG(INFO) << "Extracting frequent sub strings... node_num=" << node_num;
-    BoundedPriorityQueue<node_int_type> queue(
-        static_cast<size_t>(trainer_spec_.seed_sentencepiece_size()));
-
-    for (node_int_type i = 0; i < node_num; ++i) {
-      const node_int_type offset = SA[L[i]];
-      const node_int_type len = D[i];
-      if (len <= 1 || offset >= array.size() || offset + len >= array.size()) {
-        continue;
-      }
-      const char32 *begin = &array[offset];
-      const char32 *end = &array[offset + len];
-      // Skips if a substring contains a sentence boundary.
-      if (std::find(begin, end, kSentenceBoundary) != end) {
-        continue;
-      }
-      const UnicodeText uw(begin, end);
-      if (!IsValidSentencePiece(uw)) {
-        continue;
-      }
-
-      // character-wise coverage is the default score.
-      const node_int_type freq = R[i] - L[i];
-      const node_int_type score = freq * len;
-      queue.push(i, score);
-    }
-
-    for (const auto &p : queue.get()) {
-      const node_int_type offset = SA[L[p.first]];
-      const node_int_type len = D[p.first];
-      CHECK_GT(len, 0);
-      const char32 *begin = &array[offset];
-      const char32 *end = &array[offset + len];
-      const UnicodeText uw(begin, end);
-      const std::string w = string_util::UnicodeTextToUTF8(uw);
-      CHECK(IsValidSentencePiece(uw));  // just in case.
-      CHECK(!port::ContainsKey(all_chars, w));
-      seed_sentencepieces.emplace_back(w, p.second);
+    for (const auto &p : substrings) {
+      CHECK(!port::ContainsKey(all_chars, p.first));
+      seed_sentencepieces.emplace_back(p.first, p.second);
     }
   }
 
@@ -315,6 +613,15 @@ TrainerModel::SentencePieces Trainer::MakeSeedSentencePiecesInternal() {
   return seed_sentencepieces;
 }
 
+void Trainer::PopulateNodes(const TrainerModel &model, size_t sid,
+                            Lattice *lattice) const {
+  if (lattice_cache_) {
+    lattice_cache_->PopulateNodes(model, sid, lattice);
+  } else {
+    model.PopulateNodes(lattice);
+  }
+}
+
 std::vector<float> Trainer::RunEStep(const TrainerModel &model, float *obj,
                                      int64_t *num_tokens) const {
   std::vector<std::vector<float>> expected(trainer_spec_.num_threads());
@@ -339,7 +646,7 @@ std::vector<float> Trainer::RunEStep(const TrainerModel &model, float *obj,
         const std::string &w = sentences_[i].first;
         const int64_t freq = sentences_[i].second;
         lattice.SetSentence(w);
-        model.PopulateNodes(&lattice);
+        PopulateNodes(model, i, &lattice);
         const float Z = lattice.PopulateMarginal(freq, &expected[n]);
         ntokens[n] += lattice.Viterbi().first.size();
         CHECK(!std::isnan(Z))
@@ -455,7 +762,7 @@ TrainerModel::SentencePieces Trainer::PruneSentencePieces(
              i += trainer_spec_.num_threads()) {
           const auto &w = sentences_[i];
           lattice.SetSentence(w.first);
-          model.PopulateNodes(&lattice);
+          PopulateNodes(model, i, &lattice);
           vsums[n] += w.second;
           for (const auto *node : lattice.Viterbi().first) {
             if (node->id >= 0) {
@@ -592,15 +899,32 @@ util::Status Trainer::Train() {
   RETURN_IF_ERROR(model.status());
   RETURN_IF_ERROR(LoadSentences());
 
+  // Identical sentences are processed only once. In TSV mode, the
+  // frequencies are not used to extract the seed pieces, so that the
+  // sentences are merged after the extraction.
+  const bool is_tsv = trainer_spec_.input_format() == "tsv";
+  if (!is_tsv) {
+    DeduplicateSentences();
+  }
+
   auto seed_sentencepieces = MakeSeedSentencePieces();
   model.SetSentencePieces(std::move(seed_sentencepieces));
 
   if (trainer_spec_.split_by_whitespace()) {
     SplitSentencesByWhitespace();
+  } else if (is_tsv) {
+    DeduplicateSentences();
   }
 
   LOG(INFO) << "Using " << sentences_.size() << " sentences for EM training";
 
+  if (trainer_spec_.lattice_cache_size() > 0) {
+    lattice_cache_ = std::make_unique<LatticeCache>(
+        sentences_.size(), trainer_spec_.lattice_cache_size(),
+        trainer_spec_.num_threads());
+    lattice_cache_->SetModel(model);
+  }
+
   desired_vocab_size_ = static_cast<size_t>(trainer_spec_.vocab_size() * 1.1);
 
   while (true) {
@@ -614,6 +938,7 @@ util::Status Trainer::Train() {
       // Executes M step.
       auto new_sentencepieces = RunMStep(model, expected);
       model.SetSentencePieces(std::move(new_sentencepieces));
+      if (lattice_cache_) lattice_cache_->SetModel(model);
 
       LOG(INFO) << "EM sub_iter=" << iter << " size=" << model.GetPieceSize()
                 << " obj=" << objective << " num_tokens=" << num_tokens
@@ -630,6 +955,7 @@ util::Status Trainer::Train() {
     // Prunes pieces.
     auto new_sentencepieces = PruneSentencePieces(model);
     model.SetSentencePieces(std::move(new_sentencepieces));
+    if (lattice_cache_) lattice_cache_->SetModel(model);
   }  // end of EM iteration
 
   // Finally, adjusts the size of sentencepices to be |vocab_size|.
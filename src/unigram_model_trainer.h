@@ -15,6 +15,7 @@
 #ifndef UNIGRAM_MODEL_TRAINER_H_
 #define UNIGRAM_MODEL_TRAINER_H_
 
+#include <cstdint>
 #include <memory>
 #include <string>
 #include <utility>
@@ -60,6 +61,46 @@ class TrainerModel : public Model {
   ModelProto model_proto_data_;
 };
 
+// Caches the pieces found in each sentence by Model::LookupPieces(), so
+// that the lattices of the following EM iterations are populated without
+// the Trie lookup. As the pieces only get removed during the EM training,
+// the cached pieces are remapped to the new vocab ids when the model is
+// updated. The cached pieces are kept within |max_bytes| in total, and the
+// sentences not fitting in the budget are looked up every time.
+class LatticeCache {
+ public:
+  // PopulateNodes() for the sentence |sid| must be called from the thread
+  // |sid % num_threads|, i.e., each thread processes every num_threads-th
+  // sentence as the trainer does.
+  LatticeCache(size_t num_sentences, uint64_t max_bytes, int num_threads);
+
+  // Remaps the cached pieces to the vocab ids of |model|. The pieces no
+  // longer in |model| are dropped. Clears the cache if |model| has a piece
+  // which was not in the previous model.
+  void SetModel(const TrainerModel &model);
+
+  // Populates the pieces of |model| to |lattice|, which stores the
+  // sentence |sid|.
+  void PopulateNodes(const TrainerModel &model, size_t sid,
+                     Lattice *lattice);
+
+ private:
+  const int num_threads_;
+  const uint64_t max_bytes_per_thread_;
+
+  // Pieces the cached vocab ids refer to.
+  std::vector<std::string> pieces_;
+
+  // Pieces found in each sentence. Empty if not cached.
+  std::vector<std::vector<Model::PieceMatch>> matches_;
+
+  // Bytes used by the sentences of each thread.
+  std::vector<uint64_t> bytes_;
+
+  // Lookup buffer of each thread.
+  std::vector<std::vector<Model::PieceMatch>> buffers_;
+};
+
 class Trainer : public TrainerInterface {
  public:
   Trainer(const TrainerSpec &trainer_spec,
@@ -74,6 +115,8 @@ class Trainer : public TrainerInterface {
 
  private:
   FRIEND_TEST(TrainerTest, IsValidSentencePieceTest);
+  FRIEND_TEST(UnigramTrainerTest, DeduplicatedSeedTest);
+  FRIEND_TEST(UnigramTrainerTest, ShardedSeedTest);
 
   // Makes seed pieces from the training corpus.
   // The size of seed pieces is determined by seed_sentencepiece_size.
@@ -82,6 +125,22 @@ class Trainer : public TrainerInterface {
   template <typename node_int_type>
   TrainerModel::SentencePieces MakeSeedSentencePiecesInternal();
 
+  // Returns at most |size| frequent sub strings in |array| with their
+  // scores, using a suffix array. |array| stores the sentences from
+  // sentences_[first_sentence] with 0x0000 delimiter. |sentence_begins|
+  // stores their offsets in |array| if the sentences are weighted by their
+  // frequencies, and is empty otherwise.
+  template <typename node_int_type>
+  std::vector<std::pair<std::string, int64_t>> ExtractFrequentSubstrings(
+      const std::vector<char32> &array,
+      const std::vector<size_t> &sentence_begins, size_t first_sentence,
+      size_t size) const;
+
+  // Populates the pieces of |model| to |lattice|, which stores
+  // sentences_[sid], using |lattice_cache_| if enabled.
+  void PopulateNodes(const TrainerModel &model, size_t sid,
+                     Lattice *lattice) const;
+
   // Executes the E step of EM and returns expected count.
   // The index of return array is the vocab id.
   // |objective| is a negative likelihood of the current model.
@@ -109,6 +168,9 @@ class Trainer : public TrainerInterface {
   // break the main training loop. desired_vocab_size_ = 1.1 * vocab_size_
   // for now.
   int desired_vocab_size_;
+
+  // Cache of the pieces found in sentences_. nullptr if disabled.
+  std::unique_ptr<LatticeCache> lattice_cache_;
 };
 }  // namespace unigram
 }  // namespace sentencepiece
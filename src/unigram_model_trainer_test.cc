@@ -14,7 +14,10 @@
 
 #include "unigram_model_trainer.h"
 
+#include <algorithm>
+#include <map>
 #include <string>
+#include <utility>
 #include <vector>
 
 #include "filesystem.h"
@@ -148,10 +151,151 @@ TEST(UnigramTrainerTest, BasicDPTest) {
   }
 }
 
+TEST(UnigramTrainerTest, DeduplicatedSeedTest) {
+  const std::string input_file =
+      util::JoinPath(::testing::TempDir(), "dup_input");
+  {
+    auto input = filesystem::NewReadableFile(
+        util::JoinPath(::testing::SrcDir(), "botchan.txt"));
+    std::vector<std::string> lines;
+    std::string line;
+    while (lines.size() < 300 && input->ReadLine(&line)) {
+      lines.push_back(line);
+    }
+    auto output = filesystem::NewWritableFile(input_file);
+    for (const auto &line : lines) output->WriteLine(line);
+    for (int i = 0; i < 150; ++i) output->WriteLine(lines[i]);
+    for (int i = 100; i < 200; ++i) output->WriteLine(lines[i]);
+  }
+
+  TrainerSpec trainer_spec;
+  trainer_spec.set_model_type(TrainerSpec::UNIGRAM);
+  trainer_spec.add_input(input_file);
+  trainer_spec.set_vocab_size(1000);
+  trainer_spec.set_model_prefix("model");
+  NormalizerSpec normalizer_spec;
+  normalizer_spec.set_name("identity");
+  NormalizerSpec denormalizer_spec;
+
+  auto make_seeds = [&](bool deduplicate) {
+    Trainer trainer(trainer_spec, normalizer_spec, denormalizer_spec);
+    EXPECT_OK(trainer.LoadSentences());
+    const size_t size = trainer.sentences_.size();
+    if (deduplicate) {
+      trainer.DeduplicateSentences();
+      EXPECT_LT(trainer.sentences_.size(), size);
+    }
+    auto seeds = trainer.MakeSeedSentencePieces();
+    std::sort(seeds.begin(), seeds.end());
+    return seeds;
+  };
+
+  // Sub strings are counted with the frequencies of the sentences.
+  const auto expected = make_seeds(false);
+  EXPECT_FALSE(expected.empty());
+  EXPECT_EQ(expected, make_seeds(true));
+}
+
+TEST(UnigramTrainerTest, ShardedSeedTest) {
+  TrainerSpec trainer_spec;
+  trainer_spec.set_model_type(TrainerSpec::UNIGRAM);
+  trainer_spec.add_input(util::JoinPath(::testing::SrcDir(), "botchan.txt"));
+  trainer_spec.set_vocab_size(1000);
+  trainer_spec.set_seed_sentencepiece_size(10000);
+  trainer_spec.set_num_threads(4);
+  trainer_spec.set_model_prefix("model");
+  NormalizerSpec normalizer_spec;
+  normalizer_spec.set_name("identity");
+  NormalizerSpec denormalizer_spec;
+
+  auto make_seeds = [&](uint64_t shard_size) {
+    trainer_spec.set_seed_sentencepiece_shard_size(shard_size);
+    Trainer trainer(trainer_spec, normalizer_spec, denormalizer_spec);
+    EXPECT_OK(trainer.LoadSentences());
+    trainer.DeduplicateSentences();
+    std::map<std::string, float> seeds;
+    for (const auto &w : trainer.MakeSeedSentencePieces()) {
+      seeds[w.first] = w.second;
+    }
+    return seeds;
+  };
+
+  // Compares the scores relative to the piece "e", as the log probabilities
+  // are normalized over different sets of pieces.
+  auto expect_same_score = [](const std::map<std::string, float> &expected,
+                              const std::map<std::string, float> &actual,
+                              const std::string &piece) {
+    EXPECT_NEAR(expected.at(piece) - expected.at("e"),
+                actual.at(piece) - actual.at("e"), 1e-3)
+        << piece;
+  };
+
+  const auto expected = make_seeds(0);
+
+  // One shard has all the sentences.
+  const auto single = make_seeds(1 << 30);
+  EXPECT_EQ(expected.size(), single.size());
+  for (const auto &it : single) {
+    ASSERT_TRUE(expected.count(it.first)) << it.first;
+    expect_same_score(expected, single, it.first);
+  }
+
+  // The frequencies are counted over all the shards. The small shards have
+  // fewer sub strings in total, but the frequent ones are still extracted.
+  const auto sharded = make_seeds(20000);
+  EXPECT_LE(sharded.size(), expected.size());
+  for (const auto &it : sharded) {
+    if (expected.count(it.first)) {
+      expect_same_score(expected, sharded, it.first);
+    }
+  }
+
+  std::vector<std::pair<float, std::string>> sorted;
+  for (const auto &it : expected) sorted.emplace_back(-it.second, it.first);
+  std::sort(sorted.begin(), sorted.end());
+  size_t num_found = 0;
+  for (size_t i = 0; i < 1000; ++i) {
+    num_found += sharded.count(sorted[i].second);
+  }
+  EXPECT_GE(num_found, 990);
+}
+
 namespace {
 
 static constexpr char kTestInputData[] = "wagahaiwa_nekodearu.txt";
 
+TEST(UnigramTrainerTest, LatticeCacheTest) {
+  const std::string input =
+      util::JoinPath(::testing::SrcDir(), kTestInputData);
+
+  auto train = [&](uint64_t lattice_cache_size) {
+    const std::string model_prefix =
+        util::JoinPath(::testing::TempDir(), "lattice_cache_model");
+    EXPECT_TRUE(
+        SentencePieceTrainer::Train(
+            absl::StrCat("--model_prefix=", model_prefix, " --input=", input,
+                         " --vocab_size=4000 --normalization_rule_name=identity",
+                         " --model_type=unigram --num_threads=4",
+                         " --max_sentence_length=2048 --lattice_cache_size=",
+                         lattice_cache_size))
+            .ok());
+    SentencePieceProcessor sp;
+    EXPECT_TRUE(sp.Load(absl::StrCat(model_prefix, ".model")).ok());
+    std::vector<std::pair<std::string, float>> pieces;
+    for (const auto &piece : sp.model_proto().pieces()) {
+      pieces.emplace_back(piece.piece(), piece.score());
+    }
+    return pieces;
+  };
+
+  // The cache does not change the result even if it is too small to keep
+  // all sentences.
+  const auto expected = train(0);
+  EXPECT_EQ(4000, expected.size());
+  EXPECT_EQ(expected, train(1 << 30));
+  EXPECT_EQ(expected, train(100000));
+}
+
 TEST(UnigramTrainerTest, EndToEndTest) {
   const std::string input =
       util::JoinPath(::testing::SrcDir(), kTestInputData);
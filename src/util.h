@@ -19,8 +19,11 @@
 #include <string.h>
 
 #include <algorithm>
+#include <atomic>
 #include <functional>
+#include <list>
 #include <memory>
+#include <mutex>
 #include <random>
 #include <sstream>
 #include <string>
@@ -30,6 +33,7 @@
 
 #include "common.h"
 #include "sentencepiece_processor.h"
+#include "third_party/absl/container/flat_hash_map.h"
 #include "third_party/absl/strings/string_view.h"
 
 #ifdef SPM_NO_THREADLOCAL
@@ -303,6 +307,17 @@ inline uint64_t FingerprintCat(uint64_t x, uint64_t y) {
   return y;
 }
 
+// Returns the FNV-1a hash of `s`. Unlike std::hash, it is the same in all
+// processes, so that it can be stored in a file.
+inline uint64_t Fingerprint(absl::string_view s) {
+  uint64_t h = 0xcbf29ce484222325;
+  for (const char c : s) {
+    h ^= static_cast<unsigned char>(c);
+    h *= 0x100000001b3;
+  }
+  return h;
+}
+
 }  // namespace port
 
 namespace random {
@@ -454,6 +469,61 @@ class ThreadPool {
   std::vector<std::thread> tasks_;
 };
 
+// Thread-safe cache of up to `capacity` values keyed by strings. The least
+// recently used value is evicted first.
+template <typename T>
+class LruCache {
+ public:
+  explicit LruCache(size_t capacity) : capacity_(capacity) {}
+
+  size_t capacity() const { return capacity_; }
+  size_t hits() const { return hits_; }
+  size_t misses() const { return misses_; }
+
+  // Copies the value of `key` to `value` if it exists.
+  bool Lookup(absl::string_view key, T *value) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    const auto it = index_.find(key);
+    if (it == index_.end()) {
+      ++misses_;
+      return false;
+    }
+    entries_.splice(entries_.begin(), entries_, it->second);
+    *value = it->second->second;
+    ++hits_;
+    return true;
+  }
+
+  void Insert(absl::string_view key, const T &value) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    if (capacity_ == 0 || index_.find(key) != index_.end()) return;
+    entries_.emplace_front(std::string(key), value);
+    // The key refers to the string in the list node, which never moves.
+    index_.emplace(entries_.front().first, entries_.begin());
+    while (entries_.size() > capacity_) {
+      index_.erase(entries_.back().first);
+      entries_.pop_back();
+    }
+  }
+
+  void Clear(bool reset_counters) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    index_.clear();
+    entries_.clear();
+    if (reset_counters) hits_ = misses_ = 0;
+  }
+
+ private:
+  using Entries = std::list<std::pair<std::string, T>>;
+
+  const size_t capacity_;
+  std::mutex mutex_;
+  Entries entries_;  // Most recently used first.
+  absl::flat_hash_map<absl::string_view, typename Entries::iterator> index_;
+  std::atomic<size_t> hits_{0};
+  std::atomic<size_t> misses_{0};
+};
+
 namespace log_domain {
 
 double LogSum(const std::vector<double> &xs);